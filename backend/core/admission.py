@@ -0,0 +1,478 @@
+"""
+Admission Control - کنترل پذیرش و Backpressure برای Pipeline ها
+
+حداکثر تعداد Pipeline های همزمان محدود است و درخواست‌های اضافه در صف‌های
+محدود منتظر می‌مانند. وقتی صف پر باشد، درخواست با QueueFullError رد می‌شود.
+صف‌ها بر اساس کلاس اولویت (interactive / monitoring / batch) و Tenant
+(API Key) تفکیک می‌شوند تا کارهای دسته‌ای یک مشتری تحلیل‌های تعاملی را گرسنه نگذارند.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import Any, Container, Deque, Dict, List, Optional
+
+from core.monitoring import queued_pipelines, admitted_pipelines, pipeline_queue_wait
+
+logger = logging.getLogger(__name__)
+
+# زمان پیش‌فرض اجرای Pipeline وقتی هنوز داده‌ای مشاهده نشده (15 دقیقه)
+DEFAULT_PIPELINE_SECONDS = 900
+
+
+class QueueFullError(Exception):
+    """صف Pipeline ها پر است"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__(f"Pipeline queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class StepDurationEstimator:
+    """تخمین زمان اجرای Pipeline بر اساس زمان‌های مشاهده شده Steps (EWMA)"""
+    
+    def __init__(self, alpha: float = 0.3, default_total: float = DEFAULT_PIPELINE_SECONDS):
+        self.alpha = alpha
+        self.default_total = default_total
+        self._step_durations: Dict[str, float] = {}
+        
+    def observe_step(self, step_name: str, duration: float):
+        """ثبت زمان اجرای یک Step"""
+        previous = self._step_durations.get(step_name)
+        if previous is None:
+            self._step_durations[step_name] = duration
+        else:
+            self._step_durations[step_name] = self.alpha * duration + (1 - self.alpha) * previous
+            
+    def observe_results(self, results: Dict[str, Any]):
+        """
+        ثبت زمان‌های Steps از خروجی PipelineManager.execute
+        
+        Args:
+            results: دیکشنری results (نام Step -> status/duration)
+        """
+        for step_name, step_result in (results or {}).items():
+            if isinstance(step_result, dict) and step_result.get('status') == 'completed':
+                self.observe_step(step_name, float(step_result.get('duration') or 0.0))
+                
+    def estimate(self, step_names: Optional[List[str]] = None) -> float:
+        """
+        تخمین زمان کل Pipeline
+        
+        Args:
+            step_names: نام Steps مورد نظر (None یعنی همه Steps مشاهده شده)
+            
+        Returns:
+            زمان تخمینی بر حسب ثانیه
+        """
+        if not self._step_durations:
+            return self.default_total
+            
+        if step_names is None:
+            return sum(self._step_durations.values())
+            
+        known = [self._step_durations[name] for name in step_names if name in self._step_durations]
+        if not known:
+            return self.default_total
+            
+        # برای Steps مشاهده نشده از میانگین Steps مشاهده شده استفاده می‌شود
+        average = sum(known) / len(known)
+        unknown_count = len(step_names) - len(known)
+        return sum(known) + average * unknown_count
+        
+    def get_stats(self) -> Dict[str, float]:
+        """زمان‌های تخمینی هر Step"""
+        return dict(self._step_durations)
+
+
+class PriorityClass(Enum):
+    """کلاس‌های اولویت اجرای Pipeline (به ترتیب اولویت)"""
+    INTERACTIVE = "interactive"
+    MONITORING = "monitoring"
+    BATCH = "batch"
+
+
+# ترتیب اولویت کلاس‌ها (اولویت مطلق بین کلاس‌ها)
+PRIORITY_ORDER = [PriorityClass.INTERACTIVE, PriorityClass.MONITORING, PriorityClass.BATCH]
+
+DEFAULT_TENANT = "anonymous"
+
+
+def get_tenant_id(
+    api_key: Optional[str],
+    client_host: Optional[str] = None,
+    known: Optional[Container[str]] = None
+) -> str:
+    """
+    شناسه Tenant بر اساس API Key (یا IP در صورت نبود API Key)
+    
+    API Key به صورت hash نگهداری می‌شود تا در لاگ‌ها و آمار دیده نشود.
+    
+    Args:
+        api_key: مقدار X-API-Key
+        client_host: IP کلاینت
+        known: Tenant های تعریف شده؛ اگر داده شود API Key های ناشناخته نادیده گرفته
+            می‌شوند تا کلاینت با کلیدهای تصادفی Tenant جدیدی نسازد
+    """
+    if api_key:
+        tenant = "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        if known is None or tenant in known:
+            return tenant
+    if client_host:
+        return f"ip:{client_host}"
+    return DEFAULT_TENANT
+
+
+def _parse_tenant_weights(raw: str) -> Dict[str, float]:
+    """خواندن وزن Tenant ها از قالب "api_key=weight,api_key2=weight" """
+    weights = {}
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        api_key, weight = item.rsplit("=", 1)
+        try:
+            weights[get_tenant_id(api_key.strip())] = max(0.01, float(weight))
+        except ValueError:
+            logger.warning("Invalid tenant weight entry ignored")
+    return weights
+
+
+class PipelineTicket:
+    """نوبت یک Pipeline در Admission Controller"""
+    
+    def __init__(
+        self,
+        analysis_id: str,
+        priority_class: PriorityClass = PriorityClass.INTERACTIVE,
+        tenant: str = DEFAULT_TENANT
+    ):
+        self.analysis_id = analysis_id
+        self.priority_class = priority_class
+        self.tenant = tenant
+        self.enqueued_at = time.monotonic()
+        self.admitted = False
+        self.was_queued = False
+        self.cancelled = False
+        # برچسب شروع مجازی برای Weighted Fair Queueing بین Tenant ها
+        self.start_tag = 0.0
+        self._future: Optional[asyncio.Future] = None
+
+
+class _TenantQueue:
+    """صف و وضعیت یک Tenant در یک کلاس اولویت"""
+    
+    def __init__(self):
+        self.waiting: Deque[PipelineTicket] = deque()
+        self.last_finish_tag = 0.0
+
+
+class AdmissionController:
+    """
+    کنترل تعداد Pipeline های همزمان و صف انتظار
+    
+    - اولویت مطلق بین کلاس‌ها: interactive > monitoring > batch
+    - چند Slot برای interactive رزرو می‌شود تا کارهای دسته‌ای همه ظرفیت را نگیرند
+    - درون هر کلاس، Weighted Fair Queueing بین Tenant ها (بر اساس برچسب زمان مجازی)
+    - سقف همزمانی برای هر Tenant
+    """
+    
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        estimator: Optional[StepDurationEstimator] = None,
+        reserved_interactive: Optional[int] = None,
+        tenant_max_concurrent: Optional[int] = None,
+        tenant_weights: Optional[Dict[str, float]] = None
+    ):
+        self.max_concurrent = max_concurrent or int(os.getenv('MAX_CONCURRENT_PIPELINES', '4'))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('PIPELINE_QUEUE_SIZE', '20'))
+        self.estimator = estimator or StepDurationEstimator()
+        
+        if reserved_interactive is None:
+            reserved_interactive = int(os.getenv('INTERACTIVE_RESERVED_SLOTS', '1'))
+        self.reserved_interactive = min(max(0, reserved_interactive), self.max_concurrent - 1)
+        self.tenant_max_concurrent = tenant_max_concurrent or int(
+            os.getenv('TENANT_MAX_CONCURRENT_PIPELINES', str(self.max_concurrent))
+        )
+        self.tenant_weights = tenant_weights if tenant_weights is not None else _parse_tenant_weights(
+            os.getenv('TENANT_WEIGHTS', '')
+        )
+        
+        # حداکثر طول صف هر کلاس (کارهای دسته‌ای صف بزرگ‌تری دارند)
+        self.class_queue_limits = {
+            PriorityClass.INTERACTIVE: self.max_queue,
+            PriorityClass.MONITORING: int(os.getenv('MONITORING_QUEUE_SIZE', str(self.max_queue * 5))),
+            PriorityClass.BATCH: int(os.getenv('BATCH_QUEUE_SIZE', '2000'))
+        }
+        
+        self._running = 0
+        self._class_running: Dict[PriorityClass, int] = {c: 0 for c in PriorityClass}
+        self._class_waiting: Dict[PriorityClass, int] = {c: 0 for c in PriorityClass}
+        self._tenant_running: Dict[str, int] = {}
+        self._queues: Dict[PriorityClass, Dict[str, _TenantQueue]] = {c: {} for c in PriorityClass}
+        self._virtual_time: Dict[PriorityClass, float] = {c: 0.0 for c in PriorityClass}
+    
+    def _class_limit(self, priority_class: PriorityClass) -> int:
+        """حداکثر Slot قابل استفاده برای یک کلاس"""
+        if priority_class == PriorityClass.INTERACTIVE:
+            return self.max_concurrent
+        return self.max_concurrent - self.reserved_interactive
+    
+    def class_capacity(self, priority_class: PriorityClass) -> int:
+        """تعداد Pipeline هایی از یک کلاس که می‌توانند همزمان اجرا شوند"""
+        return min(self._class_limit(priority_class), self.tenant_max_concurrent)
+    
+    def reserve(
+        self,
+        analysis_id: str,
+        priority_class: PriorityClass = PriorityClass.INTERACTIVE,
+        tenant: str = DEFAULT_TENANT
+    ) -> PipelineTicket:
+        """
+        رزرو نوبت برای یک Pipeline
+        
+        Args:
+            analysis_id: شناسه تحلیل
+            priority_class: کلاس اولویت
+            tenant: شناسه Tenant (get_tenant_id)
+            
+        Returns:
+            PipelineTicket (اگر admitted باشد بلافاصله اجرا می‌شود)
+            
+        Raises:
+            QueueFullError: اگر ظرفیت و صف کلاس هر دو پر باشند
+        """
+        if self._class_waiting[priority_class] >= self.class_queue_limits[priority_class]:
+            raise QueueFullError(self.retry_after())
+        
+        ticket = PipelineTicket(analysis_id, priority_class, tenant)
+        ticket._future = asyncio.get_running_loop().create_future()
+        
+        # محاسبه برچسب WFQ: شروع = max(زمان مجازی کلاس، پایان آخرین کار Tenant)
+        tenant_queue = self._queues[priority_class].setdefault(tenant, _TenantQueue())
+        weight = self.tenant_weights.get(tenant, 1.0)
+        ticket.start_tag = max(self._virtual_time[priority_class], tenant_queue.last_finish_tag)
+        tenant_queue.last_finish_tag = ticket.start_tag + 1.0 / weight
+        tenant_queue.waiting.append(ticket)
+        self._class_waiting[priority_class] += 1
+        
+        self._dispatch()
+        
+        if not ticket.admitted:
+            ticket.was_queued = True
+            logger.info(
+                f"Pipeline {analysis_id} queued ({priority_class.value}) "
+                f"at position {self.get_position(ticket)}"
+            )
+        
+        self._update_gauges()
+        return ticket
+    
+    def _next_ticket(self, priority_class: PriorityClass) -> Optional[PipelineTicket]:
+        """انتخاب Ticket بعدی یک کلاس با کمترین برچسب شروع بین Tenant های مجاز"""
+        best: Optional[PipelineTicket] = None
+        
+        for tenant, tenant_queue in self._queues[priority_class].items():
+            while tenant_queue.waiting and tenant_queue.waiting[0].cancelled:
+                tenant_queue.waiting.popleft()
+            if not tenant_queue.waiting:
+                continue
+            if self._tenant_running.get(tenant, 0) >= self.tenant_max_concurrent:
+                continue
+            head = tenant_queue.waiting[0]
+            if best is None or head.start_tag < best.start_tag:
+                best = head
+        
+        return best
+    
+    def _dispatch(self):
+        """اختصاص Slot های آزاد به Ticket های منتظر بر اساس اولویت و سهم منصفانه"""
+        while self._running < self.max_concurrent:
+            ticket = None
+            for priority_class in PRIORITY_ORDER:
+                if self._class_running[priority_class] >= self._class_limit(priority_class):
+                    continue
+                ticket = self._next_ticket(priority_class)
+                if ticket is not None:
+                    break
+            
+            if ticket is None:
+                return
+            
+            self._admit(ticket)
+    
+    def _admit(self, ticket: PipelineTicket):
+        """اجرای یک Ticket و به‌روزرسانی شمارنده‌ها"""
+        priority_class = ticket.priority_class
+        tenant_queue = self._queues[priority_class][ticket.tenant]
+        tenant_queue.waiting.popleft()
+        
+        self._virtual_time[priority_class] = max(self._virtual_time[priority_class], ticket.start_tag)
+        self._class_waiting[priority_class] -= 1
+        self._running += 1
+        self._class_running[priority_class] += 1
+        self._tenant_running[ticket.tenant] = self._tenant_running.get(ticket.tenant, 0) + 1
+        
+        ticket.admitted = True
+        wait_time = time.monotonic() - ticket.enqueued_at
+        pipeline_queue_wait.labels(priority_class=priority_class.value).observe(wait_time)
+        if not ticket._future.done():
+            ticket._future.set_result(True)
+    
+    def get_position(self, ticket: PipelineTicket) -> int:
+        """موقعیت تقریبی در صف (0 یعنی در حال اجرا)"""
+        if ticket.admitted or ticket.cancelled:
+            return 0
+        
+        position = 1
+        for priority_class in PRIORITY_ORDER:
+            if priority_class == ticket.priority_class:
+                for tenant_queue in self._queues[priority_class].values():
+                    position += sum(
+                        1 for t in tenant_queue.waiting
+                        if not t.cancelled and t.start_tag < ticket.start_tag
+                    )
+                break
+            position += self._class_waiting[priority_class]
+        return position
+    
+    def estimate_wait(self, position: int, step_names: Optional[List[str]] = None) -> int:
+        """
+        تخمین زمان انتظار تا شروع اجرا
+        
+        Args:
+            position: موقعیت در صف (0 یعنی بدون انتظار)
+            step_names: Steps مورد انتظار Pipeline
+            
+        Returns:
+            زمان انتظار بر حسب ثانیه
+        """
+        if position <= 0:
+            return 0
+        rounds = math.ceil(position / self.max_concurrent)
+        return int(rounds * self.estimator.estimate(step_names))
+    
+    def estimate_completion(self, position: int, step_names: Optional[List[str]] = None) -> int:
+        """تخمین زمان تا پایان Pipeline (انتظار + اجرا)"""
+        return self.estimate_wait(position, step_names) + int(self.estimator.estimate(step_names))
+    
+    def retry_after(self) -> int:
+        """زمان پیشنهادی برای تلاش مجدد وقتی صف پر است"""
+        return max(1, int(self.estimator.estimate() / self.max_concurrent))
+    
+    async def wait_for_slot(self, ticket: PipelineTicket):
+        """انتظار تا نوبت اجرای Pipeline برسد"""
+        if ticket.admitted:
+            return
+        
+        try:
+            await ticket._future
+        except asyncio.CancelledError:
+            self.cancel(ticket)
+            raise
+    
+    def release(self, ticket: PipelineTicket):
+        """آزادسازی ظرفیت پس از پایان Pipeline و واگذاری آن به Ticket بعدی"""
+        if not ticket.admitted:
+            self.cancel(ticket)
+            return
+        
+        ticket.admitted = False
+        ticket.cancelled = True  # Ticket تمام شده دیگر قابل لغو یا اجرا نیست
+        self._running -= 1
+        self._class_running[ticket.priority_class] -= 1
+        self._tenant_running[ticket.tenant] -= 1
+        if self._tenant_running[ticket.tenant] <= 0:
+            del self._tenant_running[ticket.tenant]
+        
+        self._dispatch()
+        self._cleanup_tenant(ticket.priority_class, ticket.tenant)
+        self._update_gauges()
+    
+    def cancel(self, ticket: PipelineTicket):
+        """لغو نوبت یک Pipeline که هنوز شروع نشده"""
+        if ticket.admitted:
+            self.release(ticket)
+            return
+        if ticket.cancelled:
+            return
+        
+        ticket.cancelled = True
+        tenant_queue = self._queues[ticket.priority_class].get(ticket.tenant)
+        if tenant_queue is not None:
+            try:
+                tenant_queue.waiting.remove(ticket)
+                self._class_waiting[ticket.priority_class] -= 1
+            except ValueError:
+                pass
+        
+        self._cleanup_tenant(ticket.priority_class, ticket.tenant)
+        self._update_gauges()
+    
+    def _cleanup_tenant(self, priority_class: PriorityClass, tenant: str):
+        """حذف صف Tenant وقتی کار منتظری ندارد و برچسبش از زمان مجازی عقب‌تر است"""
+        tenant_queue = self._queues[priority_class].get(tenant)
+        if tenant_queue is None or tenant_queue.waiting:
+            return
+        if tenant_queue.last_finish_tag <= self._virtual_time[priority_class]:
+            del self._queues[priority_class][tenant]
+    
+    def _update_gauges(self):
+        """به‌روزرسانی Metrics"""
+        for priority_class in PriorityClass:
+            admitted_pipelines.labels(priority_class=priority_class.value).set(
+                self._class_running[priority_class]
+            )
+            queued_pipelines.labels(priority_class=priority_class.value).set(
+                self._class_waiting[priority_class]
+            )
+    
+    @asynccontextmanager
+    async def slot(self, ticket: PipelineTicket):
+        """Context Manager برای اجرای Pipeline در ظرفیت رزرو شده"""
+        await self.wait_for_slot(ticket)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """وضعیت فعلی Admission Controller"""
+        return {
+            'running': self._running,
+            'queued': sum(self._class_waiting.values()),
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'reserved_interactive_slots': self.reserved_interactive,
+            'tenant_max_concurrent': self.tenant_max_concurrent,
+            'classes': {
+                priority_class.value: {
+                    'running': self._class_running[priority_class],
+                    'queued': self._class_waiting[priority_class]
+                }
+                for priority_class in PriorityClass
+            },
+            'estimated_pipeline_seconds': int(self.estimator.estimate())
+        }
+
+
+def get_pipeline_step_names(auto_implement: bool, content_types: List[str]) -> List[str]:
+    """نام Steps پایپ‌لاین کامل بر اساس تنظیمات درخواست (مطابق create_full_pipeline)"""
+    step_names = ['site_analysis', 'seo_analysis']
+    if content_types:
+        step_names.append('content_generation')
+    if auto_implement:
+        step_names.append('seo_implementation')
+    step_names.extend(['content_placement', 'dashboard_update'])
+    return step_names
+
+
+# Global Admission Controller Instance
+admission_controller = AdmissionController()
@@ -0,0 +1,118 @@
+"""
+Analysis Coalescer - ادغام تحلیل‌های همزمان یکسان (Singleflight)
+
+اگر چند درخواست `/analyze-site` برای یک سایت با تنظیمات یکسان همزمان برسد،
+فقط اولین درخواست (leader) Pipeline را اجرا می‌کند و بقیه (followers)
+به همان اجرا متصل می‌شوند. هر درخواست analysis_id مخصوص خودش را دارد.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from core.monitoring import analysis_requests_coalesced, inflight_analyses
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_site_url(url: str) -> str:
+    """
+    نرمال‌سازی URL برای مقایسه درخواست‌ها
+    
+    همان قواعد SiteAnalyzer.validate_url به اضافه حذف پورت پیش‌فرض،
+    حروف کوچک برای scheme/host و حذف / انتهایی.
+    """
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+        
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    port = parsed.port
+    
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+        
+    path = parsed.path.rstrip('/')
+    return f"{scheme}://{host}{path}"
+
+
+def make_analysis_key(url: str, auto_implement: bool, content_types: List[str]) -> str:
+    """تولید کلید یکتا برای یک تحلیل بر اساس URL نرمال‌شده و تنظیمات"""
+    types_key = ",".join(sorted(set(content_types or [])))
+    return f"{normalize_site_url(url)}|auto={int(bool(auto_implement))}|types={types_key}"
+
+
+class _InflightAnalysis:
+    """وضعیت یک تحلیل در حال اجرا"""
+    
+    def __init__(self, leader_id: str):
+        self.leader_id = leader_id
+        self.follower_ids: List[str] = []
+
+
+class AnalysisCoalescer:
+    """مدیریت ادغام تحلیل‌های در حال اجرا"""
+    
+    def __init__(self):
+        self._inflight: Dict[str, _InflightAnalysis] = {}
+        
+    def join(self, key: str, analysis_id: str) -> Tuple[bool, str]:
+        """
+        ثبت یک درخواست تحلیل
+        
+        Args:
+            key: کلید تحلیل (make_analysis_key)
+            analysis_id: شناسه تحلیل این درخواست
+            
+        Returns:
+            (is_leader, leader_id) - اگر is_leader باشد، فراخواننده باید Pipeline را اجرا کند
+        """
+        inflight = self._inflight.get(key)
+        
+        if inflight is None:
+            self._inflight[key] = _InflightAnalysis(analysis_id)
+            inflight_analyses.set(len(self._inflight))
+            analysis_requests_coalesced.labels(outcome='leader').inc()
+            return True, analysis_id
+            
+        inflight.follower_ids.append(analysis_id)
+        analysis_requests_coalesced.labels(outcome='follower').inc()
+        logger.info(f"Coalesced analysis {analysis_id} into in-flight run {inflight.leader_id}")
+        return False, inflight.leader_id
+        
+    def leave(self, key: str, leader_id: str) -> List[str]:
+        """
+        پایان اجرای leader و برگرداندن followers برای به‌اشتراک‌گذاری نتایج
+        
+        Args:
+            key: کلید تحلیل
+            leader_id: شناسه تحلیل leader
+            
+        Returns:
+            لیست analysis_id های followers
+        """
+        inflight = self._inflight.get(key)
+        if inflight is None or inflight.leader_id != leader_id:
+            return []
+            
+        del self._inflight[key]
+        inflight_analyses.set(len(self._inflight))
+        return inflight.follower_ids
+        
+    def get_leader(self, key: str) -> Optional[str]:
+        """دریافت شناسه leader تحلیل در حال اجرا (در صورت وجود)"""
+        inflight = self._inflight.get(key)
+        return inflight.leader_id if inflight else None
+        
+    def get_stats(self) -> Dict[str, int]:
+        """آمار تحلیل‌های در حال اجرا"""
+        return {
+            'inflight': len(self._inflight),
+            'followers': sum(len(i.follower_ids) for i in self._inflight.values())
+        }
+
+
+# Global Analysis Coalescer Instance
+analysis_coalescer = AnalysisCoalescer()
@@ -0,0 +1,469 @@
+"""
+Analysis Diff - مقایسه ساختاری دو تحلیل یک سایت
+
+به جای مقایسه عمیق و بازگشتی کل دیکشنری‌ها، داده‌های هر تحلیل به رکوردهای کلیددار
+تبدیل می‌شوند و فقط Hash آن‌ها مقایسه می‌شود:
+- صفحات: تمام لیست‌های seo_analysis که آیتم‌های آن‌ها url دارند (یا خود url هستند)
+  بر اساس آدرس صفحه ادغام می‌شوند (مثلاً technical.pages و headings.pages_without_h1)
+- مشکلات: بر اساس (type، url) و نقاط ضعف بر اساس عنوان
+- بخش‌های site_analysis: هر بخش سطح اول
+
+فقط برای رکوردهایی که Hash آن‌ها تغییر کرده، فیلدهای تغییر کرده استخراج می‌شوند؛
+در نتیجه زمان مقایسه با تعداد صفحات خطی است (تحلیل‌های 10 هزار صفحه‌ای در کسری از ثانیه).
+خلاصه تغییرات پس از هر تحلیل مجدد در داشبورد ذخیره و به هشدارها اضافه می‌شود.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.cache import analysis_tag, cache_manager
+from core.portfolio import METRIC_FIELDS, SCORE_FIELDS
+
+try:
+    import orjson
+except ImportError:
+    # Hash با json استاندارد محاسبه می‌شود
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# مقایسه‌ها با نسخه نماهای مشتق شده دو تحلیل کلید می‌شوند و تا تغییر داده‌ها معتبرند
+ANALYSIS_DIFF_CACHE_TTL = int(os.getenv("ANALYSIS_DIFF_CACHE_TTL", str(7 * 24 * 3600)))
+# حداکثر آیتم‌های هر لیست جزئیات (شمارش‌های summary همیشه کامل هستند)
+ANALYSIS_DIFF_DETAIL_LIMIT = int(os.getenv("ANALYSIS_DIFF_DETAIL_LIMIT", "1000"))
+# حداقل تغییر امتیاز کلی برای ایجاد هشدار
+ANALYSIS_DIFF_SCORE_ALERT = float(os.getenv("ANALYSIS_DIFF_SCORE_ALERT", "5"))
+
+# فیلدهایی که در هر اجرا تغییر می‌کنند و نباید تغییر محسوب شوند
+VOLATILE_FIELDS = frozenset({'analyzed_at', 'last_crawled', 'crawled_at', 'generated_at', 'timestamp', 'checked_at'})
+# بخش‌هایی از seo_analysis که جداگانه مقایسه می‌شوند
+_SEPARATE_SECTIONS = frozenset({'issues', 'url', 'pages_analyzed', 'total_pages_found'})
+_MAX_DEPTH = 3
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def digest(value: Any) -> bytes:
+    """Hash کوتاه و پایدار یک مقدار (مستقل از ترتیب کلیدها)"""
+    return hashlib.blake2b(_dumps(value), digest_size=8).digest()
+
+
+def _stable(record: Dict[str, Any], drop: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """حذف فیلدهای متغیر یک رکورد"""
+    return {key: value for key, value in record.items() if key not in VOLATILE_FIELDS and key not in drop}
+
+
+def _is_page_url(value: Any) -> bool:
+    return isinstance(value, str) and ('://' in value or value.startswith('/'))
+
+
+def page_records(seo_analysis: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    رکورد هر صفحه از تمام لیست‌های صفحه‌ای seo_analysis
+    
+    Returns:
+        url -> {مسیر لیست (مثلاً technical.pages): آیتم بدون url، True برای لیست آدرس‌ها،
+        یا لیست آیتم‌ها اگر صفحه چند بار در آن لیست آمده باشد}
+    """
+    records: Dict[str, Dict[str, Any]] = {}
+    repeated = set()
+    
+    def add(url: str, path: str, value: Any):
+        record = records.setdefault(url, {})
+        if path not in record:
+            record[path] = value
+        elif (url, path) in repeated:
+            record[path].append(value)
+        else:
+            record[path] = [record[path], value]
+            repeated.add((url, path))
+            
+    def walk(value: Any, path: str, depth: int):
+        if isinstance(value, dict):
+            if depth < _MAX_DEPTH:
+                for key, child in value.items():
+                    walk(child, f"{path}.{key}", depth + 1)
+        elif isinstance(value, list) and value:
+            first = value[0]
+            if isinstance(first, dict) and 'url' in first:
+                for item in value:
+                    if isinstance(item, dict) and item.get('url'):
+                        add(item['url'], path, _stable(item, ('url',)))
+            elif _is_page_url(first):
+                for item in value:
+                    if _is_page_url(item):
+                        add(item, path, True)
+                        
+    for section, value in (seo_analysis or {}).items():
+        if section not in _SEPARATE_SECTIONS:
+            walk(value, section, 1)
+    return records
+
+
+def issue_records(seo_analysis: Dict[str, Any], weaknesses: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    رکورد مشکلات سئو (کلید: type|url) و نقاط ضعف (کلید: weakness|عنوان)
+    
+    عنوان مشکلات شامل تعداد است (مثلاً «12 تصویر بدون Alt Text»)، پس تغییر تعداد
+    به عنوان تغییر همان مشکل شناخته می‌شود و نه مشکل جدید. کلیدهای تکراری (مثلاً یک نقطه ضعف
+    برای چند صفحه) با Hash محتوا از هم جدا می‌شوند تا به ترتیب آیتم‌ها وابسته نباشند.
+    """
+    items = []
+    for issue in (seo_analysis or {}).get('issues') or []:
+        if isinstance(issue, dict):
+            items.append((f"{issue.get('type') or issue.get('title') or 'unknown'}|{issue.get('url') or ''}", _stable(issue)))
+    for weakness in weaknesses or []:
+        if isinstance(weakness, dict):
+            items.append((f"weakness|{weakness.get('title') or 'unknown'}", _stable(weakness)))
+            
+    counts: Dict[str, int] = {}
+    for key, _ in items:
+        counts[key] = counts.get(key, 0) + 1
+    records: Dict[str, Dict[str, Any]] = {}
+    for key, record in items:
+        if counts[key] > 1:
+            key = f"{key}#{digest(record).hex()}"
+        unique, index = key, 1
+        while unique in records:
+            index += 1
+            unique = f"{key}:{index}"
+        records[unique] = record
+    return records
+
+
+def _digests(records: Dict[str, Dict[str, Any]]) -> Dict[str, bytes]:
+    return {key: digest(record) for key, record in records.items()}
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def field_changes(before: Any, after: Any, prefix: str = '') -> List[Dict[str, Any]]:
+    """
+    فیلدهای تغییر کرده دو رکورد (یک سطح در عمق دیکشنری‌های تو در تو)
+    
+    مقادیر ساده با before/after و مقادیر بزرگ (لیست/دیکشنری) فقط با اندازه گزارش می‌شوند.
+    """
+    if not isinstance(before, dict) or not isinstance(after, dict):
+        return [_change(prefix or 'value', before, after)]
+    changes = []
+    for key in sorted(set(before) | set(after), key=str):
+        if key in VOLATILE_FIELDS:
+            continue
+        old, new = before.get(key), after.get(key)
+        if _is_scalar(old) and _is_scalar(new):
+            if old != new:
+                changes.append(_change(f"{prefix}{key}", old, new))
+        elif digest(old) != digest(new):
+            if isinstance(old, dict) and isinstance(new, dict) and prefix.count('.') < 2:
+                changes.extend(field_changes(old, new, f"{prefix}{key}."))
+            else:
+                changes.append(_change(f"{prefix}{key}", old, new))
+    return changes
+
+
+def _change(field: str, before: Any, after: Any) -> Dict[str, Any]:
+    if _is_scalar(before) and _is_scalar(after):
+        return {'field': field, 'before': before, 'after': after}
+    return {
+        'field': field,
+        'before_size': len(before) if isinstance(before, (list, dict)) else None,
+        'after_size': len(after) if isinstance(after, (list, dict)) else None
+    }
+
+
+def _keyed_diff(
+    before: Dict[str, Dict[str, Any]],
+    after: Dict[str, Dict[str, Any]],
+    limit: int
+) -> Tuple[List[str], List[str], List[Tuple[str, List[Dict[str, Any]]]], Dict[str, int]]:
+    """
+    مقایسه دو مجموعه رکورد کلیددار با Hash
+    
+    Returns:
+        (کلیدهای جدید، کلیدهای حذف شده، [(کلید، تغییرات)] تا limit مورد، شمارش‌ها)
+    """
+    before_digests = _digests(before)
+    after_digests = _digests(after)
+    added = [key for key in after_digests if key not in before_digests]
+    removed = [key for key in before_digests if key not in after_digests]
+    changed_keys = [
+        key for key, value in after_digests.items()
+        if key in before_digests and before_digests[key] != value
+    ]
+    changed = [(key, field_changes(before[key], after[key])) for key in changed_keys[:limit]]
+    counts = {
+        'added': len(added),
+        'removed': len(removed),
+        'changed': len(changed_keys),
+        'unchanged': len(after_digests) - len(added) - len(changed_keys)
+    }
+    return added, removed, changed, counts
+
+
+def _set_diff(before: List[Any], after: List[Any]) -> Dict[str, List[Any]]:
+    before_set, after_set = set(before or []), set(after or [])
+    return {
+        'added': [value for value in after or [] if value not in before_set],
+        'removed': [value for value in before or [] if value not in after_set]
+    }
+
+
+def diff_analyses(before: Dict[str, Any], after: Dict[str, Any], limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    مقایسه ساختاری دو تحلیل
+    
+    Args:
+        before: تحلیل پایه (خروجی DashboardManager.get_analysis_snapshot)
+        after: تحلیل جدید (همان ساختار)
+        limit: حداکثر آیتم‌های هر لیست جزئیات (پیش‌فرض: ANALYSIS_DIFF_DETAIL_LIMIT)
+        
+    Returns:
+        {'summary', 'scores', 'pages', 'issues', 'keywords', 'site', 'truncated', ...}
+    """
+    start = time.perf_counter()
+    limit = limit or ANALYSIS_DIFF_DETAIL_LIMIT
+    before_seo = before.get('seo_analysis') or {}
+    after_seo = after.get('seo_analysis') or {}
+    before_derived = before.get('derived') or {}
+    after_derived = after.get('derived') or {}
+    
+    # صفحات
+    pages_added, pages_removed, pages_changed, page_counts = _keyed_diff(
+        page_records(before_seo), page_records(after_seo), limit
+    )
+    titles_changed = sum(
+        1 for _, changes in pages_changed
+        if any(change['field'].rsplit('.', 1)[-1] == 'title' for change in changes)
+    )
+    
+    # مشکلات و نقاط ضعف
+    before_issues = issue_records(before_seo, before_derived.get('weaknesses'))
+    after_issues = issue_records(after_seo, after_derived.get('weaknesses'))
+    issues_new, issues_fixed, issues_changed, issue_counts = _keyed_diff(before_issues, after_issues, limit)
+    
+    # امتیازها و متریک‌ها (از ردیف portfolio نماهای مشتق شده)
+    before_metrics = (before_derived.get('portfolio') or {}).get('metrics') or {}
+    after_metrics = (after_derived.get('portfolio') or {}).get('metrics') or {}
+    scores = {}
+    for field in METRIC_FIELDS:
+        old, new = before_metrics.get(field), after_metrics.get(field)
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+            scores[field] = {'before': old, 'after': new, 'delta': round(new - old, 3)}
+        elif old is not None or new is not None:
+            scores[field] = {'before': old, 'after': new, 'delta': None}
+            
+    # سایت: CMS، پلاگین‌ها، تکنولوژی‌ها و بخش‌های site_analysis
+    before_search = before_derived.get('search') or {}
+    after_search = after_derived.get('search') or {}
+    plugins = _set_diff(before_search.get('plugins'), after_search.get('plugins'))
+    technologies = _set_diff(before_search.get('technologies'), after_search.get('technologies'))
+    keywords = _set_diff(before_search.get('keywords'), after_search.get('keywords'))
+    before_site = before.get('site_analysis') or {}
+    after_site = after.get('site_analysis') or {}
+    site_changes = []
+    for section in sorted(set(before_site) | set(after_site), key=str):
+        if section in VOLATILE_FIELDS or section in ('url', 'cms_details', 'technology_stack'):
+            continue
+        old, new = before_site.get(section), after_site.get(section)
+        if digest(old) != digest(new):
+            site_changes.extend(field_changes(old, new, f"{section}.") if isinstance(old, dict) and isinstance(new, dict)
+                                else [_change(section, old, new)])
+                                
+    overall = scores.get('overall_score', {})
+    truncated = any(
+        count > limit for count in (
+            page_counts['added'], page_counts['removed'], page_counts['changed'],
+            issue_counts['added'], issue_counts['removed'], issue_counts['changed']
+        )
+    )
+    return {
+        'analysis_id': after.get('analysis_id'),
+        'base_analysis_id': before.get('analysis_id'),
+        'site_url': after.get('site_url'),
+        'created_at': after.get('created_at'),
+        'base_created_at': before.get('created_at'),
+        'summary': {
+            'score_delta': overall.get('delta'),
+            'pages_added': page_counts['added'],
+            'pages_removed': page_counts['removed'],
+            'pages_changed': page_counts['changed'],
+            'pages_unchanged': page_counts['unchanged'],
+            'titles_changed': titles_changed,
+            'issues_new': issue_counts['added'],
+            'issues_fixed': issue_counts['removed'],
+            'issues_changed': issue_counts['changed'],
+            'high_priority_new': sum(
+                1 for key in issues_new
+                if after_issues[key].get('severity') == 'high' or after_issues[key].get('priority') == 'high'
+            ),
+            'keywords_added': len(keywords['added']),
+            'keywords_removed': len(keywords['removed']),
+            'plugins_added': len(plugins['added']),
+            'plugins_removed': len(plugins['removed']),
+            'site_fields_changed': len(site_changes)
+        },
+        'scores': scores,
+        'pages': {
+            'added': pages_added[:limit],
+            'removed': pages_removed[:limit],
+            'changed': [{'url': url, 'changes': changes} for url, changes in pages_changed]
+        },
+        'issues': {
+            'new': [after_issues[key] for key in issues_new[:limit]],
+            'fixed': [before_issues[key] for key in issues_fixed[:limit]],
+            'changed': [
+                {'key': key, 'title': after_issues[key].get('title'), 'changes': changes}
+                for key, changes in issues_changed
+            ]
+        },
+        'keywords': keywords,
+        'site': {
+            'cms_type': {'before': before_search.get('cms_type'), 'after': after_search.get('cms_type')},
+            'plugins': plugins,
+            'technologies': technologies,
+            'changes': site_changes
+        },
+        'truncated': truncated,
+        'computed_in_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+def change_alerts(diff: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    هشدارهای «چه چیزی تغییر کرده» از نتیجه diff_analyses (با همان قالب هشدارهای داشبورد)
+    """
+    summary = diff['summary']
+    timestamp = datetime.now().isoformat()
+    alerts = []
+    
+    def alert(alert_type: str, message: str, priority: str):
+        alerts.append({
+            'type': alert_type,
+            'category': 'change',
+            'message': message,
+            'priority': priority,
+            'timestamp': timestamp
+        })
+        
+    delta = summary.get('score_delta')
+    if delta is not None and abs(delta) >= ANALYSIS_DIFF_SCORE_ALERT:
+        if delta < 0:
+            alert('warning', f'امتیاز کلی سایت نسبت به تحلیل قبلی {abs(delta):.1f} امتیاز کاهش یافته است', 'high')
+        else:
+            alert('info', f'امتیاز کلی سایت نسبت به تحلیل قبلی {delta:.1f} امتیاز افزایش یافته است', 'low')
+    ssl = next((change for change in diff['site']['changes'] if change['field'] == 'security.ssl_enabled'), None)
+    if ssl and ssl.get('before') and not ssl.get('after'):
+        alert('warning', 'HTTPS نسبت به تحلیل قبلی غیرفعال شده است', 'high')
+    if summary['issues_new']:
+        alert(
+            'warning',
+            f"{summary['issues_new']} مشکل جدید شناسایی شد ({summary['high_priority_new']} مورد با اولویت بالا)",
+            'high' if summary['high_priority_new'] else 'medium'
+        )
+    if summary['issues_fixed']:
+        alert('info', f"{summary['issues_fixed']} مشکل نسبت به تحلیل قبلی برطرف شده است", 'low')
+    if summary['pages_removed']:
+        alert('warning', f"{summary['pages_removed']} صفحه تحلیل قبلی در این تحلیل یافت نشد", 'medium')
+    if summary['pages_added']:
+        alert('info', f"{summary['pages_added']} صفحه جدید یافت شد", 'low')
+    if summary['titles_changed']:
+        alert('info', f"عنوان {summary['titles_changed']} صفحه تغییر کرده است", 'low')
+    if summary['plugins_added'] or summary['plugins_removed']:
+        alert(
+            'info',
+            f"پلاگین‌ها تغییر کرده‌اند ({summary['plugins_added']} جدید، {summary['plugins_removed']} حذف شده)",
+            'low'
+        )
+    return alerts
+
+
+def change_summary(diff: Dict[str, Any]) -> Dict[str, Any]:
+    """خلاصه کوچک تغییرات برای ذخیره در داشبورد (فیلد changes)"""
+    return {
+        'base_analysis_id': diff['base_analysis_id'],
+        'base_created_at': diff['base_created_at'],
+        'computed_at': datetime.now().isoformat(),
+        'summary': diff['summary'],
+        'scores': {field: diff['scores'][field] for field in SCORE_FIELDS if field in diff['scores']},
+        'alerts': change_alerts(diff)
+    }
+
+
+async def _compute_diff(analysis_id: str, base_id: str) -> Dict[str, Any]:
+    from core.dashboard_manager import DashboardManager
+    
+    manager = DashboardManager()
+    after = await manager.get_analysis_snapshot(analysis_id)
+    before = await manager.get_analysis_snapshot(base_id)
+    if after is None or before is None:
+        return {'error': 'Dashboard not found', 'analysis_id': analysis_id, 'base_analysis_id': base_id}
+    # مقایسه CPU-bound است؛ در Thread جداگانه تا Event Loop آزاد بماند
+    return await asyncio.to_thread(diff_analyses, before, after)
+
+
+async def previous_analysis_id(analysis_id: str) -> Optional[str]:
+    """شناسه آخرین تحلیل تکمیل شده قبلی همان سایت (از search_index)"""
+    from core.search_index import search_index
+    
+    if not search_index.connected:
+        return None
+    return await search_index.previous_analysis(analysis_id)
+
+
+async def get_analysis_diff(analysis_id: str, base_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    مقایسه یک تحلیل با تحلیل پایه (پیش‌فرض: تحلیل تکمیل شده قبلی همان سایت) از Cache
+    
+    کلید Cache شامل نسخه نماهای مشتق شده هر دو تحلیل است، پس تغییرات فقط-وضعیت
+    (مثلاً ذخیره همین خلاصه تغییرات) نتیجه را بی‌اعتبار نمی‌کنند.
+    
+    Returns:
+        نتیجه diff_analyses، {'error'} اگر داشبورد یافت نشود، یا None اگر تحلیل پایه‌ای وجود نداشته باشد
+    """
+    from core.dashboard_manager import DashboardManager
+    
+    base_id = base_id or await previous_analysis_id(analysis_id)
+    if base_id is None:
+        return None
+    manager = DashboardManager()
+    versions = []
+    for target in (base_id, analysis_id):
+        meta = await manager.get_dashboard_meta(target)
+        if meta is None:
+            return {'error': 'Dashboard not found', 'analysis_id': target}
+        versions.append(meta['derived_version'])
+    return await cache_manager.get_or_set(
+        f"analysis_diff:{base_id}:{versions[0]}:{analysis_id}:{versions[1]}",
+        _compute_diff,
+        lambda diff: 60 if 'error' in diff else ANALYSIS_DIFF_CACHE_TTL,
+        analysis_id,
+        base_id,
+        tags=[analysis_tag(analysis_id), analysis_tag(base_id)]
+    )
+
+
+async def record_changes(analysis_id: str):
+    """
+    مقایسه تحلیل تکمیل شده با تحلیل قبلی همان سایت و ذخیره خلاصه و هشدارهای تغییرات در داشبورد
+    """
+    from core.dashboard_manager import DashboardManager
+    
+    try:
+        diff = await get_analysis_diff(analysis_id)
+        if diff is None or 'error' in diff:
+            return
+        await DashboardManager().update_dashboard(analysis_id, {'changes': change_summary(diff)})
+    except Exception as e:
+        logger.error(f"Error recording changes for {analysis_id}: {str(e)}")
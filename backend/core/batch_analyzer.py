@@ -0,0 +1,351 @@
+"""
+Batch Analyzer - تحلیل دسته‌ای چندین سایت با منابع مشترک
+
+تمام سایت‌های یک دسته با یک Scheduler مشترک اجرا می‌شوند:
+- محدودیت همزمانی سراسری و محدودیت همزمانی برای هر Host
+- اجرای Pipeline ها با کلاس اولویت batch در Admission Controller
+- یک httpx.AsyncClient مشترک (Connection Pool مشترک) برای همه سایت‌ها
+- نتایج هر سایت به محض اتمام برگردانده می‌شود (برای Streaming به صورت NDJSON)
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from core.admission import admission_controller, PriorityClass, QueueFullError, DEFAULT_TENANT
+from core.analysis_coalescer import normalize_site_url
+from core.monitoring import monitor_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+def _host_key(url: str) -> str:
+    """کلید Host برای محدودیت همزمانی (بدون www)"""
+    host = (urlparse(url).hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+
+def create_shared_http_client(max_connections: int) -> httpx.AsyncClient:
+    """ایجاد httpx.AsyncClient مشترک با همان تنظیمات Analyzer ها"""
+    return httpx.AsyncClient(
+        timeout=30.0,
+        follow_redirects=True,
+        verify=False,  # مشابه SiteAnalyzer برای سایت‌های با گواهینامه منقضی شده
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        ),
+        headers={
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+    )
+
+
+class BatchSummary:
+    """جمع‌آوری خلاصه نتایج یک دسته"""
+    
+    def __init__(self, batch_id: str, total: int):
+        self.batch_id = batch_id
+        self.total = total
+        self.started_at = time.monotonic()
+        self.completed = 0
+        self.failed = 0
+        self.site_durations: List[float] = []
+        self.response_times: List[float] = []
+        self.issues_total = 0
+        self.ssl_enabled = 0
+        self.cms_types: Dict[str, int] = {}
+        self.failed_sites: List[Dict[str, str]] = []
+        
+    def add(self, item: Dict[str, Any]):
+        """افزودن نتیجه یک سایت به خلاصه"""
+        self.site_durations.append(item.get('duration', 0.0))
+        
+        if item.get('status') != 'completed':
+            self.failed += 1
+            self.failed_sites.append({'url': item.get('url', ''), 'error': item.get('error') or ''})
+            return
+            
+        self.completed += 1
+        summary = item.get('summary', {})
+        cms_type = summary.get('cms_type') or 'unknown'
+        self.cms_types[cms_type] = self.cms_types.get(cms_type, 0) + 1
+        self.issues_total += summary.get('issues_count', 0)
+        if summary.get('ssl_enabled'):
+            self.ssl_enabled += 1
+        if summary.get('response_time') is not None:
+            self.response_times.append(summary['response_time'])
+            
+    def to_dict(self) -> Dict[str, Any]:
+        """خلاصه نهایی دسته"""
+        elapsed = time.monotonic() - self.started_at
+        processed = self.completed + self.failed
+        return {
+            'type': 'summary',
+            'batch_id': self.batch_id,
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'elapsed_seconds': round(elapsed, 2),
+            'sites_per_minute': round(processed / elapsed * 60, 2) if elapsed > 0 else 0,
+            'average_site_duration': round(sum(self.site_durations) / len(self.site_durations), 2) if self.site_durations else 0,
+            'average_response_time': round(sum(self.response_times) / len(self.response_times), 3) if self.response_times else None,
+            'ssl_enabled_sites': self.ssl_enabled,
+            'total_issues': self.issues_total,
+            'cms_distribution': self.cms_types,
+            'failed_sites': self.failed_sites,
+            'finished_at': datetime.now().isoformat()
+        }
+
+
+class BatchAnalysisScheduler:
+    """Scheduler تحلیل دسته‌ای با محدودیت همزمانی سراسری و برای هر Host"""
+    
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        per_host_concurrency: Optional[int] = None
+    ):
+        # بیش از سهم کلاس batch در Admission Controller فقط در صف آن منتظر می‌ماند
+        self.pipeline_slots = admission_controller.class_capacity(PriorityClass.BATCH)
+        configured = max_concurrency or int(os.getenv('BATCH_MAX_CONCURRENCY', '0'))
+        self.max_concurrency = min(configured, self.pipeline_slots) if configured > 0 else self.pipeline_slots
+        self.per_host_concurrency = per_host_concurrency or int(os.getenv('BATCH_PER_HOST_CONCURRENCY', '2'))
+        self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_users: Dict[str, int] = {}
+        
+    def _acquire_host_semaphore(self, host: str) -> asyncio.Semaphore:
+        """دریافت Semaphore یک Host (با شمارش استفاده برای پاک‌سازی)"""
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_concurrency)
+            self._host_semaphores[host] = semaphore
+        self._host_users[host] = self._host_users.get(host, 0) + 1
+        return semaphore
+        
+    def _release_host_semaphore(self, host: str):
+        """پاک کردن Semaphore های بدون استفاده"""
+        self._host_users[host] -= 1
+        if self._host_users[host] <= 0:
+            del self._host_users[host]
+            del self._host_semaphores[host]
+            
+    async def stream(
+        self,
+        urls: List[str],
+        auto_implement: bool = False,
+        content_types: Optional[List[str]] = None,
+        tenant: str = DEFAULT_TENANT
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        اجرای تحلیل دسته‌ای و برگرداندن نتایج به محض آماده شدن
+        
+        Args:
+            urls: لیست آدرس سایت‌ها
+            auto_implement: آیا تغییرات خودکار اعمال شود؟
+            content_types: انواع محتوای تولیدی (پیش‌فرض: بدون تولید محتوا)
+            tenant: شناسه Tenant برای سهم منصفانه در Admission Controller
+            
+        Yields:
+            نتیجه هر سایت (type=result) و در پایان خلاصه دسته (type=summary)
+        """
+        content_types = content_types or []
+        batch_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        
+        # حذف URL های تکراری (بر اساس URL نرمال‌شده)
+        unique_urls: Dict[str, str] = {}
+        for url in urls:
+            unique_urls.setdefault(normalize_site_url(url), url)
+            
+        summary = BatchSummary(batch_id, len(unique_urls))
+        logger.info(f"Starting batch {batch_id} with {len(unique_urls)} sites")
+        
+        yield {
+            'type': 'batch_started',
+            'batch_id': batch_id,
+            'total': len(unique_urls),
+            'duplicates_removed': len(urls) - len(unique_urls),
+            'max_concurrency': self.max_concurrency,
+            'pipeline_slots': self.pipeline_slots,
+            'per_host_concurrency': self.per_host_concurrency
+        }
+        
+        http_client = create_shared_http_client(self.max_concurrency * 2)
+        tasks = [
+            asyncio.create_task(
+                self._analyze_site(batch_id, url, auto_implement, content_types, http_client, tenant)
+            )
+            for url in unique_urls.values()
+        ]
+        
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                summary.add(item)
+                yield item
+        finally:
+            # اگر Client قطع شد، تحلیل‌های باقیمانده لغو می‌شوند
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await http_client.aclose()
+            
+        yield summary.to_dict()
+        
+    async def _analyze_site(
+        self,
+        batch_id: str,
+        url: str,
+        auto_implement: bool,
+        content_types: List[str],
+        http_client: httpx.AsyncClient,
+        tenant: str
+    ) -> Dict[str, Any]:
+        """تحلیل یک سایت در محدودیت‌های همزمانی Scheduler و نوبت batch در Admission Controller"""
+        from core.dashboard_manager import DashboardManager
+        
+        analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        host = _host_key(normalize_site_url(url))
+        host_semaphore = self._acquire_host_semaphore(host)
+        dashboard_manager = DashboardManager()
+        start_time = time.monotonic()
+        
+        try:
+            await dashboard_manager.create_dashboard(analysis_id, url)
+            await dashboard_manager.update_dashboard(analysis_id, {'batch_id': batch_id})
+            
+            # ابتدا Slot همان Host گرفته می‌شود تا کارهای منتظر یک Host پرکار Slot سراسری را اشغال نکنند
+            async with host_semaphore:
+                async with self._global_semaphore:
+                    try:
+                        ticket = admission_controller.reserve(analysis_id, PriorityClass.BATCH, tenant)
+                    except QueueFullError:
+                        await dashboard_manager.update_dashboard(
+                            analysis_id,
+                            {'status': 'failed', 'error': 'Pipeline queue is full'}
+                        )
+                        return self._failed_item(analysis_id, url, 'Pipeline queue is full', 0.0)
+                    
+                    async with admission_controller.slot(ticket):
+                        return await self._run_pipeline(
+                            analysis_id, url, auto_implement, content_types, http_client
+                        )
+                        
+        except asyncio.CancelledError:
+            # قطع شدن Client: داشبوردهای ساخته شده نباید در وضعیت processing باقی بمانند
+            await self._mark_failed(analysis_id, 'Batch analysis was cancelled')
+            raise
+        except Exception as e:
+            # خطای یک سایت به یک خط نتیجه ناموفق تبدیل می‌شود و Stream ادامه پیدا می‌کند
+            logger.error(f"Batch analysis failed for {url}: {str(e)}")
+            await self._mark_failed(analysis_id, str(e))
+            return self._failed_item(analysis_id, url, str(e), round(time.monotonic() - start_time, 2))
+        finally:
+            self._release_host_semaphore(host)
+            
+    @staticmethod
+    def _failed_item(analysis_id: str, url: str, error: str, duration: float) -> Dict[str, Any]:
+        """خط نتیجه ناموفق یک سایت"""
+        return {
+            'type': 'result',
+            'analysis_id': analysis_id,
+            'url': url,
+            'status': 'failed',
+            'error': error,
+            'duration': duration
+        }
+        
+    @staticmethod
+    async def _mark_failed(analysis_id: str, error: str):
+        """ثبت وضعیت failed در داشبورد (خطای Database نادیده گرفته می‌شود)"""
+        from core.dashboard_manager import DashboardManager
+        
+        try:
+            await DashboardManager().update_dashboard(analysis_id, {'status': 'failed', 'error': error})
+        except Exception as e:
+            logger.error(f"Error marking batch analysis {analysis_id} as failed: {str(e)}")
+            
+    @monitor_pipeline("batch_site")
+    async def _run_pipeline(
+        self,
+        analysis_id: str,
+        url: str,
+        auto_implement: bool,
+        content_types: List[str],
+        http_client: httpx.AsyncClient
+    ) -> Dict[str, Any]:
+        """اجرای Pipeline کامل برای یک سایت با Client مشترک"""
+        from core.pipeline import create_full_pipeline
+        from core.dashboard_manager import DashboardManager
+        
+        start_time = time.monotonic()
+        result_item = {
+            'type': 'result',
+            'analysis_id': analysis_id,
+            'url': url,
+            'dashboard_url': f"/dashboard/{analysis_id}"
+        }
+        
+        try:
+            pipeline = await create_full_pipeline(
+                analysis_id,
+                url,
+                auto_implement,
+                content_types,
+                http_client=http_client
+            )
+            result = await pipeline.execute()
+            admission_controller.estimator.observe_results(result.get('results', {}))
+            
+            if result['status'] == 'completed':
+                result_item['status'] = 'completed'
+                result_item['summary'] = await self._summarize(result['context'])
+            else:
+                result_item['status'] = 'failed'
+                result_item['error'] = result.get('error')
+                await DashboardManager().update_dashboard(
+                    analysis_id,
+                    {'status': 'failed', 'error': result.get('error')}
+                )
+                
+        except Exception as e:
+            logger.error(f"Batch analysis failed for {url}: {str(e)}")
+            result_item['status'] = 'failed'
+            result_item['error'] = str(e)
+            await self._mark_failed(analysis_id, str(e))
+                
+        result_item['duration'] = round(time.monotonic() - start_time, 2)
+        return result_item
+        
+    async def _summarize(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """استخراج خلاصه کوچک از نتایج Pipeline برای خروجی Stream"""
+        site_analysis = await context.aget('site_analysis_result') or {}
+        seo_analysis = await context.aget('seo_analysis_result') or {}
+        performance = site_analysis.get('performance', {}) or {}
+        security = site_analysis.get('security', {}) or {}
+        sitemap = site_analysis.get('sitemap') or {}
+        
+        return {
+            'cms_type': site_analysis.get('cms_type'),
+            'response_time': performance.get('response_time'),
+            'status_code': performance.get('status_code'),
+            'ssl_enabled': bool(security.get('ssl_enabled')),
+            'sitemap_found': bool(sitemap.get('found')) if isinstance(sitemap, dict) else False,
+            'pages_analyzed': seo_analysis.get('pages_analyzed', 0),
+            'issues_count': len(seo_analysis.get('issues', []) or [])
+        }
+
+
+# Global Batch Scheduler Instance (مشترک بین تمام درخواست‌های دسته‌ای یک Worker)
+batch_scheduler = BatchAnalysisScheduler()
@@ -1,137 +1,907 @@
 """
 Cache Manager - مدیریت Cache برای بهبود Performance
+
+Cache دو لایه:
+- لایه محلی: LRU درون‌پردازه‌ای با TTL و سقف حجم (بایت)
+- لایه راه دور: Redis یا SQLite محلی (مشترک بین Worker ها، core.cache_backends)
+
+نوشتن به صورت write-through در هر دو لایه انجام می‌شود و خواندن به صورت
+read-through (لایه محلی، سپس Redis و پر کردن لایه محلی). تغییر یا حذف یک کلید
+از طریق کانال Invalidation همان Backend به سایر Worker ها اعلام می‌شود تا نسخه محلی آن را حذف کنند.
+
+get_or_set در برابر Cache Stampede محافظت شده است (Singleflight، Lock در Redis،
+stale-while-revalidate و انقضای زودهنگام احتمالی).
+
+کلیدها می‌توانند Tag داشته باشند (دامنه، تحلیل، منبع داده). نسخه هر Tag در
+Redis نگهداری و در نام کلید ذخیره شده قرار می‌گیرد؛ invalidate_tags فقط نسخه را
+افزایش می‌دهد و کلیدهای قدیمی با TTL خود حذف می‌شوند.
 """
 
+import asyncio
+import functools
+import inspect
 import json
 import hashlib
 import logging
-from typing import Any, Optional
-from datetime import datetime, timedelta
-try:
-    import redis.asyncio as redis
-except ImportError:
-    # Fallback برای زمانی که redis نصب نیست
-    redis = None
+import math
+import os
+import random
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import urlparse
+from core.cache_backends import CacheBackend, SQLiteCacheBackend, create_cache_backend
+from core.cache_codec import CacheCodec, CodecError
+from core.local_cache import LocalCache
+from core.monitoring import cache_requests, cache_get_or_set, cache_memoize
 
 logger = logging.getLogger(__name__)
 
+# پیشوند کلید Lock محاسبه (Singleflight بین Worker ها)
+LOCK_PREFIX = "lock:"
+
+# پیشوند کلید نسخه هر Tag (Namespace نسخه‌دار برای Invalidation با O(1))
+TAG_VERSION_PREFIX = "tagver:"
+
+# Tag ضمنی تمام کلیدها (برای پاک کردن کل Cache)
+GLOBAL_TAG = "all"
+
+# نشانه خطای ذخیره شده (Negative Caching در memoize)
+FAILURE_MARKER = "__cache_failure__"
+
+# نشانه Entry ذخیره شده (مقدار + زمان انقضای منطقی + هزینه محاسبه)
+ENTRY_MARKER = "__ce"
+
+
+def domain_tag(url_or_domain: str) -> str:
+    """Tag یک دامنه (بدون scheme و www)"""
+    value = url_or_domain.strip().lower()
+    if '://' in value:
+        value = urlparse(value).hostname or ''
+    value = value.split('/')[0].split(':')[0]
+    if value.startswith('www.'):
+        value = value[4:]
+    return f"domain:{value}"
+
+
+def analysis_tag(analysis_id: str) -> str:
+    """Tag یک تحلیل"""
+    return f"analysis:{analysis_id}"
+
+
+def source_tag(source: str) -> str:
+    """Tag یک منبع داده (مثلاً ahrefs، semrush، serp)"""
+    return f"source:{source.lower()}"
+
+
+class CachedFailureError(Exception):
+    """خطای ذخیره شده یک متد memoize شده (تا پایان negative_ttl دوباره اجرا نمی‌شود)"""
+    pass
+
 
 class CacheManager:
-    """مدیریت Cache با Redis"""
+    """مدیریت Cache دو لایه (حافظه محلی + Redis)"""
     
-    def __init__(self, redis_url: str = "redis://localhost:6379/0"):
-        self.redis_url = redis_url
-        self.client: Optional[redis.Redis] = None
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        local_max_bytes: Optional[int] = None,
+        local_ttl: Optional[int] = None,
+        codec: Optional[CacheCodec] = None,
+        backend: Optional[CacheBackend] = None
+    ):
+        """
+        Args:
+            redis_url: آدرس Redis (برای Backend پیش‌فرض)
+            local_max_bytes: سقف حجم لایه محلی (بایت)
+            local_ttl: حداکثر TTL لایه محلی (ثانیه)
+            codec: Codec مقادیر
+            backend: Backend لایه راه دور (پیش‌فرض بر اساس CACHE_BACKEND)
+        """
+        self.backend_mode = os.getenv("CACHE_BACKEND", "redis").lower()
+        self.backend = backend or create_cache_backend(self.backend_mode, redis_url)
         self._connected = False
-    
-    async def connect(self):
-        """اتصال به Redis"""
-        if redis is None:
-            logger.warning("Redis not available, caching disabled")
-            self._connected = False
-            return
+        self.codec = codec or CacheCodec()
+        
+        # لایه محلی: TTL محلی حداکثر local_ttl است تا داده کهنه محدود بماند
+        self.local = LocalCache(
+            max_bytes=local_max_bytes or int(os.getenv("CACHE_LOCAL_MAX_BYTES", str(64 * 1024 * 1024)))
+        )
+        self.local_ttl = local_ttl if local_ttl is not None else int(os.getenv("CACHE_LOCAL_TTL", "60"))
         
+        # شناسه این Worker برای نادیده گرفتن پیام‌های Invalidation خودش
+        self._instance_id = uuid.uuid4().hex
+        self._listener_task: Optional[asyncio.Task] = None
+        
+        # Singleflight: کلیدهای در حال محاسبه در این Worker
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # کلیدهایی که تازه‌سازی پس‌زمینه آن‌ها زمان‌بندی شده ولی هنوز شروع نشده است
+        self._refreshing = set()
+        self._background_tasks = set()
+        self.lock_timeout = float(os.getenv("CACHE_LOCK_TIMEOUT", "30"))
+        
+        # نسخه Tag ها: tag -> (version, expires_at) در حافظه، و شمارنده محلی وقتی Redis نیست
+        self._tag_versions: Dict[str, tuple] = {}
+        self._local_tag_counters: Dict[str, int] = {}
+        
+        # آمار متدهای memoize شده: method -> result -> count
+        self.memoize_stats: Dict[str, Dict[str, int]] = {}
+        
+        self.stats = {
+            'local_hits': 0,
+            'local_misses': 0,
+            'remote_hits': 0,
+            'remote_misses': 0,
+            'invalidations_received': 0
+        }
+        
+    async def connect(self):
+        """اتصال به Backend و شروع گوش دادن به پیام‌های Invalidation"""
         try:
-            self.client = await redis.from_url(
-                self.redis_url,
-                encoding="utf-8",
-                decode_responses=True
-            )
-            await self.client.ping()
-            self._connected = True
-            logger.info("Connected to Redis")
+            await self.backend.connect()
         except Exception as e:
-            logger.warning(f"Could not connect to Redis: {str(e)}")
-            self._connected = False
-    
+            if self.backend_mode != 'auto' or isinstance(self.backend, SQLiteCacheBackend):
+                logger.warning(f"Could not connect to {self.backend.name} cache backend, using local cache only: {str(e)}")
+                self._connected = False
+                return
+                
+            # حالت auto: بدون Redis از Backend محلی SQLite استفاده می‌شود
+            logger.warning(f"Could not connect to {self.backend.name}, falling back to SQLite cache: {str(e)}")
+            self.backend = SQLiteCacheBackend()
+            try:
+                await self.backend.connect()
+            except Exception as e:
+                logger.warning(f"Could not open SQLite cache, using local cache only: {str(e)}")
+                self._connected = False
+                return
+                
+        self._connected = True
+        logger.info(f"Connected to {self.backend.name} cache backend")
+        self._listener_task = asyncio.create_task(self._listen_invalidations())
+        
     async def close(self):
         """بستن اتصال"""
-        if self.client:
-            await self.client.close()
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener_task = None
+        if self._connected:
+            try:
+                await self.backend.close()
+            except Exception:
+                pass
             self._connected = False
-    
+        self.local.clear()
+        
+    async def _listen_invalidations(self):
+        """دریافت پیام‌های Invalidation از سایر Worker ها و حذف نسخه محلی"""
+        while True:
+            try:
+                async for message in self.backend.listen():
+                    try:
+                        payload = json.loads(message)
+                    except (TypeError, ValueError):
+                        continue
+                    if payload.get('origin') == self._instance_id:
+                        continue
+                    self.local.delete_many(payload.get('keys', []))
+                    for tag, version in (payload.get('tags') or {}).items():
+                        self._remember_tag_version(tag, int(version))
+                    self.stats['invalidations_received'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # قطع موقت اتصال؛ لایه محلی پاک می‌شود چون ممکن است پیامی از دست رفته باشد
+                logger.warning(f"Cache invalidation listener error: {str(e)}")
+                self.local.clear()
+                self._tag_versions.clear()
+                await asyncio.sleep(1)
+                
+    async def _publish_invalidation(self, keys: List[str], tags: Optional[Dict[str, int]] = None):
+        """اعلام تغییر کلیدها (یا نسخه جدید Tag ها) به سایر Worker ها"""
+        if not self._connected or not (keys or tags):
+            return
+            
+        try:
+            message = json.dumps({'origin': self._instance_id, 'keys': keys, 'tags': tags or {}})
+            await self.backend.publish(message)
+        except Exception as e:
+            logger.error(f"Error publishing cache invalidation: {str(e)}")
+            
     def _generate_key(self, prefix: str, *args) -> str:
         """تولید Cache Key"""
         key_data = "_".join(str(arg) for arg in args)
         key_hash = hashlib.md5(key_data.encode()).hexdigest()
         return f"{prefix}:{key_hash}"
-    
-    async def get(self, key: str) -> Optional[Any]:
-        """دریافت از Cache"""
-        if not self._connected:
-            return None
         
+    def _remember_tag_version(self, tag: str, version: int):
+        """ذخیره نسخه یک Tag در حافظه (حداکثر به مدت local_ttl)"""
+        current = self._tag_versions.get(tag)
+        if current is not None and current[0] > version and current[1] > time.monotonic():
+            return
+        self._tag_versions[tag] = (version, time.monotonic() + self.local_ttl)
+        
+    async def _get_tag_versions(self, tags: List[str]) -> Dict[str, int]:
+        """دریافت نسخه فعلی Tag ها (از حافظه یا با یک MGET از Redis)"""
+        now = time.monotonic()
+        versions: Dict[str, int] = {}
+        missing: List[str] = []
+        
+        for tag in tags:
+            cached = self._tag_versions.get(tag)
+            if cached is not None and cached[1] > now:
+                versions[tag] = cached[0]
+            else:
+                missing.append(tag)
+                
+        if not missing:
+            return versions
+            
+        if self._connected:
+            try:
+                raw_versions = await self.backend.get_counters([f"{TAG_VERSION_PREFIX}{tag}" for tag in missing])
+            except Exception as e:
+                logger.error(f"Error getting cache tag versions: {str(e)}")
+                for tag in missing:
+                    cached = self._tag_versions.get(tag)
+                    versions[tag] = cached[0] if cached else 0
+                return versions
+        else:
+            raw_versions = [self._local_tag_counters.get(tag, 0) for tag in missing]
+            
+        for tag, raw_version in zip(missing, raw_versions):
+            version = int(raw_version or 0)
+            self._remember_tag_version(tag, version)
+            versions[tag] = version
+        return versions
+        
+    async def _physical_keys(self, keys: Iterable[str], tags: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        تبدیل کلیدهای منطقی به کلیدهای ذخیره شده با توجه به نسخه Tag ها
+        
+        نسخه هر Tag در نام کلید قرار می‌گیرد؛ با افزایش نسخه، تمام کلیدهای آن Tag
+        بدون پیمایش نامعتبر می‌شوند و با TTL خود از Redis حذف می‌شوند.
+        تا وقتی هیچ Tag ای نامعتبر نشده باشد، کلید ذخیره شده همان کلید منطقی است.
+        """
+        all_tags = sorted(set(tags or ()) | {GLOBAL_TAG})
+        versions = await self._get_tag_versions(all_tags)
+        namespace = ",".join(f"{tag}={versions[tag]}" for tag in all_tags if versions[tag])
+        
+        if not namespace:
+            return {key: key for key in keys}
+            
+        suffix = hashlib.md5(namespace.encode()).hexdigest()[:12]
+        return {key: f"{key}#{suffix}" for key in keys}
+        
+    async def _physical_key(self, key: str, tags: Optional[List[str]] = None) -> str:
+        """کلید ذخیره شده یک کلید منطقی"""
+        return (await self._physical_keys([key], tags))[key]
+        
+    async def invalidate_tags(self, tags: List[str]) -> Dict[str, int]:
+        """
+        نامعتبر کردن تمام کلیدهای دارای هر یک از Tag ها (O(1) برای هر Tag)
+        
+        Args:
+            tags: لیست Tag ها (domain_tag، analysis_tag، source_tag یا GLOBAL_TAG)
+            
+        Returns:
+            نسخه جدید هر Tag
+        """
+        tags = list(dict.fromkeys(tags))
+        if not tags:
+            return {}
+            
+        if self._connected:
+            try:
+                versions = await self.backend.incr_many([f"{TAG_VERSION_PREFIX}{tag}" for tag in tags])
+                new_versions = dict(zip(tags, versions))
+            except Exception as e:
+                logger.error(f"Error invalidating cache tags: {str(e)}")
+                return {}
+        else:
+            new_versions = {}
+            for tag in tags:
+                self._local_tag_counters[tag] = self._local_tag_counters.get(tag, 0) + 1
+                new_versions[tag] = self._local_tag_counters[tag]
+                
+        for tag, version in new_versions.items():
+            self._remember_tag_version(tag, version)
+            
+        await self._publish_invalidation([], new_versions)
+        logger.info(f"Invalidated cache tags: {', '.join(tags)}")
+        return new_versions
+        
+    def _record(self, tier: str, hit: bool):
+        """ثبت Hit/Miss یک لایه"""
+        self.stats[f"{tier}_{'hits' if hit else 'misses'}"] += 1
+        cache_requests.labels(tier=tier, result='hit' if hit else 'miss').inc()
+        
+    def _make_entry(self, value: Any, ttl: int, cost: float) -> Dict[str, Any]:
+        """ساخت Entry ذخیره شده (مقدار + زمان انقضای منطقی + هزینه محاسبه)"""
+        return {ENTRY_MARKER: 1, 'v': value, 'e': time.time() + ttl, 'd': round(cost, 4)}
+        
+    def _unwrap_entry(self, raw: Any) -> Dict[str, Any]:
+        """تبدیل مقدار خوانده شده به Entry (مقادیر قدیمی بدون Entry تازه فرض می‌شوند)"""
+        if isinstance(raw, dict) and raw.get(ENTRY_MARKER) == 1:
+            return raw
+        return {ENTRY_MARKER: 1, 'v': raw, 'e': float('inf'), 'd': 0.0}
+        
+    def _get_local_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        دریافت Entry از لایه محلی
+        
+        هر بار از نسخه Encode شده Decode می‌شود تا تغییر مقدار برگشتی توسط یک
+        فراخواننده، مقدار Cache شده سایر فراخواننده‌های همین Worker را تغییر ندهد.
+        """
+        encoded = self.local.get(key)
+        self._record('local', encoded is not None)
+        if encoded is None:
+            return None
+            
         try:
-            value = await self.client.get(key)
-            if value:
-                return json.loads(value)
+            return self._unwrap_entry(self.codec.decode(encoded))
+        except (CodecError, TypeError, ValueError) as e:
+            logger.error(f"Error decoding locally cached value: {str(e)}")
+            self.local.delete(key)
+            return None
+            
+    async def _get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """دریافت Entry از Cache (ابتدا لایه محلی، سپس Redis) حتی اگر منقضی منطقی شده باشد"""
+        entry = self._get_local_entry(key)
+        if entry is not None:
+            return entry
+            
+        if not self._connected:
             return None
+            
+        try:
+            # دریافت مقدار و TTL باقیمانده در یک رفت و برگشت
+            [(raw_value, remaining_ttl)] = await self.backend.get_many([key])
         except Exception as e:
             logger.error(f"Error getting from cache: {str(e)}")
             return None
-    
+            
+        return self._load_remote_entry(key, raw_value, remaining_ttl)
+        
+    def _load_remote_entry(self, key: str, raw_value: Optional[bytes], remaining_ttl: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Decode مقدار خوانده شده از Redis و پر کردن لایه محلی"""
+        self._record('remote', raw_value is not None)
+        if raw_value is None:
+            return None
+            
+        try:
+            entry = self._unwrap_entry(self.codec.decode(raw_value))
+        except (CodecError, TypeError, ValueError) as e:
+            logger.error(f"Error decoding cached value: {str(e)}")
+            return None
+            
+        local_ttl = self.local_ttl if remaining_ttl is None or remaining_ttl < 0 else min(self.local_ttl, remaining_ttl)
+        self.local.set(key, raw_value, local_ttl)
+        return entry
+        
+    async def get(self, key: str, tags: Optional[List[str]] = None) -> Optional[Any]:
+        """
+        دریافت از Cache (ابتدا لایه محلی، سپس Redis)
+        
+        Args:
+            key: Cache Key
+            tags: Tag های کلید (باید با Tag های زمان ذخیره یکسان باشد)
+        """
+        entry = await self._get_entry(await self._physical_key(key, tags))
+        if entry is None or entry['e'] <= time.time():
+            return None
+        return entry['v']
+        
     async def set(
         self,
         key: str,
         value: Any,
-        ttl: int = 3600  # 1 hour default
+        ttl: int = 3600,  # 1 hour default
+        stale_ttl: int = 0,
+        cost: float = 0.0,
+        tags: Optional[List[str]] = None
     ):
-        """ذخیره در Cache"""
-        if not self._connected:
+        """
+        ذخیره در Cache (write-through در هر دو لایه)
+        
+        Args:
+            key: Cache Key
+            value: مقدار
+            ttl: مدت تازه بودن مقدار (ثانیه)
+            stale_ttl: مدت اضافه‌ای که مقدار منقضی شده برای stale-while-revalidate نگهداری می‌شود
+            cost: زمان محاسبه مقدار (ثانیه، برای انقضای زودهنگام احتمالی)
+            tags: Tag های کلید برای Invalidation گروهی (invalidate_tags)
+        """
+        await self._set_physical(await self._physical_key(key, tags), value, ttl, stale_ttl, cost)
+        
+    async def _set_physical(self, key: str, value: Any, ttl: int, stale_ttl: int = 0, cost: float = 0.0):
+        """ذخیره با کلید ذخیره شده (بعد از اعمال نسخه Tag ها)"""
+        try:
+            encoded = self.codec.encode(self._make_entry(value, ttl, cost))
+        except (TypeError, ValueError, OverflowError) as e:
+            logger.error(f"Error setting cache: {str(e)}")
             return
+            
+        physical_ttl = ttl + max(0, stale_ttl)
+        
+        self.local.set(key, encoded, min(self.local_ttl, physical_ttl))
         
+        if not self._connected:
+            return
+            
         try:
-            value_str = json.dumps(value, default=str)
-            await self.client.setex(key, ttl, value_str)
+            await self.backend.set_many({key: encoded}, physical_ttl)
         except Exception as e:
             logger.error(f"Error setting cache: {str(e)}")
-    
-    async def delete(self, key: str):
-        """حذف از Cache"""
+            return
+            
+        await self._publish_invalidation([key])
+        
+    async def get_many(self, keys: List[str], tags: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        دریافت چند کلید در یک رفت و برگشت (MGET به همراه TTL ها در یک Pipeline)
+        
+        Args:
+            keys: لیست Cache Key ها
+            tags: Tag های مشترک کلیدها
+            
+        Returns:
+            دیکشنری کلید -> مقدار فقط برای کلیدهای موجود و تازه (کلیدهای Miss حذف می‌شوند)
+        """
+        physical_keys = await self._physical_keys(dict.fromkeys(keys), tags)
+        results: Dict[str, Any] = {}
+        missing: List[str] = []
+        now = time.time()
+        
+        for key, physical_key in physical_keys.items():
+            entry = self._get_local_entry(physical_key)
+            if entry is not None:
+                if entry['e'] > now:
+                    results[key] = entry['v']
+            else:
+                missing.append(key)
+                
+        if not missing or not self._connected:
+            return results
+            
+        try:
+            response = await self.backend.get_many([physical_keys[key] for key in missing])
+        except Exception as e:
+            logger.error(f"Error getting many from cache: {str(e)}")
+            return results
+            
+        for key, (raw_value, remaining_ttl) in zip(missing, response):
+            entry = self._load_remote_entry(physical_keys[key], raw_value, remaining_ttl)
+            if entry is not None and entry['e'] > now:
+                results[key] = entry['v']
+                
+        return results
+        
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        ttl: int = 3600,
+        stale_ttl: int = 0,
+        tags: Optional[List[str]] = None
+    ):
+        """
+        ذخیره چند کلید با یک Pipeline از SETEX ها (یک رفت و برگشت)
+        
+        Args:
+            mapping: دیکشنری کلید -> مقدار
+            ttl: Time To Live (ثانیه)
+            stale_ttl: مدت اضافه نگهداری برای stale-while-revalidate
+            tags: Tag های مشترک کلیدها
+        """
+        physical_keys = await self._physical_keys(mapping, tags)
+        physical_ttl = ttl + max(0, stale_ttl)
+        encoded_items = {}
+        
+        for logical_key, value in mapping.items():
+            key = physical_keys[logical_key]
+            try:
+                encoded = self.codec.encode(self._make_entry(value, ttl, 0.0))
+            except (TypeError, ValueError, OverflowError) as e:
+                logger.error(f"Error setting cache for {key}: {str(e)}")
+                continue
+            self.local.set(key, encoded, min(self.local_ttl, physical_ttl))
+            encoded_items[key] = encoded
+            
+        if not self._connected or not encoded_items:
+            return
+            
+        try:
+            await self.backend.set_many(encoded_items, physical_ttl)
+        except Exception as e:
+            logger.error(f"Error setting many in cache: {str(e)}")
+            return
+            
+        await self._publish_invalidation(list(encoded_items))
+        
+    async def delete_many(self, keys: List[str], tags: Optional[List[str]] = None):
+        """حذف چند کلید با یک دستور DEL (هر دو لایه و لایه محلی سایر Worker ها)"""
+        keys = list((await self._physical_keys(dict.fromkeys(keys), tags)).values())
+        if not keys:
+            return
+            
+        self.local.delete_many(keys)
+        
         if not self._connected:
             return
+            
+        try:
+            await self.backend.delete_many(keys)
+        except Exception as e:
+            logger.error(f"Error deleting many from cache: {str(e)}")
+            return
+            
+        await self._publish_invalidation(keys)
+        
+    async def delete(self, key: str, tags: Optional[List[str]] = None):
+        """حذف از Cache (هر دو لایه و لایه محلی سایر Worker ها)"""
+        key = await self._physical_key(key, tags)
+        self.local.delete(key)
         
+        if not self._connected:
+            return
+            
         try:
-            await self.client.delete(key)
+            await self.backend.delete_many([key])
         except Exception as e:
             logger.error(f"Error deleting from cache: {str(e)}")
-    
+            return
+            
+        await self._publish_invalidation([key])
+        
     async def get_or_set(
         self,
         key: str,
         func,
         ttl: int = 3600,
         *args,
+        stale_ttl: int = 0,
+        early_expiration_beta: float = 1.0,
+        tags: Optional[List[str]] = None,
         **kwargs
     ) -> Any:
         """
         دریافت از Cache یا اجرای Function و ذخیره
         
+        در هر لحظه فقط یک فراخواننده برای یک کلید Function را اجرا می‌کند
+        (Singleflight درون Worker و Lock در Redis بین Worker ها)؛ بقیه منتظر نتیجه می‌مانند.
+        
         Args:
             key: Cache Key
             func: Function برای اجرا در صورت عدم وجود Cache
-            ttl: Time To Live (ثانیه)
+            ttl: Time To Live (ثانیه)، یا Function ای که از روی نتیجه TTL را برمی‌گرداند
             *args, **kwargs: Arguments برای Function
+            stale_ttl: اگر بزرگ‌تر از صفر باشد، تا این مدت پس از انقضا مقدار قدیمی
+                برگردانده می‌شود و Function در پس‌زمینه دوباره اجرا می‌شود (stale-while-revalidate)
+            early_expiration_beta: ضریب انقضای زودهنگام احتمالی (0 یعنی غیرفعال)؛
+                کلیدهای پرهزینه کمی قبل از انقضا در پس‌زمینه تازه می‌شوند
+            tags: Tag های کلید برای Invalidation گروهی
             
         Returns:
             نتیجه از Cache یا Function
         """
-        # تلاش برای دریافت از Cache
-        cached = await self.get(key)
-        if cached is not None:
-            logger.debug(f"Cache hit for key: {key}")
-            return cached
+        key = await self._physical_key(key, tags)
         
-        # اجرای Function
+        # تلاش برای دریافت از Cache
+        entry = await self._get_entry(key)
+        if entry is not None:
+            now = time.time()
+            if now < entry['e']:
+                if self._should_refresh_early(entry, now, early_expiration_beta):
+                    cache_get_or_set.labels(outcome='early_refresh').inc()
+                    self._refresh_in_background(key, func, ttl, stale_ttl, args, kwargs)
+                else:
+                    cache_get_or_set.labels(outcome='hit').inc()
+                logger.debug(f"Cache hit for key: {key}")
+                return entry['v']
+                
+            if stale_ttl > 0:
+                cache_get_or_set.labels(outcome='stale').inc()
+                logger.debug(f"Serving stale value for key: {key}, refreshing in background")
+                self._refresh_in_background(key, func, ttl, stale_ttl, args, kwargs)
+                return entry['v']
+                
+        # اگر همین کلید در این Worker در حال محاسبه است، منتظر همان نتیجه می‌مانیم
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            cache_get_or_set.labels(outcome='coalesced').inc()
+            try:
+                result = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                result = None
+            if result is not None:
+                return result
+            
+        cache_get_or_set.labels(outcome='miss').inc()
         logger.debug(f"Cache miss for key: {key}, executing function")
-        result = await func(*args, **kwargs)
+        return await self._compute_singleflight(key, func, ttl, stale_ttl, args, kwargs)
+        
+    def _should_refresh_early(self, entry: Dict[str, Any], now: float, beta: float) -> bool:
+        """
+        انقضای زودهنگام احتمالی (XFetch)
         
-        # ذخیره در Cache
-        await self.set(key, result, ttl)
+        احتمال تازه‌سازی با نزدیک شدن به زمان انقضا و با هزینه محاسبه بیشتر می‌شود،
+        در نتیجه تازه‌سازی‌ها در زمان پخش می‌شوند.
+        """
+        cost = entry.get('d') or 0.0
+        if beta <= 0 or cost <= 0 or entry['e'] == float('inf'):
+            return False
+        return now - cost * beta * math.log(max(random.random(), 1e-12)) >= entry['e']
+        
+    def _refresh_in_background(self, key: str, func, ttl: int, stale_ttl: int, args: tuple, kwargs: dict):
+        """اجرای Function در پس‌زمینه (اگر همین کلید در حال محاسبه نباشد)"""
+        if key in self._inflight or key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        
+        async def refresh():
+            try:
+                await self._compute_singleflight(key, func, ttl, stale_ttl, args, kwargs, wait_for_lock=False)
+            except Exception as e:
+                logger.warning(f"Background cache refresh failed for {key}: {str(e)}")
+            finally:
+                self._refreshing.discard(key)
+                
+        task = asyncio.create_task(refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
         
-        return result
+    async def _compute_singleflight(
+        self,
+        key: str,
+        func,
+        ttl: int,
+        stale_ttl: int,
+        args: tuple,
+        kwargs: dict,
+        wait_for_lock: bool = True
+    ) -> Any:
+        """اجرای Function برای یک کلید به صورت Singleflight (درون Worker و بین Worker ها)"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        
+        try:
+            token = await self._acquire_lock(key)
+            if token is None:
+                # Worker دیگری در حال محاسبه است
+                if not wait_for_lock:
+                    result = None
+                    future.set_result(result)
+                    return result
+                    
+                cache_get_or_set.labels(outcome='lock_wait').inc()
+                entry = await self._wait_for_other_worker(key)
+                if entry is not None:
+                    future.set_result(entry['v'])
+                    return entry['v']
+                    
+            try:
+                start_time = time.monotonic()
+                result = await func(*args, **kwargs)
+                cost = time.monotonic() - start_time
+                
+                # ذخیره در Cache (None ذخیره نمی‌شود تا دفعه بعد دوباره محاسبه شود)
+                if result is not None:
+                    await self._set_physical(
+                        key,
+                        result,
+                        ttl(result) if callable(ttl) else ttl,
+                        stale_ttl=stale_ttl,
+                        cost=cost
+                    )
+            finally:
+                if token is not None:
+                    await self._release_lock(key, token)
+                    
+            future.set_result(result)
+            return result
+            
+        except asyncio.CancelledError:
+            # منتظران دوباره خودشان محاسبه را انجام می‌دهند
+            future.cancel()
+            raise
+            
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                # جلوگیری از هشدار "exception was never retrieved" وقتی منتظری وجود ندارد
+                future.exception()
+            raise
+            
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """
+        گرفتن Lock محاسبه یک کلید در Redis
+        
+        Returns:
+            Token قفل (بدون Redis همیشه موفق)، یا None اگر Worker دیگری آن را دارد
+        """
+        token = uuid.uuid4().hex
+        if not self._connected:
+            return token
+            
+        try:
+            acquired = await self.backend.acquire_lock(f"{LOCK_PREFIX}{key}", token, self.lock_timeout)
+            return token if acquired else None
+        except Exception as e:
+            # در صورت خطای Redis، محاسبه بدون Lock بین Worker ها انجام می‌شود
+            logger.error(f"Error acquiring cache lock: {str(e)}")
+            return token
+            
+    async def _release_lock(self, key: str, token: str):
+        """آزاد کردن Lock فقط اگر هنوز متعلق به همین فراخواننده باشد"""
+        if not self._connected:
+            return
+            
+        try:
+            await self.backend.release_lock(f"{LOCK_PREFIX}{key}", token)
+        except Exception as e:
+            logger.error(f"Error releasing cache lock: {str(e)}")
+            
+    async def _wait_for_other_worker(self, key: str) -> Optional[Dict[str, Any]]:
+        """انتظار برای نتیجه Worker دارنده Lock (حداکثر تا زمان انقضای Lock)"""
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.05
+        
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+            
+            entry = await self._get_entry(key)
+            if entry is not None and entry['e'] > time.time():
+                return entry
+                
+            try:
+                if not await self.backend.lock_exists(f"{LOCK_PREFIX}{key}"):
+                    # Lock آزاد شد ولی مقداری ذخیره نشد (مثلاً خطا در Worker دیگر)
+                    return None
+            except Exception:
+                return None
+                
+        logger.warning(f"Timed out waiting for cache lock on {key}")
+        return None
+        
+    def memoize(
+        self,
+        ttl: int = 3600,
+        key_args: Optional[Sequence[str]] = None,
+        negative_ttl: int = 60,
+        is_failure: Optional[Callable[[Any], bool]] = None,
+        stale_ttl: int = 0,
+        tags: Optional[Callable[[Dict[str, Any]], List[str]]] = None
+    ):
+        """
+        Decorator برای Cache کردن نتیجه متدهای async بر اساس Arguments
+        
+        مثال:
+            @cache_manager.memoize(ttl=86400, key_args=['keyword', 'language'])
+            async def calculate_difficulty(self, keyword, language='fa'): ...
+            
+        فراخوانی با bypass_cache=True مقدار Cache را نادیده می‌گیرد و نتیجه جدید را ذخیره می‌کند.
+        
+        Args:
+            ttl: مدت اعتبار نتیجه موفق (ثانیه)
+            key_args: نام Argument هایی که در کلید استفاده می‌شوند (پیش‌فرض: همه به جز self/cls)
+            negative_ttl: مدت نگهداری خطاها و نتایج ناموفق (ثانیه، 0 یعنی ذخیره نشوند)
+            is_failure: تشخیص نتیجه ناموفق (مثلاً نتیجه پیش‌فرض بعد از خطای شبکه)
+            stale_ttl: مدت stale-while-revalidate برای نتایج موفق
+            tags: Function ای که از Arguments (دیکشنری نام -> مقدار) لیست Tag ها را می‌سازد
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+            method_name = func.__qualname__
+            key_prefix = f"memo:{func.__module__}.{method_name}"
+            
+            def result_ttl(result: Any) -> int:
+                if isinstance(result, dict) and FAILURE_MARKER in result:
+                    return negative_ttl
+                if is_failure is not None and is_failure(result):
+                    return negative_ttl
+                return ttl
+                
+            @functools.wraps(func)
+            async def wrapper(*args, bypass_cache: bool = False, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = {
+                    name: value for name, value in bound.arguments.items()
+                    if (name in key_args if key_args is not None else name not in ('self', 'cls'))
+                }
+                key_data = json.dumps(arguments, sort_keys=True, default=str, ensure_ascii=False)
+                key = f"{key_prefix}:{hashlib.md5(key_data.encode()).hexdigest()}"
+                key_tags = tags(bound.arguments) if tags is not None else None
+                
+                state = {'computed': False, 'error': None}
+                
+                async def compute():
+                    state['computed'] = True
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        if negative_ttl <= 0:
+                            raise
+                        state['error'] = e
+                        return {FAILURE_MARKER: f"{type(e).__name__}: {str(e)}"}
+                        
+                if bypass_cache:
+                    self._record_memoize(method_name, 'bypass')
+                    await self.delete(key, tags=key_tags)
+                    
+                result = await self.get_or_set(
+                    key,
+                    compute,
+                    result_ttl,
+                    stale_ttl=stale_ttl,
+                    tags=key_tags
+                )
+                
+                if isinstance(result, dict) and FAILURE_MARKER in result:
+                    if state['error'] is not None:
+                        self._record_memoize(method_name, 'failure')
+                        raise state['error']
+                    self._record_memoize(method_name, 'negative_hit')
+                    raise CachedFailureError(result[FAILURE_MARKER])
+                    
+                if not bypass_cache:
+                    failed = is_failure is not None and is_failure(result)
+                    if state['computed']:
+                        self._record_memoize(method_name, 'failure' if failed else 'miss')
+                    else:
+                        self._record_memoize(method_name, 'negative_hit' if failed else 'hit')
+                return result
+                
+            return wrapper
+        return decorator
+        
+    def _record_memoize(self, method_name: str, result: str):
+        """ثبت نتیجه یک فراخوانی memoize شده"""
+        method_stats = self.memoize_stats.setdefault(method_name, {})
+        method_stats[result] = method_stats.get(result, 0) + 1
+        cache_memoize.labels(method=method_name, result=result).inc()
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار Cache به تفکیک لایه (شامل نرخ Hit)"""
+        def ratio(hits: int, misses: int) -> float:
+            total = hits + misses
+            return round(hits / total, 4) if total else 0.0
+            
+        return {
+            'connected': self._connected,
+            'backend': self.backend.get_stats(),
+            'codec': self.codec.describe(),
+            'local': {
+                **self.local.get_stats(),
+                'hits': self.stats['local_hits'],
+                'misses': self.stats['local_misses'],
+                'hit_ratio': ratio(self.stats['local_hits'], self.stats['local_misses'])
+            },
+            'remote': {
+                'hits': self.stats['remote_hits'],
+                'misses': self.stats['remote_misses'],
+                'hit_ratio': ratio(self.stats['remote_hits'], self.stats['remote_misses'])
+            },
+            'overall_hit_ratio': ratio(
+                self.stats['local_hits'] + self.stats['remote_hits'],
+                self.stats['remote_misses'] if self._connected else self.stats['local_misses']
+            ),
+            'invalidations_received': self.stats['invalidations_received'],
+            'memoized_methods': {
+                method_name: dict(method_stats) for method_name, method_stats in self.memoize_stats.items()
+            }
+        }
 
 
 # Global Cache Manager Instance
 cache_manager = CacheManager()
-
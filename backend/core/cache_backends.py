@@ -0,0 +1,480 @@
+"""
+Cache Backends - لایه ذخیره‌سازی راه دور CacheManager
+
+CacheManager فقط با رابط CacheBackend کار می‌کند. دو پیاده‌سازی وجود دارد:
+- RedisCacheBackend: مشترک بین چند سرور (پیش‌فرض)
+- SQLiteCacheBackend: فایل SQLite محلی در حالت WAL برای نصب‌های بدون Redis
+  (Edge و On-Prem)؛ چند Worker روی یک سرور همزمان از یک فایل استفاده می‌کنند
+
+انتخاب Backend با متغیر CACHE_BACKEND انجام می‌شود: redis، sqlite یا auto
+(تلاش برای Redis و در صورت در دسترس نبودن، استفاده از SQLite).
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    # Fallback برای زمانی که redis نصب نیست
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# کانال اعلام حذف کلیدها به سایر Worker ها
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# آزاد کردن Lock فقط توسط دارنده آن (مقایسه Token و حذف به صورت اتمیک)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# حداکثر تعداد پارامتر در یک دستور SQLite
+_SQLITE_CHUNK_SIZE = 500
+
+
+class CacheBackend(ABC):
+    """
+    رابط Backend ذخیره‌سازی Cache
+    
+    Backend ناقص (بدون پیاده‌سازی همه متدها) هنگام ساخت TypeError ایجاد می‌کند.
+    
+    مقادیر bytes (خروجی CacheCodec) هستند. TTL باقیمانده مانند Redis برگردانده
+    می‌شود: ثانیه، -1 برای کلید بدون انقضا و -2 برای کلید ناموجود.
+    """
+    
+    name = "base"
+    
+    @abstractmethod
+    async def connect(self):
+        """اتصال (در صورت خطا Exception ایجاد می‌شود)"""
+        
+    @abstractmethod
+    async def close(self):
+        """بستن اتصال"""
+        
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> List[Tuple[Optional[bytes], int]]:
+        """دریافت مقدار و TTL باقیمانده چند کلید (به همان ترتیب)"""
+        
+    @abstractmethod
+    async def set_many(self, items: Dict[str, bytes], ttl: int):
+        """ذخیره چند کلید با TTL یکسان"""
+        
+    @abstractmethod
+    async def delete_many(self, keys: List[str]):
+        """حذف چند کلید"""
+        
+    @abstractmethod
+    async def get_counters(self, names: List[str]) -> List[int]:
+        """مقدار چند شمارنده (0 برای شمارنده ناموجود)"""
+        
+    @abstractmethod
+    async def incr_many(self, names: List[str]) -> List[int]:
+        """افزایش اتمیک چند شمارنده و برگرداندن مقدار جدید"""
+        
+    @abstractmethod
+    async def acquire_lock(self, name: str, token: str, timeout: float) -> bool:
+        """گرفتن Lock با انقضا (فقط اگر آزاد باشد)"""
+        
+    @abstractmethod
+    async def release_lock(self, name: str, token: str):
+        """آزاد کردن Lock فقط اگر Token آن برابر باشد"""
+        
+    @abstractmethod
+    async def lock_exists(self, name: str) -> bool:
+        """آیا Lock هنوز گرفته شده است"""
+        
+    @abstractmethod
+    async def publish(self, message: str):
+        """ارسال پیام Invalidation به سایر Worker ها"""
+        
+    @abstractmethod
+    def listen(self) -> AsyncIterator[str]:
+        """دریافت پیام‌های Invalidation (در صورت قطع اتصال Exception ایجاد می‌شود)"""
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """اطلاعات Backend"""
+        return {'backend': self.name}
+
+
+class RedisCacheBackend(CacheBackend):
+    """Backend مبتنی بر Redis (مقادیر و شمارنده‌ها در Redis، Invalidation با Pub/Sub)"""
+    
+    name = "redis"
+    
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.client = None
+        
+    async def connect(self):
+        if redis is None:
+            raise RuntimeError("redis package is not installed")
+        # مقادیر به صورت bytes (خروجی CacheCodec) ذخیره می‌شوند
+        self.client = await redis.from_url(self.redis_url, decode_responses=False)
+        await self.client.ping()
+        
+    async def close(self):
+        if self.client:
+            await self.client.close()
+            self.client = None
+            
+    async def get_many(self, keys: List[str]) -> List[Tuple[Optional[bytes], int]]:
+        # مقادیر و TTL ها در یک رفت و برگشت
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            for key in keys:
+                pipe.ttl(key)
+            response = await pipe.execute()
+        return list(zip(response[0], response[1:]))
+        
+    async def set_many(self, items: Dict[str, bytes], ttl: int):
+        if len(items) == 1:
+            key, value = next(iter(items.items()))
+            await self.client.setex(key, ttl, value)
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.setex(key, ttl, value)
+            await pipe.execute()
+            
+    async def delete_many(self, keys: List[str]):
+        await self.client.delete(*keys)
+        
+    async def get_counters(self, names: List[str]) -> List[int]:
+        return [int(value or 0) for value in await self.client.mget(names)]
+        
+    async def incr_many(self, names: List[str]) -> List[int]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.incr(name)
+            return [int(value) for value in await pipe.execute()]
+            
+    async def acquire_lock(self, name: str, token: str, timeout: float) -> bool:
+        return bool(await self.client.set(name, token, nx=True, px=int(timeout * 1000)))
+        
+    async def release_lock(self, name: str, token: str):
+        await self.client.eval(RELEASE_LOCK_SCRIPT, 1, name, token)
+        
+    async def lock_exists(self, name: str) -> bool:
+        return bool(await self.client.exists(name))
+        
+    async def publish(self, message: str):
+        await self.client.publish(INVALIDATION_CHANNEL, message)
+        
+    async def listen(self) -> AsyncIterator[str]:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get('type') == 'message':
+                    yield message['data']
+        finally:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
+                
+    def get_stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'url': self.redis_url.split('@')[-1]}
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Backend محلی مبتنی بر SQLite در حالت WAL
+    
+    - TTL: زمان انقضا کنار هر مقدار ذخیره می‌شود و کلیدهای منقضی خوانده نمی‌شوند
+    - محدودیت حجم: مجموع حجم با Trigger نگهداری می‌شود و در صورت عبور از سقف،
+      ابتدا کلیدهای منقضی و سپس نزدیک‌ترین کلیدها به انقضا حذف می‌شوند
+    - چند Worker: WAL خواندن همزمان را ممکن می‌کند و نوشتن‌ها با busy_timeout
+      پشت سر هم انجام می‌شوند؛ Lock ها و شمارنده‌ها در جداول همین فایل هستند
+    - Invalidation: پیام‌ها در جدول cache_events نوشته و توسط سایر Worker ها Poll می‌شوند
+    """
+    
+    name = "sqlite"
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            path: مسیر فایل SQLite
+            max_bytes: سقف مجموع حجم مقادیر (بایت)
+            poll_interval: فاصله بررسی پیام‌های Invalidation (ثانیه)
+        """
+        default_path = Path(__file__).resolve().parent.parent / 'cache_data' / 'cache.sqlite3'
+        self.path = path or os.getenv("CACHE_SQLITE_PATH", str(default_path))
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("CACHE_SQLITE_MAX_BYTES", str(256 * 1024 * 1024))
+        )
+        self.poll_interval = poll_interval if poll_interval is not None else float(
+            os.getenv("CACHE_SQLITE_POLL_INTERVAL", "0.5")
+        )
+        # پیام‌های Invalidation قدیمی‌تر از این مدت حذف می‌شوند
+        self.event_retention = 60.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self.evictions = 0
+        
+    async def connect(self):
+        await asyncio.to_thread(self._open)
+        
+    def _open(self):
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at);
+            CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('total_bytes', 0);
+            CREATE TRIGGER IF NOT EXISTS cache_entries_insert AFTER INSERT ON cache_entries BEGIN
+                UPDATE cache_meta SET value = value + NEW.size WHERE name = 'total_bytes';
+            END;
+            CREATE TRIGGER IF NOT EXISTS cache_entries_update AFTER UPDATE OF size ON cache_entries BEGIN
+                UPDATE cache_meta SET value = value + NEW.size - OLD.size WHERE name = 'total_bytes';
+            END;
+            CREATE TRIGGER IF NOT EXISTS cache_entries_delete AFTER DELETE ON cache_entries BEGIN
+                UPDATE cache_meta SET value = value - OLD.size WHERE name = 'total_bytes';
+            END;
+            CREATE TABLE IF NOT EXISTS cache_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS cache_locks (
+                name TEXT PRIMARY KEY,
+                token TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+        """)
+        self._conn = conn
+        
+    async def close(self):
+        await asyncio.to_thread(self._close)
+        
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                
+    async def _run(self, func, *args):
+        """اجرای یک عملیات SQLite در Thread جداگانه (یک اتصال، پشت سر هم)"""
+        def run():
+            with self._lock:
+                if self._conn is None:
+                    raise RuntimeError("SQLite cache backend is not connected")
+                return func(self._conn, *args)
+        return await asyncio.to_thread(run)
+        
+    @staticmethod
+    def _chunks(items: List, size: int = _SQLITE_CHUNK_SIZE):
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+            
+    async def get_many(self, keys: List[str]) -> List[Tuple[Optional[bytes], int]]:
+        return await self._run(self._get_many, keys)
+        
+    def _get_many(self, conn: sqlite3.Connection, keys: List[str]) -> List[Tuple[Optional[bytes], int]]:
+        now = time.time()
+        found = {}
+        for chunk in self._chunks(list(dict.fromkeys(keys))):
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, value, expires_at FROM cache_entries WHERE key IN ({placeholders}) AND expires_at > ?",
+                (*chunk, now)
+            )
+            for key, value, expires_at in rows:
+                found[key] = (bytes(value), max(0, int(expires_at - now)))
+        return [found.get(key, (None, -2)) for key in keys]
+        
+    async def set_many(self, items: Dict[str, bytes], ttl: int):
+        await self._run(self._set_many, items, ttl)
+        
+    def _set_many(self, conn: sqlite3.Connection, items: Dict[str, bytes], ttl: int):
+        expires_at = time.time() + ttl
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO cache_entries (key, value, expires_at, size) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                "expires_at = excluded.expires_at, size = excluded.size",
+                [(key, value, expires_at, len(key) + len(value)) for key, value in items.items()]
+            )
+            self._evict_if_needed(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+            
+    def _evict_if_needed(self, conn: sqlite3.Connection):
+        """حذف کلیدهای منقضی و در صورت عبور از سقف حجم، نزدیک‌ترین کلیدها به انقضا"""
+        now = time.time()
+        total = conn.execute("SELECT value FROM cache_meta WHERE name = 'total_bytes'").fetchone()[0]
+        
+        if total <= self.max_bytes and now - self._last_purge < 60:
+            return
+            
+        self._last_purge = now
+        conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM cache_locks WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM cache_events WHERE created_at < ?", (now - self.event_retention,))
+        total = conn.execute("SELECT value FROM cache_meta WHERE name = 'total_bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+            
+        # تا 90% سقف حذف می‌شود تا هر نوشتن بعدی دوباره Eviction انجام ندهد
+        target = int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM cache_entries ORDER BY expires_at"):
+            victims.append(key)
+            freed += size
+            if total - freed <= target:
+                break
+        for chunk in self._chunks(victims):
+            conn.execute(f"DELETE FROM cache_entries WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+        self.evictions += len(victims)
+        
+    async def delete_many(self, keys: List[str]):
+        await self._run(self._delete_many, keys)
+        
+    def _delete_many(self, conn: sqlite3.Connection, keys: List[str]):
+        for chunk in self._chunks(list(keys)):
+            conn.execute(f"DELETE FROM cache_entries WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            
+    async def get_counters(self, names: List[str]) -> List[int]:
+        return await self._run(self._get_counters, names)
+        
+    def _get_counters(self, conn: sqlite3.Connection, names: List[str]) -> List[int]:
+        values = {}
+        for chunk in self._chunks(list(dict.fromkeys(names))):
+            rows = conn.execute(
+                f"SELECT name, value FROM cache_counters WHERE name IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            values.update(rows)
+        return [values.get(name, 0) for name in names]
+        
+    async def incr_many(self, names: List[str]) -> List[int]:
+        return await self._run(self._incr_many, names)
+        
+    def _incr_many(self, conn: sqlite3.Connection, names: List[str]) -> List[int]:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            values = []
+            for name in names:
+                conn.execute(
+                    "INSERT INTO cache_counters (name, value) VALUES (?, 1) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                    (name,)
+                )
+                values.append(conn.execute("SELECT value FROM cache_counters WHERE name = ?", (name,)).fetchone()[0])
+            conn.execute("COMMIT")
+            return values
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+            
+    async def acquire_lock(self, name: str, token: str, timeout: float) -> bool:
+        return await self._run(self._acquire_lock, name, token, timeout)
+        
+    def _acquire_lock(self, conn: sqlite3.Connection, name: str, token: str, timeout: float) -> bool:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache_locks WHERE name = ? AND expires_at <= ?", (name, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO cache_locks (name, token, expires_at) VALUES (?, ?, ?)",
+                (name, token, now + timeout)
+            )
+            conn.execute("COMMIT")
+            return cursor.rowcount == 1
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+            
+    async def release_lock(self, name: str, token: str):
+        await self._run(
+            lambda conn: conn.execute("DELETE FROM cache_locks WHERE name = ? AND token = ?", (name, token))
+        )
+        
+    async def lock_exists(self, name: str) -> bool:
+        row = await self._run(
+            lambda conn: conn.execute(
+                "SELECT 1 FROM cache_locks WHERE name = ? AND expires_at > ?", (name, time.time())
+            ).fetchone()
+        )
+        return row is not None
+        
+    async def publish(self, message: str):
+        await self._run(
+            lambda conn: conn.execute(
+                "INSERT INTO cache_events (message, created_at) VALUES (?, ?)", (message, time.time())
+            )
+        )
+        
+    async def listen(self) -> AsyncIterator[str]:
+        row = await self._run(lambda conn: conn.execute("SELECT MAX(id) FROM cache_events").fetchone())
+        last_id = row[0] or 0
+        
+        while True:
+            rows = await self._run(
+                lambda conn: conn.execute(
+                    "SELECT id, message FROM cache_events WHERE id > ? ORDER BY id LIMIT 1000", (last_id,)
+                ).fetchall()
+            )
+            for event_id, message in rows:
+                last_id = event_id
+                yield message
+            if not rows:
+                await asyncio.sleep(self.poll_interval)
+                
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {'backend': self.name, 'path': self.path, 'max_bytes': self.max_bytes, 'evictions': self.evictions}
+        with self._lock:
+            if self._conn is not None:
+                stats['bytes'] = self._conn.execute(
+                    "SELECT value FROM cache_meta WHERE name = 'total_bytes'"
+                ).fetchone()[0]
+        return stats
+
+
+def create_cache_backend(name: Optional[str] = None, redis_url: Optional[str] = None) -> CacheBackend:
+    """
+    ساخت Backend بر اساس تنظیمات
+    
+    Args:
+        name: 'redis' یا 'sqlite' (پیش‌فرض: CACHE_BACKEND)؛ برای 'auto' ابتدا Redis ساخته می‌شود
+        redis_url: آدرس Redis
+    """
+    name = (name or os.getenv("CACHE_BACKEND", "redis")).lower()
+    if name == 'sqlite':
+        return SQLiteCacheBackend()
+    if name not in ('redis', 'auto'):
+        logger.warning(f"Unknown CACHE_BACKEND {name!r}, using redis")
+    return RedisCacheBackend(redis_url)
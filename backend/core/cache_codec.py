@@ -0,0 +1,235 @@
+"""
+Cache Codec - Serialize و فشرده‌سازی مقادیر Cache
+
+قالب ذخیره شده: 3 بایت Header + Payload
+- بایت 0: MAGIC (b'C')
+- بایت 1: نسخه قالب (FORMAT_VERSION)
+- بایت 2: نوع Serializer (4 بیت پایین) و نوع فشرده‌سازی (4 بیت بالا)
+
+Serializer پیش‌فرض msgpack است (در صورت نصب بودن) و در غیر این صورت JSON.
+datetime/date و مقادیر numpy حفظ می‌شوند (به جای تبدیل بی‌صدا به رشته).
+Payload های بزرگ‌تر از آستانه با zstd (در صورت نصب بودن) یا zlib فشرده می‌شوند.
+به دلیل وجود Header، خواندن مقادیری که با تنظیمات دیگری نوشته شده‌اند همیشه ممکن است.
+"""
+
+import json
+import logging
+import os
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    # Fallback به JSON وقتی msgpack نصب نیست
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    # Fallback به zlib وقتی zstandard نصب نیست
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'C'
+FORMAT_VERSION = 1
+HEADER_SIZE = 3
+
+SERIALIZER_JSON = 0
+SERIALIZER_MSGPACK = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+# نوع‌های Extension در msgpack
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+
+# کلیدهای نشانه‌گذاری در JSON
+_JSON_DATETIME = "__datetime__"
+_JSON_DATE = "__date__"
+
+
+class CodecError(Exception):
+    """خطا در Decode مقدار Cache"""
+    pass
+
+
+def _to_builtin(value: Any) -> Any:
+    """تبدیل نوع‌های غیر استاندارد (numpy، set، Decimal) به نوع‌های پایه"""
+    # numpy بدون import مستقیم (اختیاری است)
+    if hasattr(value, 'tolist') and type(value).__module__ == 'numpy':
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode())
+    if isinstance(value, date):
+        return msgpack.ExtType(_EXT_DATE, value.isoformat().encode())
+    return _to_builtin(value)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {_JSON_DATETIME: value.isoformat()}
+    if isinstance(value, date):
+        return {_JSON_DATE: value.isoformat()}
+    return _to_builtin(value)
+
+
+def _json_object_hook(obj: dict) -> Any:
+    if len(obj) == 1:
+        if _JSON_DATETIME in obj:
+            return datetime.fromisoformat(obj[_JSON_DATETIME])
+        if _JSON_DATE in obj:
+            return date.fromisoformat(obj[_JSON_DATE])
+    return obj
+
+
+class CacheCodec:
+    """Encode/Decode مقادیر Cache با Header نسخه‌دار"""
+    
+    def __init__(
+        self,
+        serializer: Optional[str] = None,
+        compression: Optional[str] = None,
+        compress_threshold: Optional[int] = None,
+        compression_level: int = 3
+    ):
+        """
+        Args:
+            serializer: 'msgpack' یا 'json' (پیش‌فرض: msgpack در صورت نصب بودن)
+            compression: 'zstd'، 'zlib' یا 'none' (پیش‌فرض: zstd در صورت نصب بودن، وگرنه zlib)
+            compress_threshold: حداقل حجم Payload برای فشرده‌سازی (بایت)
+            compression_level: سطح فشرده‌سازی
+        """
+        serializer = (serializer or os.getenv('CACHE_SERIALIZER', 'msgpack')).lower()
+        if serializer == 'msgpack' and msgpack is None:
+            serializer = 'json'
+        self.serializer = SERIALIZER_MSGPACK if serializer == 'msgpack' else SERIALIZER_JSON
+        
+        compression = (compression or os.getenv('CACHE_COMPRESSION', 'zstd')).lower()
+        if compression == 'zstd' and zstandard is None:
+            compression = 'zlib'
+        self.compression = {
+            'zstd': COMPRESSION_ZSTD,
+            'zlib': COMPRESSION_ZLIB
+        }.get(compression, COMPRESSION_NONE)
+        
+        self.compress_threshold = compress_threshold if compress_threshold is not None else int(
+            os.getenv('CACHE_COMPRESS_THRESHOLD', '1024')
+        )
+        self.compression_level = compression_level
+        
+        if zstandard is not None:
+            self._zstd_compressor = zstandard.ZstdCompressor(level=compression_level)
+            self._zstd_decompressor = zstandard.ZstdDecompressor()
+            
+    def _serialize(self, value: Any) -> bytes:
+        if self.serializer == SERIALIZER_MSGPACK:
+            return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+        return json.dumps(value, default=_json_default, ensure_ascii=False).encode('utf-8')
+        
+    def _deserialize(self, serializer: int, payload: bytes) -> Any:
+        if serializer == SERIALIZER_MSGPACK:
+            if msgpack is None:
+                raise CodecError("Value was written with msgpack, which is not installed")
+            return msgpack.unpackb(payload, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+        if serializer == SERIALIZER_JSON:
+            return json.loads(payload, object_hook=_json_object_hook)
+        raise CodecError(f"Unknown serializer: {serializer}")
+        
+    def _compress(self, payload: bytes) -> Tuple[int, bytes]:
+        if self.compression == COMPRESSION_NONE or len(payload) < self.compress_threshold:
+            return COMPRESSION_NONE, payload
+        if self.compression == COMPRESSION_ZSTD:
+            return COMPRESSION_ZSTD, self._zstd_compressor.compress(payload)
+        return COMPRESSION_ZLIB, zlib.compress(payload, self.compression_level)
+        
+    def _decompress(self, compression: int, payload: bytes) -> bytes:
+        if compression == COMPRESSION_NONE:
+            return payload
+        if compression == COMPRESSION_ZLIB:
+            return zlib.decompress(payload)
+        if compression == COMPRESSION_ZSTD:
+            if zstandard is None:
+                raise CodecError("Value was compressed with zstd, which is not installed")
+            return self._zstd_decompressor.decompress(payload)
+        raise CodecError(f"Unknown compression: {compression}")
+        
+    def encode(self, value: Any) -> bytes:
+        """
+        تبدیل مقدار به bytes (Header + Payload)
+        
+        Args:
+            value: مقدار
+            
+        Returns:
+            bytes قابل ذخیره در Redis
+        """
+        compression, payload = self._compress(self._serialize(value))
+        flags = self.serializer | (compression << 4)
+        return MAGIC + bytes((FORMAT_VERSION, flags)) + payload
+        
+    def decode(self, data: Any) -> Any:
+        """
+        تبدیل bytes ذخیره شده به مقدار
+        
+        مقادیر قدیمی بدون Header (JSON متنی) هم خوانده می‌شوند.
+        
+        Raises:
+            CodecError: اگر قالب یا نسخه پشتیبانی نشود
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+            
+        if len(data) < HEADER_SIZE or data[:1] != MAGIC:
+            # مقادیر نوشته شده پیش از Codec (JSON متنی)
+            try:
+                return json.loads(data)
+            except ValueError as e:
+                raise CodecError(f"Invalid cache value: {str(e)}")
+                
+        version, flags = data[1], data[2]
+        if version != FORMAT_VERSION:
+            raise CodecError(f"Unsupported cache format version: {version}")
+            
+        try:
+            payload = self._decompress(flags >> 4, data[HEADER_SIZE:])
+            return self._deserialize(flags & 0x0F, payload)
+        except CodecError:
+            raise
+        except Exception as e:
+            # Payload خراب (خطاهای zlib/zstd/msgpack از ValueError ارث نمی‌برند)
+            raise CodecError(f"Corrupted cache value: {type(e).__name__}: {str(e)}")
+        
+    def describe(self) -> dict:
+        """تنظیمات فعلی Codec"""
+        return {
+            'serializer': 'msgpack' if self.serializer == SERIALIZER_MSGPACK else 'json',
+            'compression': {
+                COMPRESSION_NONE: 'none',
+                COMPRESSION_ZLIB: 'zlib',
+                COMPRESSION_ZSTD: 'zstd'
+            }[self.compression],
+            'compress_threshold': self.compress_threshold,
+            'format_version': FORMAT_VERSION
+        }
@@ -0,0 +1,144 @@
+"""
+Dashboard Cache - نگهداری داشبوردها در حافظه با سقف حجم
+
+حجم هر داشبورد (طول JSON آن؛ نتایج بزرگ فقط به اندازه ResultHandle شمرده می‌شوند)
+هنگام ثبت اندازه‌گیری می‌شود. وقتی مجموع حجم از سقف بیشتر شود، داشبوردهایی که
+مدت بیشتری استفاده نشده‌اند (LRU) از حافظه حذف می‌شوند؛ نسخه آن‌ها در dashboard_store
+باقی است و در اولین دسترسی دوباره بارگذاری می‌شود. بدون ذخیره پایدار هیچ داشبوردی حذف نمی‌شود.
+"""
+
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from core.monitoring import dashboard_memory_bytes, dashboard_memory_evictions, dashboard_memory_items
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(dashboard: Dict[str, Any]) -> int:
+    """حجم تقریبی داشبورد در حافظه (بایت)"""
+    try:
+        return len(json.dumps(dashboard, ensure_ascii=False, default=str).encode('utf-8'))
+    except (TypeError, ValueError):
+        return 0
+
+
+class DashboardCache:
+    """Cache LRU داشبوردها با سقف مجموع حجم"""
+    
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        can_evict: Optional[Callable[[], bool]] = None,
+        on_evict: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Args:
+            max_bytes: سقف مجموع حجم داشبوردهای حافظه (پیش‌فرض: DASHBOARD_MEMORY_MAX_BYTES)
+            can_evict: آیا حذف از حافظه مجاز است (وقتی ذخیره پایدار در دسترس است)
+            on_evict: فراخوانی با analysis_id هر داشبورد حذف شده
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv("DASHBOARD_MEMORY_MAX_BYTES", str(256 * 1024 * 1024))
+        )
+        self.can_evict = can_evict or (lambda: True)
+        self.on_evict = on_evict
+        # analysis_id -> (dashboard, size)
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'over_budget': 0}
+        
+    def __contains__(self, analysis_id: str) -> bool:
+        return analysis_id in self._items
+        
+    def __len__(self) -> int:
+        return len(self._items)
+        
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """دریافت داشبورد (و علامت‌گذاری به عنوان اخیراً استفاده شده)"""
+        item = self._items.get(analysis_id)
+        if item is None:
+            self.stats['misses'] += 1
+            return None
+        self._items.move_to_end(analysis_id)
+        self.stats['hits'] += 1
+        return item[0]
+        
+    def put(self, analysis_id: str, dashboard: Dict[str, Any]):
+        """
+        ثبت یا اندازه‌گیری دوباره یک داشبورد (بعد از هر تغییر صدا زده می‌شود)
+        """
+        size = estimate_size(dashboard)
+        previous = self._items.pop(analysis_id, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._items[analysis_id] = (dashboard, size)
+        self._bytes += size
+        self._evict(keep=analysis_id)
+        self._report()
+        
+    def ids(self) -> List[str]:
+        """شناسه داشبوردهای موجود در حافظه"""
+        return list(self._items)
+        
+    def items(self) -> List[tuple]:
+        """(analysis_id, dashboard) تمام داشبوردهای حافظه (بدون تغییر ترتیب LRU و آمار)"""
+        return [(analysis_id, item[0]) for analysis_id, item in self._items.items()]
+        
+    def pop(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """حذف یک داشبورد از حافظه"""
+        item = self._items.pop(analysis_id, None)
+        if item is None:
+            return None
+        self._bytes -= item[1]
+        self._report()
+        return item[0]
+        
+    def clear(self):
+        """حذف تمام داشبوردها"""
+        self._items.clear()
+        self._bytes = 0
+        self._report()
+        
+    def _evict(self, keep: str):
+        """حذف قدیمی‌ترین داشبوردها تا رسیدن به سقف حجم (داشبورد keep حذف نمی‌شود)"""
+        if self._bytes <= self.max_bytes:
+            return
+        if not self.can_evict():
+            # بدون ذخیره پایدار، حذف یعنی از دست رفتن داده
+            self.stats['over_budget'] += 1
+            if self.stats['over_budget'] == 1:
+                logger.warning(
+                    f"Dashboards use {self._bytes} bytes (budget {self.max_bytes}) "
+                    f"but persistence is unavailable, nothing is evicted"
+                )
+            return
+            
+        for analysis_id in list(self._items):
+            if self._bytes <= self.max_bytes:
+                break
+            if analysis_id == keep:
+                continue
+            _, size = self._items.pop(analysis_id)
+            self._bytes -= size
+            self.stats['evictions'] += 1
+            dashboard_memory_evictions.inc()
+            if self.on_evict:
+                self.on_evict(analysis_id)
+            logger.debug(f"Evicted dashboard {analysis_id} from memory ({size} bytes)")
+            
+    def _report(self):
+        dashboard_memory_bytes.set(self._bytes)
+        dashboard_memory_items.set(len(self._items))
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار حافظه داشبوردها"""
+        return {
+            **self.stats,
+            'items': len(self._items),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes
+        }
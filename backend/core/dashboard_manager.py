@@ -3,17 +3,39 @@
 """
 
 import logging
+import os
+import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+from core.dashboard_cache import DashboardCache
+from core.dashboard_store import dashboard_store, restore_secrets
+from core.monitoring import dashboard_memory_reloads
+from core.portfolio import portfolio_index, portfolio_row
+from core.dashboard_views import DASHBOARD_FIELDS, DASHBOARD_LISTS, build_summary, data_sections, get_list
+from core.result_store import result_store
+from core.search_index import search_document, search_index
+from core.timeseries import monitoring_metrics, timeseries_store
+
 logger = logging.getLogger(__name__)
 
+# فیلدهای data که نماهای مشتق شده (نقاط قوت/ضعف و پیشنهادات) از آن‌ها ساخته می‌شوند
+DERIVED_VIEW_SOURCES = ('site_analysis', 'seo_analysis')
+
 
 class DashboardManager:
     """کلاس مدیریت Dashboard"""
     
     _instance = None
-    _dashboards = {}  # Shared in-memory storage
+    _validated_at = {}  # analysis_id -> زمان آخرین مقایسه با Database
+    # Cache حافظه (read-through) جلوی dashboard_store با سقف حجم؛ داشبوردهای کم‌استفاده به Database سپرده می‌شوند
+    _dashboards = DashboardCache(
+        can_evict=lambda: dashboard_store.connected,
+        on_evict=lambda analysis_id: DashboardManager._validated_at.pop(analysis_id, None)
+    )
+    
+    # حداکثر مدتی که نسخه حافظه بدون مقایسه با Database استفاده می‌شود (سایر Worker ها ممکن است آن را تغییر داده باشند)
+    memory_ttl = float(os.getenv("DASHBOARD_MEMORY_TTL", "5"))
     
     def __new__(cls):
         """Singleton pattern - ensure only one instance exists"""
@@ -22,10 +44,51 @@ class DashboardManager:
         return cls._instance
     
     def __init__(self):
-        # در آینده اینجا Connection به Database خواهد بود
         # Use class-level storage so all instances share the same data
         if not hasattr(self, '_initialized'):
             self._initialized = True
+            
+    async def _get_dashboard(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        دریافت داشبورد از حافظه یا در صورت نبود (یا قدیمی بودن) از Database
+        
+        Returns:
+            دیکشنری داشبورد (همان نسخه حافظه، قابل تغییر) یا None
+        """
+        dashboard = DashboardManager._dashboards.get(analysis_id)
+        
+        if dashboard is None:
+            # داشبوردی که از حافظه حذف شده ولی هنوز نوشته نشده است
+            dashboard = dashboard_store.get_unflushed(analysis_id)
+            if dashboard is not None:
+                DashboardManager._dashboards.put(analysis_id, dashboard)
+                return dashboard
+        else:
+            if (
+                not dashboard_store.connected
+                or dashboard_store.is_dirty(analysis_id)
+                or time.monotonic() - DashboardManager._validated_at.get(analysis_id, 0) < self.memory_ttl
+            ):
+                return dashboard
+                
+            # فقط اگر Worker دیگری نسخه جدیدتری نوشته باشد دوباره بارگذاری می‌شود
+            stored_at = await dashboard_store.get_updated_at(analysis_id)
+            DashboardManager._validated_at[analysis_id] = time.monotonic()
+            if stored_at is None or stored_at.isoformat() <= dashboard.get('updated_at', ''):
+                return dashboard
+                
+        loaded = await dashboard_store.load(analysis_id)
+        if loaded is None:
+            return dashboard
+            
+        if dashboard is None:
+            dashboard_memory_reloads.inc()
+        else:
+            # رمزها در Database نوشته نمی‌شوند؛ نسخه حافظه آن‌ها حفظ می‌شود
+            restore_secrets(loaded, dashboard)
+        DashboardManager._dashboards.put(analysis_id, loaded)
+        DashboardManager._validated_at[analysis_id] = time.monotonic()
+        return loaded
     
     async def create_dashboard(self, analysis_id: str, site_url: str) -> str:
         """
@@ -46,10 +109,21 @@ class DashboardManager:
             'status': 'processing',
             'created_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat(),
+            'version': 1,
             'data': {}
         }
+        dashboard_data['derived'] = self._compute_derived_views({}, dashboard_data['version'])
+        
+        DashboardManager._dashboards.put(analysis_id, dashboard_data)
+        DashboardManager._validated_at[analysis_id] = time.monotonic()
+        dashboard_store.mark_dirty(analysis_id, dashboard_data)
+        portfolio_index.upsert(analysis_id, dashboard_data)
+        search_index.index_dashboard(analysis_id, dashboard_data)
         
-        DashboardManager._dashboards[analysis_id] = dashboard_data
+        try:
+            await timeseries_store.record(site_url, monitoring_metrics(status=dashboard_data['status']))
+        except Exception as e:
+            logger.error(f"Error recording monitoring history: {str(e)}")
         
         # در Production این URL واقعی خواهد بود
         dashboard_url = f"/dashboard/{analysis_id}"
@@ -70,28 +144,85 @@ class DashboardManager:
         """
         logger.info(f"Updating dashboard: {analysis_id}")
         
-        if analysis_id not in DashboardManager._dashboards:
+        dashboard = await self._get_dashboard(analysis_id)
+        if dashboard is None:
             logger.warning(f"Dashboard not found: {analysis_id}")
             return
         
         # جدا کردن فیلدهای سطح dashboard از فیلدهای data
-        dashboard_level_fields = ['applied_fixes', 'last_applied_at', 'status', 'cms_credentials', 'competitor_analysis', 'suggested_content', 'suggested_content_keywords', 'suggested_content_created_at']
+        dashboard_level_fields = ['applied_fixes', 'last_applied_at', 'status', 'cms_credentials', 'competitor_analysis', 'suggested_content', 'suggested_content_keywords', 'suggested_content_created_at', 'coalesced_with', 'batch_id', 'changes']
         data_level_fields = {}
         
         for key, value in data.items():
             if key in dashboard_level_fields:
-                DashboardManager._dashboards[analysis_id][key] = value
+                dashboard[key] = value
             else:
                 data_level_fields[key] = value
         
-        # به‌روزرسانی data
+        dashboard['version'] = dashboard.get('version', 0) + 1
+        sources_changed = any(key in data_level_fields for key in DERIVED_VIEW_SOURCES)
+        
+        # نماهای مشتق شده فقط وقتی داده‌های منبع آن‌ها تغییر کند دوباره ساخته می‌شوند
+        if sources_changed or 'derived' not in dashboard:
+            sources = {}
+            for key in DERIVED_VIEW_SOURCES:
+                if key in data_level_fields:
+                    sources[key] = data_level_fields[key]
+                elif key in dashboard['data']:
+                    sources[key] = await result_store.aload(dashboard['data'][key])
+            dashboard['derived'] = self._compute_derived_views(sources, dashboard['version'])
+        
+        # ثبت متریک‌های بخش‌های تغییر کرده در تاریخچه مانیتورینگ سایت
+        if sources_changed or 'status' in data:
+            try:
+                await timeseries_store.record(
+                    dashboard.get('site_url', ''),
+                    monitoring_metrics(
+                        data_level_fields.get('site_analysis'),
+                        data_level_fields.get('seo_analysis'),
+                        len(dashboard['derived']['weaknesses']) if sources_changed else None,
+                        data.get('status')
+                    )
+                )
+            except Exception as e:
+                logger.error(f"Error recording monitoring history: {str(e)}")
+        
+        # به‌روزرسانی data (نتایج بزرگ به Result Store منتقل و فقط Handle نگهداری می‌شود)
         if data_level_fields:
-            DashboardManager._dashboards[analysis_id]['data'].update(data_level_fields)
+            for key, value in data_level_fields.items():
+                data_level_fields[key] = await result_store.aput(analysis_id, key, value)
+            dashboard['data'].update(data_level_fields)
         
-        DashboardManager._dashboards[analysis_id]['updated_at'] = datetime.now().isoformat()
+        dashboard['updated_at'] = datetime.now().isoformat()
         
         if 'status' in data:
-            DashboardManager._dashboards[analysis_id]['status'] = data['status']
+            dashboard['status'] = data['status']
+            
+        # نوشتن در Database به صورت write-behind (تغییرات پشت سر هم ادغام می‌شوند)
+        dashboard_store.mark_dirty(analysis_id, dashboard, sections=data_level_fields.keys())
+        portfolio_index.upsert(analysis_id, dashboard)
+        search_index.index_dashboard(analysis_id, dashboard)
+        
+        # اندازه‌گیری دوباره حجم (ممکن است باعث حذف داشبوردهای کم‌استفاده از حافظه شود)
+        DashboardManager._dashboards.put(analysis_id, dashboard)
+    
+    async def get_dashboard_meta(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        نسخه و وضعیت داشبورد بدون بارگذاری داده‌ها (برای ETag و درخواست‌های شرطی)
+        
+        Returns:
+            {'version', 'derived_version', 'created_at', 'updated_at', 'status'} یا None
+        """
+        dashboard = await self._get_dashboard(analysis_id)
+        if dashboard is None:
+            return None
+        return {
+            'version': dashboard.get('version', 0),
+            'derived_version': (dashboard.get('derived') or {}).get('version', 0),
+            'created_at': dashboard.get('created_at'),
+            'updated_at': dashboard.get('updated_at'),
+            'status': dashboard.get('status')
+        }
     
     async def get_dashboard_data(self, analysis_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -103,37 +234,216 @@ class DashboardManager:
         Returns:
             داده‌های Dashboard یا None
         """
-        if analysis_id not in DashboardManager._dashboards:
+        stored = await self._get_dashboard(analysis_id)
+        if stored is None:
             logger.warning(f"Dashboard not found: {analysis_id}")
             return None
         
-        dashboard = DashboardManager._dashboards[analysis_id].copy()
+        dashboard = stored.copy()
+        dashboard['data'] = await result_store.resolve_dict(dashboard.get('data', {}))
+        
+        # نماهای مشتق شده از قبل (هنگام update_dashboard) ساخته شده‌اند؛
+        # کپی برگردانده می‌شود تا تغییر لیست‌ها توسط فراخواننده نسخه ذخیره شده را تغییر ندهد
+        derived = await self._ensure_derived(stored)
+        dashboard.pop('derived', None)
+        dashboard['strengths'] = list(derived['strengths'])
+        dashboard['weaknesses'] = list(derived['weaknesses'])
+        dashboard['recommendations'] = list(derived['recommendations'])
+        dashboard['derived_version'] = derived['version']
+        
+        # اضافه کردن applied_fixes به dashboard (اگر وجود دارد)
+        if 'applied_fixes' not in dashboard and 'applied_fixes' in dashboard['data']:
+            # applied_fixes در data است، آن را به سطح dashboard منتقل می‌کنیم
+            dashboard['applied_fixes'] = dashboard['data']['applied_fixes']
+        
+        return dashboard
+    
+    async def get_dashboard_view(self, analysis_id: str, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        دریافت فقط فیلدهای مشخص شده داشبورد
+        
+        فقط بخش‌هایی از data که درخواست شده‌اند از Result Store بارگذاری می‌شوند.
+        
+        Args:
+            analysis_id: شناسه تحلیل
+            fields: فیلدها (خروجی dashboard_views.parse_fields)
+            
+        Returns:
+            دیکشنری فیلدهای درخواستی یا None
+        """
+        stored = await self._get_dashboard(analysis_id)
+        if stored is None:
+            logger.warning(f"Dashboard not found: {analysis_id}")
+            return None
+        
+        derived = await self._ensure_derived(stored)
+        view = {'analysis_id': analysis_id}
+        
+        for field in fields:
+            if field in ('strengths', 'weaknesses', 'recommendations'):
+                view[field] = list(derived[field])
+            elif field == 'derived_version':
+                view[field] = derived['version']
+            elif field == 'summary':
+                view['summary'] = {
+                    'site_url': stored.get('site_url', ''),
+                    'status': stored.get('status', 'unknown'),
+                    'updated_at': stored.get('updated_at'),
+                    'version': stored.get('version', 0),
+                    **derived['summary'],
+                    'strengths_count': len(derived['strengths']),
+                    'weaknesses_count': len(derived['weaknesses']),
+                    'recommendations_count': len(derived['recommendations'])
+                }
+            elif field == 'applied_fixes':
+                view[field] = stored.get('applied_fixes', stored.get('data', {}).get('applied_fixes'))
+            elif field in DASHBOARD_FIELDS and field in stored:
+                view[field] = stored[field]
+                
+        sections = data_sections(fields)
+        data = stored.get('data', {})
+        if sections is None:
+            view['data'] = await result_store.resolve_dict(data)
+        elif sections:
+            view['data'] = {
+                section: await result_store.aload(data[section])
+                for section in sections if section in data
+            }
+            
+        return view
+    
+    async def get_analysis_snapshot(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        داده‌های لازم برای مقایسه دو تحلیل (analysis_diff): site_analysis، seo_analysis و نماهای مشتق شده
+        
+        Returns:
+            {'analysis_id', 'site_url', 'status', 'created_at', 'site_analysis', 'seo_analysis', 'derived'} یا None
+        """
+        stored = await self._get_dashboard(analysis_id)
+        if stored is None:
+            return None
+        
+        derived = await self._ensure_derived(stored)
+        data = stored.get('data', {})
+        return {
+            'analysis_id': analysis_id,
+            'site_url': stored.get('site_url', ''),
+            'status': stored.get('status'),
+            'created_at': stored.get('created_at'),
+            'site_analysis': await result_store.aload(data.get('site_analysis')) or {},
+            'seo_analysis': await result_store.aload(data.get('seo_analysis')) or {},
+            'derived': derived
+        }
+    
+    async def get_dashboard_section(self, analysis_id: str, section: str) -> Optional[Dict[str, Any]]:
+        """
+        دریافت یک بخش از data داشبورد (مثلاً seo_analysis) به صورت جداگانه
+        
+        Returns:
+            {'found': bool, 'value': ...} یا None اگر داشبورد وجود نداشته باشد
+        """
+        stored = await self._get_dashboard(analysis_id)
+        if stored is None:
+            return None
+        data = stored.get('data', {})
+        if section not in data:
+            return {'found': False, 'value': None}
+        return {'found': True, 'value': await result_store.aload(data[section])}
+    
+    async def get_dashboard_list(self, analysis_id: str, name: str) -> Optional[List[Any]]:
+        """
+        دریافت یکی از لیست‌های طولانی داشبورد (dashboard_views.DASHBOARD_LISTS)
+        
+        Returns:
+            لیست آیتم‌ها یا None اگر داشبورد وجود نداشته باشد
+        """
+        stored = await self._get_dashboard(analysis_id)
+        if stored is None:
+            return None
+        
+        section, path = DASHBOARD_LISTS[name]
+        if section is None:
+            # applied_fixes ممکن است در داشبوردهای قدیمی داخل data باشد
+            source = stored if path[0] in stored else stored.get('data', {})
+        else:
+            source = await result_store.aload(stored.get('data', {}).get(section)) or {}
+        return get_list(source, path)
+    
+    async def _ensure_derived(self, stored: Dict[str, Any]) -> Dict[str, Any]:
+        """نماهای مشتق شده داشبورد (برای داشبوردهای ذخیره شده قبل از افزودن summary/portfolio/search دوباره ساخته می‌شوند)"""
+        derived = stored.get('derived')
+        if derived is None or any(key not in derived for key in ('summary', 'portfolio', 'search')):
+            data = stored.get('data', {})
+            sources = {
+                key: await result_store.aload(data[key])
+                for key in DERIVED_VIEW_SOURCES if key in data
+            }
+            derived = self._compute_derived_views(sources, stored.get('version', 0))
+            stored['derived'] = derived
+            portfolio_index.upsert(stored.get('analysis_id', ''), stored)
+            search_index.index_dashboard(stored.get('analysis_id', ''), stored)
+        return derived
+    
+    def _compute_derived_views(self, data: Dict[str, Any], version: int) -> Dict[str, Any]:
+        """
+        ساخت نماهای مشتق شده از داده‌های تحلیل
+        
+        Args:
+            data: داده‌های تحلیل (حداقل site_analysis و seo_analysis)
+            version: نسخه داشبوردی که نماها از آن ساخته شده‌اند
+            
+        Returns:
+            {'version', 'strengths', 'weaknesses', 'recommendations', 'summary', 'portfolio', 'search'}
+        """
+        derived = {
+            'version': version, 'strengths': [], 'weaknesses': [], 'recommendations': [],
+            'portfolio': None, 'search': None
+        }
+        
+        site_analysis = data.get('site_analysis')
+        seo_analysis = data.get('seo_analysis')
+        derived['summary'] = build_summary(
+            site_analysis if isinstance(site_analysis, dict) else {},
+            seo_analysis if isinstance(seo_analysis, dict) else {}
+        )
         
         try:
             # استخراج نقاط قوت و ضعف از داده‌های تحلیل
-            strengths, weaknesses = self._extract_strengths_weaknesses(dashboard.get('data', {}))
-            dashboard['strengths'] = strengths
-            dashboard['weaknesses'] = weaknesses
+            strengths, weaknesses = self._extract_strengths_weaknesses(data)
+            derived['strengths'] = strengths
+            derived['weaknesses'] = weaknesses
             
             # تولید پیشنهادات
             try:
-                recommendations = self._generate_recommendations(dashboard.get('data', {}), weaknesses)
-                dashboard['recommendations'] = recommendations
+                derived['recommendations'] = self._generate_recommendations(data, weaknesses)
             except Exception as e:
                 logger.error(f"Error generating recommendations: {str(e)}")
-                dashboard['recommendations'] = []
-            
-            # اضافه کردن applied_fixes به dashboard (اگر وجود دارد)
-            if 'applied_fixes' not in dashboard and 'applied_fixes' in dashboard.get('data', {}):
-                # applied_fixes در data است، آن را به سطح dashboard منتقل می‌کنیم
-                dashboard['applied_fixes'] = dashboard['data']['applied_fixes']
         except Exception as e:
             logger.error(f"Error extracting strengths/weaknesses: {str(e)}")
-            dashboard['strengths'] = []
-            dashboard['weaknesses'] = []
-            dashboard['recommendations'] = []
-        
-        return dashboard
+            
+        # ردیف عددی تحلیل برای گزارش تجمیعی (portfolio_index)
+        if derived['summary']['has_data']:
+            try:
+                derived['portfolio'] = portfolio_row(
+                    site_analysis if isinstance(site_analysis, dict) else {},
+                    seo_analysis if isinstance(seo_analysis, dict) else {},
+                    derived['strengths'],
+                    derived['weaknesses']
+                )
+            except Exception as e:
+                logger.error(f"Error building portfolio row: {str(e)}")
+                
+            # مقادیر قابل جستجو برای search_index
+            try:
+                derived['search'] = search_document(
+                    site_analysis if isinstance(site_analysis, dict) else {},
+                    seo_analysis if isinstance(seo_analysis, dict) else {},
+                    derived['weaknesses']
+                )
+            except Exception as e:
+                logger.error(f"Error building search document: {str(e)}")
+            
+        return derived
     
     def _extract_strengths_weaknesses(self, data: Dict[str, Any]) -> tuple:
         """
@@ -414,8 +724,63 @@ class DashboardManager:
         return recommendations
     
     @classmethod
-    def clear_all_dashboards(cls):
-        """پاک کردن تمام داشبوردهای کش شده (برای تست یا رفع مشکل)"""
+    def get_memory_stats(cls) -> Dict[str, Any]:
+        """آمار حافظه داشبوردها"""
+        return cls._dashboards.get_stats()
+    
+    @classmethod
+    def get_active_ids(cls) -> List[str]:
+        """تحلیل‌هایی که ResultHandle های آن‌ها هنوز در حافظه استفاده می‌شوند (برای sweep در Result Store)"""
+        return cls._dashboards.ids() + dashboard_store.unflushed_ids()
+    
+    @classmethod
+    async def clear_dashboard(cls, analysis_id: str) -> bool:
+        """
+        حذف یک داشبورد از حافظه و نتایج آن از Result Store (نسخه Database باقی می‌ماند)
+        
+        بدون Database نسخه حافظه تنها نسخه داشبورد است و حذف نمی‌شود؛ داشبوردهای
+        در حال پردازش هم حذف نمی‌شوند چون Pipeline آن‌ها هنوز از Result Store می‌خواند.
+        
+        Returns:
+            آیا داشبورد و نتایج آن حذف شدند
+        """
+        if not dashboard_store.connected:
+            return False
+        dashboard = cls._dashboards.get(analysis_id) or dashboard_store.get_unflushed(analysis_id)
+        if dashboard is not None and dashboard.get('status') == 'processing':
+            return False
+            
+        # تغییرات نوشته نشده به ResultHandle ها ارجاع دارند؛ اول در Database نوشته شوند
+        await dashboard_store.flush()
+        if dashboard_store.is_dirty(analysis_id):
+            return False
+        cls._dashboards.pop(analysis_id)
+        cls._validated_at.pop(analysis_id, None)
+        result_store.delete(analysis_id)
+        return True
+    
+    @classmethod
+    async def clear_all_dashboards(cls):
+        """
+        پاک کردن تمام داشبوردهای کش شده در حافظه (نسخه Database باقی می‌ماند)
+        
+        تغییرات نوشته نشده به ResultHandle ها ارجاع دارند، پس ابتدا در Database نوشته می‌شوند؛
+        نتایج داشبوردهایی که نوشتن آن‌ها ناموفق بوده یا Pipeline آن‌ها در حال اجراست حذف نمی‌شوند.
+        """
+        if dashboard_store.connected:
+            await dashboard_store.flush()
+        keep = set(dashboard_store.unflushed_ids())
+        keep.update(
+            analysis_id for analysis_id, dashboard in cls._dashboards.items()
+            if dashboard.get('status') == 'processing'
+        )
+        
         cls._dashboards.clear()
-        logger.info("All dashboards cleared from memory")
+        cls._validated_at.clear()
+        if not dashboard_store.connected:
+            # بدون Database داشبوردها کاملاً حذف شده‌اند
+            portfolio_index.clear()
+            search_index.clear()
+        result_store.clear(keep=keep)
+        logger.info(f"All dashboards cleared from memory (results of {len(keep)} analyses kept)")
 
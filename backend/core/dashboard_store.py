@@ -0,0 +1,480 @@
+"""
+Dashboard Store - ذخیره پایدار داشبوردها در Database
+
+DashboardManager داشبوردها را در حافظه نگه می‌دارد (Cache read-through) و
+تغییرات را به این Store اعلام می‌کند. Store تغییرات را به صورت write-behind جمع
+می‌کند (چند update_dashboard پشت سر هم یک داشبورد فقط یک نوشتن می‌شوند) و
+در یک Transaction در جداول dashboards، site_analyses و seo_analyses می‌نویسد.
+نتایج بزرگ (تحلیل سایت/سئو و سایر data) فقط وقتی تغییر کرده باشند دوباره نوشته می‌شوند.
+
+Database با DATABASE_URL تعیین می‌شود (برای تست محلی: sqlite:///./content_factory.db).
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.result_store import result_store
+
+logger = logging.getLogger(__name__)
+
+# کلیدهای data که در جداول مخصوص خود ذخیره می‌شوند
+SITE_ANALYSIS_KEY = 'site_analysis'
+SEO_ANALYSIS_KEY = 'seo_analysis'
+
+# فیلدهای محرمانه وضعیت داشبورد که در Database نوشته نمی‌شوند (فقط در حافظه Worker می‌مانند)
+SECRET_STATE_FIELDS = {'cms_credentials': ('password', 'api_key')}
+
+# نام رمزهای حذف شده در نسخه Database (برای درخواست ورود دوباره اطلاعات لاگین)
+SECRETS_REMOVED_KEY = 'secrets_removed'
+
+
+def persisted_state(dashboard: Dict[str, Any]) -> Dict[str, Any]:
+    """وضعیت قابل ذخیره داشبورد (بدون data و بدون رمزها)"""
+    state = {key: value for key, value in dashboard.items() if key != 'data'}
+    for field, secrets in SECRET_STATE_FIELDS.items():
+        if isinstance(state.get(field), dict):
+            removed = [key for key in secrets if state[field].get(key)]
+            state[field] = {key: value for key, value in state[field].items() if key not in secrets}
+            if removed:
+                state[field][SECRETS_REMOVED_KEY] = removed
+    return state
+
+
+def restore_secrets(dashboard: Dict[str, Any], previous: Optional[Dict[str, Any]]):
+    """انتقال رمزهای نسخه حافظه به نسخه بارگذاری شده از Database"""
+    if not previous:
+        return
+    for field, secrets in SECRET_STATE_FIELDS.items():
+        source, target = previous.get(field), dashboard.get(field)
+        if not isinstance(source, dict) or not isinstance(target, dict):
+            continue
+        # فقط اگر همان اطلاعات لاگین باشد (در Worker دیگری تغییر نکرده باشد)
+        if source.get('saved_at') != target.get('saved_at'):
+            continue
+        for secret in secrets:
+            if secret in source:
+                target[secret] = source[secret]
+
+
+def missing_secrets(dashboard: Dict[str, Any], field: str) -> List[str]:
+    """
+    رمزهای ذخیره شده‌ای که در این Worker در دسترس نیستند
+    
+    پس از Restart، حذف از حافظه (LRU) یا خواندن داشبورد در Worker دیگر، رمزها فقط
+    از نسخه Database (بدون رمز) بارگذاری می‌شوند و باید دوباره وارد شوند.
+    """
+    value = dashboard.get(field)
+    if not isinstance(value, dict):
+        return []
+    return [secret for secret in value.get(SECRETS_REMOVED_KEY, []) if not value.get(secret)]
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    """تبدیل رشته ISO به datetime"""
+    if isinstance(value, datetime) or value is None:
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _merge_sections(current: Optional[Set[str]], sections: Optional[Iterable[str]]) -> Optional[Set[str]]:
+    """ادغام بخش‌های تغییر کرده (None یعنی نوشتن کامل)"""
+    if current is None or sections is None:
+        return None
+    return current | set(sections)
+
+
+def _section_dirty(sections: Optional[Set[str]], key: str) -> bool:
+    """آیا کلید data باید در این دور نوشته شود"""
+    if sections is None or key in sections:
+        return True
+    # ستون data داشبورد یکجا نوشته می‌شود؛ تغییر یکی از کلیدهای آن همه را لازم دارد
+    return key not in (SITE_ANALYSIS_KEY, SEO_ANALYSIS_KEY) and any(
+        section not in (SITE_ANALYSIS_KEY, SEO_ANALYSIS_KEY) for section in sections
+    )
+
+
+class DashboardStore:
+    """ذخیره write-behind داشبوردها با مدل‌های SQLAlchemy"""
+    
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        flush_interval: Optional[float] = None,
+        max_batch: Optional[int] = None
+    ):
+        """
+        Args:
+            enabled: فعال بودن ذخیره پایدار (پیش‌فرض: DASHBOARD_PERSISTENCE)
+            flush_interval: حداکثر تاخیر نوشتن تغییرات (ثانیه)
+            max_batch: تعداد داشبوردهای تغییر کرده‌ای که باعث نوشتن فوری می‌شود
+        """
+        self.enabled = enabled if enabled is not None else (
+            os.getenv("DASHBOARD_PERSISTENCE", "true").lower() == "true"
+        )
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("DASHBOARD_FLUSH_INTERVAL", "1.0")
+        )
+        self.max_batch = max_batch if max_batch is not None else int(
+            os.getenv("DASHBOARD_FLUSH_BATCH", "100")
+        )
+        self._connected = False
+        self._session_factory = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._dirty_sections: Dict[str, Optional[Set[str]]] = {}  # کلیدهای data تغییر کرده هر داشبورد
+        self._flushing: Dict[str, Dict[str, Any]] = {}  # داشبوردهای در حال نوشتن
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        self.stats = {'marked': 0, 'flushes': 0, 'rows_written': 0, 'loads': 0, 'flush_errors': 0}
+        
+    @property
+    def connected(self) -> bool:
+        return self._connected
+        
+    async def connect(self):
+        """ایجاد جداول و شروع Flusher (در صورت خطا فقط حافظه استفاده می‌شود)"""
+        if not self.enabled:
+            logger.info("Dashboard persistence disabled, dashboards are kept in memory only")
+            return
+            
+        try:
+            from database.database import AsyncSessionLocal, init_db
+            await init_db()
+        except Exception as e:
+            logger.warning(f"Dashboard database unavailable, dashboards are kept in memory only: {str(e)}")
+            self._connected = False
+            return
+            
+        self._session_factory = AsyncSessionLocal
+        self._flush_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._connected = True
+        self._flusher_task = asyncio.create_task(self._flush_loop())
+        logger.info("Dashboard persistence enabled")
+        
+    async def close(self):
+        """نوشتن تغییرات باقیمانده و توقف Flusher"""
+        if not self._connected:
+            return
+        if self._flusher_task:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._flusher_task = None
+        await self.flush()
+        self._connected = False
+        
+    def mark_dirty(self, analysis_id: str, dashboard: Dict[str, Any], sections: Optional[Iterable[str]] = None):
+        """
+        ثبت تغییر یک داشبورد برای نوشتن بعدی
+        
+        فقط آخرین وضعیت هر داشبورد نوشته می‌شود، پس تغییرات پشت سر هم ادغام می‌شوند.
+        
+        Args:
+            analysis_id: شناسه تحلیل
+            dashboard: نسخه زنده داشبورد
+            sections: کلیدهای data که تغییر کرده‌اند (None یعنی همه)؛ فیلدهای سطح
+                داشبورد همیشه نوشته می‌شوند ولی نتایج بزرگ فقط در صورت تغییر
+        """
+        if not self._connected:
+            return
+        previous = self._dirty_sections.get(analysis_id, set()) if analysis_id in self._pending else set()
+        self._dirty_sections[analysis_id] = _merge_sections(previous, sections)
+        self._pending[analysis_id] = dashboard
+        self.stats['marked'] += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush_event.set()
+            
+    def is_dirty(self, analysis_id: str) -> bool:
+        """آیا تغییرات این داشبورد هنوز نوشته نشده است"""
+        return analysis_id in self._pending or analysis_id in self._flushing
+        
+    def get_unflushed(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """نسخه زنده داشبوردی که هنوز نوشته نشده است (برای داشبوردهایی که از حافظه حذف شده‌اند)"""
+        return self._pending.get(analysis_id) or self._flushing.get(analysis_id)
+        
+    def unflushed_ids(self) -> List[str]:
+        """شناسه داشبوردهایی که تغییرات آن‌ها هنوز نوشته نشده است"""
+        return list(self._pending) + list(self._flushing)
+        
+    async def _flush_loop(self):
+        """نوشتن دوره‌ای تغییرات"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            if self._pending:
+                await self.flush()
+                
+    async def flush(self):
+        """نوشتن تمام تغییرات در یک Transaction"""
+        if not self._connected or not self._pending:
+            return
+            
+        async with self._flush_lock:
+            # Snapshot همزمان (بدون await) تا تغییرات بعدی در دور بعد نوشته شوند
+            batch = {
+                analysis_id: (
+                    {**dashboard, 'data': dict(dashboard.get('data', {}))},
+                    self._dirty_sections.get(analysis_id)
+                )
+                for analysis_id, dashboard in self._pending.items()
+            }
+            self._flushing = dict(self._pending)
+            self._pending.clear()
+            self._dirty_sections = {}
+            
+            try:
+                # فقط نتایج تغییر کرده از Result Store خوانده و دوباره نوشته می‌شوند
+                for dashboard, sections in batch.values():
+                    dashboard['data'] = await result_store.resolve_dict({
+                        key: value for key, value in dashboard['data'].items()
+                        if _section_dirty(sections, key)
+                    })
+                incomplete = await self._write_batch(batch)
+                self.stats['flushes'] += 1
+                self.stats['rows_written'] += len(batch) - len(incomplete)
+            except Exception as e:
+                self.stats['flush_errors'] += 1
+                logger.error(f"Error persisting {len(batch)} dashboards: {str(e)}")
+                incomplete = {analysis_id: sections for analysis_id, (_, sections) in batch.items()}
+            finally:
+                flushing, self._flushing = self._flushing, {}
+                
+            # بازگرداندن به صف (ادغام با تغییرات جدیدتر)؛ ردیف‌های ناموجود بار بعد کامل نوشته می‌شوند
+            for analysis_id, sections in incomplete.items():
+                if analysis_id not in self._pending:
+                    self._pending[analysis_id] = flushing[analysis_id]
+                    self._dirty_sections[analysis_id] = sections
+                else:
+                    self._dirty_sections[analysis_id] = _merge_sections(self._dirty_sections.get(analysis_id), sections)
+                    
+    async def _write_batch(
+        self,
+        batch: Dict[str, Tuple[Dict[str, Any], Optional[Set[str]]]]
+    ) -> Dict[str, Optional[Set[str]]]:
+        """
+        Upsert داشبوردها و تحلیل‌های سایت/سئو آن‌ها
+        
+        ردیف‌های موجود با UPDATE فقط ستون‌های تغییر کرده به‌روزرسانی می‌شوند؛ Payload
+        تحلیل سایت/سئو فقط وقتی بخش مربوطه تغییر کرده باشد دوباره نوشته می‌شود.
+        
+        Returns:
+            داشبوردهایی که ردیف آن‌ها وجود ندارد و بخش‌هایش خوانده نشده است
+            (با sections=None برای نوشتن کامل در دور بعد)
+        """
+        from sqlalchemy import select
+        from database.models import Dashboard, SEOAnalysis, SiteAnalysis
+        
+        analysis_ids = list(batch)
+        incomplete: Dict[str, Optional[Set[str]]] = {}
+        async with self._session_factory() as session:
+            async with session.begin():
+                summaries = dict((await session.execute(
+                    select(Dashboard.analysis_id, Dashboard.summary).where(Dashboard.analysis_id.in_(analysis_ids))
+                )).all())
+                site_ids = await self._existing_ids(session, SiteAnalysis, analysis_ids)
+                seo_ids = await self._existing_ids(session, SEOAnalysis, analysis_ids)
+                
+                for analysis_id, (dashboard, sections) in batch.items():
+                    data = dashboard['data']
+                    site_dirty = _section_dirty(sections, SITE_ANALYSIS_KEY)
+                    seo_dirty = _section_dirty(sections, SEO_ANALYSIS_KEY)
+                    data_dirty = sections is None or any(
+                        key not in (SITE_ANALYSIS_KEY, SEO_ANALYSIS_KEY) for key in sections
+                    )
+                    if (
+                        (analysis_id not in site_ids and not site_dirty)
+                        or (analysis_id not in summaries and not data_dirty)
+                    ):
+                        incomplete[analysis_id] = None
+                        continue
+                        
+                    site_values = {'site_url': dashboard.get('site_url') or '', 'status': dashboard.get('status')}
+                    if site_dirty:
+                        site_analysis = data.get(SITE_ANALYSIS_KEY)
+                        if isinstance(site_analysis, dict):
+                            site_values.update(
+                                cms_type=site_analysis.get('cms_type'),
+                                technology_stack=site_analysis.get('technology_stack'),
+                                structure=site_analysis.get('structure'),
+                                performance=site_analysis.get('performance'),
+                                security=site_analysis.get('security'),
+                                sitemap=site_analysis.get('sitemap')
+                            )
+                        site_values['payload'] = site_analysis
+                    await self._upsert(session, SiteAnalysis, analysis_id, site_values, analysis_id in site_ids)
+                    
+                    seo_analysis = data.get(SEO_ANALYSIS_KEY)
+                    seo_score = (summaries.get(analysis_id) or {}).get('seo_score')
+                    if seo_dirty:
+                        seo_score = seo_analysis.get('score') if isinstance(seo_analysis, dict) else None
+                    if seo_dirty and seo_analysis is not None:
+                        seo_values = {'payload': seo_analysis}
+                        if isinstance(seo_analysis, dict):
+                            score = seo_analysis.get('score')
+                            seo_values.update(
+                                technical_seo=seo_analysis.get('technical'),
+                                content_seo=seo_analysis.get('content'),
+                                competitor_analysis=seo_analysis.get('competitor_analysis'),
+                                issues=seo_analysis.get('issues'),
+                                score=int(score) if isinstance(score, (int, float)) else None
+                            )
+                        await self._upsert(session, SEOAnalysis, analysis_id, seo_values, analysis_id in seo_ids)
+                        
+                    dashboard_values = {
+                        'site_url': dashboard.get('site_url'),
+                        'status': dashboard.get('status'),
+                        'state': persisted_state(dashboard),
+                        'summary': {
+                            'status': dashboard.get('status'),
+                            'seo_score': seo_score,
+                            'updated_at': dashboard.get('updated_at')
+                        },
+                        'updated_at': _parse_datetime(dashboard.get('updated_at')) or datetime.utcnow()
+                    }
+                    if data_dirty:
+                        dashboard_values['data'] = {
+                            key: value for key, value in data.items()
+                            if key not in (SITE_ANALYSIS_KEY, SEO_ANALYSIS_KEY)
+                        }
+                    created_at = _parse_datetime(dashboard.get('created_at'))
+                    if created_at and analysis_id not in summaries:
+                        dashboard_values['created_at'] = created_at
+                    await self._upsert(session, Dashboard, analysis_id, dashboard_values, analysis_id in summaries)
+                    
+        return incomplete
+        
+    @staticmethod
+    async def _existing_ids(session, model, analysis_ids: List[str]) -> Set[str]:
+        """شناسه‌های تحلیلی که ردیفی از این مدل دارند (بدون خواندن ستون‌های بزرگ)"""
+        from sqlalchemy import select
+        result = await session.execute(select(model.analysis_id).where(model.analysis_id.in_(analysis_ids)))
+        return set(result.scalars())
+        
+    @staticmethod
+    async def _upsert(session, model, analysis_id: str, values: Dict[str, Any], exists: bool):
+        """UPDATE ستون‌های داده شده یک ردیف موجود یا INSERT ردیف جدید"""
+        from sqlalchemy import update
+        if exists:
+            await session.execute(update(model).where(model.analysis_id == analysis_id).values(**values))
+        else:
+            session.add(model(analysis_id=analysis_id, **values))
+            
+    async def load(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        بارگذاری یک داشبورد از Database
+        
+        فیلدهای SECRET_STATE_FIELDS در نسخه Database وجود ندارند (restore_secrets).
+        
+        Returns:
+            داشبورد با همان ساختار DashboardManager یا None
+        """
+        if not self._connected:
+            return None
+            
+        pending = self._pending.get(analysis_id)
+        if pending is not None:
+            return pending
+            
+        from sqlalchemy import select
+        from database.models import Dashboard, SEOAnalysis, SiteAnalysis
+        
+        try:
+            async with self._session_factory() as session:
+                dashboard_row = (await session.execute(
+                    select(Dashboard).where(Dashboard.analysis_id == analysis_id)
+                )).scalar_one_or_none()
+                if dashboard_row is None:
+                    return None
+                site_row = (await session.execute(
+                    select(SiteAnalysis).where(SiteAnalysis.analysis_id == analysis_id)
+                )).scalar_one_or_none()
+                seo_row = (await session.execute(
+                    select(SEOAnalysis).where(SEOAnalysis.analysis_id == analysis_id)
+                )).scalars().first()
+        except Exception as e:
+            logger.error(f"Error loading dashboard {analysis_id}: {str(e)}")
+            return None
+            
+        self.stats['loads'] += 1
+        data = dict(dashboard_row.data or {})
+        if site_row is not None and site_row.payload is not None:
+            data[SITE_ANALYSIS_KEY] = site_row.payload
+        if seo_row is not None and seo_row.payload is not None:
+            data[SEO_ANALYSIS_KEY] = seo_row.payload
+            
+        # نتایج بزرگ دوباره به Result Store منتقل می‌شوند
+        for key, value in data.items():
+            data[key] = await result_store.aput(analysis_id, key, value)
+            
+        dashboard = dict(dashboard_row.state or {})
+        dashboard.setdefault('analysis_id', analysis_id)
+        dashboard.setdefault('site_url', dashboard_row.site_url)
+        dashboard.setdefault('status', dashboard_row.status)
+        dashboard['data'] = data
+        return dashboard
+        
+    async def get_updated_at(self, analysis_id: str) -> Optional[datetime]:
+        """زمان آخرین نوشتن یک داشبورد (برای اعتبارسنجی Cache حافظه)"""
+        if not self._connected:
+            return None
+        from sqlalchemy import select
+        from database.models import Dashboard
+        
+        try:
+            async with self._session_factory() as session:
+                return (await session.execute(
+                    select(Dashboard.updated_at).where(Dashboard.analysis_id == analysis_id)
+                )).scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Error checking dashboard {analysis_id}: {str(e)}")
+            return None
+            
+    async def load_states(self, since: Optional[datetime] = None) -> List[tuple]:
+        """
+        فیلدهای سطح داشبورد (state، بدون data) تمام داشبوردها یا داشبوردهای تغییر کرده از since
+        
+        Returns:
+            لیست (analysis_id, site_url, status, updated_at, state)
+        """
+        if not self._connected:
+            return []
+        from sqlalchemy import select
+        from database.models import Dashboard
+        
+        query = select(
+            Dashboard.analysis_id, Dashboard.site_url, Dashboard.status, Dashboard.updated_at, Dashboard.state
+        )
+        if since is not None:
+            query = query.where(Dashboard.updated_at >= since)
+        try:
+            async with self._session_factory() as session:
+                return [tuple(row) for row in (await session.execute(query)).all()]
+        except Exception as e:
+            logger.error(f"Error loading dashboard states: {str(e)}")
+            return []
+            
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار Store"""
+        return {
+            **self.stats,
+            'connected': self._connected,
+            'pending': len(self._pending),
+            'flush_interval': self.flush_interval,
+            'max_batch': self.max_batch
+        }
+
+
+# Global Dashboard Store Instance
+dashboard_store = DashboardStore()
@@ -0,0 +1,172 @@
+"""
+نماهای سبک داشبورد
+انتخاب فیلدها (?fields=summary,alerts) و صفحه‌بندی Cursor برای لیست‌های طولانی داشبورد
+"""
+
+import base64
+import binascii
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("DASHBOARD_MAX_PAGE_SIZE", "500"))
+
+# فیلدهای سطح داشبورد که بدون بارگذاری data برگردانده می‌شوند (cms_credentials عمداً در این لیست نیست)
+DASHBOARD_FIELDS = (
+    'analysis_id', 'site_url', 'status', 'error', 'created_at', 'updated_at', 'version',
+    'strengths', 'weaknesses', 'recommendations', 'derived_version',
+    'applied_fixes', 'last_applied_at', 'competitor_analysis',
+    'suggested_content', 'suggested_content_keywords', 'suggested_content_created_at',
+    'coalesced_with', 'batch_id', 'changes'
+)
+
+# لیست‌های قابل صفحه‌بندی: نام -> (بخش data یا None برای سطح داشبورد، مسیر لیست در آن بخش)
+DASHBOARD_LISTS = {
+    'issues': ('seo_analysis', ('issues',)),
+    'keywords': ('seo_analysis', ('content', 'keywords')),
+    'content-items': ('generated_content', ('content_items',)),
+    'applied-fixes': (None, ('applied_fixes',))
+}
+
+
+def parse_fields(fields: Optional[str], extra: Iterable[str] = ()) -> Optional[List[str]]:
+    """
+    تبدیل پارامتر fields به لیست فیلدها
+    
+    فیلدهای مجاز: DASHBOARD_FIELDS، summary، data، data.<section> و فیلدهای extra
+    
+    Args:
+        fields: مقدار Query (جدا شده با کاما)
+        extra: فیلدهای محاسبه شده‌ای که فراخوان پشتیبانی می‌کند
+        
+    Returns:
+        لیست فیلدها (بدون تکرار) یا None اگر fields داده نشده باشد
+        
+    Raises:
+        ValueError: فیلد ناشناخته
+    """
+    if fields is None or not fields.strip():
+        return None
+        
+    allowed = set(DASHBOARD_FIELDS) | {'summary', 'data'} | set(extra)
+    requested = []
+    for field in fields.split(','):
+        field = field.strip()
+        if not field or field in requested:
+            continue
+        if field not in allowed and not (field.startswith('data.') and len(field) > 5):
+            raise ValueError(f"Unknown field: {field}")
+        requested.append(field)
+    return requested
+
+
+def data_sections(fields: List[str]) -> Optional[List[str]]:
+    """
+    بخش‌هایی از data که فیلدهای درخواستی به آن‌ها نیاز دارند
+    
+    Returns:
+        لیست نام بخش‌ها، یا None اگر کل data لازم باشد
+    """
+    if 'data' in fields:
+        return None
+    return [field[5:] for field in fields if field.startswith('data.')]
+
+
+def project_item(item: Any, fields: Optional[List[str]]) -> Any:
+    """انتخاب کلیدهای مشخص از یک آیتم لیست (آیتم‌های غیر دیکشنری بدون تغییر)"""
+    if not fields or not isinstance(item, dict):
+        return item
+    return {key: item[key] for key in fields if key in item}
+
+
+def get_list(source: Any, path: tuple) -> List[Any]:
+    """دسترسی به لیست در مسیر path (لیست خالی اگر مسیر وجود نداشته باشد)"""
+    value = source
+    for key in path:
+        if not isinstance(value, dict):
+            return []
+        value = value.get(key)
+    return value if isinstance(value, list) else []
+
+
+def encode_cursor(name: str, offset: int) -> str:
+    """ساخت Cursor مات برای صفحه بعدی"""
+    raw = json.dumps({'l': name, 'o': offset}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(name: str, cursor: Optional[str]) -> int:
+    """
+    خواندن offset از Cursor
+    
+    Raises:
+        ValueError: Cursor نامعتبر یا متعلق به لیست دیگر
+    """
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        offset = int(payload['o'])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if payload.get('l') != name or offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def paginate(
+    name: str,
+    items: List[Any],
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    صفحه‌بندی Cursor روی یک لیست
+    
+    Args:
+        name: نام لیست (Cursor به همین لیست محدود است)
+        items: کل آیتم‌ها
+        cursor: Cursor صفحه قبلی (None برای صفحه اول)
+        limit: تعداد آیتم هر صفحه (حداکثر MAX_PAGE_SIZE)
+        fields: کلیدهای مورد نیاز هر آیتم
+        
+    Returns:
+        {'items', 'total', 'limit', 'next_cursor'}
+    """
+    offset = decode_cursor(name, cursor)
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    page = items[offset:offset + limit]
+    next_offset = offset + len(page)
+    
+    return {
+        'items': [project_item(item, fields) for item in page],
+        'total': len(items),
+        'limit': limit,
+        'next_cursor': encode_cursor(name, next_offset) if next_offset < len(items) else None
+    }
+
+
+def build_summary(site_analysis: Dict[str, Any], seo_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    خلاصه کوچک تحلیل برای نماهای اصلی UI (بخشی از نماهای مشتق شده داشبورد)
+    """
+    security = site_analysis.get('security') or {}
+    performance = site_analysis.get('performance') or {}
+    technical = seo_analysis.get('technical') or {}
+    content = seo_analysis.get('content') or {}
+    
+    return {
+        'has_data': bool(site_analysis or seo_analysis),
+        'ssl_enabled': bool(security.get('ssl_enabled', False)),
+        'response_time': performance.get('response_time'),
+        'status_code': performance.get('status_code'),
+        'crawlability': technical.get('crawlability', 'unknown'),
+        'indexability': technical.get('indexability', 'unknown'),
+        'readability': content.get('readability', 0),
+        'keywords_count': len(content.get('keywords') or []),
+        'issues_count': len(seo_analysis.get('issues') or []),
+        'pages_analyzed': seo_analysis.get('pages_analyzed', 0)
+    }
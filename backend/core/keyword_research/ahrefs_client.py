@@ -506,6 +506,10 @@ class AhrefsKeywordAnalyzer:
                 'summary': {}
             }
     
+    def _metrics_cache_key(self, keyword: str, country: str) -> str:
+        """Cache Key معیارهای یک کلمه کلیدی"""
+        return f"ahrefs:keyword_metrics:{country}:{keyword.lower()}"
+    
     async def get_bulk_keyword_metrics(
         self,
         keywords: List[str],
@@ -515,6 +519,9 @@ class AhrefsKeywordAnalyzer:
         """
         دریافت معیارهای چند کلمه کلیدی به صورت همزمان
         
+        ابتدا تمام کلمات در یک رفت و برگشت از Cache خوانده می‌شوند و فقط
+        کلمات Miss از API دریافت و سپس یکجا در Cache ذخیره می‌شوند.
+        
         Args:
             keywords: لیست کلمات کلیدی
             country: کشور
@@ -524,20 +531,43 @@ class AhrefsKeywordAnalyzer:
             Dictionary با کلید کلمه کلیدی و مقدار معیارها
         """
         import asyncio
+        from core.cache import cache_manager, source_tag
+        
+        # حذف کلمات تکراری (بدون توجه به حروف بزرگ و کوچک)
+        unique_keywords = {}
+        for kw in keywords:
+            unique_keywords.setdefault(kw.lower(), kw)
+        
+        cache_keys = {self._metrics_cache_key(kw, country): kw_lower for kw_lower, kw in unique_keywords.items()}
+        tags = [source_tag('ahrefs')]
+        cached = await cache_manager.get_many(list(cache_keys), tags=tags)
+        results = {cache_keys[key]: metrics for key, metrics in cached.items()}
         
-        results = {}
+        missing = [kw for kw_lower, kw in unique_keywords.items() if kw_lower not in results]
+        if not missing:
+            return results
+        
+        fetched = {}
         semaphore = asyncio.Semaphore(max_concurrent)
         
         async def fetch_with_semaphore(keyword: str):
             async with semaphore:
                 metrics = await self.get_keyword_metrics(keyword, country)
                 if metrics:
-                    results[keyword.lower()] = metrics
+                    fetched[keyword.lower()] = metrics
                 # تاخیر برای جلوگیری از Rate Limiting
                 await asyncio.sleep(0.5)
         
-        tasks = [fetch_with_semaphore(kw) for kw in keywords]
+        tasks = [fetch_with_semaphore(kw) for kw in missing]
         await asyncio.gather(*tasks, return_exceptions=True)
         
+        if fetched:
+            await cache_manager.set_many(
+                {self._metrics_cache_key(kw, country): metrics for kw, metrics in fetched.items()},
+                ttl=int(os.getenv('KEYWORD_METRICS_CACHE_TTL', '86400')),
+                tags=tags
+            )
+        
+        results.update(fetched)
         return results
 
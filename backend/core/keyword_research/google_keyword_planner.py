@@ -13,6 +13,8 @@ from bs4 import BeautifulSoup
 import re
 from urllib.parse import quote, urlencode
 
+from core.cache import cache_manager
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,6 +51,7 @@ class GoogleKeywordPlanner:
         self.base_url = "https://www.google.com"
         self.timeout = 15.0
     
+    @cache_manager.memoize(ttl=86400, negative_ttl=300, is_failure=lambda result: not result)
     async def get_keyword_ideas(
         self,
         seed_keyword: str,
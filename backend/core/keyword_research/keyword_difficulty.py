@@ -12,6 +12,8 @@ from datetime import datetime
 from bs4 import BeautifulSoup
 import asyncio
 
+from core.cache import cache_manager
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,6 +45,7 @@ class KeywordDifficultyCalculator:
             'blogger.com', 'tumblr.com', 'github.com', 'stackoverflow.com'
         }
     
+    @cache_manager.memoize(ttl=86400, negative_ttl=300, is_failure=lambda result: 'error' in result)
     async def calculate_difficulty(
         self,
         keyword: str,
@@ -9,6 +9,8 @@ from typing import Dict, Any, List, Optional
 import numpy as np
 from collections import Counter
 
+from core.cache import cache_manager
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,6 +50,7 @@ class SemanticKeywordAnalyzer:
             logger.error(f"Error loading semantic model: {str(e)}")
             self.model_loaded = False
     
+    @cache_manager.memoize(ttl=7 * 86400, negative_ttl=300, is_failure=lambda result: not result)
     async def find_semantic_keywords(
         self,
         main_keyword: str,
@@ -556,6 +556,10 @@ class SEMrushKeywordAnalyzer:
             }
         }
     
+    def _overview_cache_key(self, keyword: str, database: str) -> str:
+        """Cache Key معیارهای یک کلمه کلیدی"""
+        return f"semrush:keyword_overview:{database}:{keyword.lower()}"
+    
     async def get_bulk_keyword_overview(
         self,
         keywords: List[str],
@@ -565,6 +569,9 @@ class SEMrushKeywordAnalyzer:
         """
         دریافت معیارهای چند کلمه کلیدی به صورت همزمان
         
+        ابتدا تمام کلمات در یک رفت و برگشت از Cache خوانده می‌شوند و فقط
+        کلمات Miss از API دریافت و سپس یکجا در Cache ذخیره می‌شوند.
+        
         Args:
             keywords: لیست کلمات کلیدی
             database: دیتابیس
@@ -573,7 +580,23 @@ class SEMrushKeywordAnalyzer:
         Returns:
             Dictionary با کلید کلمه کلیدی و مقدار معیارها
         """
-        results = {}
+        from core.cache import cache_manager, source_tag
+        
+        # حذف کلمات تکراری (بدون توجه به حروف بزرگ و کوچک)
+        unique_keywords = {}
+        for kw in keywords:
+            unique_keywords.setdefault(kw.lower(), kw)
+        
+        cache_keys = {self._overview_cache_key(kw, database): kw_lower for kw_lower, kw in unique_keywords.items()}
+        tags = [source_tag('semrush')]
+        cached = await cache_manager.get_many(list(cache_keys), tags=tags)
+        results = {cache_keys[key]: overview for key, overview in cached.items()}
+        
+        missing = [kw for kw_lower, kw in unique_keywords.items() if kw_lower not in results]
+        if not missing:
+            return results
+        
+        fetched = {}
         
         # استفاده از semaphore برای محدود کردن درخواست‌های همزمان
         semaphore = asyncio.Semaphore(max_concurrent)
@@ -582,13 +605,21 @@ class SEMrushKeywordAnalyzer:
             async with semaphore:
                 overview = await self.get_keyword_overview(keyword, database)
                 if overview:
-                    results[keyword.lower()] = overview
+                    fetched[keyword.lower()] = overview
                 # تاخیر کوتاه برای جلوگیری از Rate Limiting
                 await asyncio.sleep(0.5)
         
-        # اجرای همزمان
-        tasks = [fetch_with_semaphore(kw) for kw in keywords]
+        # اجرای همزمان فقط برای کلمات Miss
+        tasks = [fetch_with_semaphore(kw) for kw in missing]
         await asyncio.gather(*tasks, return_exceptions=True)
         
+        if fetched:
+            await cache_manager.set_many(
+                {self._overview_cache_key(kw, database): overview for kw, overview in fetched.items()},
+                ttl=int(os.getenv('KEYWORD_METRICS_CACHE_TTL', '86400')),
+                tags=tags
+            )
+        
+        results.update(fetched)
         return results
 
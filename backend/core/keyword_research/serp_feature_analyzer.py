@@ -11,6 +11,8 @@ from urllib.parse import quote, urlencode
 import re
 import json
 
+from core.cache import cache_manager
+
 logger = logging.getLogger(__name__)
 
 
@@ -40,6 +42,7 @@ class SERPFeatureAnalyzer:
             }
         )
     
+    @cache_manager.memoize(ttl=6 * 3600, negative_ttl=300, is_failure=lambda result: not result.get('organic_results'))
     async def analyze_serp_features(
         self,
         keyword: str,
@@ -0,0 +1,106 @@
+"""
+Local Cache - Cache درون‌پردازه‌ای LRU با TTL و سقف حجم (بایت)
+
+لایه اول CacheManager؛ کلیدهای پرتکرار بدون رفت و برگشت شبکه از حافظه همین
+Worker خوانده می‌شوند. مقادیر به شکل Encode شده (bytes) نگهداری می‌شوند تا هر
+فراخواننده نسخه مستقل خود را Decode کند و تغییر آن Cache را خراب نکند.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class LocalCache:
+    """Cache LRU با TTL برای هر کلید و محدودیت مجموع حجم"""
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_item_bytes: Optional[int] = None):
+        """
+        Args:
+            max_bytes: حداکثر مجموع حجم مقادیر (بایت)
+            max_item_bytes: حداکثر حجم یک مقدار (مقادیر بزرگ‌تر در این لایه نگهداری نمی‌شوند)
+        """
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes or max(1, max_bytes // 8)
+        # key -> (encoded, expires_at)
+        self._items: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        دریافت مقدار Encode شده
+        
+        Returns:
+            bytes ذخیره شده یا None
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            encoded, expires_at = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._items.move_to_end(key)
+            return encoded
+            
+    def set(self, key: str, encoded: bytes, ttl: float):
+        """
+        ذخیره مقدار
+        
+        Args:
+            key: کلید
+            encoded: مقدار Encode شده با CacheCodec
+            ttl: مدت اعتبار (ثانیه)
+        """
+        if ttl <= 0 or len(encoded) > self.max_item_bytes:
+            self.delete(key)
+            return
+            
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (encoded, time.monotonic() + ttl)
+            self._bytes += len(encoded)
+            
+            while self._bytes > self.max_bytes and self._items:
+                oldest_key = next(iter(self._items))
+                self._remove(oldest_key)
+                self.evictions += 1
+                
+    def delete(self, key: str):
+        """حذف یک کلید"""
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+                
+    def delete_many(self, keys: Iterable[str]):
+        """حذف چند کلید"""
+        with self._lock:
+            for key in keys:
+                if key in self._items:
+                    self._remove(key)
+                    
+    def clear(self):
+        """پاک کردن تمام کلیدها"""
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+            
+    def _remove(self, key: str):
+        """حذف کلید (باید داخل Lock صدا زده شود)"""
+        encoded, _ = self._items.pop(key)
+        self._bytes -= len(encoded)
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار فعلی Cache محلی"""
+        with self._lock:
+            return {
+                'items': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions
+            }
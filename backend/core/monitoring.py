@@ -35,6 +35,74 @@ active_pipelines = Gauge(
     'Number of active pipelines'
 )
 
+analysis_requests_coalesced = Counter(
+    'analysis_requests_coalesced_total',
+    'Analysis requests by coalescing outcome (leader starts a pipeline, follower attaches)',
+    ['outcome']
+)
+
+cache_memoize = Counter(
+    'cache_memoize_total',
+    'Memoized method calls by method and result (hit, miss, negative_hit, failure, bypass)',
+    ['method', 'result']
+)
+
+inflight_analyses = Gauge(
+    'inflight_analyses',
+    'Number of distinct in-flight analyses that can be coalesced'
+)
+
+admitted_pipelines = Gauge(
+    'admitted_pipelines',
+    'Number of pipelines holding an admission slot',
+    ['priority_class']
+)
+
+queued_pipelines = Gauge(
+    'queued_pipelines',
+    'Number of pipelines waiting for an admission slot',
+    ['priority_class']
+)
+
+pipeline_queue_wait = Histogram(
+    'pipeline_queue_wait_seconds',
+    'Time a pipeline waited in the admission queue',
+    ['priority_class'],
+    buckets=(0, 1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+)
+
+cache_requests = Counter(
+    'cache_requests_total',
+    'Cache lookups by tier (local, remote) and result (hit, miss)',
+    ['tier', 'result']
+)
+
+cache_get_or_set = Counter(
+    'cache_get_or_set_total',
+    'CacheManager.get_or_set calls by outcome (hit, miss, coalesced, lock_wait, stale, early_refresh)',
+    ['outcome']
+)
+
+dashboard_memory_bytes = Gauge(
+    'dashboard_memory_bytes',
+    'Approximate bytes of dashboards held in process memory'
+)
+
+dashboard_memory_items = Gauge(
+    'dashboard_memory_items',
+    'Number of dashboards held in process memory'
+)
+
+dashboard_memory_evictions = Counter(
+    'dashboard_memory_evictions_total',
+    'Dashboards evicted from process memory to the persistent store'
+)
+
+dashboard_memory_reloads = Counter(
+    'dashboard_memory_reloads_total',
+    'Dashboards loaded back from the persistent store on access'
+)
+
 
 def monitor_request(func):
     """Decorator برای Monitoring API Requests"""
@@ -20,6 +20,71 @@ class PipelineStatus(Enum):
     CANCELLED = "cancelled"
 
 
+class PipelineContext(dict):
+    """
+    Context یک Pipeline که ResultHandle ها را هنگام دسترسی به صورت Lazy بارگذاری می‌کند
+    
+    get و [] مقدار کامل را برمی‌گردانند؛ get_raw خود Handle را برمی‌گرداند
+    (برای انتقال نتیجه بدون بارگذاری، مثلاً به Dashboard).
+    
+    PipelineManager پیش از هر Step با preload تمام Handle ها را در Thread جداگانه
+    بارگذاری می‌کند تا دسترسی همگام Step ها Event Loop را با خواندن دیسک مسدود نکند.
+    کد async بیرون از Step ها باید از aget استفاده کند.
+    """
+    
+    def __init__(self, *args, result_store: Optional[Any] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.result_store = result_store
+        self._loaded: Dict[str, Any] = {}
+    
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if key in self._loaded:
+            return self._loaded[key]
+        if self.result_store is not None:
+            # فقط برای فراخواننده‌های همگام بیرون از Step ها (خواندن مستقیم از دیسک)
+            return self.result_store.load(value)
+        return value
+    
+    def __setitem__(self, key, value):
+        self._loaded.pop(key, None)
+        super().__setitem__(key, value)
+    
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        return self[key]
+    
+    async def aget(self, key, default=None):
+        """نسخه async متد get (بارگذاری ResultHandle در Thread جداگانه)"""
+        if key not in self:
+            return default
+        if key in self._loaded:
+            return self._loaded[key]
+        value = super().__getitem__(key)
+        if self.result_store is not None:
+            return await self.result_store.aload(value)
+        return value
+    
+    async def preload(self):
+        """بارگذاری تمام ResultHandle های Context پیش از اجرای یک Step"""
+        if self.result_store is None:
+            return
+        for key, value in list(super().items()):
+            if key not in self._loaded:
+                loaded = await self.result_store.aload(value)
+                if loaded is not value:
+                    self._loaded[key] = loaded
+    
+    def release(self):
+        """آزادسازی مقادیر بارگذاری شده (فقط Handle ها در حافظه می‌مانند)"""
+        self._loaded.clear()
+    
+    def get_raw(self, key, default=None):
+        """دریافت مقدار ذخیره شده بدون بارگذاری ResultHandle"""
+        return super().get(key, default)
+
+
 class PipelineStep:
     """کلاس برای مدیریت هر Step در Pipeline"""
     
@@ -67,10 +132,17 @@ class PipelineStep:
 class PipelineManager:
     """مدیریت Pipeline کامل"""
     
-    def __init__(self):
+    def __init__(self, analysis_id: Optional[str] = None, result_store: Optional[Any] = None):
+        """
+        Args:
+            analysis_id: شناسه تحلیل (برای کلید نتایج در Result Store)
+            result_store: ResultStore برای انتقال نتایج بزرگ Steps به دیسک (اختیاری)
+        """
         self.steps: List[PipelineStep] = []
-        self.context: Dict[str, Any] = {}
+        self.context: Dict[str, Any] = PipelineContext(result_store=result_store)
         self.status = PipelineStatus.PENDING
+        self.analysis_id = analysis_id
+        self.result_store = result_store
     
     def add_step(self, step: PipelineStep):
         """اضافه کردن Step به Pipeline"""
@@ -84,9 +156,10 @@ class PipelineManager:
             initial_context: Context اولیه
             
         Returns:
-            نتایج Pipeline
+            نتایج Pipeline (با Result Store، نتایج بزرگ به صورت ResultHandle هستند)
         """
-        self.context = initial_context or {}
+        if initial_context is not None:
+            self.context = PipelineContext(initial_context, result_store=self.result_store)
         self.status = PipelineStatus.RUNNING
         
         results = {}
@@ -98,8 +171,19 @@ class PipelineManager:
                 if not self._check_dependencies(step):
                     raise ValueError(f"Dependencies not met for step: {step.name}")
                 
-                # اجرای Step
-                result = await step.execute(self.context)
+                # اجرای Step (نتایج قبلی پیش از آن و خارج از Event Loop بارگذاری می‌شوند)
+                await self.context.preload()
+                try:
+                    result = await step.execute(self.context)
+                finally:
+                    self.context.release()
+                
+                # انتقال نتیجه بزرگ به Result Store و نگهداری فقط Handle در حافظه
+                if self.result_store is not None and self.analysis_id:
+                    result = await self.result_store.aput(self.analysis_id, step.name, result)
+                    step.result = result
+                    self.context[f"{step.name}_result"] = result
+                
                 results[step.name] = {
                     'status': step.status.value,
                     'result': result,
@@ -149,11 +233,34 @@ class PipelineManager:
         }
 
 
+def build_dashboard_payload(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ساخت داده‌های Dashboard از Context یک Pipeline تکمیل شده
+    
+    Args:
+        context: Context نهایی Pipeline
+        
+    Returns:
+        داده‌های قابل ارسال به DashboardManager.update_dashboard
+        (ResultHandle ها بدون بارگذاری منتقل می‌شوند)
+    """
+    get = context.get_raw if isinstance(context, PipelineContext) else context.get
+    return {
+        'site_analysis': get("site_analysis_result"),
+        'seo_analysis': get("seo_analysis_result"),
+        'generated_content': get("content_generation_result"),
+        'implementation': get("seo_implementation_result"),
+        'placement': get("content_placement_result"),
+        'status': 'completed'
+    }
+
+
 async def create_full_pipeline(
     analysis_id: str,
     site_url: str,
     auto_implement: bool,
-    content_types: List[str]
+    content_types: List[str],
+    http_client: Optional[Any] = None
 ) -> PipelineManager:
     """
     ایجاد Pipeline کامل برای تحلیل و بهینه‌سازی سایت
@@ -163,6 +270,7 @@ async def create_full_pipeline(
         site_url: آدرس سایت
         auto_implement: آیا تغییرات خودکار اعمال شود؟
         content_types: انواع محتوای تولیدی
+        http_client: httpx.AsyncClient مشترک (اختیاری، برای تحلیل دسته‌ای)
         
     Returns:
         PipelineManager آماده برای اجرا
@@ -173,12 +281,15 @@ async def create_full_pipeline(
     from core.seo_implementation import AutoSEOImplementation
     from core.content_placement import ContentPlacementEngine
     from core.dashboard_manager import DashboardManager
+    from core.report_generator import ReportGenerator
+    from core.analysis_diff import record_changes
+    from core.result_store import result_store
     
-    pipeline = PipelineManager()
+    pipeline = PipelineManager(analysis_id, result_store)
     
     # Step 1: Site Analysis
     async def site_analysis_step(context: Dict[str, Any]) -> Dict[str, Any]:
-        analyzer = SiteAnalyzer()
+        analyzer = SiteAnalyzer(client=http_client)
         result = await analyzer.analyze(site_url)
         await analyzer.close()
         return result
@@ -187,7 +298,7 @@ async def create_full_pipeline(
     
     # Step 2: SEO Analysis (وابسته به Site Analysis)
     async def seo_analysis_step(context: Dict[str, Any]) -> Dict[str, Any]:
-        analyzer = SEOAnalyzer()
+        analyzer = SEOAnalyzer(client=http_client)
         try:
             result = await analyzer.deep_analysis(site_url)
             return result
@@ -263,17 +374,13 @@ async def create_full_pipeline(
     # Step 6: Dashboard Update
     async def dashboard_update_step(context: Dict[str, Any]) -> Dict[str, Any]:
         manager = DashboardManager()
-        await manager.update_dashboard(
-            analysis_id,
-            {
-                'site_analysis': context.get("site_analysis_result"),
-                'seo_analysis': context.get("seo_analysis_result"),
-                'generated_content': context.get("content_generation_result"),
-                'implementation': context.get("seo_implementation_result"),
-                'placement': context.get("content_placement_result"),
-                'status': 'completed'
-            }
-        )
+        await manager.update_dashboard(analysis_id, build_dashboard_payload(context))
+        
+        # خلاصه و هشدارهای تغییرات نسبت به تحلیل قبلی همان سایت
+        await record_changes(analysis_id)
+        
+        # گزارش سئو یک بار همین‌جا ساخته می‌شود (تا تغییر بعدی داده‌ها از Cache خوانده می‌شود)
+        await ReportGenerator().precompute_seo_report(analysis_id)
         return {'updated': True}
     
     pipeline.add_step(PipelineStep(
@@ -283,12 +390,12 @@ async def create_full_pipeline(
     ))
     
     # تنظیم Context اولیه
-    pipeline.context = {
+    pipeline.context.update({
         'analysis_id': analysis_id,
         'site_url': site_url,
         'auto_implement': auto_implement,
         'content_types': content_types
-    }
+    })
     
     return pipeline
 
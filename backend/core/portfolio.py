@@ -0,0 +1,506 @@
+"""
+Portfolio - گزارش تجمیعی روی تمام تحلیل‌ها
+
+برای هر تحلیل یک ردیف عددی (امتیازها، زمان پاسخ، تعداد مشکلات به تفکیک نوع) همراه
+نماهای مشتق شده داشبورد ساخته می‌شود (portfolio_row). PortfolioIndex این ردیف‌ها را در
+آرایه‌های ستونی NumPy نگه می‌دارد تا توزیع امتیازها، درصدک‌ها، رایج‌ترین مشکلات و
+ضعیف‌ترین سایت‌ها به صورت برداری (بدون پیمایش دیکشنری هر داشبورد) محاسبه شوند.
+
+هنگام Startup ردیف‌ها از dashboard_store بارگذاری می‌شوند و برای دیدن تغییرات Worker های
+دیگر، حداکثر هر PORTFOLIO_SYNC_INTERVAL ثانیه ردیف‌های تغییر کرده دوباره خوانده می‌شوند.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    # گزارش تجمیعی فقط وقتی numpy نصب است در دسترس است
+    np = None
+
+from core.report_generator import ReportGenerator
+from core.timeseries import site_key
+
+logger = logging.getLogger(__name__)
+
+# ستون‌های عددی هر تحلیل (مقدار نامشخص: NaN)
+METRIC_FIELDS = (
+    'overall_score',
+    'technical_score',
+    'content_score',
+    'security_score',
+    'performance_score',
+    'response_time',
+    'status_code',
+    'readability',
+    'issues_count',
+    'weaknesses_count',
+    'high_priority_count',
+    'strengths_count',
+    'keywords_count',
+    'pages_analyzed'
+)
+SCORE_FIELDS = METRIC_FIELDS[:5]
+COUNT_FIELDS = (
+    'status_code', 'issues_count', 'weaknesses_count', 'high_priority_count',
+    'strengths_count', 'keywords_count', 'pages_analyzed'
+)
+PERCENTILES = (10, 25, 50, 75, 90)
+GRADES = ('A+', 'A', 'B', 'C', 'D', 'F')
+SCORE_BINS = tuple(range(0, 101, 10))
+
+# ستون‌هایی که در هر ردیف رتبه‌بندی برگردانده می‌شوند
+ITEM_FIELDS = ('overall_score', 'response_time', 'issues_count', 'weaknesses_count', 'high_priority_count')
+
+_scorer = ReportGenerator()
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def portfolio_row(
+    site_analysis: Dict[str, Any],
+    seo_analysis: Dict[str, Any],
+    strengths: List[Dict[str, Any]],
+    weaknesses: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    ردیف عددی یک تحلیل برای گزارش تجمیعی (امتیازها همان محاسبه گزارش سئو هستند)
+    
+    Returns:
+        {'metrics': {field: value}, 'grade', 'cms_type', 'issues': {type: count}}
+    """
+    content = seo_analysis.get('content') or {}
+    performance = site_analysis.get('performance') or {}
+    security = site_analysis.get('security') or {}
+    # مقادیر غیر استاندارد باعث خطای محاسبه امتیاز نشوند
+    if not isinstance(content.get('readability', 0), (int, float)):
+        content = {**content, 'readability': 0}
+    if not isinstance(security.get('security_headers', {}), dict):
+        site_analysis = {**site_analysis, 'security': {**security, 'security_headers': {}}}
+    score = _scorer._calculate_overall_score(
+        site_analysis, {**seo_analysis, 'content': content}, strengths, weaknesses
+    )
+    breakdown = score['breakdown']
+    
+    # مشکلات سئو بر اساس type و نقاط ضعف بر اساس عنوان شمرده می‌شوند
+    issues: Dict[str, int] = {}
+    seo_issues = [issue for issue in seo_analysis.get('issues') or [] if isinstance(issue, dict)]
+    for issue in seo_issues:
+        issue_type = issue.get('type') or issue.get('title') or 'unknown'
+        issues[issue_type] = issues.get(issue_type, 0) + 1
+    for weakness in weaknesses:
+        title = weakness.get('title') or 'unknown'
+        issues[title] = issues.get(title, 0) + 1
+        
+    return {
+        'metrics': {
+            'overall_score': score['overall'],
+            'technical_score': breakdown['technical'],
+            'content_score': breakdown['content'],
+            'security_score': breakdown['security'],
+            'performance_score': breakdown['performance'],
+            'response_time': _number(performance.get('response_time')),
+            'status_code': _number(performance.get('status_code')),
+            'readability': _number(content.get('readability')),
+            'issues_count': len(seo_issues),
+            'weaknesses_count': len(weaknesses),
+            'high_priority_count': sum(1 for weakness in weaknesses if weakness.get('priority') == 'high'),
+            'strengths_count': len(strengths),
+            'keywords_count': len(content.get('keywords') or []),
+            'pages_analyzed': _number(seo_analysis.get('pages_analyzed'))
+        },
+        'grade': score['grade'],
+        'cms_type': site_analysis.get('cms_type') or 'unknown',
+        'issues': issues
+    }
+
+
+def _value(field: str, value: float) -> Optional[float]:
+    """مقدار یک ستون برای خروجی JSON (NaN یعنی None)"""
+    if np.isnan(value):
+        return None
+    return int(value) if field in COUNT_FIELDS else round(float(value), 3)
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _Vocabulary:
+    """نگاشت مقادیر دسته‌ای (وضعیت، CMS، سایت، نوع مشکل) به کد عددی"""
+    
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.names: List[str] = []
+        
+    def code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class PortfolioIndex:
+    """ردیف‌های عددی تمام تحلیل‌ها به صورت ستونی برای Query های تجمیعی برداری"""
+    
+    def __init__(self, sync_interval: Optional[float] = None, initial_capacity: int = 1024):
+        """
+        Args:
+            sync_interval: حداقل فاصله خواندن تغییرات از dashboard_store (ثانیه)
+            initial_capacity: ظرفیت اولیه آرایه‌ها (با پر شدن دو برابر می‌شود)
+        """
+        self.sync_interval = sync_interval if sync_interval is not None else float(
+            os.getenv("PORTFOLIO_SYNC_INTERVAL", "60")
+        )
+        self.initial_capacity = initial_capacity
+        self.stats = {'upserts': 0, 'queries': 0, 'syncs': 0}
+        self._last_sync = 0.0
+        self._synced_until: Optional[datetime] = None
+        self.clear()
+        
+    @property
+    def available(self) -> bool:
+        return np is not None
+        
+    def __len__(self) -> int:
+        return self._size
+        
+    def clear(self):
+        """حذف تمام ردیف‌ها"""
+        self._rows: Dict[str, int] = {}
+        self._analysis_ids: List[str] = []
+        self._site_urls: List[str] = []
+        self._statuses = _Vocabulary()
+        self._cms = _Vocabulary()
+        self._sites = _Vocabulary()
+        self._issue_types = _Vocabulary()
+        self._size = 0
+        self._capacity = 0
+        if np is None:
+            return
+        self._metrics = np.empty((0, len(METRIC_FIELDS)), dtype=np.float64)
+        self._issues = np.zeros((0, 0), dtype=np.int32)
+        self._status = np.empty(0, dtype=np.int16)
+        self._cms_code = np.empty(0, dtype=np.int16)
+        self._site = np.empty(0, dtype=np.int32)
+        self._grade = np.empty(0, dtype=np.int8)
+        self._updated = np.empty(0, dtype=np.float64)
+        self._has_data = np.empty(0, dtype=bool)
+        
+    def _grow(self, rows: int, issue_types: int):
+        """افزایش ظرفیت ردیف‌ها (دو برابر) یا ستون‌های نوع مشکل"""
+        capacity = self._capacity
+        if rows > capacity:
+            capacity = max(self.initial_capacity, capacity * 2, rows)
+        columns = self._issues.shape[1]
+        if issue_types > columns:
+            columns = max(16, columns * 2, issue_types)
+            
+        if capacity != self._capacity:
+            extra = capacity - self._capacity
+            self._metrics = np.concatenate([self._metrics, np.full((extra, len(METRIC_FIELDS)), np.nan)])
+            self._status = np.concatenate([self._status, np.zeros(extra, dtype=np.int16)])
+            self._cms_code = np.concatenate([self._cms_code, np.zeros(extra, dtype=np.int16)])
+            self._site = np.concatenate([self._site, np.zeros(extra, dtype=np.int32)])
+            self._grade = np.concatenate([self._grade, np.full(extra, -1, dtype=np.int8)])
+            self._updated = np.concatenate([self._updated, np.zeros(extra)])
+            self._has_data = np.concatenate([self._has_data, np.zeros(extra, dtype=bool)])
+            
+        if capacity != self._capacity or columns != self._issues.shape[1]:
+            issues = np.zeros((capacity, columns), dtype=np.int32)
+            issues[:self._size, :self._issues.shape[1]] = self._issues[:self._size]
+            self._issues = issues
+        self._capacity = capacity
+        
+    def upsert(self, analysis_id: str, dashboard: Dict[str, Any]):
+        """
+        ثبت یا به‌روزرسانی ردیف یک داشبورد (از derived['portfolio'] آن)
+        """
+        if np is None:
+            return
+            
+        index = self._rows.get(analysis_id)
+        if index is None:
+            index = self._size
+            self._grow(index + 1, len(self._issue_types.names))
+            self._rows[analysis_id] = index
+            self._analysis_ids.append(analysis_id)
+            self._site_urls.append('')
+            self._size += 1
+            
+        site_url = dashboard.get('site_url') or ''
+        self._site_urls[index] = site_url
+        self._site[index] = self._sites.code(site_key(site_url))
+        self._status[index] = self._statuses.code(dashboard.get('status') or 'unknown')
+        self._updated[index] = _timestamp(dashboard.get('updated_at'))
+        self.stats['upserts'] += 1
+        
+        row = (dashboard.get('derived') or {}).get('portfolio')
+        self._issues[index] = 0
+        if not row:
+            self._metrics[index] = np.nan
+            self._grade[index] = -1
+            self._cms_code[index] = self._cms.code('unknown')
+            self._has_data[index] = False
+            return
+            
+        metrics = row.get('metrics', {})
+        self._metrics[index] = [
+            np.nan if metrics.get(field) is None else metrics[field] for field in METRIC_FIELDS
+        ]
+        grade = row.get('grade')
+        self._grade[index] = GRADES.index(grade) if grade in GRADES else -1
+        self._cms_code[index] = self._cms.code(row.get('cms_type') or 'unknown')
+        self._has_data[index] = True
+        
+        codes = [self._issue_types.code(issue_type) for issue_type in row.get('issues', {})]
+        self._grow(self._size, len(self._issue_types.names))
+        if codes:
+            self._issues[index, codes] = list(row['issues'].values())
+            
+    async def sync(self, force: bool = False):
+        """
+        خواندن داشبوردهای تغییر کرده (توسط Worker های دیگر) از dashboard_store
+        
+        Args:
+            force: بدون توجه به sync_interval
+        """
+        from core.dashboard_store import dashboard_store
+        
+        if np is None or not dashboard_store.connected:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+        
+        rows = await dashboard_store.load_states(self._synced_until)
+        for analysis_id, site_url, status, updated_at, state in rows:
+            dashboard = dict(state or {})
+            dashboard['site_url'] = site_url or dashboard.get('site_url')
+            dashboard['status'] = status or dashboard.get('status')
+            index = self._rows.get(analysis_id)
+            if index is not None and self._updated[index] >= _timestamp(dashboard.get('updated_at')):
+                # ردیف حافظه (نوشته شده توسط همین Worker) جدیدتر است
+                continue
+            self.upsert(analysis_id, dashboard)
+            
+        timestamps = [row[3] for row in rows if row[3] is not None]
+        if timestamps:
+            self._synced_until = max(timestamps)
+        self.stats['syncs'] += 1
+        logger.debug(f"Portfolio synced {len(rows)} dashboards from the store")
+        
+    def _mask(self, status: Optional[str], cms_type: Optional[str], latest_only: bool) -> "np.ndarray":
+        """ردیف‌های دارای داده که با فیلترها تطابق دارند"""
+        size = self._size
+        mask = self._has_data[:size].copy()
+        for value, vocabulary, column in (
+            (status, self._statuses, self._status),
+            (cms_type, self._cms, self._cms_code)
+        ):
+            if value:
+                code = vocabulary.codes.get(value)
+                if code is None:
+                    mask[:] = False
+                else:
+                    mask &= column[:size] == code
+                    
+        if latest_only:
+            # فقط آخرین تحلیل هر سایت
+            rows = np.flatnonzero(mask)
+            if rows.size:
+                order = np.lexsort((self._updated[rows], self._site[rows]))
+                sites = self._site[rows][order]
+                last = np.ones(order.size, dtype=bool)
+                last[:-1] = sites[1:] != sites[:-1]
+                mask = np.zeros(size, dtype=bool)
+                mask[rows[order[last]]] = True
+        return mask
+        
+    def _item(self, index: int) -> Dict[str, Any]:
+        metrics = self._metrics[index]
+        grade = int(self._grade[index])
+        item = {
+            'analysis_id': self._analysis_ids[index],
+            'site_url': self._site_urls[index],
+            'status': self._statuses.names[int(self._status[index])],
+            'grade': GRADES[grade] if grade >= 0 else None,
+            'updated_at': datetime.fromtimestamp(self._updated[index]).isoformat() if self._updated[index] else None
+        }
+        for field in ITEM_FIELDS:
+            item[field] = _value(field, metrics[METRIC_FIELDS.index(field)])
+        return item
+        
+    def _rank(self, rows: "np.ndarray", metric: str, ascending: bool, limit: int, offset: int = 0):
+        """
+        رتبه‌بندی ردیف‌ها بر اساس یک ستون (فقط k ردیف اول مرتب می‌شوند)
+        
+        Returns:
+            (تعداد ردیف‌های دارای مقدار، اندیس ردیف‌های صفحه درخواستی)
+        """
+        values = self._metrics[rows, METRIC_FIELDS.index(metric)]
+        valid = ~np.isnan(values)
+        rows, values = rows[valid], values[valid]
+        keys = values if ascending else -values
+        end = min(offset + limit, rows.size)
+        if end <= 0 or offset >= rows.size:
+            return rows.size, rows[:0]
+        if end < rows.size:
+            candidates = np.argpartition(keys, end - 1)[:end]
+            order = candidates[np.argsort(keys[candidates], kind='stable')]
+        else:
+            order = np.argsort(keys, kind='stable')
+        return rows.size, rows[order[offset:end]]
+        
+    def _distribution(self, values: "np.ndarray") -> Dict[str, Any]:
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return {'count': 0}
+        percentiles = np.percentile(values, PERCENTILES)
+        return {
+            'count': int(values.size),
+            'mean': round(float(values.mean()), 3),
+            'min': round(float(values.min()), 3),
+            'max': round(float(values.max()), 3),
+            'percentiles': {f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, percentiles)}
+        }
+        
+    def _top_issues(self, rows: "np.ndarray", limit: int) -> List[Dict[str, Any]]:
+        types = len(self._issue_types.names)
+        if not types or not rows.size:
+            return []
+        counts = self._issues[rows, :types]
+        affected = np.count_nonzero(counts, axis=0)
+        occurrences = counts.sum(axis=0)
+        order = np.lexsort((-occurrences, -affected))[:limit]
+        return [
+            {
+                'type': self._issue_types.names[column],
+                'sites_affected': int(affected[column]),
+                'share': round(float(affected[column]) / rows.size, 4),
+                'occurrences': int(occurrences[column])
+            }
+            for column in order if affected[column]
+        ]
+        
+    def summary(
+        self,
+        status: Optional[str] = 'completed',
+        cms_type: Optional[str] = None,
+        latest_only: bool = True,
+        top: int = 10
+    ) -> Dict[str, Any]:
+        """
+        گزارش تجمیعی: توزیع امتیازها و متریک‌ها، رایج‌ترین مشکلات و ضعیف‌ترین سایت‌ها
+        
+        Args:
+            status: فقط تحلیل‌های با این وضعیت (None یعنی همه)
+            cms_type: فقط سایت‌های با این CMS
+            latest_only: فقط آخرین تحلیل هر سایت
+            top: تعداد موارد لیست‌های رتبه‌بندی
+        """
+        if np is None:
+            raise RuntimeError("Portfolio reporting requires numpy")
+        self.stats['queries'] += 1
+        
+        rows = np.flatnonzero(self._mask(status, cms_type, latest_only))
+        metrics = self._metrics[rows]
+        overall = metrics[:, 0]
+        grades = self._grade[rows]
+        
+        _, worst = self._rank(rows, 'overall_score', ascending=True, limit=top)
+        _, slowest = self._rank(rows, 'response_time', ascending=False, limit=top)
+        histogram, _ = np.histogram(overall[~np.isnan(overall)], bins=SCORE_BINS)
+        grade_counts = np.bincount(grades[grades >= 0], minlength=len(GRADES))
+        cms_counts = np.bincount(self._cms_code[rows], minlength=len(self._cms.names))
+        status_counts = np.bincount(self._status[:self._size], minlength=len(self._statuses.names))
+        
+        return {
+            'analyses': int(rows.size),
+            'sites': int(np.unique(self._site[rows]).size),
+            'filters': {'status': status, 'cms_type': cms_type, 'latest_only': latest_only},
+            'distributions': {
+                field: self._distribution(metrics[:, column]) for column, field in enumerate(METRIC_FIELDS)
+            },
+            'score_histogram': [
+                {'from': SCORE_BINS[i], 'to': SCORE_BINS[i + 1], 'count': int(count)}
+                for i, count in enumerate(histogram)
+            ],
+            'grades': {grade: int(count) for grade, count in zip(GRADES, grade_counts)},
+            'cms_types': {
+                name: int(count) for name, count in zip(self._cms.names, cms_counts) if count
+            },
+            'statuses': {
+                name: int(count) for name, count in zip(self._statuses.names, status_counts) if count
+            },
+            'top_issues': self._top_issues(rows, top),
+            'worst_performers': [self._item(index) for index in worst],
+            'slowest_sites': [self._item(index) for index in slowest]
+        }
+        
+    def rankings(
+        self,
+        metric: str = 'overall_score',
+        ascending: bool = True,
+        limit: int = 50,
+        offset: int = 0,
+        status: Optional[str] = 'completed',
+        cms_type: Optional[str] = None,
+        latest_only: bool = True
+    ) -> Dict[str, Any]:
+        """
+        رتبه‌بندی تحلیل‌ها بر اساس یکی از METRIC_FIELDS
+        
+        Raises:
+            ValueError: اگر metric معتبر نباشد
+        """
+        if np is None:
+            raise RuntimeError("Portfolio reporting requires numpy")
+        if metric not in METRIC_FIELDS:
+            raise ValueError(f"Unknown metric: {metric}")
+        self.stats['queries'] += 1
+        
+        rows = np.flatnonzero(self._mask(status, cms_type, latest_only))
+        total, page = self._rank(rows, metric, ascending, limit, offset)
+        items = []
+        for index in page:
+            item = self._item(index)
+            item[metric] = _value(metric, self._metrics[index, METRIC_FIELDS.index(metric)])
+            items.append(item)
+        return {
+            'metric': metric,
+            'order': 'asc' if ascending else 'desc',
+            'total': int(total),
+            'limit': limit,
+            'offset': offset,
+            'items': items
+        }
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار Index"""
+        return {
+            **self.stats,
+            'available': self.available,
+            'rows': self._size,
+            'issue_types': len(self._issue_types.names),
+            'sync_interval': self.sync_interval
+        }
+
+
+# Global Portfolio Index Instance
+portfolio_index = PortfolioIndex()
@@ -11,6 +11,8 @@ import httpx
 import re
 from datetime import datetime
 
+from core.cache import cache_manager, domain_tag
+
 logger = logging.getLogger(__name__)
 
 
@@ -134,6 +136,12 @@ class RankChecker:
             logger.error(f"Error estimating Iran rank: {str(e)}")
             return None
     
+    @cache_manager.memoize(
+        ttl=86400,
+        negative_ttl=600,
+        is_failure=lambda result: not result.get('global') and not result.get('iran'),
+        tags=lambda args: [domain_tag(args['url'])]
+    )
     async def get_comprehensive_rank(self, url: str) -> Dict[str, Any]:
         """
         دریافت رنک جامع سایت (جهانی و ایران)
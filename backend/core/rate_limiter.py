@@ -0,0 +1,451 @@
+"""
+Rate Limiter - محدودیت نرخ درخواست‌ها با الگوریتم Token Bucket
+
+هر Bucket ظرفیت limit دارد و با نرخ limit/period پر می‌شود (اجازه Burst تا limit و
+سپس نرخ یکنواخت). هر درخواست از Bucket پیش‌فرض Tenant (یا محدودیت اختصاصی API Key
+آن) و در صورت تطبیق، از Bucket مسیر (per-route) یک Token برمی‌دارد؛ درخواست فقط
+وقتی پذیرفته می‌شود که همه Bucket ها Token داشته باشند.
+
+دو Store وجود دارد:
+- MemoryRateLimitStore: داخل پروسه، Shard شده با حذف Bucket های پر شده به ترتیب
+  آخرین استفاده (O(1) سرشکن برای هر درخواست، بدون پیمایش تمام کلیدها)
+- RedisRateLimitStore: مشترک بین تمام Worker ها و سرورها؛ بررسی و برداشت Token ها
+  با یک اسکریپت Lua اتمیک و ساعت خود Redis انجام می‌شود
+
+انتخاب Store با متغیر RATE_LIMIT_BACKEND انجام می‌شود: memory، redis یا auto
+(تلاش برای Redis و در صورت در دسترس نبودن، استفاده از حافظه).
+"""
+
+import logging
+import math
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.admission import get_tenant_id
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    # فقط Store حافظه وقتی redis نصب نیست
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "auto").lower()
+# محدودیت پیش‌فرض هر Tenant (API Key یا IP)
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "60/minute")
+# محدودیت‌های مسیر: "POST /analyze=10/minute,/dashboard/*/export*=20/minute"
+RATE_LIMIT_ROUTES = os.getenv("RATE_LIMIT_ROUTES", "")
+# محدودیت‌های اختصاصی API Key ها به جای پیش‌فرض: "key1=600/minute,key2=unlimited"
+RATE_LIMIT_API_KEYS = os.getenv("RATE_LIMIT_API_KEYS", "")
+# مسیرهای بدون محدودیت (پیشوند)، مثلاً "/health,/metrics"
+RATE_LIMIT_EXEMPT_PATHS = os.getenv("RATE_LIMIT_EXEMPT_PATHS", "")
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+# حداکثر Bucket های داخل حافظه (با پر شدن، قدیمی‌ترین Bucket ها حذف می‌شوند)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+KEY_PREFIX = "ratelimit"
+
+_PERIODS = {
+    's': 1, 'sec': 1, 'second': 1,
+    'm': 60, 'min': 60, 'minute': 60,
+    'h': 3600, 'hour': 3600,
+    'd': 86400, 'day': 86400
+}
+_RATE_PATTERN = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+?)s?\s*$')
+
+# بررسی و برداشت اتمیک Token از چند Bucket (همه یا هیچ)
+# KEYS: کلید Bucket ها | ARGV: cost، سپس برای هر Bucket ظرفیت و نرخ (Token در میلی‌ثانیه)
+# خروجی: {allowed, تعداد Token باقیمانده هر Bucket × 1000}
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local tokens = {}
+local allowed = 1
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local value = tonumber(state[1])
+    if value == nil then
+        value = capacity
+    else
+        value = math.min(capacity, value + math.max(0, now - tonumber(state[2])) * rate)
+    end
+    tokens[i] = value
+    if value < cost then
+        allowed = 0
+    end
+end
+local result = {allowed}
+for i = 1, #KEYS do
+    if allowed == 1 then
+        local capacity = tonumber(ARGV[i * 2])
+        local rate = tonumber(ARGV[i * 2 + 1])
+        tokens[i] = tokens[i] - cost
+        redis.call('HSET', KEYS[i], 'tokens', tokens[i], 'ts', now)
+        redis.call('PEXPIRE', KEYS[i], math.ceil((capacity - tokens[i]) / rate) + 1)
+    end
+    result[i + 1] = math.floor(tokens[i] * 1000)
+end
+return result
+"""
+
+
+class RateLimit:
+    """محدودیت limit درخواست در period ثانیه"""
+    
+    __slots__ = ('limit', 'period', 'rate')
+    
+    def __init__(self, limit: int, period: float):
+        if limit <= 0 or period <= 0:
+            raise ValueError("Rate limit and period must be positive")
+        self.limit = limit
+        self.period = period
+        # Token در ثانیه
+        self.rate = limit / period
+        
+    def __repr__(self):
+        return f"RateLimit({self.limit}/{self.period:g}s)"
+
+
+def parse_rate(text: str) -> RateLimit:
+    """
+    خواندن محدودیت از قالب "60/minute"، "10/second"، "1000/hour" یا "100/5m"
+    
+    Raises:
+        ValueError: قالب نامعتبر
+    """
+    match = _RATE_PATTERN.match(text.lower())
+    if not match or match.group(3) not in _PERIODS:
+        raise ValueError(f"Invalid rate limit {text!r}")
+    count, multiplier, unit = match.groups()
+    return RateLimit(int(count), int(multiplier or 1) * _PERIODS[unit])
+
+
+def _parse_rules(raw: str) -> List[Tuple[str, str]]:
+    """جدا کردن آیتم‌های "name=rate" (آیتم‌های نامعتبر نادیده گرفته می‌شوند)"""
+    rules = []
+    for item in (raw or "").split(","):
+        if "=" not in item:
+            continue
+        name, rate = item.rsplit("=", 1)
+        if name.strip():
+            rules.append((name.strip(), rate.strip()))
+    return rules
+
+
+class RouteRule:
+    """محدودیت یک مسیر (الگو با * برای هر تعداد کاراکتر، متد اختیاری)"""
+    
+    __slots__ = ('pattern', 'method', 'limit', '_regex', '_prefix')
+    
+    def __init__(self, pattern: str, limit: RateLimit):
+        method, _, path = pattern.strip().rpartition(' ')
+        self.pattern = pattern.strip()
+        self.method = method.strip().upper() or None
+        self.limit = limit
+        if path.endswith('*') and '*' not in path[:-1]:
+            # پیشوند ساده بدون Regex
+            self._regex, self._prefix = None, path[:-1]
+        else:
+            self._regex = re.compile('^' + '.*'.join(re.escape(part) for part in path.split('*')) + '$')
+            self._prefix = None
+            
+    def matches(self, method: str, path: str) -> bool:
+        if self.method is not None and self.method != method:
+            return False
+        if self._prefix is not None:
+            return path.startswith(self._prefix)
+        return self._regex.match(path) is not None
+
+
+class RateLimitResult:
+    """نتیجه بررسی یک درخواست (بر اساس محدودکننده‌ترین Bucket)"""
+    
+    __slots__ = ('allowed', 'limit', 'remaining', 'reset_after', 'retry_after')
+    
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset_after: float, retry_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_after = reset_after
+        self.retry_after = retry_after
+        
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        """Header های X-RateLimit-* (Reset: ثانیه تا پر شدن کامل Bucket)"""
+        headers = [
+            (b"x-ratelimit-limit", str(self.limit).encode()),
+            (b"x-ratelimit-remaining", str(self.remaining).encode()),
+            (b"x-ratelimit-reset", str(math.ceil(self.reset_after)).encode())
+        ]
+        if not self.allowed:
+            headers.append((b"retry-after", str(max(1, math.ceil(self.retry_after))).encode()))
+        return headers
+
+
+def bucket_result(allowed: bool, buckets: List[Tuple[str, RateLimit]], tokens: List[float], cost: int = 1) -> RateLimitResult:
+    """ساخت RateLimitResult از Token های باقیمانده Bucket ها"""
+    if len(buckets) == 1:
+        limit, remaining = buckets[0][1], tokens[0]
+    else:
+        index = min(range(len(buckets)), key=tokens.__getitem__)
+        limit, remaining = buckets[index][1], tokens[index]
+    retry_after = 0.0
+    if not allowed:
+        retry_after = max(
+            (cost - value) / bucket_limit.rate
+            for (_, bucket_limit), value in zip(buckets, tokens) if value < cost
+        )
+    return RateLimitResult(
+        allowed,
+        limit.limit,
+        max(0, int(remaining)),
+        (limit.limit - remaining) / limit.rate,
+        retry_after
+    )
+
+
+class RateLimitStore(ABC):
+    """رابط Store وضعیت Bucket ها (Store بدون acquire هنگام ساخت TypeError ایجاد می‌کند)"""
+    
+    name = "base"
+    
+    async def connect(self):
+        """اتصال (در صورت خطا Exception ایجاد می‌شود)"""
+        
+    async def close(self):
+        """بستن اتصال"""
+        
+    @abstractmethod
+    async def acquire(self, buckets: List[Tuple[str, RateLimit]], cost: int = 1) -> Tuple[bool, List[float]]:
+        """
+        برداشت اتمیک cost Token از تمام Bucket ها (همه یا هیچ)
+        
+        Returns:
+            (پذیرفته شد، Token های باقیمانده هر Bucket به همان ترتیب)
+        """
+        
+    def get_stats(self) -> Dict[str, Any]:
+        return {'backend': self.name}
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Store داخل پروسه
+    
+    هر Shard یک OrderedDict به ترتیب آخرین برداشت است. Bucket ای که تا زمان پر شدن
+    کامل استفاده نشده معادل Bucket ناموجود است، پس با هر برداشت فقط Bucket های
+    ابتدای همان Shard که زمان پر شدنشان گذشته حذف می‌شوند.
+    """
+    
+    name = "memory"
+    
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS, max_keys: int = RATE_LIMIT_MAX_KEYS, clock=time.monotonic):
+        self._shards: List[OrderedDict] = [OrderedDict() for _ in range(max(1, shards))]
+        self.max_keys_per_shard = max(1, max_keys // len(self._shards))
+        self._clock = clock
+        
+    async def acquire(self, buckets: List[Tuple[str, RateLimit]], cost: int = 1) -> Tuple[bool, List[float]]:
+        return self.acquire_sync(buckets, cost)
+        
+    def acquire_sync(self, buckets: List[Tuple[str, RateLimit]], cost: int = 1) -> Tuple[bool, List[float]]:
+        now = self._clock()
+        shards = self._shards
+        states = []
+        tokens = []
+        allowed = True
+        for key, limit in buckets:
+            shard = shards[hash(key) % len(shards)]
+            # entry: [tokens، زمان آخرین برداشت، زمان پر شدن کامل]
+            entry = shard.get(key)
+            value = limit.limit if entry is None else min(limit.limit, entry[0] + (now - entry[1]) * limit.rate)
+            states.append(shard)
+            tokens.append(value)
+            if value < cost:
+                allowed = False
+                
+        if allowed:
+            for index, (key, limit) in enumerate(buckets):
+                value = tokens[index] - cost
+                tokens[index] = value
+                shard = states[index]
+                shard[key] = [value, now, now + (limit.limit - value) / limit.rate]
+                shard.move_to_end(key)
+                self._expire(shard, now)
+        return allowed, tokens
+        
+    def _expire(self, shard: OrderedDict, now: float):
+        while shard:
+            entry = next(iter(shard.values()))
+            if entry[2] > now and len(shard) <= self.max_keys_per_shard:
+                break
+            shard.popitem(last=False)
+            
+    def clear(self):
+        for shard in self._shards:
+            shard.clear()
+            
+    def get_stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'buckets': sum(len(shard) for shard in self._shards), 'shards': len(self._shards)}
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Store مشترک در Redis (اسکریپت Lua اتمیک با ساعت Redis)"""
+    
+    name = "redis"
+    
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.client = None
+        self._script = None
+        
+    async def connect(self):
+        if redis is None:
+            raise RuntimeError("redis package is not installed")
+        self.client = await redis.from_url(self.redis_url, decode_responses=False)
+        await self.client.ping()
+        # EVALSHA با بارگذاری خودکار اسکریپت در صورت NOSCRIPT
+        self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+        
+    async def close(self):
+        if self.client:
+            await self.client.close()
+            self.client = None
+            
+    async def acquire(self, buckets: List[Tuple[str, RateLimit]], cost: int = 1) -> Tuple[bool, List[float]]:
+        args = [cost]
+        for _, limit in buckets:
+            args.extend((limit.limit, repr(limit.rate / 1000)))
+        response = await self._script(keys=[key for key, _ in buckets], args=args)
+        return bool(response[0]), [int(value) / 1000 for value in response[1:]]
+        
+    def get_stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'url': self.redis_url.split('@')[-1]}
+
+
+class RateLimiter:
+    """انتخاب Bucket های هر درخواست و بررسی آن‌ها در Store"""
+    
+    def __init__(
+        self,
+        default: Optional[str] = None,
+        routes: Optional[str] = None,
+        api_keys: Optional[str] = None,
+        exempt_paths: Optional[str] = None,
+        backend: Optional[str] = None,
+        store: Optional[RateLimitStore] = None
+    ):
+        """
+        Args:
+            default: محدودیت پیش‌فرض هر Tenant (پیش‌فرض: RATE_LIMIT_DEFAULT)
+            routes: محدودیت‌های مسیر (پیش‌فرض: RATE_LIMIT_ROUTES)
+            api_keys: محدودیت‌های اختصاصی API Key ها (پیش‌فرض: RATE_LIMIT_API_KEYS)
+            exempt_paths: پیشوند مسیرهای بدون محدودیت (پیش‌فرض: RATE_LIMIT_EXEMPT_PATHS)
+            backend: 'memory'، 'redis' یا 'auto' (پیش‌فرض: RATE_LIMIT_BACKEND)
+            store: Store آماده (به جای ساخت بر اساس backend)
+        """
+        self.default = parse_rate(default or RATE_LIMIT_DEFAULT)
+        self.routes: List[RouteRule] = []
+        for pattern, rate in _parse_rules(RATE_LIMIT_ROUTES if routes is None else routes):
+            try:
+                self.routes.append(RouteRule(pattern, parse_rate(rate)))
+            except ValueError:
+                logger.warning(f"Invalid rate limit route entry ignored: {pattern}")
+        # Tenant -> محدودیت (None یعنی بدون محدودیت)
+        self.tenant_limits: Dict[str, Optional[RateLimit]] = {}
+        for api_key, rate in _parse_rules(RATE_LIMIT_API_KEYS if api_keys is None else api_keys):
+            try:
+                self.tenant_limits[get_tenant_id(api_key)] = None if rate.lower() == 'unlimited' else parse_rate(rate)
+            except ValueError:
+                logger.warning("Invalid rate limit API key entry ignored")
+        self.exempt_paths = tuple(
+            path.strip() for path in (RATE_LIMIT_EXEMPT_PATHS if exempt_paths is None else exempt_paths).split(",")
+            if path.strip()
+        )
+        self.backend_mode = (backend or RATE_LIMIT_BACKEND).lower()
+        self.store = store or MemoryRateLimitStore()
+        self._fallback: Optional[MemoryRateLimitStore] = None
+        self._last_error_log = 0.0
+        
+    async def connect(self):
+        """اتصال به Redis (در حالت redis یا auto)؛ در صورت خطا Store حافظه استفاده می‌شود"""
+        if self.backend_mode not in ('redis', 'auto') or self.store.name == 'redis':
+            return
+        store = RedisRateLimitStore()
+        try:
+            await store.connect()
+            self.store = store
+            logger.info("Rate limiter using Redis store")
+        except Exception as e:
+            log = logger.error if self.backend_mode == 'redis' else logger.info
+            log(f"Redis unavailable for rate limiting, using per-process memory store: {str(e)}")
+            
+    async def close(self):
+        await self.store.close()
+        
+    def buckets(self, method: str, path: str, tenant: str) -> List[Tuple[str, RateLimit]]:
+        """Bucket های یک درخواست (لیست خالی یعنی بدون محدودیت)"""
+        if self.exempt_paths and path.startswith(self.exempt_paths):
+            return []
+        if tenant in self.tenant_limits:
+            limit = self.tenant_limits[tenant]
+            if limit is None:
+                return []
+        else:
+            limit = self.default
+        # Hash Tag Tenant تمام کلیدها را در یک Slot کلاستر Redis نگه می‌دارد
+        prefix = f"{KEY_PREFIX}:{{{tenant}}}:"
+        buckets = [(prefix + "*", limit)]
+        for rule in self.routes:
+            if rule.matches(method, path):
+                buckets.append((prefix + rule.pattern, rule.limit))
+        return buckets
+        
+    async def check(
+        self,
+        method: str,
+        path: str,
+        api_key: Optional[str] = None,
+        client_host: Optional[str] = None,
+        cost: int = 1
+    ) -> Optional[RateLimitResult]:
+        """
+        بررسی و ثبت یک درخواست
+        
+        Returns:
+            RateLimitResult یا None برای مسیرها و Tenant های بدون محدودیت
+        """
+        # فقط API Key های تعریف شده در RATE_LIMIT_API_KEYS Tenant جداگانه دارند
+        buckets = self.buckets(method, path, get_tenant_id(api_key, client_host, known=self.tenant_limits))
+        if not buckets:
+            return None
+        try:
+            allowed, tokens = await self.store.acquire(buckets, cost)
+        except Exception as e:
+            # خطای Redis: محدودیت داخل همین پروسه ادامه می‌یابد
+            now = time.monotonic()
+            if now - self._last_error_log > 60:
+                self._last_error_log = now
+                logger.error(f"Rate limit store error, using per-process memory store: {str(e)}")
+            if self._fallback is None:
+                self._fallback = MemoryRateLimitStore()
+            allowed, tokens = self._fallback.acquire_sync(buckets, cost)
+        return bucket_result(allowed, buckets, tokens, cost)
+        
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.store.get_stats(),
+            'default': repr(self.default),
+            'routes': len(self.routes),
+            'api_keys': len(self.tenant_limits)
+        }
+
+
+# Global Rate Limiter
+rate_limiter = RateLimiter()
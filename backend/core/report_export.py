@@ -0,0 +1,277 @@
+"""
+Report Export - خروجی HTML و PDF گزارش سئو
+
+HTML به صورت تکه تکه (Streaming) ساخته می‌شود: جدول مشکلات که در گزارش‌های چند صفحه‌ای
+بزرگ‌ترین بخش است در دسته‌های REPORT_EXPORT_CHUNK_ROWS ردیفی ارسال می‌شود و کل سند
+هیچ‌وقت یکجا در حافظه ساخته نمی‌شود. PDF از همان HTML با weasyprint (در Thread جداگانه)
+ساخته می‌شود و خروجی آن در فایل موقت (SpooledTemporaryFile) نگهداری و تکه تکه ارسال می‌شود.
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+from html import escape
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+
+try:
+    import weasyprint
+except ImportError:
+    # خروجی PDF فقط وقتی weasyprint نصب است در دسترس است
+    weasyprint = None
+
+logger = logging.getLogger(__name__)
+
+REPORT_EXPORT_FORMATS = ('html', 'pdf')
+REPORT_EXPORT_CHUNK_ROWS = int(os.getenv("REPORT_EXPORT_CHUNK_ROWS", "200"))
+# خروجی PDF تا این حجم در حافظه و بعد از آن روی دیسک نگهداری می‌شود
+REPORT_EXPORT_SPOOL_BYTES = int(os.getenv("REPORT_EXPORT_SPOOL_BYTES", str(8 * 1024 * 1024)))
+REPORT_EXPORT_READ_SIZE = 64 * 1024
+
+MEDIA_TYPES = {
+    'html': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf'
+}
+
+PRIORITY_LABELS = {'high': 'بالا', 'medium': 'متوسط', 'low': 'پایین'}
+
+_STYLE = """
+@page { size: A4; margin: 18mm 14mm; @bottom-center { content: counter(page) " / " counter(pages); } }
+body { font-family: Vazirmatn, Tahoma, sans-serif; font-size: 11pt; color: #222; }
+h1 { font-size: 20pt; margin-bottom: 4pt; }
+h2 { font-size: 14pt; border-bottom: 1px solid #ccc; padding-bottom: 3pt; page-break-after: avoid; }
+table { width: 100%; border-collapse: collapse; margin-bottom: 10pt; }
+thead { display: table-header-group; }
+th, td { border: 1px solid #ddd; padding: 4pt 6pt; text-align: right; vertical-align: top; }
+th { background: #f3f3f3; }
+tr { page-break-inside: avoid; }
+.meta { color: #666; }
+.score { font-size: 16pt; font-weight: bold; }
+.priority-high { color: #b00020; }
+.priority-medium { color: #a86400; }
+.priority-low { color: #2e7d32; }
+"""
+
+
+def _text(value: Any) -> str:
+    """مقدار قابل نمایش (escape شده)"""
+    if value is None or value == '':
+        return '—'
+    if isinstance(value, bool):
+        return 'بله' if value else 'خیر'
+    if isinstance(value, (list, tuple)):
+        return escape('، '.join(str(item) for item in value)) or '—'
+    return escape(str(value))
+
+
+def _table(rows: Iterable[Tuple[str, Any]]) -> str:
+    """جدول دو ستونی عنوان/مقدار"""
+    body = ''.join(f"<tr><th>{escape(label)}</th><td>{_text(value)}</td></tr>" for label, value in rows)
+    return f"<table>{body}</table>"
+
+
+def _list(items: List[Any], key: str = 'title') -> str:
+    if not items:
+        return "<p class=\"meta\">—</p>"
+    entries = ''.join(
+        f"<li>{_text(item.get(key) if isinstance(item, dict) else item)}</li>" for item in items
+    )
+    return f"<ul>{entries}</ul>"
+
+
+def _issue_row(index: int, issue: Dict[str, Any]) -> str:
+    priority = issue.get('priority', 'medium')
+    solution = issue.get('solution') or {}
+    steps = solution.get('steps', []) if isinstance(solution, dict) else []
+    steps_html = ''.join(f"<li>{_text(step)}</li>" for step in steps)
+    return (
+        f"<tr><td>{index}</td>"
+        f"<td><strong>{_text(issue.get('issue'))}</strong><br>{_text(issue.get('description'))}</td>"
+        f"<td class=\"priority-{escape(str(priority))}\">{_text(PRIORITY_LABELS.get(priority, priority))}</td>"
+        f"<td>{_text(issue.get('category'))}</td>"
+        f"<td><ol>{steps_html}</ol></td>"
+        f"<td>{_text(issue.get('estimated_time', solution.get('estimated_time') if isinstance(solution, dict) else None))}</td></tr>"
+    )
+
+
+def iter_report_html(report: Dict[str, Any]) -> Iterator[str]:
+    """
+    ساخت HTML گزارش سئو به صورت تکه تکه
+    
+    Args:
+        report: خروجی ReportGenerator.generate_seo_report
+        
+    Yields:
+        تکه‌های HTML (جدول مشکلات در دسته‌های REPORT_EXPORT_CHUNK_ROWS ردیفی)
+    """
+    summary = report.get('executive_summary', {})
+    score = report.get('overall_score', {})
+    technical = report.get('technical_analysis', {})
+    headings = technical.get('headings_structure', {})
+    security = report.get('security_analysis', {})
+    performance = report.get('performance_analysis', {})
+    content = report.get('content_analysis', {})
+    
+    yield (
+        "<!DOCTYPE html><html lang=\"fa\" dir=\"rtl\"><head><meta charset=\"utf-8\">"
+        f"<title>گزارش سئو - {_text(report.get('site_url'))}</title><style>{_STYLE}</style></head><body>"
+        f"<h1>گزارش سئو {_text(report.get('site_url'))}</h1>"
+        f"<p class=\"meta\">شناسه تحلیل: {_text(report.get('analysis_id'))} | "
+        f"تاریخ گزارش: {_text(report.get('generated_at'))} | وضعیت: {_text(report.get('status'))}</p>"
+        f"<p class=\"score\">امتیاز کلی: {_text(score.get('overall'))} ({_text(score.get('grade'))})</p>"
+    )
+    
+    yield (
+        f"<h2>خلاصه اجرایی</h2><p>{_text(summary.get('summary'))}</p>"
+        + _table([
+            ('نقاط قوت', summary.get('total_strengths')),
+            ('نقاط ضعف', summary.get('total_weaknesses')),
+            ('مشکلات با اولویت بالا', summary.get('high_priority_issues')),
+            ('مشکلات با اولویت متوسط', summary.get('medium_priority_issues')),
+            ('مشکلات با اولویت پایین', summary.get('low_priority_issues')),
+            ('نوع CMS', summary.get('cms_type')),
+            ('SSL', summary.get('has_ssl')),
+            ('Sitemap', summary.get('has_sitemap'))
+        ])
+        + "<h2>امتیازها</h2>"
+        + _table((name, value) for name, value in score.get('breakdown', {}).items())
+    )
+    
+    yield (
+        "<h2>تحلیل فنی</h2>"
+        + _table([
+            ('Crawlability', technical.get('crawlability')),
+            ('Indexability', technical.get('indexability')),
+            ('H1', headings.get('h1_count')),
+            ('H2', headings.get('h2_count')),
+            ('H3', headings.get('h3_count')),
+            ('Sitemap', technical.get('sitemap', {}).get('url') or technical.get('sitemap', {}).get('found')),
+            ('تعداد تصاویر', technical.get('images_count')),
+            ('تعداد فرم‌ها', technical.get('forms_count'))
+        ])
+        + "<h2>تحلیل محتوا</h2>"
+        + _table([
+            ('خوانایی', f"{content.get('readability_score')} ({content.get('readability_status')})"),
+            ('کلمات کلیدی', [
+                keyword.get('word', '') if isinstance(keyword, dict) else keyword
+                for keyword in content.get('keywords', [])[:50]
+            ])
+        ])
+        + "<h2>امنیت و عملکرد</h2>"
+        + _table([
+            ('SSL', security.get('ssl_enabled')),
+            *((name, value) for name, value in security.get('security_headers', {}).items()),
+            ('امتیاز امنیت', security.get('security_score')),
+            ('زمان پاسخ', performance.get('response_time')),
+            ('وضعیت زمان پاسخ', performance.get('response_time_status')),
+            ('کد وضعیت', performance.get('status_code')),
+            ('امتیاز عملکرد', performance.get('performance_score'))
+        ])
+    )
+    
+    yield (
+        "<h2>نقاط قوت</h2>" + _list(report.get('strengths', []))
+        + "<h2>نقاط ضعف</h2>" + _list(report.get('weaknesses', []))
+    )
+    
+    # بزرگ‌ترین بخش گزارش؛ ردیف‌ها دسته دسته ارسال می‌شوند
+    issues = report.get('issues_and_solutions', [])
+    yield (
+        f"<h2>مشکلات و راه‌حل‌ها ({len(issues)})</h2><table><thead><tr>"
+        "<th>#</th><th>مشکل</th><th>اولویت</th><th>دسته</th><th>راه‌حل</th><th>زمان</th>"
+        "</tr></thead><tbody>"
+    )
+    for start in range(0, len(issues), REPORT_EXPORT_CHUNK_ROWS):
+        yield ''.join(
+            _issue_row(start + offset + 1, issue)
+            for offset, issue in enumerate(issues[start:start + REPORT_EXPORT_CHUNK_ROWS])
+        )
+    yield "</tbody></table>"
+    
+    recommendations = ''.join(
+        f"<tr><td>{_text(item.get('title'))}</td><td>{_text(item.get('action'))}</td></tr>"
+        for item in report.get('priority_recommendations', [])
+    )
+    timeline = ''.join(
+        f"<tr><td>{_text(phase.get('phase'))}</td><td>{_text(phase.get('items'))}</td>"
+        f"<td>{_text(phase.get('estimated_time'))}</td></tr>"
+        for phase in report.get('implementation_timeline', [])
+    )
+    content_summary = report.get('generated_content_summary', {})
+    yield (
+        "<h2>توصیه‌های اولویت‌دار</h2>"
+        f"<table><thead><tr><th>عنوان</th><th>اقدام</th></tr></thead><tbody>{recommendations}</tbody></table>"
+        "<h2>جدول زمانی پیشنهادی</h2>"
+        f"<table><thead><tr><th>فاز</th><th>موارد</th><th>زمان</th></tr></thead><tbody>{timeline}</tbody></table>"
+        "<h2>محتوای تولید شده</h2>"
+        + _table([
+            ('تعداد محتوا', content_summary.get('total_items')),
+            ('تعداد کلمات', content_summary.get('total_words')),
+            ('نوع محتوا', content_summary.get('content_types'))
+        ])
+        + "</body></html>"
+    )
+
+
+async def stream_report_html(report: Dict[str, Any]) -> AsyncIterator[bytes]:
+    """
+    Stream کردن HTML گزارش (بین تکه‌ها کنترل به Event Loop برگردانده می‌شود)
+    """
+    for chunk in iter_report_html(report):
+        yield chunk.encode('utf-8')
+        await asyncio.sleep(0)
+
+
+def _write_pdf(report: Dict[str, Any], target) -> None:
+    source = tempfile.SpooledTemporaryFile(max_size=REPORT_EXPORT_SPOOL_BYTES)
+    try:
+        for chunk in iter_report_html(report):
+            source.write(chunk.encode('utf-8'))
+        source.seek(0)
+        weasyprint.HTML(file_obj=source, encoding='utf-8').write_pdf(target)
+    finally:
+        source.close()
+
+
+async def render_report_pdf(report: Dict[str, Any]):
+    """
+    ساخت PDF گزارش در Thread جداگانه
+    
+    Returns:
+        فایل موقت PDF (ابتدای فایل) که باید با iter_file ارسال و بسته شود
+        
+    Raises:
+        RuntimeError: اگر weasyprint نصب نباشد
+    """
+    if weasyprint is None:
+        raise RuntimeError("PDF export requires weasyprint")
+        
+    target = tempfile.SpooledTemporaryFile(max_size=REPORT_EXPORT_SPOOL_BYTES)
+    try:
+        await asyncio.to_thread(_write_pdf, report, target)
+    except Exception:
+        target.close()
+        raise
+    target.seek(0)
+    return target
+
+
+def file_size(file) -> int:
+    """حجم فایل موقت بدون تغییر موقعیت خواندن"""
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+async def iter_file(file) -> AsyncIterator[bytes]:
+    """ارسال تکه تکه یک فایل موقت و بستن آن در پایان"""
+    try:
+        while True:
+            chunk = file.read(REPORT_EXPORT_READ_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
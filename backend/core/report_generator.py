@@ -3,15 +3,56 @@
 """
 
 import logging
+import os
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from core.cache import analysis_tag, cache_manager
+
 logger = logging.getLogger(__name__)
 
+# گزارش‌ها با نسخه داشبورد کلید می‌شوند، پس هر تغییر داده (یا اعمال اصلاحات) گزارش قبلی را بی‌اثر می‌کند
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", str(7 * 24 * 3600)))
+
 
 class ReportGenerator:
     """کلاس تولید گزارش"""
     
+    async def get_seo_report(self, analysis_id: str) -> Dict[str, Any]:
+        """
+        دریافت گزارش سئو از Cache (در صورت نبود، ساخت و ذخیره آن)
+        
+        کلید Cache شامل نسخه داشبورد است؛ update_dashboard نسخه را افزایش می‌دهد
+        و گزارش نسخه قبلی دیگر خوانده نمی‌شود. Tag تحلیل امکان Invalidation دستی را می‌دهد.
+        
+        Args:
+            analysis_id: شناسه تحلیل
+            
+        Returns:
+            گزارش سئو
+        """
+        from core.dashboard_manager import DashboardManager
+        
+        meta = await DashboardManager().get_dashboard_meta(analysis_id)
+        if meta is None:
+            return await self.generate_seo_report(analysis_id)
+            
+        return await cache_manager.get_or_set(
+            f"seo_report:{analysis_id}:{meta['version']}",
+            self.generate_seo_report,
+            # گزارش‌های خطا فقط مدت کوتاهی نگهداری می‌شوند
+            lambda report: 60 if 'error' in report else REPORT_CACHE_TTL,
+            analysis_id,
+            tags=[analysis_tag(analysis_id)]
+        )
+    
+    async def precompute_seo_report(self, analysis_id: str):
+        """ساخت گزارش سئو از قبل (پس از تکمیل Pipeline) تا اولین درخواست منتظر نماند"""
+        try:
+            await self.get_seo_report(analysis_id)
+        except Exception as e:
+            logger.error(f"Error precomputing SEO report for {analysis_id}: {str(e)}")
+    
     async def generate_seo_report(self, analysis_id: str) -> Dict[str, Any]:
         """
         تولید گزارش کامل سئو
@@ -0,0 +1,60 @@
+"""
+پاسخ JSON سریع برای API
+
+FastJSONResponse با orjson (در صورت نصب بودن) Serialize می‌کند و datetime/date،
+مقادیر و آرایه‌های numpy، set و Decimal را مستقیماً پشتیبانی می‌کند.
+در صورت نبود orjson از json استاندارد با همان تبدیل‌ها استفاده می‌شود.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    # Fallback به json استاندارد وقتی orjson نصب نیست
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+)
+
+
+def _default(value: Any) -> Any:
+    """تبدیل نوع‌هایی که Serializer به صورت پیش‌فرض پشتیبانی نمی‌کند"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # numpy بدون import مستقیم (اختیاری است)
+    if hasattr(value, 'tolist') and type(value).__module__ == 'numpy':
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'model_dump'):
+        return value.model_dump()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize به JSON (UTF-8، بدون فاصله اضافه)"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse با Serializer سریع (کلاس پاسخ پیش‌فرض App)"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,297 @@
+"""
+Result Store - نگهداری نتایج بزرگ Pipeline خارج از حافظه
+
+نتایج کوچک مستقیماً در Context و Dashboard می‌مانند. نتایج بزرگ (لیست صفحات،
+جداول کلمات کلیدی، محتوای تولید شده) به صورت JSON فشرده روی دیسک محلی نوشته
+می‌شوند و به جای آن‌ها یک ResultHandle کوچک نگهداری می‌شود که هنگام دسترسی
+به صورت Lazy بارگذاری می‌شود.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# آستانه پیش‌فرض اندازه JSON برای انتقال به دیسک (64KB)
+DEFAULT_SPILL_THRESHOLD = 64 * 1024
+
+
+class ResultHandle:
+    """ارجاع به یک نتیجه ذخیره شده در Result Store"""
+    
+    __slots__ = ('key', 'size', 'stored_size', 'created_at')
+    
+    def __init__(self, key: str, size: int, stored_size: int, created_at: Optional[float] = None):
+        self.key = key
+        self.size = size
+        self.stored_size = stored_size
+        self.created_at = created_at or time.time()
+        
+    def to_dict(self) -> Dict[str, Any]:
+        """خلاصه Handle (برای نمایش و لاگ)"""
+        return {
+            'result_handle': self.key,
+            'size': self.size,
+            'stored_size': self.stored_size
+        }
+        
+    def __repr__(self) -> str:
+        return f"ResultHandle({self.key!r}, size={self.size})"
+
+
+class ResultStore:
+    """
+    ذخیره نتایج بزرگ به صورت فایل‌های JSON فشرده (zlib)
+    
+    آخرین نتایج بارگذاری شده در یک LRU کوچک نگهداری می‌شوند تا دسترسی‌های
+    پشت سر هم به یک نتیجه دوباره از دیسک خوانده نشوند.
+    """
+    
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        spill_threshold: Optional[int] = None,
+        cache_items: Optional[int] = None,
+        ttl_seconds: Optional[int] = None
+    ):
+        default_dir = Path(__file__).resolve().parent.parent / 'result_store'
+        self.base_dir = Path(base_dir or os.getenv('RESULT_STORE_DIR', str(default_dir)))
+        self.spill_threshold = spill_threshold if spill_threshold is not None else int(
+            os.getenv('RESULT_SPILL_THRESHOLD_BYTES', str(DEFAULT_SPILL_THRESHOLD))
+        )
+        self.cache_items = cache_items if cache_items is not None else int(
+            os.getenv('RESULT_STORE_CACHE_ITEMS', '8')
+        )
+        # نتایج تحلیل‌هایی که مدت ttl_seconds تغییر نکرده‌اند با sweep حذف می‌شوند (0: غیرفعال)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(
+            os.getenv('RESULT_STORE_TTL_SECONDS', str(7 * 24 * 3600))
+        )
+        self.sweep_interval = int(os.getenv('RESULT_STORE_SWEEP_INTERVAL_SECONDS', '3600'))
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self.stats = {'spilled': 0, 'kept_inline': 0, 'loads': 0, 'cache_hits': 0, 'swept': 0}
+        
+    def _path(self, key: str) -> Path:
+        """مسیر فایل یک کلید"""
+        return self.base_dir / f"{key}.json.z"
+        
+    def _make_key(self, analysis_id: str, name: str) -> str:
+        """کلید امن برای فایل (analysis_id/name)"""
+        safe_id = "".join(c if c.isalnum() or c in '-_' else '_' for c in analysis_id)
+        safe_name = "".join(c if c.isalnum() or c in '-_' else '_' for c in name)
+        return f"{safe_id}/{safe_name}"
+        
+    def put(self, analysis_id: str, name: str, value: Any) -> Any:
+        """
+        ذخیره یک نتیجه (در صورت بزرگ بودن روی دیسک)
+        
+        Args:
+            analysis_id: شناسه تحلیل
+            name: نام نتیجه (مثلاً نام Step)
+            value: مقدار قابل تبدیل به JSON
+            
+        Returns:
+            ResultHandle برای نتایج بزرگ، در غیر این صورت همان مقدار
+        """
+        if value is None or isinstance(value, (ResultHandle, bool, int, float, str)):
+            return value
+            
+        try:
+            encoded = json.dumps(value, ensure_ascii=False, default=str).encode('utf-8')
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Result {name} of {analysis_id} is not serializable, kept in memory: {str(e)}")
+            self.stats['kept_inline'] += 1
+            return value
+            
+        if len(encoded) < self.spill_threshold:
+            self.stats['kept_inline'] += 1
+            return value
+            
+        key = self._make_key(analysis_id, name)
+        compressed = zlib.compress(encoded, 6)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # نوشتن اتمیک تا خواننده همزمان فایل نیمه‌کاره نبیند
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        
+        with self._lock:
+            self._cache.pop(key, None)
+        self.stats['spilled'] += 1
+        logger.debug(f"Spilled result {key}: {len(encoded)} -> {len(compressed)} bytes")
+        return ResultHandle(key, len(encoded), len(compressed))
+        
+    async def aput(self, analysis_id: str, name: str, value: Any) -> Any:
+        """نسخه async متد put (نوشتن در Thread جداگانه)"""
+        return await asyncio.to_thread(self.put, analysis_id, name, value)
+        
+    def load(self, value: Any) -> Any:
+        """
+        بارگذاری مقدار یک ResultHandle (مقادیر معمولی بدون تغییر برگردانده می‌شوند)
+        
+        Args:
+            value: ResultHandle یا مقدار معمولی
+            
+        Returns:
+            مقدار کامل نتیجه
+        """
+        if not isinstance(value, ResultHandle):
+            return value
+            
+        with self._lock:
+            if value.key in self._cache:
+                self._cache.move_to_end(value.key)
+                self.stats['cache_hits'] += 1
+                return self._cache[value.key]
+                
+        try:
+            with open(self._path(value.key), 'rb') as f:
+                loaded = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        except FileNotFoundError:
+            logger.error(f"Result {value.key} not found in result store")
+            return None
+            
+        self.stats['loads'] += 1
+        with self._lock:
+            if self.cache_items > 0:
+                self._cache[value.key] = loaded
+                self._cache.move_to_end(value.key)
+                while len(self._cache) > self.cache_items:
+                    self._cache.popitem(last=False)
+        return loaded
+        
+    async def aload(self, value: Any) -> Any:
+        """نسخه async متد load (خواندن از دیسک در Thread جداگانه)"""
+        if not isinstance(value, ResultHandle):
+            return value
+        with self._lock:
+            if value.key in self._cache:
+                self._cache.move_to_end(value.key)
+                self.stats['cache_hits'] += 1
+                return self._cache[value.key]
+        return await asyncio.to_thread(self.load, value)
+        
+    async def resolve_dict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """کپی یک دیکشنری با بارگذاری تمام ResultHandle های سطح اول آن"""
+        resolved = {}
+        for key, value in data.items():
+            resolved[key] = await self.aload(value) if isinstance(value, ResultHandle) else value
+        return resolved
+        
+    def delete(self, analysis_id: str):
+        """حذف تمام نتایج ذخیره شده یک تحلیل"""
+        prefix = self._make_key(analysis_id, '')
+        with self._lock:
+            for key in [k for k in self._cache if k.startswith(prefix)]:
+                del self._cache[key]
+        shutil.rmtree(self.base_dir / prefix.rstrip('/'), ignore_errors=True)
+        
+    def sweep(self, active_ids: Iterable[str] = (), now: Optional[float] = None) -> int:
+        """
+        حذف نتایج تحلیل‌هایی که بیش از ttl_seconds تغییر نکرده‌اند
+        
+        Args:
+            active_ids: تحلیل‌هایی که Handle های آن‌ها هنوز در حافظه استفاده می‌شوند
+            now: زمان فعلی (برای تست)
+            
+        Returns:
+            تعداد تحلیل‌های حذف شده
+        """
+        if self.ttl_seconds <= 0 or not self.base_dir.is_dir():
+            return 0
+        keep = {self._make_key(analysis_id, '').rstrip('/') for analysis_id in active_ids}
+        cutoff = (now or time.time()) - self.ttl_seconds
+        removed = 0
+        
+        for directory in self.base_dir.iterdir():
+            if not directory.is_dir() or directory.name in keep:
+                continue
+            try:
+                newest = max(
+                    [directory.stat().st_mtime] + [path.stat().st_mtime for path in directory.iterdir()]
+                )
+            except FileNotFoundError:
+                continue
+            if newest < cutoff:
+                with self._lock:
+                    for key in [k for k in self._cache if k.startswith(directory.name + '/')]:
+                        del self._cache[key]
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+                
+        self.stats['swept'] += removed
+        if removed:
+            logger.info(f"Swept results of {removed} analyses from result store")
+        return removed
+        
+    def start_sweeper(self, get_active_ids: Callable[[], Iterable[str]]):
+        """شروع حذف دوره‌ای نتایج منقضی شده"""
+        if self._sweeper_task is None and self.ttl_seconds > 0:
+            self._sweeper_task = asyncio.create_task(self._sweep_loop(get_active_ids))
+            
+    async def stop_sweeper(self):
+        """توقف حذف دوره‌ای"""
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            try:
+                await self._sweeper_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._sweeper_task = None
+            
+    async def _sweep_loop(self, get_active_ids: Callable[[], Iterable[str]]):
+        """حذف دوره‌ای نتایج منقضی شده (خارج از Event Loop)"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await asyncio.to_thread(self.sweep, set(get_active_ids()))
+            except Exception as e:
+                logger.error(f"Error sweeping result store: {str(e)}")
+                
+    def clear(self, keep: Iterable[str] = ()):
+        """
+        حذف تمام نتایج ذخیره شده
+        
+        Args:
+            keep: تحلیل‌هایی که نتایج آن‌ها حذف نمی‌شود
+        """
+        keep_dirs = {self._make_key(analysis_id, '').rstrip('/') for analysis_id in keep}
+        with self._lock:
+            for key in [k for k in self._cache if k.split('/', 1)[0] not in keep_dirs]:
+                del self._cache[key]
+        if not keep_dirs:
+            shutil.rmtree(self.base_dir, ignore_errors=True)
+            return
+        if self.base_dir.is_dir():
+            for directory in self.base_dir.iterdir():
+                if directory.name not in keep_dirs:
+                    shutil.rmtree(directory, ignore_errors=True)
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار Result Store"""
+        with self._lock:
+            cached = len(self._cache)
+        return {
+            **self.stats,
+            'cached_items': cached,
+            'spill_threshold': self.spill_threshold,
+            'ttl_seconds': self.ttl_seconds,
+            'base_dir': str(self.base_dir)
+        }
+
+
+# Global Result Store Instance
+result_store = ResultStore()
@@ -0,0 +1,644 @@
+"""
+Search Index - جستجوی متنی و فیلتردار (Faceted) روی تحلیل‌های ذخیره شده
+
+یک Index جاسازی شده در SQLite که همزمان با نوشتن داشبوردها (DashboardManager.create_dashboard
+و update_dashboard) به صورت افزایشی و write-behind به‌روز می‌شود:
+- جدول analyses: یک ردیف برای هر تحلیل با Index های ثانویه روی دامنه سایت، نوع CMS و وضعیت
+- جدول analysis_facets: مقادیر چندگانه هر تحلیل (پلاگین‌ها، تکنولوژی‌ها و نوع مشکلات)
+- جدول مجازی FTS5 برای جستجوی متنی آزاد (آدرس سایت، CMS، پلاگین‌ها، مشکلات و کلمات کلیدی)
+
+Query ها با Cursor صفحه‌بندی می‌شوند (keyset روی updated_at برای مرتب‌سازی زمانی) و
+مستقل از تعداد تحلیل‌ها در چند میلی‌ثانیه پاسخ داده می‌شوند.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.timeseries import site_key
+
+logger = logging.getLogger(__name__)
+
+FACETS = ('plugin', 'technology', 'issue_type', 'keyword')
+SORTS = ('updated_at', 'relevance')
+# حداکثر مقادیر هر نوع که برای یک تحلیل در Index نگهداری می‌شود
+SEARCH_KEYWORDS_LIMIT = 50
+SEARCH_TERMS_LIMIT = 200
+FACET_COUNTS_LIMIT = 10
+
+_COLUMNS = (
+    'analysis_id', 'site_url', 'domain', 'cms_type', 'status', 'issues_count',
+    'overall_score', 'created_at', 'updated_at', 'version', 'document_version'
+)
+_RESULT_COLUMNS = (
+    'analysis_id', 'site_url', 'cms_type', 'status', 'issues_count',
+    'overall_score', 'created_at', 'updated_at', 'version'
+)
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _unique(values: List[Any], limit: int) -> List[str]:
+    """مقادیر متنی یکتا (به ترتیب اولین رخداد)"""
+    seen = {}
+    for value in values:
+        text = str(value).strip() if value is not None else ''
+        if text and text not in seen:
+            seen[text] = None
+            if len(seen) >= limit:
+                break
+    return list(seen)
+
+
+def search_document(
+    site_analysis: Dict[str, Any],
+    seo_analysis: Dict[str, Any],
+    weaknesses: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    مقادیر قابل جستجوی یک تحلیل (بخشی از نماهای مشتق شده داشبورد)
+    
+    Args:
+        site_analysis: خروجی SiteAnalyzer
+        seo_analysis: خروجی SEOAnalyzer
+        weaknesses: نقاط ضعف استخراج شده
+        
+    Returns:
+        {'cms_type', 'plugins', 'plugin_names', 'technologies', 'issue_types', 'issue_titles', 'keywords'}
+    """
+    cms_details = site_analysis.get('cms_details') or {}
+    stack = site_analysis.get('technology_stack') or {}
+    content = seo_analysis.get('content') or {}
+    issues = seo_analysis.get('issues') or []
+    
+    plugins = (cms_details.get('plugins') if isinstance(cms_details, dict) else None) or stack.get('plugins') or []
+    slugs, names = [], []
+    for plugin in plugins:
+        if isinstance(plugin, dict):
+            slugs.append(plugin.get('slug') or plugin.get('name'))
+            names.append(plugin.get('name'))
+        else:
+            slugs.append(plugin)
+            
+    technologies = [stack.get('frontend_framework')]
+    for key in ('javascript_libraries', 'css_frameworks', 'analytics'):
+        technologies.extend(stack.get(key) or [])
+    if isinstance(cms_details, dict):
+        technologies.append(cms_details.get('page_builder'))
+        
+    issues = [issue for issue in issues if isinstance(issue, dict)]
+    return {
+        'cms_type': str(site_analysis.get('cms_type') or '').lower() or None,
+        'plugins': _unique([str(slug).lower() for slug in slugs if slug], SEARCH_TERMS_LIMIT),
+        'plugin_names': _unique(names, SEARCH_TERMS_LIMIT),
+        'technologies': _unique(technologies, SEARCH_TERMS_LIMIT),
+        'issue_types': _unique(
+            [issue.get('type') for issue in issues]
+            + [weakness.get('title') for weakness in weaknesses if isinstance(weakness, dict)],
+            SEARCH_TERMS_LIMIT
+        ),
+        'issue_titles': _unique([issue.get('title') for issue in issues], SEARCH_TERMS_LIMIT),
+        'keywords': _unique(
+            [keyword.get('word') if isinstance(keyword, dict) else keyword for keyword in content.get('keywords') or []],
+            SEARCH_KEYWORDS_LIMIT
+        )
+    }
+
+
+def match_expression(query: str) -> Optional[str]:
+    """
+    تبدیل متن جستجوی کاربر به عبارت MATCH امن FTS5
+    
+    هر کلمه به صورت پیشوندی و بین نقل قول (بدون عملگرهای FTS) و کلمات با AND ترکیب می‌شوند.
+    """
+    tokens = _TOKEN.findall(query or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens[:16])
+
+
+def keyword_expression(keyword: str) -> Optional[str]:
+    """
+    فیلتر کلمه کلیدی به صورت عبارت (phrase) روی ستون keywords جدول FTS
+    
+    کلمات کلیدی هر تحلیل (تا SEARCH_KEYWORDS_LIMIT) در جدول analysis_facets نوشته نمی‌شوند
+    تا هزینه نوشتن Index با تعداد آن‌ها زیاد نشود.
+    """
+    tokens = _TOKEN.findall(keyword or '')
+    if not tokens:
+        return None
+    return f'keywords : "{" ".join(tokens[:16])}"'
+
+
+def encode_keyset(updated_at: str, row_id: int) -> str:
+    """Cursor مات صفحه بعدی در مرتب‌سازی زمانی"""
+    raw = json.dumps({'l': 'search', 'u': updated_at, 'i': row_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_keyset(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """
+    خواندن (updated_at, id) از Cursor
+    
+    Raises:
+        ValueError: Cursor نامعتبر
+    """
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        position = (str(payload['u']), int(payload['i']))
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if payload.get('l') != 'search':
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def search_row(analysis_id: str, dashboard: Dict[str, Any]) -> Tuple[tuple, Dict[str, Any]]:
+    """
+    ردیف جدول analyses و سند قابل جستجوی یک داشبورد
+    
+    Returns:
+        (مقادیر _COLUMNS، derived['search'] یا {} برای داشبوردهای بدون داده)
+    """
+    derived = dashboard.get('derived') or {}
+    document = derived.get('search') or {}
+    summary = derived.get('summary') or {}
+    portfolio = derived.get('portfolio') or {}
+    site_url = dashboard.get('site_url') or ''
+    row = (
+        analysis_id,
+        site_url,
+        site_key(site_url),
+        document.get('cms_type'),
+        dashboard.get('status') or 'unknown',
+        summary.get('issues_count'),
+        (portfolio.get('metrics') or {}).get('overall_score'),
+        dashboard.get('created_at'),
+        dashboard.get('updated_at') or '',
+        dashboard.get('version', 0),
+        derived.get('version')
+    )
+    return row, document
+
+
+class SearchIndex:
+    """Index جستجوی تحلیل‌ها (SQLite FTS5)"""
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        flush_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            path: مسیر فایل SQLite (مشترک بین Worker ها)
+            enabled: ذخیره پایدار (پیش‌فرض: SEARCH_INDEX_PERSISTENCE؛ در غیر این صورت Index فقط در حافظه است)
+            flush_interval: حداکثر تاخیر نوشتن تغییرات در Index (ثانیه)
+        """
+        default_path = Path(__file__).resolve().parent.parent / 'search_data' / 'search.sqlite3'
+        enabled = enabled if enabled is not None else (
+            os.getenv("SEARCH_INDEX_PERSISTENCE", "true").lower() == "true"
+        )
+        self.path = (path or os.getenv("SEARCH_INDEX_PATH", str(default_path))) if enabled else ':memory:'
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("SEARCH_INDEX_FLUSH_INTERVAL", "1.0")
+        )
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, Tuple[tuple, Dict[str, Any]]] = {}
+        self._last_optimize = 0.0
+        self.stats = {'indexed': 0, 'queries': 0, 'flushes': 0, 'flush_errors': 0, 'rebuilt': 0}
+        
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None
+        
+    async def connect(self):
+        """باز کردن SQLite، ساخت Index از dashboard_store در صورت خالی بودن و شروع Flusher"""
+        from core.dashboard_store import dashboard_store
+        
+        if not dashboard_store.connected:
+            # داشبوردها فقط در حافظه همین Worker هستند؛ Index هم نباید بعد از Restart باقی بماند
+            self.path = ':memory:'
+        try:
+            await asyncio.to_thread(self._open)
+        except Exception as e:
+            logger.warning(f"Search index unavailable, analysis search is disabled: {str(e)}")
+            return
+        try:
+            await self.rebuild_if_empty()
+        except Exception as e:
+            logger.error(f"Error building search index: {str(e)}")
+        self._flusher_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Search index enabled ({self.path})")
+        
+    def _open(self):
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        # ANALYZE فقط نمونه‌ای از هر Index را می‌خواند
+        conn.execute("PRAGMA analysis_limit=1000")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                id INTEGER PRIMARY KEY,
+                analysis_id TEXT NOT NULL UNIQUE,
+                site_url TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                cms_type TEXT,
+                status TEXT NOT NULL,
+                issues_count INTEGER,
+                overall_score REAL,
+                created_at TEXT,
+                updated_at TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                document_version INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS ix_analyses_updated ON analyses (updated_at, id);
+            CREATE INDEX IF NOT EXISTS ix_analyses_domain ON analyses (domain, updated_at);
+            CREATE INDEX IF NOT EXISTS ix_analyses_cms ON analyses (cms_type, updated_at);
+            CREATE INDEX IF NOT EXISTS ix_analyses_status ON analyses (status, updated_at);
+            CREATE TABLE IF NOT EXISTS analysis_facets (
+                facet TEXT NOT NULL,
+                value TEXT NOT NULL,
+                analysis INTEGER NOT NULL,
+                PRIMARY KEY (facet, value, analysis)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS ix_analysis_facets_analysis ON analysis_facets (analysis, facet);
+            CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5 (
+                site_url, cms, plugins, technologies, issues, keywords,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            );
+        """)
+        self._conn = conn
+        
+    async def close(self):
+        """نوشتن تغییرات باقیمانده و بستن SQLite"""
+        if self._flusher_task:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._flusher_task = None
+        if self._conn is not None:
+            await self.flush()
+            with self._db_lock:
+                self._conn.close()
+                self._conn = None
+                
+    async def rebuild_if_empty(self) -> int:
+        """
+        ساخت Index از وضعیت داشبوردهای dashboard_store (فقط وقتی Index خالی است)
+        
+        Returns:
+            تعداد داشبوردهای اضافه شده
+        """
+        from core.dashboard_store import dashboard_store
+        
+        if self._conn is None or not dashboard_store.connected:
+            return 0
+        if await asyncio.to_thread(self._count) > 0:
+            return 0
+        rows = await dashboard_store.load_states()
+        for analysis_id, site_url, status, updated_at, state in rows:
+            dashboard = dict(state or {})
+            dashboard['site_url'] = site_url or dashboard.get('site_url')
+            dashboard['status'] = status or dashboard.get('status')
+            self.index_dashboard(analysis_id, dashboard)
+        self._last_optimize = 0.0
+        await self.flush()
+        self.stats['rebuilt'] += len(rows)
+        logger.info(f"Search index built from {len(rows)} stored dashboards")
+        return len(rows)
+        
+    def _count(self) -> int:
+        with self._db_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            
+    def index_dashboard(self, analysis_id: str, dashboard: Dict[str, Any]):
+        """
+        ثبت وضعیت جدید یک داشبورد برای نوشتن در Index (تغییرات پشت سر هم ادغام می‌شوند)
+        
+        Args:
+            analysis_id: شناسه تحلیل
+            dashboard: داشبورد (شامل derived['search'])
+        """
+        if self._conn is None or not analysis_id:
+            return
+        self._pending[analysis_id] = search_row(analysis_id, dashboard)
+        
+    async def _flush_loop(self):
+        """نوشتن دوره‌ای تغییرات"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                self.stats['flush_errors'] += 1
+                logger.error(f"Error flushing search index: {str(e)}")
+                
+    async def flush(self):
+        """نوشتن تغییرات در یک Transaction"""
+        if self._conn is None or not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        # آمار Index ها (برای انتخاب Index مناسب توسط Query Planner) ساعتی یک بار به‌روز می‌شود
+        optimize = time.time() - self._last_optimize > 3600
+        if optimize:
+            self._last_optimize = time.time()
+        try:
+            await asyncio.to_thread(self._write, list(pending.values()), optimize)
+        except Exception:
+            # تغییرات جدیدتر (ثبت شده در حین نوشتن) اولویت دارند
+            self._pending = {**pending, **self._pending}
+            raise
+        self.stats['indexed'] += len(pending)
+        self.stats['flushes'] += 1
+        
+    def _write(self, rows: List[Tuple[tuple, Dict[str, Any]]], optimize: bool = False):
+        with self._db_lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                for row, document in rows:
+                    self._write_row(conn, row, document)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if optimize:
+                conn.execute("ANALYZE")
+                
+    @staticmethod
+    def _write_row(conn: sqlite3.Connection, row: tuple, document: Dict[str, Any]):
+        existing = conn.execute(
+            "SELECT id, updated_at, document_version FROM analyses WHERE analysis_id = ?", (row[0],)
+        ).fetchone()
+        if existing is not None and existing[1] > row[8]:
+            # نسخه جدیدتر قبلاً توسط Worker دیگری نوشته شده است
+            return
+        if existing is None:
+            row_id = conn.execute(
+                f"INSERT INTO analyses ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", row
+            ).lastrowid
+        else:
+            row_id = existing[0]
+            conn.execute(
+                f"UPDATE analyses SET {', '.join(f'{column} = ?' for column in _COLUMNS[1:])} WHERE id = ?",
+                (*row[1:], row_id)
+            )
+            if existing[2] == row[-1]:
+                # داده‌های تحلیل تغییر نکرده (مثلاً فقط وضعیت)؛ متن و Facet ها معتبرند
+                return
+            conn.execute("DELETE FROM analyses_fts WHERE rowid = ?", (row_id,))
+            conn.execute("DELETE FROM analysis_facets WHERE analysis = ?", (row_id,))
+            
+        conn.execute(
+            "INSERT INTO analyses_fts (rowid, site_url, cms, plugins, technologies, issues, keywords) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                row_id,
+                f"{row[1]} {row[2]}",
+                document.get('cms_type') or '',
+                ' '.join(document.get('plugins', []) + document.get('plugin_names', [])),
+                ' '.join(document.get('technologies', [])),
+                ' '.join(document.get('issue_types', []) + document.get('issue_titles', [])),
+                ' '.join(document.get('keywords', []))
+            )
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO analysis_facets (facet, value, analysis) VALUES (?, ?, ?)",
+            [
+                (facet, value, row_id)
+                for facet, key in (
+                    ('plugin', 'plugins'), ('technology', 'technologies'),
+                    ('issue_type', 'issue_types')
+                )
+                for value in document.get(key, [])
+            ]
+        )
+        
+    async def search(
+        self,
+        query: Optional[str] = None,
+        site: Optional[str] = None,
+        cms_type: Optional[str] = None,
+        status: Optional[str] = None,
+        facets: Optional[Dict[str, str]] = None,
+        sort: str = 'updated_at',
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        facet_counts: bool = False
+    ) -> Dict[str, Any]:
+        """
+        جستجو و فهرست تحلیل‌ها
+        
+        Args:
+            query: متن آزاد (آدرس سایت، CMS، پلاگین، مشکل یا کلمه کلیدی؛ کلمات به صورت پیشوندی)
+            site: پیشوند دامنه سایت (مثلاً example.com یا https://www.example.com)
+            cms_type: نوع CMS
+            status: وضعیت تحلیل
+            facets: فیلترهای Facet (plugin، technology، issue_type، keyword -> مقدار)
+            sort: 'updated_at' (جدیدترین‌ها) یا 'relevance' (فقط همراه query)
+            cursor: Cursor صفحه بعدی (از پاسخ قبلی)
+            limit: اندازه صفحه
+            facet_counts: شمارش CMS، وضعیت، پلاگین‌ها و نوع مشکلات در کل نتایج
+            
+        Returns:
+            {'items', 'total', 'limit', 'next_cursor'} (و 'facets' در صورت درخواست)
+            
+        Raises:
+            ValueError: پارامتر یا Cursor نامعتبر
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort: {sort}. Available: {', '.join(SORTS)}")
+        unknown = set(facets or {}) - set(FACETS)
+        if unknown:
+            raise ValueError(f"Unknown facet: {', '.join(sorted(unknown))}")
+        if self._conn is None:
+            raise RuntimeError("Search index is not available")
+            
+        facets = {facet: value for facet, value in (facets or {}).items() if value}
+        keyword = keyword_expression(facets.pop('keyword', None))
+        match = ' '.join(part for part in (match_expression(query), keyword) if part) or None
+        if sort == 'relevance' and match is None:
+            sort = 'updated_at'
+        if sort == 'relevance':
+            from core.dashboard_views import decode_cursor
+            position = decode_cursor('search', cursor)
+        else:
+            position = decode_keyset(cursor)
+            
+        # نتایج باید تغییرات همین Worker را هم شامل شوند
+        await self.flush()
+        self.stats['queries'] += 1
+        return await asyncio.to_thread(
+            self._search, match, site_key(site) if site else None, cms_type, status,
+            facets,
+            sort, position, limit, facet_counts
+        )
+        
+    def _search(
+        self,
+        match: Optional[str],
+        domain: Optional[str],
+        cms_type: Optional[str],
+        status: Optional[str],
+        facets: Dict[str, str],
+        sort: str,
+        position: Any,
+        limit: int,
+        facet_counts: bool
+    ) -> Dict[str, Any]:
+        source = "analyses AS a"
+        where: List[str] = []
+        params: List[Any] = []
+        if match:
+            source += " JOIN analyses_fts ON analyses_fts.rowid = a.id"
+            where.append("analyses_fts MATCH ?")
+            params.append(match)
+        if domain:
+            # پیشوند دامنه به صورت بازه تا Index روی domain استفاده شود
+            where.append("a.domain >= ? AND a.domain < ?")
+            params.extend([domain, domain + '\uffff'])
+        for column, value in (('cms_type', cms_type and cms_type.lower()), ('status', status)):
+            if value:
+                where.append(f"a.{column} = ?")
+                params.append(value)
+        for facet, value in facets.items():
+            where.append("a.id IN (SELECT analysis FROM analysis_facets WHERE facet = ? AND value = ?)")
+            params.extend([facet, value.lower() if facet == 'plugin' else value])
+        filters = f" WHERE {' AND '.join(where)}" if where else ""
+        
+        columns = ', '.join(f"a.{column}" for column in _RESULT_COLUMNS)
+        if sort == 'relevance':
+            page_sql = (
+                f"SELECT a.id, {columns} FROM {source}{filters} "
+                "ORDER BY bm25(analyses_fts, 2.0, 4.0, 4.0, 2.0, 2.0, 1.0), a.id LIMIT ? OFFSET ?"
+            )
+            page_params = [*params, limit + 1, position]
+        else:
+            page_where = list(where)
+            page_params = list(params)
+            if position is not None:
+                page_where.append("(a.updated_at < ? OR (a.updated_at = ? AND a.id < ?))")
+                page_params.extend([position[0], position[0], position[1]])
+            page_filters = f" WHERE {' AND '.join(page_where)}" if page_where else ""
+            page_sql = (
+                f"SELECT a.id, {columns} FROM {source}{page_filters} "
+                "ORDER BY a.updated_at DESC, a.id DESC LIMIT ?"
+            )
+            page_params.append(limit + 1)
+            
+        with self._db_lock:
+            conn = self._conn
+            rows = conn.execute(page_sql, page_params).fetchall()
+            total = conn.execute(f"SELECT COUNT(*) FROM {source}{filters}", params).fetchone()[0]
+            counts = self._facet_counts(conn, source, filters, params) if facet_counts else None
+            
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            if sort == 'relevance':
+                from core.dashboard_views import encode_cursor
+                next_cursor = encode_cursor('search', position + limit)
+            else:
+                next_cursor = encode_keyset(page[-1][8], page[-1][0])
+                
+        result = {
+            'items': [dict(zip(_RESULT_COLUMNS, row[1:])) for row in page],
+            'total': total,
+            'limit': limit,
+            'next_cursor': next_cursor
+        }
+        if counts is not None:
+            result['facets'] = counts
+        return result
+        
+    @staticmethod
+    def _facet_counts(conn: sqlite3.Connection, source: str, filters: str, params: List[Any]) -> Dict[str, Any]:
+        """تعداد نتایج به تفکیک CMS، وضعیت، پلاگین و نوع مشکل"""
+        counts = {}
+        for column in ('cms_type', 'status'):
+            counts[column] = [
+                {'value': value, 'count': count}
+                for value, count in conn.execute(
+                    f"SELECT a.{column}, COUNT(*) AS n FROM {source}{filters} "
+                    f"GROUP BY a.{column} ORDER BY n DESC LIMIT ?",
+                    [*params, FACET_COUNTS_LIMIT]
+                ).fetchall()
+            ]
+        for facet in ('plugin', 'issue_type'):
+            counts[facet] = [
+                {'value': value, 'count': count}
+                for value, count in conn.execute(
+                    # پیمایش از نتایج به Facet ها (و نه کل ردیف‌های آن Facet)
+                    f"SELECT f.value, COUNT(*) AS n FROM (SELECT a.id FROM {source}{filters}) AS m "
+                    "CROSS JOIN analysis_facets AS f ON f.analysis = m.id AND f.facet = ? "
+                    "GROUP BY f.value ORDER BY n DESC, f.value LIMIT ?",
+                    [*params, facet, FACET_COUNTS_LIMIT]
+                ).fetchall()
+            ]
+        return counts
+        
+    async def previous_analysis(self, analysis_id: str) -> Optional[str]:
+        """
+        آخرین تحلیل تکمیل شده همان سایت (همان دامنه) که قبل از این تحلیل ایجاد شده است
+        
+        Returns:
+            شناسه تحلیل یا None
+        """
+        if self._conn is None:
+            return None
+        await self.flush()
+        return await asyncio.to_thread(self._previous_analysis, analysis_id)
+        
+    def _previous_analysis(self, analysis_id: str) -> Optional[str]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT p.analysis_id FROM analyses AS a "
+                "JOIN analyses AS p ON p.domain = a.domain AND p.id != a.id "
+                "WHERE a.analysis_id = ? AND p.status = 'completed' AND p.created_at < a.created_at "
+                "ORDER BY p.created_at DESC LIMIT 1",
+                (analysis_id,)
+            ).fetchone()
+        return row[0] if row else None
+        
+    def clear(self):
+        """حذف تمام ردیف‌های Index"""
+        self._pending.clear()
+        if self._conn is None:
+            return
+        with self._db_lock:
+            self._conn.executescript(
+                "DELETE FROM analyses; DELETE FROM analysis_facets; DELETE FROM analyses_fts;"
+            )
+            
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار Search Index"""
+        return {
+            **self.stats,
+            'pending': len(self._pending),
+            'available': self.connected,
+            'persistent': self.path != ':memory:'
+        }
+
+
+# Global instance
+search_index = SearchIndex()
@@ -5,7 +5,7 @@
 
 import asyncio
 import logging
-from typing import Dict, Any, List, Set
+from typing import Dict, Any, List, Optional, Set
 from urllib.parse import urljoin, urlparse
 import httpx
 from bs4 import BeautifulSoup
@@ -18,12 +18,14 @@ logger = logging.getLogger(__name__)
 class SEOAnalyzer:
     """کلاس تحلیل سئو"""
     
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         import ssl
         import warnings
         warnings.filterwarnings('ignore', message='Unverified HTTPS request')
         
-        self.client = httpx.AsyncClient(
+        # Client مشترک (مثلاً در تحلیل دسته‌ای) توسط این کلاس بسته نمی‌شود
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
             timeout=30.0,
             follow_redirects=True,
             verify=False,
@@ -571,4 +573,5 @@ class SEOAnalyzer:
     
     async def close(self):
         """بستن client"""
-        await self.client.aclose()
+        if self._owns_client:
+            await self.client.aclose()
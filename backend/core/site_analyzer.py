@@ -17,13 +17,15 @@ logger = logging.getLogger(__name__)
 class SiteAnalyzer:
     """کلاس اصلی تحلیل سایت"""
     
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         import ssl
         import warnings
         # Suppress SSL warnings for expired certificates
         warnings.filterwarnings('ignore', message='Unverified HTTPS request')
         
-        self.client = httpx.AsyncClient(
+        # Client مشترک (مثلاً در تحلیل دسته‌ای) توسط این کلاس بسته نمی‌شود
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
             timeout=30.0,
             follow_redirects=True,
             verify=False,  # غیرفعال کردن SSL verification برای سایت‌های با گواهینامه منقضی شده
@@ -1421,5 +1423,6 @@ class SiteAnalyzer:
     
     async def close(self):
         """بستن Client"""
-        await self.client.aclose()
+        if self._owns_client:
+            await self.client.aclose()
 
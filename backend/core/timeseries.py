@@ -0,0 +1,600 @@
+"""
+Time-Series Store - تاریخچه متریک‌های سایت‌های مانیتور شده
+
+هر سری (سایت + متریک) شامل:
+- یک بافر حلقوی از نقاط خام (raw)
+- سه سطح Rollup با بازه‌های 1m، 1h و 1d (count/sum/min/max/last هر بازه)
+  که هنگام ثبت هر نقطه به صورت افزایشی به‌روز می‌شوند
+
+داده‌ها به صورت ستونی (array) نگهداری می‌شوند و با پر شدن ظرفیت، قدیمی‌ترین ردیف‌ها
+بازنویسی می‌شوند. Query بازه با جستجوی دودویی روی زمان انجام می‌شود و به صورت خودکار
+ریزترین سطحی انتخاب می‌شود که کل بازه را پوشش دهد و از max_points بیشتر نشود.
+
+نقاط و Rollup ها به صورت write-behind در SQLite (حالت WAL) ذخیره می‌شوند و سری‌ها
+هنگام اولین دسترسی از آن بارگذاری می‌شوند؛ فقط TIMESERIES_MAX_SERIES سری اخیر در حافظه می‌مانند.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# بازه هر سطح Rollup (ثانیه) و ظرفیت آن (تعداد بازه)
+ROLLUPS = OrderedDict([
+    ('1m', (60, 1440)),         # 1 روز
+    ('1h', (3600, 24 * 93)),    # حدود 3 ماه
+    ('1d', (86400, 366 * 3))    # حدود 3 سال
+])
+RESOLUTIONS = ('raw',) + tuple(ROLLUPS)
+
+# متریک‌هایی که برای هر سایت ثبت می‌شوند
+METRICS = (
+    'response_time',
+    'status_code',
+    'security_score',
+    'readability',
+    'issues_count',
+    'keywords_count',
+    'weaknesses_count',
+    'analysis_status'
+)
+
+# وضعیت تحلیل به صورت عددی ذخیره می‌شود
+ANALYSIS_STATUS_CODES = {'started': 0, 'processing': 1, 'completed': 2, 'failed': 3}
+ANALYSIS_STATUS_NAMES = {code: name for name, code in ANALYSIS_STATUS_CODES.items()}
+
+
+def site_key(url_or_domain: str) -> str:
+    """کلید سایت (دامنه بدون scheme و www)"""
+    value = (url_or_domain or '').strip().lower()
+    if '://' in value:
+        value = urlparse(value).hostname or ''
+    value = value.split('/')[0].split(':')[0]
+    if value.startswith('www.'):
+        value = value[4:]
+    return value
+
+
+def monitoring_metrics(
+    site_analysis: Optional[Dict[str, Any]] = None,
+    seo_analysis: Optional[Dict[str, Any]] = None,
+    weaknesses_count: Optional[int] = None,
+    status: Optional[str] = None
+) -> Dict[str, float]:
+    """
+    استخراج متریک‌های قابل ثبت از نتایج تحلیل
+    
+    فقط متریک‌های بخش‌هایی که داده شده‌اند برگردانده می‌شوند
+    (تا با به‌روزرسانی یک بخش، نقاط تکراری برای بخش دیگر ثبت نشود).
+    """
+    metrics: Dict[str, float] = {}
+    
+    if isinstance(site_analysis, dict) and site_analysis:
+        performance = site_analysis.get('performance') or {}
+        if isinstance(performance.get('response_time'), (int, float)):
+            metrics['response_time'] = float(performance['response_time'])
+        if isinstance(performance.get('status_code'), (int, float)):
+            metrics['status_code'] = float(performance['status_code'])
+            
+        security = site_analysis.get('security') or {}
+        if security:
+            headers = security.get('security_headers') or {}
+            header_count = sum(1 for v in headers.values() if v) if isinstance(headers, dict) else 0
+            metrics['security_score'] = float(min(100, (50 if security.get('ssl_enabled') else 0) + header_count * 12.5))
+            
+    if isinstance(seo_analysis, dict) and seo_analysis:
+        content = seo_analysis.get('content') or {}
+        if isinstance(content.get('readability'), (int, float)):
+            metrics['readability'] = float(content['readability'])
+        metrics['keywords_count'] = float(len(content.get('keywords') or []))
+        metrics['issues_count'] = float(len(seo_analysis.get('issues') or []))
+        
+    if weaknesses_count is not None:
+        metrics['weaknesses_count'] = float(weaknesses_count)
+        
+    if status in ANALYSIS_STATUS_CODES:
+        metrics['analysis_status'] = float(ANALYSIS_STATUS_CODES[status])
+        
+    return metrics
+
+
+class RingBuffer:
+    """
+    بافر حلقوی ستونی با ظرفیت ثابت
+    
+    ستون اول زمان است و ردیف‌ها به ترتیب زمان اضافه می‌شوند. حافظه به تدریج
+    تا سقف ظرفیت رشد می‌کند و پس از آن قدیمی‌ترین ردیف‌ها بازنویسی می‌شوند.
+    """
+    
+    __slots__ = ('capacity', 'columns', '_start')
+    
+    def __init__(self, capacity: int, width: int):
+        self.capacity = capacity
+        self.columns = [array('d') for _ in range(width)]
+        self._start = 0  # اندیس فیزیکی قدیمی‌ترین ردیف
+        
+    def __len__(self) -> int:
+        return len(self.columns[0])
+        
+    @property
+    def full(self) -> bool:
+        return len(self) >= self.capacity
+        
+    def _physical(self, index: int) -> int:
+        return (self._start + index) % len(self)
+        
+    def append(self, row: Tuple[float, ...]):
+        """افزودن ردیف (در صورت پر بودن، جایگزین قدیمی‌ترین ردیف)"""
+        if not self.full:
+            for column, value in zip(self.columns, row):
+                column.append(value)
+            return
+        position = self._start
+        for column, value in zip(self.columns, row):
+            column[position] = value
+        self._start = (self._start + 1) % self.capacity
+        
+    def last(self) -> Optional[Tuple[float, ...]]:
+        if not len(self):
+            return None
+        position = self._physical(len(self) - 1)
+        return tuple(column[position] for column in self.columns)
+        
+    def replace_last(self, row: Tuple[float, ...]):
+        position = self._physical(len(self) - 1)
+        for column, value in zip(self.columns, row):
+            column[position] = value
+            
+    def first_time(self) -> Optional[float]:
+        return self.columns[0][self._start] if len(self) else None
+        
+    def _time_at(self, index: int) -> float:
+        return self.columns[0][self._physical(index)]
+        
+    def _bisect(self, timestamp: float, right: bool = False) -> int:
+        """اولین اندیس منطقی با زمان >= timestamp (با right=True: زمان > timestamp)"""
+        low, high = 0, len(self)
+        while low < high:
+            mid = (low + high) // 2
+            value = self._time_at(mid)
+            if value < timestamp or (right and value == timestamp):
+                low = mid + 1
+            else:
+                high = mid
+        return low
+        
+    def count_range(self, start: float, end: float) -> int:
+        """تعداد ردیف‌های بازه [start, end]"""
+        return max(0, self._bisect(end, right=True) - self._bisect(start))
+        
+    def range(self, start: float, end: float, limit: Optional[int] = None) -> List[Tuple[float, ...]]:
+        """
+        ردیف‌های بازه [start, end] به ترتیب زمان
+        
+        Args:
+            limit: در صورت تعیین، فقط آخرین limit ردیف بازه
+        """
+        first = self._bisect(start)
+        stop = self._bisect(end, right=True)
+        if limit is not None:
+            first = max(first, stop - limit)
+        rows = []
+        for index in range(first, stop):
+            position = self._physical(index)
+            rows.append(tuple(column[position] for column in self.columns))
+        return rows
+
+
+class Series:
+    """یک سری زمانی: نقاط خام و سطوح Rollup"""
+    
+    __slots__ = ('raw', 'rollups')
+    
+    def __init__(self, raw_capacity: int):
+        self.raw = RingBuffer(raw_capacity, 2)  # (ts, value)
+        # (bucket, count, sum, min, max, last)
+        self.rollups = {name: RingBuffer(capacity, 6) for name, (_, capacity) in ROLLUPS.items()}
+        
+    def add(self, timestamp: float, value: float) -> Optional[List[Tuple[str, Tuple[float, ...]]]]:
+        """
+        ثبت یک نقطه و به‌روزرسانی Rollup ها
+        
+        Returns:
+            ردیف‌های Rollup تغییر کرده [(resolution, row)]، یا None اگر نقطه قدیمی‌تر از آخرین نقطه باشد
+        """
+        last = self.raw.last()
+        if last is not None and timestamp < last[0]:
+            return None
+        self.raw.append((timestamp, value))
+        
+        changed = []
+        for name, (seconds, _) in ROLLUPS.items():
+            ring = self.rollups[name]
+            bucket = timestamp - timestamp % seconds
+            current = ring.last()
+            if current is not None and current[0] == bucket:
+                row = (
+                    bucket,
+                    current[1] + 1,
+                    current[2] + value,
+                    min(current[3], value),
+                    max(current[4], value),
+                    value
+                )
+                ring.replace_last(row)
+            else:
+                row = (bucket, 1.0, value, value, value, value)
+                ring.append(row)
+            changed.append((name, row))
+        return changed
+        
+    def ring(self, resolution: str) -> RingBuffer:
+        return self.raw if resolution == 'raw' else self.rollups[resolution]
+
+
+def merge_rollup(current: Optional[Tuple[float, ...]], row: Tuple[float, ...]) -> Tuple[float, ...]:
+    """ادغام دو ردیف Rollup یک Bucket (row جدیدتر است)"""
+    if current is None:
+        return row
+    return (
+        current[0],
+        current[1] + row[1],
+        current[2] + row[2],
+        min(current[3], row[3]),
+        max(current[4], row[4]),
+        row[5]
+    )
+
+
+class TimeSeriesStore:
+    """Store سری‌های زمانی متریک‌های سایت‌ها"""
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        raw_capacity: Optional[int] = None,
+        max_series: Optional[int] = None,
+        flush_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            path: مسیر فایل SQLite
+            enabled: فعال بودن ذخیره پایدار (پیش‌فرض: TIMESERIES_PERSISTENCE)
+            raw_capacity: حداکثر نقاط خام هر سری
+            max_series: حداکثر سری‌های نگهداری شده در حافظه (فقط با ذخیره پایدار)
+            flush_interval: حداکثر تاخیر نوشتن نقاط جدید (ثانیه)
+        """
+        default_path = Path(__file__).resolve().parent.parent / 'timeseries_data' / 'timeseries.sqlite3'
+        self.path = path or os.getenv("TIMESERIES_SQLITE_PATH", str(default_path))
+        self.enabled = enabled if enabled is not None else (
+            os.getenv("TIMESERIES_PERSISTENCE", "true").lower() == "true"
+        )
+        self.raw_capacity = raw_capacity or int(os.getenv("TIMESERIES_RAW_POINTS", "2048"))
+        self.max_series = max_series or int(os.getenv("TIMESERIES_MAX_SERIES", "2000"))
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("TIMESERIES_FLUSH_INTERVAL", "2.0")
+        )
+        # نقاط خام قدیمی‌تر از این مدت از SQLite حذف می‌شوند (Rollup ها باقی می‌مانند)
+        self.raw_retention = float(os.getenv("TIMESERIES_RAW_RETENTION", str(30 * 86400)))
+        self._series: "OrderedDict[str, Series]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._pending_points: List[Tuple[str, float, float]] = []
+        # تغییرات Rollup از آخرین نوشتن (با مقدار SQLite جمع می‌شوند تا Worker ها همدیگر را بازنویسی نکنند)
+        self._pending_rollups: Dict[Tuple[str, str, float], Tuple[float, ...]] = {}
+        self._pending_keys = set()
+        self._last_prune = 0.0
+        self.stats = {
+            'points': 0, 'out_of_order': 0, 'queries': 0, 'loads': 0,
+            'evictions': 0, 'flushes': 0, 'flush_errors': 0
+        }
+        
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None
+        
+    async def connect(self):
+        """باز کردن SQLite و شروع Flusher (در صورت خطا فقط حافظه استفاده می‌شود)"""
+        if not self.enabled:
+            logger.info("Time-series persistence disabled, history is kept in memory only")
+            return
+        try:
+            await asyncio.to_thread(self._open)
+        except Exception as e:
+            logger.warning(f"Time-series database unavailable, history is kept in memory only: {str(e)}")
+            return
+        self._flusher_task = asyncio.create_task(self._flush_loop())
+        logger.info("Time-series persistence enabled")
+        
+    def _open(self):
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ts_points (
+                series TEXT NOT NULL,
+                ts REAL NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (series, ts)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS ts_rollups (
+                series TEXT NOT NULL,
+                resolution TEXT NOT NULL,
+                bucket REAL NOT NULL,
+                count REAL NOT NULL,
+                sum REAL NOT NULL,
+                min REAL NOT NULL,
+                max REAL NOT NULL,
+                last REAL NOT NULL,
+                PRIMARY KEY (series, resolution, bucket)
+            ) WITHOUT ROWID;
+        """)
+        self._conn = conn
+        
+    async def close(self):
+        """نوشتن نقاط باقیمانده و بستن SQLite"""
+        if self._flusher_task:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._flusher_task = None
+        if self._conn is not None:
+            await self.flush()
+            with self._db_lock:
+                self._conn.close()
+                self._conn = None
+                
+    @staticmethod
+    def _key(site: str, metric: str) -> str:
+        return f"{site_key(site)}|{metric}"
+        
+    async def _get_series(self, key: str, create: bool) -> Optional[Series]:
+        """سری از حافظه، یا بارگذاری از SQLite"""
+        series = self._series.get(key)
+        if series is not None:
+            self._series.move_to_end(key)
+            return series
+            
+        if self._conn is not None:
+            if self._load_lock is None:
+                self._load_lock = asyncio.Lock()
+            async with self._load_lock:
+                series = self._series.get(key)
+                if series is None:
+                    # نقاط نوشته نشده این سری باید قبل از بارگذاری در SQLite باشند
+                    if key in self._pending_keys:
+                        await self.flush()
+                    series = await asyncio.to_thread(self._load, key)
+                    self.stats['loads'] += 1
+            if series is None and not create:
+                return None
+        elif not create:
+            return None
+            
+        if series is None:
+            series = Series(self.raw_capacity)
+        self._series[key] = series
+        self._evict()
+        return series
+        
+    def _load(self, key: str) -> Optional[Series]:
+        with self._db_lock:
+            raw_rows = self._conn.execute(
+                "SELECT ts, value FROM ts_points WHERE series = ? ORDER BY ts DESC LIMIT ?",
+                (key, self.raw_capacity)
+            ).fetchall()
+            rollup_rows = {
+                name: self._conn.execute(
+                    "SELECT bucket, count, sum, min, max, last FROM ts_rollups "
+                    "WHERE series = ? AND resolution = ? ORDER BY bucket DESC LIMIT ?",
+                    (key, name, capacity)
+                ).fetchall()
+                for name, (_, capacity) in ROLLUPS.items()
+            }
+        if not raw_rows and not any(rollup_rows.values()):
+            return None
+            
+        series = Series(self.raw_capacity)
+        for row in reversed(raw_rows):
+            series.raw.append(row)
+        for name, rows in rollup_rows.items():
+            for row in reversed(rows):
+                series.rollups[name].append(row)
+        return series
+        
+    def _evict(self):
+        """حذف سری‌های کم‌استفاده از حافظه (فقط وقتی در SQLite ذخیره می‌شوند)"""
+        if self._conn is None:
+            return
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+            self.stats['evictions'] += 1
+            
+    async def record(self, site: str, metrics: Dict[str, float], timestamp: Optional[float] = None):
+        """
+        ثبت مقادیر متریک‌های یک سایت
+        
+        Args:
+            site: آدرس یا دامنه سایت
+            metrics: متریک -> مقدار (مثلاً خروجی monitoring_metrics)
+            timestamp: زمان نقطه (پیش‌فرض: اکنون)
+        """
+        if not metrics or not site_key(site):
+            return
+        timestamp = timestamp if timestamp is not None else time.time()
+        
+        for metric, value in metrics.items():
+            key = self._key(site, metric)
+            series = await self._get_series(key, create=True)
+            changed = series.add(timestamp, float(value))
+            if changed is None:
+                self.stats['out_of_order'] += 1
+                continue
+            self.stats['points'] += 1
+            
+            if self._conn is not None:
+                value = float(value)
+                self._pending_points.append((key, timestamp, value))
+                for name, row in changed:
+                    rollup_key = (key, name, row[0])
+                    self._pending_rollups[rollup_key] = merge_rollup(
+                        self._pending_rollups.get(rollup_key), (row[0], 1.0, value, value, value, value)
+                    )
+                self._pending_keys.add(key)
+                
+    async def query(
+        self,
+        site: str,
+        metric: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        resolution: str = 'auto',
+        max_points: int = 500
+    ) -> Dict[str, Any]:
+        """
+        Query بازه زمانی یک متریک
+        
+        Args:
+            site: آدرس یا دامنه سایت
+            metric: نام متریک
+            start: ابتدای بازه (Unix time، پیش‌فرض: 24 ساعت قبل از end)
+            end: انتهای بازه (Unix time، پیش‌فرض: اکنون)
+            resolution: 'raw'، '1m'، '1h'، '1d' یا 'auto'
+            max_points: حداکثر نقاط (در حالت auto ریزترین سطحی که از این بیشتر نشود انتخاب می‌شود)
+            
+        Returns:
+            {'metric', 'resolution', 'points'}؛ هر نقطه خام {'ts', 'value'} و
+            هر نقطه Rollup {'ts', 'avg', 'min', 'max', 'last', 'count'} است
+        """
+        if resolution != 'auto' and resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        self.stats['queries'] += 1
+        
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - 86400
+        series = await self._get_series(self._key(site, metric), create=False)
+        if series is None:
+            return {'metric': metric, 'resolution': resolution if resolution != 'auto' else 'raw', 'points': []}
+            
+        if resolution == 'auto':
+            resolution = self._choose_resolution(series, start, end, max_points)
+            
+        rows = series.ring(resolution).range(start, end, limit=max_points)
+        if resolution == 'raw':
+            points = [{'ts': row[0], 'value': row[1]} for row in rows]
+        else:
+            points = [
+                {'ts': row[0], 'avg': row[2] / row[1], 'min': row[3], 'max': row[4], 'last': row[5], 'count': int(row[1])}
+                for row in rows
+            ]
+        return {'metric': metric, 'resolution': resolution, 'points': points}
+        
+    @staticmethod
+    def _choose_resolution(series: Series, start: float, end: float, max_points: int) -> str:
+        """ریزترین سطحی که کل بازه را پوشش دهد و از max_points بیشتر نشود"""
+        for resolution in RESOLUTIONS:
+            ring = series.ring(resolution)
+            if not len(ring):
+                continue
+            covers = not ring.full or ring.first_time() <= start
+            if covers and ring.count_range(start, end) <= max_points:
+                return resolution
+        return RESOLUTIONS[-1]
+        
+    async def _flush_loop(self):
+        """نوشتن دوره‌ای نقاط جدید"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                self.stats['flush_errors'] += 1
+                logger.error(f"Error flushing time-series points: {str(e)}")
+                
+    async def flush(self):
+        """نوشتن نقاط و Rollup های تغییر کرده در یک Transaction"""
+        if self._conn is None or not self._pending_keys:
+            return
+        points, self._pending_points = self._pending_points, []
+        rollups, self._pending_rollups = self._pending_rollups, {}
+        self._pending_keys = set()
+        
+        prune = time.time() - self._last_prune > 3600
+        try:
+            await asyncio.to_thread(self._write, points, rollups, prune)
+        except Exception:
+            # بازگرداندن به صف (همراه با نقاطی که در حین نوشتن ثبت شده‌اند)
+            self._pending_points = points + self._pending_points
+            for rollup_key, row in self._pending_rollups.items():
+                rollups[rollup_key] = merge_rollup(rollups.get(rollup_key), row)
+            self._pending_rollups = rollups
+            self._pending_keys.update(key for key, _, _ in points)
+            self._pending_keys.update(key for key, _, _ in rollups)
+            raise
+        if prune:
+            self._last_prune = time.time()
+        self.stats['flushes'] += 1
+        
+    def _write(self, points: List[Tuple[str, float, float]], rollups: Dict[Tuple[str, str, float], Tuple[float, ...]], prune: bool):
+        with self._db_lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO ts_points (series, ts, value) VALUES (?, ?, ?)", points)
+                conn.executemany(
+                    "INSERT INTO ts_rollups (series, resolution, bucket, count, sum, min, max, last) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(series, resolution, bucket) DO UPDATE SET "
+                    "count = ts_rollups.count + excluded.count, "
+                    "sum = ts_rollups.sum + excluded.sum, "
+                    "min = min(ts_rollups.min, excluded.min), "
+                    "max = max(ts_rollups.max, excluded.max), "
+                    "last = excluded.last",
+                    [(key, name, *row) for (key, name, _), row in rollups.items()]
+                )
+                if prune:
+                    self._prune(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+                
+    def _prune(self, conn: sqlite3.Connection):
+        """حذف Rollup های خارج از ظرفیت هر سطح و نقاط خام قدیمی"""
+        now = time.time()
+        for name, (seconds, capacity) in ROLLUPS.items():
+            conn.execute(
+                "DELETE FROM ts_rollups WHERE resolution = ? AND bucket < ?",
+                (name, now - seconds * capacity)
+            )
+        conn.execute("DELETE FROM ts_points WHERE ts < ?", (now - self.raw_retention,))
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار Time-Series Store"""
+        return {
+            **self.stats,
+            'series_in_memory': len(self._series),
+            'pending_points': len(self._pending_points),
+            'persistent': self.connected
+        }
+
+
+# Global instance
+timeseries_store = TimeSeriesStore()
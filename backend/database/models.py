@@ -23,6 +23,7 @@ class SiteAnalysis(Base):
     performance = Column(JSON)
     security = Column(JSON)
     sitemap = Column(JSON)
+    payload = Column(JSON)  # خروجی کامل تحلیل
     status = Column(String, default="processing")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -45,6 +46,7 @@ class SEOAnalysis(Base):
     competitor_analysis = Column(JSON)
     issues = Column(JSON)
     score = Column(Integer)
+    payload = Column(JSON)  # خروجی کامل تحلیل
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -61,7 +63,8 @@ class ContentItem(Base):
     content_type = Column(String)  # text, image, video, infographic
     title = Column(String)
     content = Column(Text)
-    metadata = Column(JSON)
+    # نام metadata در Declarative رزرو شده است؛ نام ستون در جدول همان metadata می‌ماند
+    content_metadata = Column("metadata", JSON)
     status = Column(String, default="generated")  # generated, placed, published
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -98,6 +101,8 @@ class Dashboard(Base):
     charts_data = Column(JSON)
     alerts = Column(JSON)
     recent_activities = Column(JSON)
+    state = Column(JSON)  # فیلدهای سطح Dashboard (applied_fixes، competitor_analysis، ...)
+    data = Column(JSON)  # سایر نتایج Pipeline (به جز site_analysis و seo_analysis)
     status = Column(String, default="processing")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -4,10 +4,15 @@ AI Content Factory Pro - Main Application
 """
 
 import asyncio
+import hashlib
+import json
 import logging
+import time
+import uuid
 from typing import Dict, List, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from datetime import datetime
 from middleware.security import (
@@ -15,9 +20,20 @@ from middleware.security import (
     SecurityHeadersMiddleware,
     RequestLoggingMiddleware
 )
-from core.pipeline import create_full_pipeline
+from middleware.compression import CompressionMiddleware
+from core.responses import FastJSONResponse
+from core.pipeline import create_full_pipeline, build_dashboard_payload
 from core.monitoring import monitor_request, monitor_pipeline
 from core.cache import cache_manager
+from core.analysis_coalescer import analysis_coalescer, make_analysis_key
+from core.admission import (
+    admission_controller,
+    get_pipeline_step_names,
+    get_tenant_id,
+    PipelineTicket,
+    PriorityClass,
+    QueueFullError
+)
 
 # تنظیمات logging
 logging.basicConfig(
@@ -32,7 +48,8 @@ app = FastAPI(
     description="سیستم تولید و بهینه‌سازی محتوای خودکار با هوش مصنوعی",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=FastJSONResponse
 )
 
 # CORS Middleware
@@ -47,18 +64,49 @@ app.add_middleware(
 # Security Middlewares
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(RequestLoggingMiddleware)
-app.add_middleware(RateLimitMiddleware, requests_per_minute=60)
+# Rate Limiting (Token Bucket، RATE_LIMIT_DEFAULT/ROUTES/API_KEYS)
+app.add_middleware(RateLimitMiddleware)
+
+# فشرده‌سازی پاسخ‌ها (brotli/gzip) بالاتر از RESPONSE_COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
 
 # Initialize Cache
 @app.on_event("startup")
 async def startup_event():
     """Event Handler برای Startup"""
     await cache_manager.connect()
+    
+    from core.dashboard_store import dashboard_store
+    from core.timeseries import timeseries_store
+    from core.portfolio import portfolio_index
+    from core.search_index import search_index
+    await dashboard_store.connect()
+    await timeseries_store.connect()
+    await portfolio_index.sync(force=True)
+    await search_index.connect()
+    
+    from core.rate_limiter import rate_limiter
+    await rate_limiter.connect()
+    
+    from core.dashboard_manager import DashboardManager
+    from core.result_store import result_store
+    result_store.start_sweeper(DashboardManager.get_active_ids)
     logger.info("Application started")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Event Handler برای Shutdown"""
+    from core.dashboard_store import dashboard_store
+    from core.timeseries import timeseries_store
+    from core.search_index import search_index
+    from core.rate_limiter import rate_limiter
+    from core.result_store import result_store
+    await result_store.stop_sweeper()
+    await search_index.close()
+    await rate_limiter.close()
+    await dashboard_store.close()
+    await timeseries_store.close()
+    
     await cache_manager.close()
     logger.info("Application shutdown")
 
@@ -76,6 +124,11 @@ class SiteRequest(BaseModel):
         True,
         description="آیا مانیتورینگ دوره‌ای فعال شود؟"
     )
+    priority: str = Field(
+        "interactive",
+        pattern="^(interactive|monitoring)$",
+        description="کلاس اولویت اجرا (interactive یا monitoring برای بررسی‌های زمان‌بندی شده)"
+    )
 
 
 class SiteAnalysisResponse(BaseModel):
@@ -86,6 +139,17 @@ class SiteAnalysisResponse(BaseModel):
     initial_findings: Dict
     estimated_time: int
     dashboard_url: Optional[str] = None
+    queue_position: Optional[int] = None
+
+
+class BatchAnalysisRequest(BaseModel):
+    """مدل درخواست تحلیل دسته‌ای سایت‌ها"""
+    urls: List[str] = Field(..., min_items=1, max_items=1000, description="لیست آدرس سایت‌ها")
+    auto_implement: bool = Field(False, description="آیا تغییرات به صورت خودکار اعمال شود؟")
+    content_types: List[str] = Field(
+        default=[],
+        description="انواع محتوای تولیدی (پیش‌فرض: فقط تحلیل)"
+    )
 
 
 class ApplyFixesRequest(BaseModel):
@@ -120,65 +184,263 @@ async def health_check():
     }
 
 
+def _get_request_tenant(http_request: Request) -> str:
+    """شناسه Tenant درخواست بر اساس X-API-Key (فقط کلیدهای تعریف شده) یا IP کلاینت"""
+    from core.rate_limiter import rate_limiter
+    
+    client_host = http_request.client.host if http_request.client else None
+    known = admission_controller.tenant_weights.keys() | rate_limiter.tenant_limits.keys()
+    return get_tenant_id(http_request.headers.get("X-API-Key"), client_host, known=known)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """مقایسه If-None-Match با ETag (مقایسه ضعیف طبق RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+
+async def _dashboard_conditional_response(
+    analysis_id: str,
+    view: str,
+    http_request: Request,
+    response: Response,
+    refresh_seconds: int = 0
+) -> Optional[Response]:
+    """
+    تنظیم ETag و Cache-Control پاسخ یک نمای داشبورد
+    
+    ETag از نسخه داشبورد ساخته می‌شود، پس بدون ساختن پاسخ قابل محاسبه است.
+    
+    Args:
+        analysis_id: شناسه تحلیل
+        view: نام نما (هر Endpoint ETag جداگانه دارد)
+        http_request: درخواست (برای If-None-Match)
+        response: پاسخ FastAPI (برای Header ها)
+        refresh_seconds: برای نماهایی که به زمان فعلی وابسته‌اند، ETag حداقل هر این مدت تغییر می‌کند
+        
+    Returns:
+        پاسخ 304 اگر نسخه کلاینت به‌روز باشد، در غیر این صورت None
+    """
+    from core.dashboard_manager import DashboardManager
+    
+    meta = await DashboardManager().get_dashboard_meta(analysis_id)
+    if meta is None:
+        return None
+        
+    tag_source = f"{analysis_id}:{meta['created_at']}:{meta['version']}:{view}"
+    if refresh_seconds:
+        tag_source += f":{int(time.time()) // refresh_seconds}"
+    etag = f'"{hashlib.md5(tag_source.encode()).hexdigest()[:20]}"'
+    
+    # داشبوردهای تمام شده کمتر تغییر می‌کنند و مدت کوتاهی بدون اعتبارسنجی استفاده می‌شوند
+    if meta['status'] in ('completed', 'failed') and not refresh_seconds:
+        cache_control = "private, max-age=30, must-revalidate"
+    else:
+        cache_control = "private, no-cache"
+        
+    if _etag_matches(http_request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+        
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return None
+
+
+def _json_response(content, response: Response) -> FastJSONResponse:
+    """
+    برگرداندن مستقیم FastJSONResponse برای Payload های بزرگ
+    
+    با برگرداندن Response، FastAPI مرحله jsonable_encoder را اجرا نمی‌کند؛
+    Header های تنظیم شده روی response (مثل ETag) به پاسخ منتقل می‌شوند.
+    """
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return FastJSONResponse(content, headers=headers)
+
+
 # Main Endpoint
 @app.post("/analyze-site", response_model=SiteAnalysisResponse)
 @monitor_request
 async def analyze_and_optimize_site(
     request: SiteRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    http_request: Request
 ):
     """
     نقطه شروع سیستم - دریافت URL سایت و شروع فرآیند کامل
     """
     try:
         # Import modules (lazy import)
-        from core.site_analyzer import SiteAnalyzer
         from core.dashboard_manager import DashboardManager
         
         # ایجاد ID منحصر به فرد
-        analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         
-        # شروع فرآیند در پس‌زمینه
-        background_tasks.add_task(
-            full_automation_pipeline,
-            analysis_id,
-            request.url,
-            request.auto_implement,
-            request.content_types
-        )
+        analysis_key = make_analysis_key(request.url, request.auto_implement, request.content_types)
+        step_names = get_pipeline_step_names(request.auto_implement, request.content_types)
         
-        # ایجاد داشبورد
-        dashboard_manager = DashboardManager()
-        dashboard_url = await dashboard_manager.create_dashboard(analysis_id, request.url)
+        # ثبت در Coalescer پیش از هر await تا leader بین بررسی و ثبت عوض نشود
+        # (داشبورد follower در create_dashboard پیش از اولین await ساخته می‌شود)
+        is_leader, leader_id = analysis_coalescer.join(analysis_key, analysis_id)
+        
+        # رزرو نوبت اجرا فقط برای leader
+        ticket = None
+        if is_leader:
+            try:
+                ticket = admission_controller.reserve(
+                    analysis_id,
+                    PriorityClass(request.priority),
+                    _get_request_tenant(http_request)
+                )
+            except QueueFullError as e:
+                analysis_coalescer.leave(analysis_key, analysis_id)
+                logger.warning(f"Rejecting analysis for {request.url}: pipeline queue is full")
+                raise HTTPException(
+                    status_code=503,
+                    detail="ظرفیت سیستم تکمیل است. لطفاً کمی بعد دوباره تلاش کنید.",
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+        
+        initial_findings = {
+            "message": "فرآیند تحلیل و بهینه‌سازی شروع شد",
+            "estimated_steps": 5,
+            "current_step": 1
+        }
+        status = "processing_started"
+        queue_position = None
+        
+        try:
+            # ایجاد داشبورد
+            dashboard_manager = DashboardManager()
+            dashboard_url = await dashboard_manager.create_dashboard(analysis_id, request.url)
+            
+            if is_leader:
+                queue_position = admission_controller.get_position(ticket)
+                if queue_position > 0:
+                    status = "queued"
+                    initial_findings["message"] = f"درخواست در صف قرار گرفت (نوبت {queue_position})"
+                    await dashboard_manager.update_dashboard(analysis_id, {'status': 'queued'})
+                
+                # شروع فرآیند در پس‌زمینه
+                background_tasks.add_task(
+                    run_admitted_pipeline,
+                    ticket,
+                    analysis_id,
+                    request.url,
+                    request.auto_implement,
+                    request.content_types,
+                    analysis_key
+                )
+            else:
+                await dashboard_manager.update_dashboard(analysis_id, {'coalesced_with': leader_id})
+                initial_findings["message"] = "تحلیل مشابهی در حال اجراست و نتایج آن برای این تحلیل هم ثبت می‌شود"
+                initial_findings["coalesced_with"] = leader_id
+        except Exception as e:
+            # Pipeline زمان‌بندی نشده است؛ نوبت آزاد می‌شود و followers منتظر این leader نمی‌مانند
+            if is_leader:
+                admission_controller.cancel(ticket)
+                follower_ids = analysis_coalescer.leave(analysis_key, analysis_id)
+                await _share_coalesced_results(
+                    analysis_id,
+                    follower_ids,
+                    {'status': 'failed', 'error': f"Analysis could not be started: {str(e)}"}
+                )
+            raise
+        
+        estimated_time = admission_controller.estimate_completion(queue_position or 0, step_names)
         
         return SiteAnalysisResponse(
             analysis_id=analysis_id,
             site_url=request.url,
-            status="processing_started",
-            initial_findings={
-                "message": "فرآیند تحلیل و بهینه‌سازی شروع شد",
-                "estimated_steps": 5,
-                "current_step": 1
-            },
-            estimated_time=900,  # 15 دقیقه
-            dashboard_url=dashboard_url
+            status=status,
+            initial_findings=initial_findings,
+            estimated_time=estimated_time,
+            dashboard_url=dashboard_url,
+            queue_position=queue_position
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error starting analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _share_coalesced_results(leader_id: str, follower_ids: List[str], payload: Dict):
+    """اشتراک نتایج Pipeline با تحلیل‌های ادغام شده"""
+    if not follower_ids:
+        return
+        
+    from core.dashboard_manager import DashboardManager
+    dashboard_manager = DashboardManager()
+    
+    for follower_id in follower_ids:
+        try:
+            await dashboard_manager.update_dashboard(
+                follower_id,
+                {**payload, 'coalesced_with': leader_id}
+            )
+        except Exception as e:
+            logger.error(f"Error sharing results with coalesced analysis {follower_id}: {str(e)}")
+
+
+async def run_admitted_pipeline(
+    ticket: PipelineTicket,
+    analysis_id: str,
+    site_url: str,
+    auto_implement: bool,
+    content_types: List[str],
+    analysis_key: Optional[str] = None
+):
+    """انتظار برای نوبت در Admission Controller و سپس اجرای Pipeline"""
+    try:
+        await admission_controller.wait_for_slot(ticket)
+    except asyncio.CancelledError:
+        # تحلیل‌های ادغام شده نباید در وضعیت processing باقی بمانند
+        cancelled_payload = {'status': 'failed', 'error': 'Analysis was cancelled before it started'}
+        try:
+            from core.dashboard_manager import DashboardManager
+            await DashboardManager().update_dashboard(analysis_id, cancelled_payload)
+        except Exception as e:
+            logger.error(f"Error marking cancelled analysis {analysis_id}: {str(e)}")
+        if analysis_key:
+            follower_ids = analysis_coalescer.leave(analysis_key, analysis_id)
+            await _share_coalesced_results(analysis_id, follower_ids, cancelled_payload)
+        raise
+    
+    try:
+        if ticket.was_queued:
+            from core.dashboard_manager import DashboardManager
+            await DashboardManager().update_dashboard(analysis_id, {'status': 'processing'})
+        
+        return await full_automation_pipeline(
+            analysis_id,
+            site_url,
+            auto_implement,
+            content_types,
+            analysis_key
+        )
+    finally:
+        admission_controller.release(ticket)
+
+
 @monitor_pipeline("full_automation")
 async def full_automation_pipeline(
     analysis_id: str,
     site_url: str,
     auto_implement: bool,
-    content_types: List[str]
+    content_types: List[str],
+    analysis_key: Optional[str] = None
 ):
     """پایپ‌لاین کامل اتوماسیون با Pipeline Manager"""
     logger.info(f"Starting full automation pipeline for {site_url}")
     
+    # نتیجه‌ای که با تحلیل‌های ادغام شده به اشتراک گذاشته می‌شود
+    shared_payload = {'status': 'failed', 'error': 'Pipeline did not complete'}
+    
     try:
         # ایجاد Pipeline
         pipeline = await create_full_pipeline(
@@ -191,47 +453,103 @@ async def full_automation_pipeline(
         # اجرای Pipeline
         result = await pipeline.execute()
         
+        # ثبت زمان‌های Steps برای تخمین زمان تحلیل‌های بعدی
+        admission_controller.estimator.observe_results(result.get('results', {}))
+        
         if result['status'] == 'completed':
             logger.info(f"Pipeline completed successfully for {site_url}")
+            shared_payload = build_dashboard_payload(result['context'])
         else:
             logger.error(f"Pipeline failed: {result.get('error')}")
+            shared_payload = {'status': 'failed', 'error': result.get('error')}
             # به‌روزرسانی وضعیت خطا در داشبورد
             try:
                 from core.dashboard_manager import DashboardManager
                 dashboard_manager = DashboardManager()
-                await dashboard_manager.update_dashboard(
-                    analysis_id,
-                    {'status': 'failed', 'error': result.get('error')}
-                )
+                await dashboard_manager.update_dashboard(analysis_id, shared_payload)
             except:
                 pass
-        
+                
         return result
         
     except Exception as e:
         logger.error(f"Pipeline failed: {str(e)}")
+        shared_payload = {'status': 'failed', 'error': str(e)}
         # به‌روزرسانی وضعیت خطا در داشبورد
         try:
             from core.dashboard_manager import DashboardManager
             dashboard_manager = DashboardManager()
-            await dashboard_manager.update_dashboard(
-                analysis_id,
-                {'status': 'failed', 'error': str(e)}
-            )
+            await dashboard_manager.update_dashboard(analysis_id, shared_payload)
         except:
             pass
         raise
+        
+    finally:
+        if analysis_key:
+            follower_ids = analysis_coalescer.leave(analysis_key, analysis_id)
+            await _share_coalesced_results(analysis_id, follower_ids, shared_payload)
+
+
+@app.post("/analyze-sites/batch")
+async def analyze_sites_batch(request: BatchAnalysisRequest, http_request: Request):
+    """
+    تحلیل دسته‌ای چندین سایت با Scheduler و Connection Pool مشترک
+    
+    Pipeline ها با کلاس اولویت batch اجرا می‌شوند تا تحلیل‌های تعاملی کند نشوند.
+    نتایج هر سایت به محض اتمام به صورت NDJSON (یک JSON در هر خط) ارسال می‌شود
+    و خط آخر خلاصه کل دسته است.
+    """
+    from core.batch_analyzer import batch_scheduler
+    
+    tenant = _get_request_tenant(http_request)
+    
+    async def ndjson_stream():
+        async for item in batch_scheduler.stream(
+            request.urls,
+            request.auto_implement,
+            request.content_types,
+            tenant=tenant
+        ):
+            yield json.dumps(item, ensure_ascii=False, default=str) + "\n"
+    
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
 
 
 # Dashboard Endpoints
 @app.get("/dashboard/{analysis_id}")
-async def get_dashboard(analysis_id: str):
-    """دریافت داده‌های داشبورد"""
+async def get_dashboard(
+    analysis_id: str,
+    http_request: Request,
+    response: Response,
+    fields: Optional[str] = None
+):
+    """
+    دریافت داده‌های داشبورد
+    
+    با fields (مثلاً ?fields=summary,alerts) فقط فیلدهای درخواستی برگردانده می‌شوند؛
+    لیست‌های طولانی و بخش‌های data از Endpoint های جداگانه قابل دریافت هستند.
+    """
     try:
         from core.dashboard_manager import DashboardManager
+        from core.dashboard_views import parse_fields
+        
+        try:
+            requested = parse_fields(fields, extra=('alerts',))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        view_name = f"dashboard:{','.join(requested)}" if requested else 'dashboard'
+        not_modified = await _dashboard_conditional_response(analysis_id, view_name, http_request, response)
+        if not_modified:
+            return not_modified
         
         dashboard_manager = DashboardManager()
-        dashboard_data = await dashboard_manager.get_dashboard_data(analysis_id)
+        if requested:
+            dashboard_data = await dashboard_manager.get_dashboard_view(
+                analysis_id, [field for field in requested if field != 'alerts']
+            )
+        else:
+            dashboard_data = await dashboard_manager.get_dashboard_data(analysis_id)
         
         if not dashboard_data:
             raise HTTPException(
@@ -239,7 +557,16 @@ async def get_dashboard(analysis_id: str):
                 detail="Dashboard یافت نشد. احتمالاً بک‌اند restart شده و داده‌ها از بین رفته است. لطفاً یک تحلیل جدید ایجاد کنید."
             )
         
-        return dashboard_data
+        if requested and 'alerts' in requested:
+            alert_source = await dashboard_manager.get_dashboard_view(
+                analysis_id, ['status', 'error', 'changes', 'data.site_analysis', 'data.seo_analysis', 'data.error']
+            ) or {}
+            alert_data = alert_source.get('data', {})
+            dashboard_data['alerts'] = _generate_alerts(
+                alert_source, alert_data.get('site_analysis'), alert_data.get('seo_analysis')
+            )
+        
+        return _json_response(dashboard_data, response)
         
     except HTTPException:
         raise
@@ -248,22 +575,189 @@ async def get_dashboard(analysis_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+
+@app.get("/dashboard/{analysis_id}/sections/{section}")
+async def get_dashboard_section(analysis_id: str, section: str, http_request: Request, response: Response):
+    """دریافت یک بخش از داده‌های داشبورد (مثلاً seo_analysis یا generated_content) به صورت جداگانه"""
+    try:
+        from core.dashboard_manager import DashboardManager
+        
+        not_modified = await _dashboard_conditional_response(
+            analysis_id, f"section:{section}", http_request, response
+        )
+        if not_modified:
+            return not_modified
+        
+        result = await DashboardManager().get_dashboard_section(analysis_id, section)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Dashboard یافت نشد")
+        if not result['found']:
+            raise HTTPException(status_code=404, detail=f"Section '{section}' یافت نشد")
+            
+        return _json_response({'analysis_id': analysis_id, 'section': section, 'data': result['value']}, response)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting dashboard section: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _get_dashboard_list_page(
+    analysis_id: str,
+    name: str,
+    http_request: Request,
+    response: Response,
+    cursor: Optional[str],
+    limit: Optional[int],
+    fields: Optional[str]
+):
+    """صفحه‌ای از یکی از لیست‌های طولانی داشبورد (مشترک بین Endpoint های لیست)"""
+    try:
+        from core.dashboard_manager import DashboardManager
+        from core.dashboard_views import paginate
+        
+        not_modified = await _dashboard_conditional_response(
+            analysis_id, f"list:{name}:{cursor}:{limit}:{fields}", http_request, response
+        )
+        if not_modified:
+            return not_modified
+        
+        items = await DashboardManager().get_dashboard_list(analysis_id, name)
+        if items is None:
+            raise HTTPException(status_code=404, detail="Dashboard یافت نشد")
+            
+        item_fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+        try:
+            page = paginate(name, items, cursor=cursor, limit=limit, fields=item_fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+            
+        return {'analysis_id': analysis_id, 'list': name, **page}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting dashboard list {name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/dashboard/{analysis_id}/issues")
+async def get_dashboard_issues(
+    analysis_id: str,
+    http_request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    """مشکلات سئو (صفحه‌بندی Cursor)"""
+    return await _get_dashboard_list_page(analysis_id, 'issues', http_request, response, cursor, limit, fields)
+
+
+@app.get("/dashboard/{analysis_id}/keywords")
+async def get_dashboard_keywords(
+    analysis_id: str,
+    http_request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    """کلمات کلیدی محتوای سایت (صفحه‌بندی Cursor)"""
+    return await _get_dashboard_list_page(analysis_id, 'keywords', http_request, response, cursor, limit, fields)
+
+
+@app.get("/dashboard/{analysis_id}/content-items")
+async def get_dashboard_content_items(
+    analysis_id: str,
+    http_request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    """محتوای تولید شده (صفحه‌بندی Cursor، مثلاً ?fields=title,type بدون متن کامل)"""
+    return await _get_dashboard_list_page(analysis_id, 'content-items', http_request, response, cursor, limit, fields)
+
+
+@app.get("/dashboard/{analysis_id}/applied-fixes")
+async def get_dashboard_applied_fixes(
+    analysis_id: str,
+    http_request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None
+):
+    """اصلاحات اعمال شده (صفحه‌بندی Cursor)"""
+    return await _get_dashboard_list_page(analysis_id, 'applied-fixes', http_request, response, cursor, limit, fields)
+
+
 @app.get("/dashboard/{analysis_id}/seo-report")
-async def get_seo_report(analysis_id: str):
+async def get_seo_report(analysis_id: str, http_request: Request, response: Response):
     """دریافت گزارش کامل سئو"""
     try:
         from core.report_generator import ReportGenerator
         
+        not_modified = await _dashboard_conditional_response(analysis_id, 'seo-report', http_request, response)
+        if not_modified:
+            return not_modified
+        
         report_generator = ReportGenerator()
-        report = await report_generator.generate_seo_report(analysis_id)
+        report = await report_generator.get_seo_report(analysis_id)
         
-        return report
+        return _json_response(report, response)
         
     except Exception as e:
         logger.error(f"Error generating SEO report: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/dashboard/{analysis_id}/seo-report/export")
+async def export_seo_report(analysis_id: str, http_request: Request, response: Response, format: str = "html"):
+    """
+    خروجی گزارش سئو به صورت HTML یا PDF (Streaming)
+    
+    Args:
+        format: html یا pdf
+    """
+    try:
+        from core import report_export
+        from core.report_generator import ReportGenerator
+        
+        if format not in report_export.REPORT_EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format باید یکی از {', '.join(report_export.REPORT_EXPORT_FORMATS)} باشد")
+        if format == 'pdf' and report_export.weasyprint is None:
+            raise HTTPException(status_code=501, detail="خروجی PDF در این سرور فعال نیست (weasyprint نصب نیست)")
+        
+        not_modified = await _dashboard_conditional_response(analysis_id, f"seo-report.{format}", http_request, response)
+        if not_modified:
+            return not_modified
+        
+        report = await ReportGenerator().get_seo_report(analysis_id)
+        if 'error' in report:
+            raise HTTPException(status_code=404, detail=report['error'])
+        
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+        headers["Content-Disposition"] = f'attachment; filename="seo-report-{analysis_id}.{format}"'
+        
+        if format == 'pdf':
+            pdf = await report_export.render_report_pdf(report)
+            headers["Content-Length"] = str(report_export.file_size(pdf))
+            body = report_export.iter_file(pdf)
+        else:
+            body = report_export.stream_report_html(report)
+            
+        return StreamingResponse(body, media_type=report_export.MEDIA_TYPES[format], headers=headers)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting SEO report: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/dashboard/{analysis_id}/analyze-competitors")
 async def analyze_competitors(analysis_id: str, request_data: Dict):
     """تحلیل رقبا و استخراج کلمات کلیدی"""
@@ -330,11 +824,17 @@ async def analyze_competitors(analysis_id: str, request_data: Dict):
 
 
 @app.get("/dashboard/{analysis_id}/competitor-keywords")
-async def get_competitor_keywords(analysis_id: str):
+async def get_competitor_keywords(analysis_id: str, http_request: Request, response: Response):
     """دریافت کلمات کلیدی رقبا برای نمایش"""
     try:
         from core.dashboard_manager import DashboardManager
         
+        not_modified = await _dashboard_conditional_response(
+            analysis_id, 'competitor-keywords', http_request, response
+        )
+        if not_modified:
+            return not_modified
+        
         dashboard_manager = DashboardManager()
         dashboard_data = await dashboard_manager.get_dashboard_data(analysis_id)
         
@@ -388,7 +888,7 @@ async def save_cms_credentials(analysis_id: str, request_data: Dict):
             'cms_type': request_data.get('cms_type', 'wordpress'),
             'admin_url': request_data.get('admin_url', ''),
             'username': request_data.get('username', ''),
-            'password': request_data.get('password', ''),  # در production باید encrypt شود
+            'password': request_data.get('password', ''),  # فقط در حافظه؛ در Database نوشته نمی‌شود
             'api_key': request_data.get('api_key', ''),
             'saved_at': datetime.now().isoformat()
         }
@@ -402,7 +902,9 @@ async def save_cms_credentials(analysis_id: str, request_data: Dict):
         
         return {
             'message': 'اطلاعات لاگین با موفقیت ذخیره شد',
-            'cms_type': credentials['cms_type']
+            'cms_type': credentials['cms_type'],
+            # رمز عبور و API Key فقط در حافظه سرور نگهداری می‌شوند و پس از Restart باید دوباره وارد شوند
+            'secrets_persisted': False
         }
         
     except HTTPException:
@@ -417,8 +919,8 @@ async def apply_specific_fixes(analysis_id: str, request_data: ApplyFixesRequest
     """اعمال اصلاحات خاص"""
     try:
         from core.dashboard_manager import DashboardManager
+        from core.dashboard_store import missing_secrets
         from core.seo_implementation import AutoSEOImplementation
-        from core.report_generator import ReportGenerator
         
         # تبدیل Pydantic model به dict
         request_dict = request_data.dict()
@@ -445,6 +947,13 @@ async def apply_specific_fixes(analysis_id: str, request_data: ApplyFixesRequest
         
         # دریافت اطلاعات لاگین CMS (اگر موجود باشد)
         cms_credentials = dashboard_data.get('cms_credentials', {})
+        
+        # رمزها در Database نوشته نمی‌شوند؛ بدون آن‌ها اصلاحات بی‌صدا بدون لاگین اجرا می‌شدند
+        if missing_secrets(dashboard_data, 'cms_credentials'):
+            raise HTTPException(
+                status_code=409,
+                detail="رمز عبور یا API Key اطلاعات لاگین CMS در این سرور در دسترس نیست (این مقادیر در Database ذخیره نمی‌شوند). لطفاً اطلاعات لاگین را دوباره وارد کنید."
+            )
         cms_type = cms_credentials.get('cms_type') if cms_credentials else None
         
         # دریافت نوع CMS از تحلیل سایت
@@ -804,44 +1313,58 @@ def _generate_alerts(dashboard_data, site_analysis, seo_analysis):
                 'timestamp': current_time.isoformat()
             })
     
+    # تغییرات نسبت به تحلیل قبلی همان سایت (analysis_diff.record_changes)
+    alerts.extend((dashboard_data.get('changes') or {}).get('alerts', []))
+    
     return alerts
 
 
-def _generate_response_time_history(performance):
-    """تولید تاریخچه زمان پاسخ"""
-    from datetime import timedelta
-    response_time = performance.get('response_time')
-    if not response_time:
-        return []
+async def _metric_history(site_url, metric, hours=24, max_points=120):
+    """
+    تاریخچه یک متریک سایت از Time-Series Store (برای نمودارها)
+    
+    Returns:
+        لیست {'timestamp', 'value'} (برای سطوح Rollup مقدار میانگین بازه است)
+    """
+    from core.timeseries import timeseries_store
     
-    # در حالت واقعی، این داده‌ها از دیتابیس یا cache می‌آید
+    end = time.time()
+    history = await timeseries_store.query(site_url, metric, start=end - hours * 3600, end=end, max_points=max_points)
     return [
         {
-            'timestamp': (datetime.now() - timedelta(minutes=10)).isoformat(),
-            'value': response_time * 0.9  # شبیه‌سازی
-        },
-        {
-            'timestamp': (datetime.now() - timedelta(minutes=5)).isoformat(),
-            'value': response_time * 0.95
-        },
-        {
-            'timestamp': datetime.now().isoformat(),
-            'value': response_time
+            'timestamp': datetime.fromtimestamp(point['ts']).isoformat(),
+            'value': point['value'] if 'value' in point else point['avg']
         }
+        for point in history['points']
     ]
 
 
+async def _status_history(site_url, hours=24):
+    """تاریخچه وضعیت تحلیل‌های سایت (فقط تغییرات وضعیت)"""
+    from core.timeseries import ANALYSIS_STATUS_NAMES, timeseries_store
+    
+    end = time.time()
+    history = await timeseries_store.query(
+        site_url, 'analysis_status', start=end - hours * 3600, end=end, resolution='raw'
+    )
+    changes = []
+    for point in history['points']:
+        status = ANALYSIS_STATUS_NAMES.get(int(point['value']), 'unknown')
+        if not changes or changes[-1]['status'] != status:
+            changes.append({'timestamp': datetime.fromtimestamp(point['ts']).isoformat(), 'status': status})
+    return changes
+
 def _estimate_completion(dashboard_data):
     """تخمین زمان تکمیل"""
     from datetime import timedelta
     status = dashboard_data.get('status', 'unknown')
     if status == 'completed':
         return 'completed'
-    elif status == 'processing':
-        # تخمین بر اساس زمان گذشته
+    elif status in ('processing', 'queued'):
+        # تخمین بر اساس زمان گذشته و زمان‌های مشاهده شده Steps
         created_at = datetime.fromisoformat(dashboard_data.get('created_at', datetime.now().isoformat()))
         elapsed = (datetime.now() - created_at).total_seconds()
-        estimated_total = 900  # 15 دقیقه
+        estimated_total = admission_controller.estimator.estimate()
         remaining = max(0, estimated_total - elapsed)
         return f"{int(remaining / 60)} دقیقه"
     else:
@@ -849,12 +1372,18 @@ def _estimate_completion(dashboard_data):
 
 
 @app.get("/dashboard/{analysis_id}/live-monitoring")
-async def get_live_monitoring(analysis_id: str):
+async def get_live_monitoring(analysis_id: str, http_request: Request, response: Response):
     """دریافت داده‌های مانیتورینگ بلادرنگ"""
     try:
         from core.dashboard_manager import DashboardManager
         from datetime import timedelta
-        import time
+        
+        # فیلدهای وابسته به زمان (مثل time_since_update) حداکثر هر 60 ثانیه تغییر می‌کنند
+        not_modified = await _dashboard_conditional_response(
+            analysis_id, 'live-monitoring', http_request, response, refresh_seconds=60
+        )
+        if not_modified:
+            return not_modified
         
         # دریافت داده‌های داشبورد
         dashboard_manager = DashboardManager()
@@ -945,17 +1474,8 @@ async def get_live_monitoring(analysis_id: str):
             
             # روند تغییرات (برای نمایش در نمودار)
             'trends': {
-                'response_time_history': _generate_response_time_history(performance) if performance else [],
-                'status_history': [
-                    {
-                        'timestamp': created_at.isoformat(),
-                        'status': 'started'
-                    },
-                    {
-                        'timestamp': dashboard_data.get('updated_at', current_time.isoformat()),
-                        'status': dashboard_data.get('status', 'unknown')
-                    }
-                ]
+                'response_time_history': await _metric_history(dashboard_data.get('site_url', ''), 'response_time'),
+                'status_history': await _status_history(dashboard_data.get('site_url', ''))
             },
             
             # پیش‌بینی
@@ -965,7 +1485,7 @@ async def get_live_monitoring(analysis_id: str):
             }
         }
         
-        return live_data
+        return _json_response(live_data, response)
         
     except HTTPException:
         raise
@@ -974,6 +1494,216 @@ async def get_live_monitoring(analysis_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/dashboard/{analysis_id}/history")
+async def get_monitoring_history(
+    analysis_id: str,
+    metrics: str = "response_time",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: str = "auto",
+    max_points: int = 500
+):
+    """
+    تاریخچه متریک‌های مانیتورینگ سایت داشبورد
+    
+    metrics با کاما جدا می‌شود (مثلاً response_time,issues_count). بازه پیش‌فرض 24 ساعت اخیر است
+    و با resolution=auto ریزترین سطح (raw، 1m، 1h، 1d) که در max_points جا شود انتخاب می‌شود.
+    """
+    try:
+        from core.dashboard_manager import DashboardManager
+        from core.timeseries import METRICS, timeseries_store
+        
+        meta = await DashboardManager().get_dashboard_view(analysis_id, ['site_url'])
+        if not meta:
+            raise HTTPException(status_code=404, detail="Dashboard یافت نشد")
+            
+        requested = [metric.strip() for metric in metrics.split(',') if metric.strip()]
+        unknown = [metric for metric in requested if metric not in METRICS]
+        if unknown or not requested:
+            raise HTTPException(status_code=400, detail=f"Unknown metrics: {', '.join(unknown)}. Available: {', '.join(METRICS)}")
+            
+        end_ts = end.timestamp() if end else time.time()
+        start_ts = start.timestamp() if start else end_ts - 86400
+        max_points = max(1, min(max_points, 5000))
+        
+        series = {}
+        for metric in requested:
+            try:
+                result = await timeseries_store.query(
+                    meta['site_url'], metric, start=start_ts, end=end_ts,
+                    resolution=resolution, max_points=max_points
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            series[metric] = result
+            
+        return {
+            'analysis_id': analysis_id,
+            'site_url': meta['site_url'],
+            'start': datetime.fromtimestamp(start_ts).isoformat(),
+            'end': datetime.fromtimestamp(end_ts).isoformat(),
+            'series': series
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting monitoring history: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _get_portfolio_index():
+    """portfolio_index به‌روز شده با تغییرات سایر Worker ها (501 اگر numpy نصب نباشد)"""
+    from core.portfolio import portfolio_index
+    
+    if not portfolio_index.available:
+        raise HTTPException(status_code=501, detail="گزارش تجمیعی در این سرور فعال نیست (numpy نصب نیست)")
+    await portfolio_index.sync()
+    return portfolio_index
+
+
+@app.get("/portfolio/summary")
+async def get_portfolio_summary(
+    status: str = "completed",
+    cms_type: Optional[str] = None,
+    latest_only: bool = True,
+    top: int = 10
+):
+    """
+    گزارش تجمیعی تمام تحلیل‌ها: توزیع امتیازها، درصدک‌ها، رایج‌ترین مشکلات و ضعیف‌ترین سایت‌ها
+    
+    status=all یعنی بدون فیلتر وضعیت؛ با latest_only فقط آخرین تحلیل هر سایت شمرده می‌شود.
+    """
+    try:
+        portfolio_index = await _get_portfolio_index()
+        return portfolio_index.summary(
+            status=None if status == 'all' else status,
+            cms_type=cms_type,
+            latest_only=latest_only,
+            top=max(1, min(top, 100))
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error building portfolio summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/portfolio/rankings")
+async def get_portfolio_rankings(
+    metric: str = "overall_score",
+    order: str = "asc",
+    limit: int = 50,
+    offset: int = 0,
+    status: str = "completed",
+    cms_type: Optional[str] = None,
+    latest_only: bool = True
+):
+    """رتبه‌بندی تحلیل‌ها بر اساس یک متریک (مثلاً overall_score، response_time، issues_count)"""
+    try:
+        from core.dashboard_views import MAX_PAGE_SIZE
+        from core.portfolio import METRIC_FIELDS
+        
+        if order not in ('asc', 'desc'):
+            raise HTTPException(status_code=400, detail="order باید asc یا desc باشد")
+        if metric not in METRIC_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}. Available: {', '.join(METRIC_FIELDS)}")
+            
+        portfolio_index = await _get_portfolio_index()
+        return portfolio_index.rankings(
+            metric=metric,
+            ascending=order == 'asc',
+            limit=max(1, min(limit, MAX_PAGE_SIZE)),
+            offset=max(0, offset),
+            status=None if status == 'all' else status,
+            cms_type=cms_type,
+            latest_only=latest_only
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error building portfolio rankings: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/analyses/search")
+async def search_analyses(
+    q: Optional[str] = None,
+    site: Optional[str] = None,
+    cms_type: Optional[str] = None,
+    status: Optional[str] = None,
+    plugin: Optional[str] = None,
+    technology: Optional[str] = None,
+    issue_type: Optional[str] = None,
+    keyword: Optional[str] = None,
+    sort: str = "updated_at",
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    facets: bool = False
+):
+    """
+    جستجو و فهرست تحلیل‌های ذخیره شده (صفحه‌بندی با Cursor)
+    
+    q متن آزاد است (آدرس سایت، CMS، پلاگین، مشکل یا کلمه کلیدی)؛ سایر پارامترها فیلتر دقیق هستند.
+    بدون هیچ پارامتری، تمام تحلیل‌ها از جدیدترین فهرست می‌شوند. با facets=true تعداد نتایج
+    به تفکیک CMS، وضعیت، پلاگین و نوع مشکل هم برگردانده می‌شود.
+    """
+    try:
+        from core.dashboard_views import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+        from core.search_index import search_index
+        
+        if not search_index.connected:
+            raise HTTPException(status_code=503, detail="Index جستجو در دسترس نیست")
+            
+        try:
+            return await search_index.search(
+                query=q,
+                site=site,
+                cms_type=cms_type,
+                status=None if status == 'all' else status,
+                facets={'plugin': plugin, 'technology': technology, 'issue_type': issue_type, 'keyword': keyword},
+                sort=sort,
+                cursor=cursor,
+                limit=max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)),
+                facet_counts=facets
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching analyses: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/dashboard/{analysis_id}/changes")
+async def get_analysis_changes(analysis_id: str, base: Optional[str] = None):
+    """
+    تغییرات این تحلیل نسبت به تحلیل پایه: صفحات جدید/حذف شده/تغییر کرده، مشکلات جدید/برطرف شده،
+    تغییر امتیازها، کلمات کلیدی و پلاگین‌ها
+    
+    بدون base، آخرین تحلیل تکمیل شده قبلی همان سایت به عنوان پایه استفاده می‌شود.
+    """
+    try:
+        from core.analysis_diff import get_analysis_diff
+        
+        diff = await get_analysis_diff(analysis_id, base)
+        if diff is None:
+            raise HTTPException(status_code=404, detail="تحلیل قبلی برای این سایت یافت نشد (پارامتر base را مشخص کنید)")
+        if 'error' in diff:
+            raise HTTPException(status_code=404, detail=f"Dashboard یافت نشد: {diff['analysis_id']}")
+        return diff
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error comparing analyses: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/dashboard/{analysis_id}/content/{content_id}/download")
 async def download_content_file(analysis_id: str, content_id: str):
     """دانلود فایل محتوا"""
@@ -1059,13 +1789,14 @@ async def get_site_rank(analysis_id: str):
         try:
             rank_data = await rank_checker.get_comprehensive_rank(site_url)
             
-            # ذخیره رنک در داشبورد
-            await dashboard_manager.update_dashboard(
-                analysis_id,
-                {
-                    'rank_data': rank_data
-                }
-            )
+            # ذخیره رنک در داشبورد (فقط در صورت تغییر، تا نسخه و ETag داشبورد بی‌دلیل عوض نشود)
+            if dashboard_data.get('data', {}).get('rank_data') != rank_data:
+                await dashboard_manager.update_dashboard(
+                    analysis_id,
+                    {
+                        'rank_data': rank_data
+                    }
+                )
             
             return rank_data
         finally:
@@ -1135,20 +1866,71 @@ async def generate_content_by_keywords(analysis_id: str, request_data: Dict):
 
 
 @app.post("/clear-cache")
-async def clear_dashboard_cache():
-    """پاک کردن تمام داشبوردهای کش شده (برای تست یا رفع مشکل)"""
+async def clear_dashboard_cache(
+    domain: Optional[str] = None,
+    analysis_id: Optional[str] = None,
+    source: Optional[str] = None,
+    all: bool = False
+):
+    """
+    پاک کردن Cache به صورت محدود (بر اساس دامنه، تحلیل یا منبع داده) یا کامل
+    
+    Invalidation با افزایش نسخه Tag ها انجام می‌شود (بدون پیمایش کلیدها).
+    
+    Args:
+        domain: دامنه یا URL سایت
+        analysis_id: شناسه تحلیل
+        source: منبع داده (مثلاً ahrefs یا semrush)
+        all: پاک کردن کل Cache و داشبوردهای کش شده
+    """
     try:
-        from core.dashboard_manager import DashboardManager
-        DashboardManager.clear_all_dashboards()
+        from core.cache import GLOBAL_TAG, analysis_tag, domain_tag, source_tag
+        
+        tags = []
+        if domain:
+            tags.append(domain_tag(domain))
+        if analysis_id:
+            tags.append(analysis_tag(analysis_id))
+        if source:
+            tags.append(source_tag(source))
+        if all:
+            tags.append(GLOBAL_TAG)
+            
+        if not tags:
+            raise HTTPException(
+                status_code=400,
+                detail="At least one of domain, analysis_id, source or all=true is required"
+            )
+            
+        versions = await cache_manager.invalidate_tags(tags)
+        
+        if all:
+            from core.dashboard_manager import DashboardManager
+            await DashboardManager.clear_all_dashboards()
+        elif analysis_id:
+            from core.dashboard_manager import DashboardManager
+            await DashboardManager.clear_dashboard(analysis_id)
+            
         return {
-            'message': 'تمام داشبوردهای کش شده پاک شدند',
+            'message': 'Cache پاک شد' if not all else 'تمام Cache و داشبوردهای کش شده پاک شدند',
+            'invalidated_tags': versions,
             'status': 'success'
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error clearing cache: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """آمار Cache به تفکیک لایه (محلی و Redis) شامل نرخ Hit و حافظه داشبوردها"""
+    from core.dashboard_manager import DashboardManager
+    
+    return {**cache_manager.get_stats(), 'dashboard_memory': DashboardManager.get_memory_stats()}
+
+
 @app.post("/dashboard/{analysis_id}/generate-content")
 async def generate_additional_content(analysis_id: str, content_spec: Dict = None):
     """تولید محتوای اضافی یا تولید مجدد محتوا"""
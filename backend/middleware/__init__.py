@@ -7,10 +7,12 @@ from .security import (
     SecurityHeadersMiddleware,
     RequestLoggingMiddleware
 )
+from .compression import CompressionMiddleware
 
 __all__ = [
     'RateLimitMiddleware',
     'SecurityHeadersMiddleware',
-    'RequestLoggingMiddleware'
+    'RequestLoggingMiddleware',
+    'CompressionMiddleware'
 ]
 
@@ -0,0 +1,189 @@
+"""
+Compression Middleware - فشرده‌سازی پاسخ‌ها با brotli یا gzip
+
+Middleware به صورت ASGI خالص نوشته شده است: پاسخ‌های تک‌قسمتی بالاتر از آستانه یکجا
+فشرده می‌شوند و پاسخ‌های Streaming قسمت به قسمت (بدون نگه داشتن کل بدنه) فشرده و ارسال می‌شوند.
+"""
+
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    # فقط gzip وقتی brotli نصب نیست
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+# نوع‌های محتوایی که فشرده‌سازی برای آن‌ها ارزش دارد (تصاویر و ویدیوها از قبل فشرده هستند)
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/'
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    انتخاب Encoding بر اساس Accept-Encoding کلاینت
+    
+    بالاترین q انتخاب می‌شود و در صورت برابری brotli بر gzip مقدم است.
+    
+    Returns:
+        'br'، 'gzip' یا None
+    """
+    preferences: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        preferences[name] = q
+        
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_q = None, 0.0
+    for encoding in supported:
+        q = preferences.get(encoding, preferences.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """فشرده‌ساز Streaming برای یک پاسخ"""
+    
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 یعنی قالب gzip
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """
+        فشرده‌سازی یک قسمت؛ قسمت‌های میانی Flush می‌شوند تا کلاینت بدون تأخیر آن‌ها را دریافت کند
+        """
+        if self.encoding == 'br':
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Middleware فشرده‌سازی پاسخ‌ها (brotli/gzip) بالاتر از یک آستانه حجم"""
+    
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+            
+        accept_encoding = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+                
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+            
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Wrapper تابع send برای فشرده‌سازی بدنه یک پاسخ"""
+    
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+        
+    def _should_compress(self, headers: List[Tuple[bytes, bytes]], status: int, body: bytes, more_body: bool) -> bool:
+        if status < 200 or status in (204, 304):
+            return False
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        if not content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES):
+            return False
+        # پاسخ‌های Streaming (حجم نامشخص) همیشه فشرده می‌شوند
+        return more_body or len(body) >= self.minimum_size
+        
+    async def send(self, message):
+        message_type = message["type"]
+        
+        if message_type == "http.response.start":
+            # Header ها تا رسیدن اولین قسمت بدنه نگه داشته می‌شوند
+            self.start_message = message
+            return
+            
+        if message_type != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+            
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = list(start.get("headers", []))
+            
+            if not self._should_compress(headers, start["status"], body, more_body):
+                self.passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+                
+            self.compressor = _Compressor(self.encoding)
+            data = self.compressor.compress(body, final=not more_body)
+            
+            new_headers = []
+            vary = None
+            for name, value in headers:
+                if name == b"content-length":
+                    continue
+                if name == b"vary":
+                    vary = value
+                    continue
+                if name == b"etag" and not value.startswith(b"W/"):
+                    # نمایش فشرده همان بایت‌ها نیست، پس ETag قوی به ضعیف تبدیل می‌شود
+                    value = b"W/" + value
+                new_headers.append((name, value))
+            new_headers.append((b"content-encoding", self.encoding.encode()))
+            new_headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+            if not more_body:
+                new_headers.append((b"content-length", str(len(data)).encode()))
+                
+            await self._send({**start, "headers": new_headers})
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+            
+        data = self.compressor.compress(body, final=not more_body)
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -1,117 +1,161 @@
 """
 Security Middleware - برای امنیت API
+
+تمام Middleware ها به صورت ASGI خالص نوشته شده‌اند (بدون BaseHTTPMiddleware): فقط پیام
+http.response.start را تغییر می‌دهند یا می‌خوانند و بدنه پاسخ را بدون نگه داشتن عبور
+می‌دهند، در نتیجه پاسخ‌های Streaming (خروجی‌ها و SSE) قسمت به قسمت به کلاینت می‌رسند.
 """
 
 import logging
-from fastapi import Request, HTTPException
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
 import time
+from typing import Optional
+
+from core.rate_limiter import RateLimiter, rate_limiter
 
 logger = logging.getLogger(__name__)
 
-# Rate Limiting Storage (در Production باید از Redis استفاده شود)
-rate_limit_storage: dict = {}
+# Security Headers (جایگزین Header های هم‌نام پاسخ می‌شوند)
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"content-security-policy", b"default-src 'self'")
+]
+_SECURITY_HEADER_NAMES = frozenset(name for name, _ in SECURITY_HEADERS)
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware برای Rate Limiting"""
+class RateLimitMiddleware:
+    """
+    Middleware برای Rate Limiting (ASGI خالص)
     
-    def __init__(self, app, requests_per_minute: int = 60):
-        super().__init__(app)
-        self.requests_per_minute = requests_per_minute
+    بررسی با RateLimiter (Token Bucket در Store مشترک) انجام می‌شود و Header های
+    X-RateLimit-* هنگام ارسال http.response.start به پاسخ اضافه می‌شوند؛ بدنه پاسخ
+    دست نمی‌خورد.
+    """
     
-    async def dispatch(self, request: Request, call_next):
-        try:
-            # دریافت IP Client
-            client_ip = request.client.host if request.client else "unknown"
-            
-            # بررسی Rate Limit
-            current_time = time.time()
-            minute_window = int(current_time / 60)
-            key = f"{client_ip}:{minute_window}"
+    def __init__(self, app, limiter: Optional[RateLimiter] = None, requests_per_minute: Optional[int] = None):
+        self.app = app
+        if limiter is None and requests_per_minute:
+            limiter = RateLimiter(default=f"{requests_per_minute}/minute")
+        self.limiter = limiter or rate_limiter
+        
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
             
-            # شمارش درخواست‌ها
-            request_count = rate_limit_storage.get(key, 0)
+        api_key = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-api-key":
+                api_key = value.decode("latin-1")
+                break
+        client = scope.get("client")
+        client_host = client[0] if client else None
+        
+        try:
+            result = await self.limiter.check(scope["method"], scope["path"], api_key, client_host)
+        except Exception as e:
+            logger.error(f"Error in RateLimitMiddleware: {str(e)}", exc_info=True)
+            # در صورت خطا، ادامه می‌دهیم بدون Rate Limiting
+            result = None
             
-            if request_count >= self.requests_per_minute:
-                logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-                return Response(
-                    content="Rate limit exceeded",
-                    status_code=429,
-                    headers={"Retry-After": "60"}
-                )
+        if result is None:
+            await self.app(scope, receive, send)
+            return
             
-            # افزایش شمارنده
-            rate_limit_storage[key] = request_count + 1
+        headers = result.headers()
+        if not result.allowed:
+            logger.warning(f"Rate limit exceeded for {'API key' if api_key else 'IP: ' + str(client_host)}")
+            body = b'{"detail":"Rate limit exceeded"}'
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    *headers
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
             
-            # پاک کردن کلیدهای قدیمی
-            for old_key in list(rate_limit_storage.keys()):
-                if old_key != key:
-                    del rate_limit_storage[old_key]
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), *headers]}
+            await send(message)
             
-            # ادامه Request
-            response = await call_next(request)
-            return response
-        except Exception as e:
-            logger.error(f"Error in RateLimitMiddleware: {str(e)}", exc_info=True)
-            # در صورت خطا، ادامه می‌دهیم بدون Rate Limiting
-            return await call_next(request)
+        await self.app(scope, receive, send_with_headers)
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """Middleware برای اضافه کردن Security Headers"""
     
-    async def dispatch(self, request: Request, call_next):
-        try:
-            response = await call_next(request)
+    def __init__(self, app):
+        self.app = app
+        
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
             
-            # اضافه کردن Security Headers
-            response.headers["X-Content-Type-Options"] = "nosniff"
-            response.headers["X-Frame-Options"] = "DENY"
-            response.headers["X-XSS-Protection"] = "1; mode=block"
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-            response.headers["Content-Security-Policy"] = "default-src 'self'"
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = [
+                    (name, value) for name, value in message.get("headers", ())
+                    if name.lower() not in _SECURITY_HEADER_NAMES
+                ]
+                headers.extend(SECURITY_HEADERS)
+                message = {**message, "headers": headers}
+            await send(message)
             
-            return response
+        try:
+            await self.app(scope, receive, send_with_headers)
         except Exception as e:
             logger.error(f"Error in SecurityHeadersMiddleware: {str(e)}", exc_info=True)
             raise
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware برای Logging درخواست‌ها"""
+class RequestLoggingMiddleware:
+    """
+    Middleware برای Logging درخواست‌ها
     
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+    Duration تا ارسال آخرین قسمت بدنه پاسخ محاسبه می‌شود (برای Streaming کل مدت ارسال).
+    """
+    
+    def __init__(self, app):
+        self.app = app
         
-        try:
-            # Log Request
-            logger.info(
-                f"Request: {request.method} {request.url.path} "
-                f"from {request.client.host if request.client else 'unknown'}"
-            )
-            
-            # اجرای Request
-            response = await call_next(request)
-            
-            # محاسبه Duration
-            duration = time.time() - start_time
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
             
-            # Log Response
-            logger.info(
-                f"Response: {request.method} {request.url.path} "
-                f"Status: {response.status_code} Duration: {duration:.3f}s"
-            )
+        start_time = time.time()
+        method, path = scope["method"], scope["path"]
+        client = scope.get("client")
+        status_code = None
+        
+        # Log Request
+        logger.info(f"Request: {method} {path} from {client[0] if client else 'unknown'}")
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
             
-            return response
+        try:
+            await self.app(scope, receive, send_with_status)
         except Exception as e:
             duration = time.time() - start_time
             logger.error(
-                f"Error in RequestLoggingMiddleware: {request.method} {request.url.path} "
+                f"Error in RequestLoggingMiddleware: {method} {path} "
                 f"Duration: {duration:.3f}s Error: {str(e)}",
                 exc_info=True
             )
             raise
-
+            
+        # Log Response
+        duration = time.time() - start_time
+        logger.info(f"Response: {method} {path} Status: {status_code} Duration: {duration:.3f}s")
@@ -2,10 +2,20 @@
 Configuration و Fixtures مشترک برای تمام تست‌ها
 """
 
+import os
+import sys
+import tempfile
+
 import pytest
 import asyncio
 from typing import AsyncGenerator
-from tests.fixtures.mock_data import (
+
+# مسیر backend و تنظیمات محیط تست (پیش از import شدن ماژول‌های backend در تست‌ها)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+os.environ.setdefault('DASHBOARD_PERSISTENCE', 'false')
+os.environ.setdefault('RESULT_STORE_DIR', tempfile.mkdtemp(prefix='test_results_'))
+
+from tests.fixtures.mock_data import (  # noqa: E402
     get_mock_site_analysis,
     get_mock_seo_analysis,
     get_mock_generated_content,
@@ -0,0 +1,121 @@
+"""
+Benchmark مقایسه دو تحلیل یک سایت
+
+مقایسه عمیق ساده (پیمایش بازگشتی دیکشنری‌ها و جستجوی هر آیتم لیست در لیست دیگر)
+با analysis_diff (رکوردهای کلیددار صفحه/مشکل و مقایسه Hash) روی دو اجرای یک سایت
+که در آن حدود 1٪ صفحات حذف، اضافه یا تغییر عنوان داده‌اند و بخشی از مشکلات برطرف شده‌اند.
+
+اجرا:
+    python tests/performance/benchmark_analysis_diff.py [--pages 1000 10000 50000] [--naive-max 5000]
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+# داشبوردها فقط در حافظه ساخته می‌شوند
+os.environ.setdefault('DASHBOARD_PERSISTENCE', 'false')
+os.environ.setdefault('RESULT_STORE_DIR', tempfile.mkdtemp(prefix='bench_results_'))
+
+from tests.fixtures.mock_data import get_mock_site_analysis  # noqa: E402
+from tests.performance.benchmark_cache_codec import build_seo_analysis  # noqa: E402
+from core.analysis_diff import diff_analyses  # noqa: E402
+from core.dashboard_manager import DashboardManager  # noqa: E402
+
+
+def build_runs(pages: int) -> List[Dict[str, Any]]:
+    """دو اجرای یک سایت با تغییرات حدود 1٪ صفحات و مشکلات"""
+    before = build_seo_analysis(pages)
+    for i, page in enumerate(before['technical']['pages']):
+        page['title'] = f"عنوان صفحه {i}"
+    after = copy.deepcopy(before)
+    step = 100
+    after_pages = after['technical']['pages']
+    for page in after_pages[1::step]:
+        page['title'] += ' (ویرایش شده)'
+    for page in after_pages[2::step]:
+        page['status_code'] = 404
+    del after_pages[3::step]
+    after_pages.extend(
+        {'url': f"https://example.com/new/post-{i}", 'status_code': 200, 'title': f"صفحه جدید {i}"}
+        for i in range(pages // step)
+    )
+    after['issues'] = [issue for i, issue in enumerate(after['issues']) if i % step != 5] + [
+        {'type': 'broken_link', 'severity': 'high', 'title': 'لینک شکسته', 'url': f"https://example.com/blog/post-{i}"}
+        for i in range(0, pages, step)
+    ]
+    return [before, after]
+
+
+def naive_diff(before: Any, after: Any, path: str = '') -> List[str]:
+    """مقایسه عمیق بازگشتی (لیست‌ها با جستجوی هر آیتم در لیست دیگر)"""
+    if isinstance(before, dict) and isinstance(after, dict):
+        changes = []
+        for key in set(before) | set(after):
+            changes.extend(naive_diff(before.get(key), after.get(key), f"{path}.{key}"))
+        return changes
+    if isinstance(before, list) and isinstance(after, list):
+        removed = [item for item in before if item not in after]
+        added = [item for item in after if item not in before]
+        return [f"{path}[-]"] * len(removed) + [f"{path}[+]"] * len(added)
+    return [] if before == after else [path]
+
+
+async def snapshots(pages: int) -> List[Dict[str, Any]]:
+    """ساخت دو داشبورد با همان مسیر Pipeline و دریافت داده‌های مقایسه"""
+    manager = DashboardManager()
+    result = []
+    for index, seo_analysis in enumerate(build_runs(pages)):
+        analysis_id = f"bench_diff_{pages}_{index}"
+        await manager.create_dashboard(analysis_id, 'https://example.com')
+        await manager.update_dashboard(analysis_id, {
+            'site_analysis': get_mock_site_analysis(),
+            'seo_analysis': seo_analysis,
+            'status': 'completed'
+        })
+        result.append(await manager.get_analysis_snapshot(analysis_id))
+    return result
+
+
+async def run(args):
+    print(f"{'pages':>7}  {'method':<16}{'time (ms)':>12}  result")
+    for pages in args.pages:
+        before, after = await snapshots(pages)
+        
+        start = time.perf_counter()
+        diff = diff_analyses(before, after)
+        keyed_ms = (time.perf_counter() - start) * 1000
+        summary = diff['summary']
+        print(
+            f"{pages:>7}  {'keyed hash diff':<16}{keyed_ms:>12.1f}  "
+            f"pages +{summary['pages_added']} -{summary['pages_removed']} ~{summary['pages_changed']} "
+            f"(titles {summary['titles_changed']}), issues +{summary['issues_new']} -{summary['issues_fixed']}"
+        )
+        
+        if pages <= args.naive_max:
+            start = time.perf_counter()
+            changes = naive_diff(before['seo_analysis'], after['seo_analysis'])
+            naive_ms = (time.perf_counter() - start) * 1000
+            print(f"{pages:>7}  {'naive deep diff':<16}{naive_ms:>12.1f}  {len(changes)} unkeyed changes")
+        else:
+            print(f"{pages:>7}  {'naive deep diff':<16}{'skipped':>12}  (--naive-max {args.naive_max})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analysis diff benchmark")
+    parser.add_argument('--pages', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--naive-max', type=int, default=5000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark کدک Cache روی Payload های seo_analysis
+
+مقایسه زمان Encode/Decode و حجم ذخیره شده بین قالب قبلی
+(json.dumps(default=str)) و CacheCodec با Serializer/فشرده‌سازی‌های مختلف.
+
+اجرا:
+    python tests/performance/benchmark_cache_codec.py [--pages 200] [--rounds 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from tests.fixtures.mock_data import get_mock_seo_analysis  # noqa: E402
+from core import cache_codec  # noqa: E402
+from core.cache_codec import CacheCodec  # noqa: E402
+
+
+def build_seo_analysis(pages: int) -> Dict[str, Any]:
+    """ساخت Payload با ساختار خروجی SEOAnalyzer.deep_analysis برای تعداد مشخصی صفحه"""
+    now = datetime.now()
+    base = get_mock_seo_analysis()
+    page_urls = [f"https://example.com/blog/post-{i}" for i in range(pages)]
+    
+    return {
+        **base,
+        'url': 'https://example.com',
+        'analyzed_at': now,
+        'technical': {
+            'crawlability': 'good',
+            'indexability': 'good',
+            'robots_txt': {'found': True, 'disallowed': ['/admin', '/cart']},
+            'pages': [
+                {
+                    'url': url,
+                    'status_code': 200,
+                    'response_time': 0.2 + (i % 17) / 10,
+                    'canonical': url,
+                    'last_crawled': now - timedelta(minutes=i)
+                }
+                for i, url in enumerate(page_urls)
+            ]
+        },
+        'content': {
+            'keywords': [{'word': f'کلمه{i}', 'count': 500 - i} for i in range(50)],
+            'readability': 62.5,
+            'readability_status': 'متوسط',
+            'meta_tags': {
+                'pages_with_title': pages - 3,
+                'pages_with_meta_description': pages - 20,
+                'total_pages': pages
+            },
+            'total_words': pages * 850,
+            'unique_words': pages * 120
+        },
+        'images': {
+            'total': pages * 6,
+            'with_alt': pages * 5,
+            'without_alt': pages,
+            'alt_coverage': 83.33,
+            'large_images': pages // 4,
+            'issues': [
+                {'type': 'missing_alt', 'count': pages, 'severity': 'high'},
+                {'type': 'large_images', 'count': pages // 4, 'severity': 'medium'}
+            ]
+        },
+        'headings': {
+            'h1_issues': [
+                {'url': url, 'count': 2, 'headings': ['عنوان اصلی صفحه', 'عنوان تکراری']}
+                for url in page_urls[::5]
+            ],
+            'structure_issues': [
+                {'url': url, 'issue': 'H2 بدون H1'} for url in page_urls[::7]
+            ]
+        },
+        'issues': base['issues'] + [
+            {
+                'type': 'missing_meta_description',
+                'severity': 'medium',
+                'title': 'Meta Description وجود ندارد',
+                'description': f'صفحه {url} فاقد Meta Description است',
+                'recommendation': 'افزودن Meta Description یکتا برای هر صفحه',
+                'url': url
+            }
+            for url in page_urls[::3]
+        ],
+        'pages_analyzed': pages,
+        'total_pages_found': pages * 2
+    }
+
+
+def legacy_encode(value: Any) -> bytes:
+    """قالب قبلی CacheManager.set"""
+    return json.dumps(value, default=str).encode('utf-8')
+
+
+def legacy_decode(data: bytes) -> Any:
+    """قالب قبلی CacheManager.get"""
+    return json.loads(data)
+
+
+def measure(encode: Callable, decode: Callable, value: Any, rounds: int) -> Dict[str, float]:
+    """اندازه‌گیری میانگین زمان Encode/Decode (میکروثانیه) و حجم (بایت)"""
+    encoded = encode(value)
+    
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode(value)
+    encode_us = (time.perf_counter() - start) / rounds * 1e6
+    
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode(encoded)
+    decode_us = (time.perf_counter() - start) / rounds * 1e6
+    
+    return {'encode_us': encode_us, 'decode_us': decode_us, 'bytes': len(encoded)}
+
+
+def available_codecs() -> List[tuple]:
+    """ترکیب‌های قابل اجرا با بسته‌های نصب شده"""
+    codecs = [('json (legacy)', legacy_encode, legacy_decode)]
+    options = [('json', 'none'), ('json', 'zlib')]
+    if cache_codec.zstandard is not None:
+        options.append(('json', 'zstd'))
+    if cache_codec.msgpack is not None:
+        options.extend([('msgpack', 'none'), ('msgpack', 'zlib')])
+        if cache_codec.zstandard is not None:
+            options.append(('msgpack', 'zstd'))
+            
+    for serializer, compression in options:
+        codec = CacheCodec(serializer=serializer, compression=compression, compress_threshold=1024)
+        codecs.append((f"{serializer}+{compression}", codec.encode, codec.decode))
+    return codecs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache codec benchmark")
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 200, 1000])
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+    
+    if cache_codec.msgpack is None:
+        print("msgpack is not installed; msgpack rows are skipped")
+    if cache_codec.zstandard is None:
+        print("zstandard is not installed; zstd rows are skipped")
+        
+    for pages in args.pages:
+        payload = build_seo_analysis(pages)
+        print(f"\nseo_analysis with {pages} pages")
+        print(f"{'codec':<18}{'encode (us)':>14}{'decode (us)':>14}{'bytes':>12}")
+        for name, encode, decode in available_codecs():
+            result = measure(encode, decode, payload, args.rounds)
+            print(f"{name:<18}{result['encode_us']:>14.1f}{result['decode_us']:>14.1f}{result['bytes']:>12}")
+
+
+if __name__ == '__main__':
+    main()
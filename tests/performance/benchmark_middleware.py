@@ -0,0 +1,172 @@
+"""
+Benchmark Stack Middleware ها
+
+مقایسه Stack قبلی (SecurityHeaders، RequestLogging و RateLimit به صورت BaseHTTPMiddleware)
+با Stack فعلی (ASGI خالص) روی همان Route های main.py و همان ترتیب Middleware ها:
+درخواست‌های همزمان به /health و /dashboard/{id} از طریق httpx.ASGITransport و گزارش
+تعداد درخواست در ثانیه و Latency های p50/p99. با --concurrency 1 زمان هر درخواست بدون
+صف و با همزمانی بالاتر، زمان انتظار بین درخواست‌های درهم‌تنیده را هم شامل می‌شود.
+
+اجرا:
+    python tests/performance/benchmark_middleware.py [--requests 5000] [--concurrency 50] [--log]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+# داشبوردها فقط در حافظه؛ محدودیت نرخ بالا تا همه درخواست‌ها پذیرفته شوند
+os.environ.setdefault('DASHBOARD_PERSISTENCE', 'false')
+os.environ.setdefault('RESULT_STORE_DIR', tempfile.mkdtemp(prefix='bench_results_'))
+os.environ.setdefault('RATE_LIMIT_BACKEND', 'memory')
+os.environ.setdefault('RATE_LIMIT_DEFAULT', '1000000000/minute')
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from starlette.middleware import Middleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+
+import main  # noqa: E402
+from core.dashboard_manager import DashboardManager  # noqa: E402
+from core.responses import FastJSONResponse  # noqa: E402
+from middleware.security import RateLimitMiddleware, RequestLoggingMiddleware, SecurityHeadersMiddleware  # noqa: E402
+from tests.fixtures.mock_data import get_mock_seo_analysis, get_mock_site_analysis  # noqa: E402
+
+logger = logging.getLogger('middleware.security')
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """RateLimitMiddleware قبلی (پنجره ثابت در دیکشنری سراسری)"""
+    
+    def __init__(self, app, requests_per_minute: int = 10 ** 9):
+        super().__init__(app)
+        self.requests_per_minute = requests_per_minute
+        self.storage: Dict[str, int] = {}
+        
+    async def dispatch(self, request: Request, call_next):
+        client_ip = request.client.host if request.client else "unknown"
+        key = f"{client_ip}:{int(time.time() / 60)}"
+        request_count = self.storage.get(key, 0)
+        if request_count >= self.requests_per_minute:
+            return Response(content="Rate limit exceeded", status_code=429, headers={"Retry-After": "60"})
+        self.storage[key] = request_count + 1
+        for old_key in list(self.storage.keys()):
+            if old_key != key:
+                del self.storage[old_key]
+        return await call_next(request)
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """SecurityHeadersMiddleware قبلی"""
+    
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        response.headers["Content-Security-Policy"] = "default-src 'self'"
+        return response
+
+
+class LegacyRequestLoggingMiddleware(BaseHTTPMiddleware):
+    """RequestLoggingMiddleware قبلی"""
+    
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        logger.info(
+            f"Request: {request.method} {request.url.path} "
+            f"from {request.client.host if request.client else 'unknown'}"
+        )
+        response = await call_next(request)
+        logger.info(
+            f"Response: {request.method} {request.url.path} "
+            f"Status: {response.status_code} Duration: {time.time() - start_time:.3f}s"
+        )
+        return response
+
+
+LEGACY = {
+    RateLimitMiddleware: LegacyRateLimitMiddleware,
+    SecurityHeadersMiddleware: LegacySecurityHeadersMiddleware,
+    RequestLoggingMiddleware: LegacyRequestLoggingMiddleware
+}
+
+
+def build_app(legacy: bool) -> FastAPI:
+    """اپلیکیشن با Route ها و ترتیب Middleware های main.py"""
+    stack = [
+        Middleware(LEGACY.get(middleware.cls, middleware.cls) if legacy else middleware.cls, **middleware.options)
+        for middleware in main.app.user_middleware
+    ]
+    return FastAPI(routes=main.app.router.routes, middleware=stack, default_response_class=FastJSONResponse)
+
+
+async def load(app: FastAPI, path: str, requests: int, concurrency: int) -> Dict[str, float]:
+    """درخواست‌های همزمان و محاسبه rps و Latency ها (میلی‌ثانیه)"""
+    latencies: List[float] = []
+    transport = httpx.ASGITransport(app=app, client=('10.0.0.1', 50000))
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        async def worker(count: int):
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{path} returned {response.status_code}")
+                    
+        await asyncio.gather(*(worker(max(1, requests // concurrency // 10)) for _ in range(concurrency)))
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2],
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    }
+
+
+async def run(args):
+    if not args.log:
+        # Log هر درخواست در هر دو Stack یکسان است؛ فقط سربار Middleware ها سنجیده می‌شود
+        logger.setLevel(logging.WARNING)
+        
+    analysis_id = 'bench_middleware'
+    manager = DashboardManager()
+    await manager.create_dashboard(analysis_id, 'https://example.com')
+    await manager.update_dashboard(analysis_id, {
+        'site_analysis': get_mock_site_analysis(),
+        'seo_analysis': get_mock_seo_analysis(),
+        'status': 'completed'
+    })
+    
+    apps = {'before (BaseHTTPMiddleware)': build_app(legacy=True), 'after (pure ASGI)': build_app(legacy=False)}
+    print(f"{'path':<28}{'stack':<30}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for path in ('/health', f"/dashboard/{analysis_id}"):
+        for label, app in apps.items():
+            result = await load(app, path, args.requests, args.concurrency)
+            print(f"{path:<28}{label:<30}{result['rps']:>10.0f}{result['p50']:>10.2f}{result['p99']:>10.2f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Middleware stack load benchmark")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--log', action='store_true', help="Log درخواست‌ها در سطح INFO فعال بماند")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main_cli()
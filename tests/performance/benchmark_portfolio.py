@@ -0,0 +1,127 @@
+"""
+Benchmark گزارش تجمیعی (Portfolio)
+
+مقایسه پیمایش دیکشنری هر داشبورد (محاسبه امتیاز و شمارش مشکلات برای هر تحلیل در هر درخواست)
+با PortfolioIndex ستونی (NumPy) برای Query های توزیع امتیاز، رایج‌ترین مشکلات و رتبه‌بندی.
+
+اجرا:
+    python tests/performance/benchmark_portfolio.py [--analyses 1000 10000 50000] [--queries 50]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from core.portfolio import PERCENTILES, PortfolioIndex, portfolio_row  # noqa: E402
+
+ISSUE_TYPES = [f"issue_type_{i}" for i in range(40)]
+WEAKNESSES = ['عدم استفاده از HTTPS', 'عدم وجود Sitemap', 'عدم وجود تگ H1', 'زمان بارگذاری کند']
+CMS_TYPES = ['wordpress', 'joomla', 'shopify', 'custom']
+
+
+def build_dashboards(count: int, sites: int) -> List[Dict[str, Any]]:
+    """داشبوردهای تکمیل شده با داده‌های تصادفی (چند تحلیل برای بعضی سایت‌ها)"""
+    rng = random.Random(7)
+    dashboards = []
+    for i in range(count):
+        site_analysis = {
+            'cms_type': rng.choice(CMS_TYPES),
+            'security': {'ssl_enabled': rng.random() > 0.2, 'security_headers': {'x_frame_options': 'DENY'}},
+            'performance': {'response_time': rng.uniform(0.1, 5.0), 'status_code': 200},
+            'sitemap': {'found': rng.random() > 0.3}
+        }
+        seo_analysis = {
+            'technical': {'crawlability': 'good', 'indexability': rng.choice(['good', 'poor'])},
+            'content': {'readability': rng.uniform(20, 95), 'keywords': [{'word': 'کلمه'}] * rng.randint(0, 50)},
+            'issues': [{'type': rng.choice(ISSUE_TYPES), 'title': 'مشکل'} for _ in range(rng.randint(0, 30))],
+            'pages_analyzed': rng.randint(1, 500)
+        }
+        weaknesses = [
+            {'title': title, 'priority': rng.choice(['high', 'medium', 'low'])}
+            for title in WEAKNESSES if rng.random() > 0.6
+        ]
+        strengths = [{'title': 'نقطه قوت'}] * rng.randint(0, 6)
+        dashboards.append({
+            'analysis_id': f"analysis_{i}",
+            'site_url': f"https://site-{i % sites}.example.com",
+            'status': 'completed',
+            'updated_at': f"2026-01-01T00:00:{i % 60:02d}",
+            'data': {'site_analysis': site_analysis, 'seo_analysis': seo_analysis},
+            'derived': {'strengths': strengths, 'weaknesses': weaknesses}
+        })
+    return dashboards
+
+
+def dict_walk_summary(dashboards: List[Dict[str, Any]], top: int = 10) -> Dict[str, Any]:
+    """مسیر قبلی: محاسبه روی دیکشنری هر داشبورد در هر درخواست"""
+    rows = []
+    for dashboard in dashboards:
+        row = portfolio_row(
+            dashboard['data']['site_analysis'], dashboard['data']['seo_analysis'],
+            dashboard['derived']['strengths'], dashboard['derived']['weaknesses']
+        )
+        rows.append((dashboard, row))
+    scores = sorted(row['metrics']['overall_score'] for _, row in rows)
+    affected = Counter()
+    for _, row in rows:
+        affected.update(row['issues'].keys())
+    return {
+        'mean': statistics.fmean(scores),
+        'percentiles': [scores[int(p / 100 * (len(scores) - 1))] for p in PERCENTILES],
+        'top_issues': affected.most_common(top),
+        'worst': sorted(rows, key=lambda item: item[1]['metrics']['overall_score'])[:top]
+    }
+
+
+def timed(func, queries: int) -> List[float]:
+    timings = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio aggregate reporting benchmark")
+    parser.add_argument('--analyses', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+    
+    print(f"{'analyses':>9}  {'query':<26}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for count in args.analyses:
+        dashboards = build_dashboards(count, sites=max(1, count * 4 // 5))
+        
+        index = PortfolioIndex(sync_interval=0)
+        start = time.perf_counter()
+        for dashboard in dashboards:
+            dashboard['derived']['portfolio'] = portfolio_row(
+                dashboard['data']['site_analysis'], dashboard['data']['seo_analysis'],
+                dashboard['derived']['strengths'], dashboard['derived']['weaknesses']
+            )
+            index.upsert(dashboard['analysis_id'], dashboard)
+        build_ms = (time.perf_counter() - start) * 1000
+        print(f"{count:>9}  {'build index (once)':<26}{build_ms:>10.1f}")
+        
+        walk_queries = max(1, min(args.queries, 200000 // count))
+        for label, func, queries in (
+            ('dict walk summary', lambda: dict_walk_summary(dashboards), walk_queries),
+            ('columnar summary', lambda: index.summary(), args.queries),
+            ('columnar summary (all)', lambda: index.summary(status=None, latest_only=False), args.queries),
+            ('rankings page', lambda: index.rankings('response_time', ascending=False, limit=50, offset=100), args.queries)
+        ):
+            timings = timed(func, queries)
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            print(f"{count:>9}  {label:<26}{statistics.median(timings):>10.2f}{p99:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark سربار Rate Limiting برای هر درخواست
+
+فراخوانی مستقیم RateLimitMiddleware (ASGI خالص) روی یک اپلیکیشن ASGI حداقلی و مقایسه با:
+- بدون Middleware (خط پایه)
+- الگوریتم قبلی (شمارنده پنجره ثابت در دیکشنری سراسری و پیمایش تمام کلیدها برای حذف)
+Store حافظه با یک کلاینت و با تعداد زیادی کلاینت متفاوت، با محدودیت مسیر و API Key،
+و در صورت دادن --redis-url، Store مشترک Redis (اسکریپت Lua) سنجیده می‌شود.
+
+اجرا:
+    python tests/performance/benchmark_rate_limit.py [--requests 100000] [--clients 100000] [--redis-url redis://localhost:6379/15]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from core.rate_limiter import MemoryRateLimitStore, RateLimiter, RedisRateLimitStore  # noqa: E402
+from middleware.security import RateLimitMiddleware  # noqa: E402
+
+# محدودیت‌ها عمداً بالا هستند تا همه درخواست‌ها پذیرفته شوند و فقط سربار سنجیده شود
+HIGH_LIMIT = '1000000000/minute'
+
+
+async def app(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': b'{"status":"ok"}'})
+
+
+async def send(message):
+    pass
+
+
+class LegacyRateLimit:
+    """الگوریتم RateLimitMiddleware قبلی (بدون سربار BaseHTTPMiddleware)"""
+    
+    def __init__(self, inner, requests_per_minute: int):
+        self.app = inner
+        self.requests_per_minute = requests_per_minute
+        self.storage = {}
+        
+    async def __call__(self, scope, receive, send):
+        client_ip = scope['client'][0]
+        key = f"{client_ip}:{int(time.time() / 60)}"
+        request_count = self.storage.get(key, 0)
+        if request_count >= self.requests_per_minute:
+            return
+        self.storage[key] = request_count + 1
+        for old_key in list(self.storage.keys()):
+            if old_key != key:
+                del self.storage[old_key]
+        await self.app(scope, receive, send)
+
+
+def scopes(count: int, clients: int, path: str = '/dashboard/analysis_1', api_key: bytes = None):
+    headers = [(b'accept', b'application/json')] + ([(b'x-api-key', api_key)] if api_key else [])
+    return [
+        {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'headers': headers,
+            'client': (f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 50000)
+        }
+        for i in (n % clients for n in range(count))
+    ]
+
+
+async def measure(asgi, requests):
+    start = time.perf_counter()
+    for scope in requests:
+        await asgi(scope, None, send)
+    return (time.perf_counter() - start) / len(requests) * 1e6
+
+
+async def run(args):
+    single = scopes(args.requests, 1)
+    many = scopes(args.requests, args.clients)
+    routed = scopes(args.requests, args.clients, path='/dashboard/analysis_1/export/pdf', api_key=b'bench-key')
+    
+    def limited(store=None, routes=''):
+        limiter = RateLimiter(
+            default=HIGH_LIMIT, routes=routes, api_keys=f"bench-key={HIGH_LIMIT}", exempt_paths='',
+            backend='memory', store=store or MemoryRateLimitStore()
+        )
+        return RateLimitMiddleware(app, limiter=limiter)
+        
+    cases = [
+        ('no middleware', app, single),
+        ('legacy fixed window, 1 client', LegacyRateLimit(app, 10 ** 9), single),
+        (f"legacy fixed window, {args.clients} clients", LegacyRateLimit(app, 10 ** 9), many),
+        ('token bucket memory, 1 client', limited(), single),
+        (f"token bucket memory, {args.clients} clients", limited(), many),
+        ('memory + route rule + API key', limited(routes=f"/dashboard/*/export*={HIGH_LIMIT}"), routed)
+    ]
+    if args.redis_url:
+        store = RedisRateLimitStore(args.redis_url)
+        await store.connect()
+        await store.client.flushdb()
+        cases.append(('token bucket redis, 1 client', limited(store), single[:args.redis_requests]))
+        cases.append((f"token bucket redis, {args.clients} clients", limited(store), many[:args.redis_requests]))
+        
+    print(f"{'case':<44}{'us/request':>12}{'overhead us':>13}")
+    baseline = None
+    for label, asgi, requests in cases:
+        await measure(asgi, requests[:1000])
+        per_request = await measure(asgi, requests)
+        baseline = per_request if baseline is None else baseline
+        print(f"{label:<44}{per_request:>12.2f}{per_request - baseline:>13.2f}")
+    if args.redis_url:
+        await store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate limiting overhead benchmark")
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--clients', type=int, default=100000)
+    parser.add_argument('--redis-url', default=None)
+    parser.add_argument('--redis-requests', type=int, default=10000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark ساخت و خروجی گزارش سئو
+
+مقایسه ساخت دوباره گزارش در هر درخواست (generate_seo_report) با گزارش Cache شده
+(get_seo_report) و اندازه‌گیری زمان Render خروجی HTML (زمان اولین تکه، زمان کل و
+بیشینه حافظه در حالت Streaming در برابر ساخت یکجای سند) و PDF (در صورت نصب weasyprint).
+
+اجرا:
+    python tests/performance/benchmark_report_export.py [--pages 200 1000 5000] [--rounds 10]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+# داشبوردها فقط در حافظه ساخته می‌شوند
+os.environ.setdefault('DASHBOARD_PERSISTENCE', 'false')
+os.environ.setdefault('RESULT_STORE_DIR', tempfile.mkdtemp(prefix='bench_results_'))
+
+from tests.performance.benchmark_cache_codec import build_seo_analysis  # noqa: E402
+from tests.performance.benchmark_response_serialization import build_site_analysis  # noqa: E402
+from core import report_export  # noqa: E402
+from core.dashboard_manager import DashboardManager  # noqa: E402
+from core.report_generator import ReportGenerator  # noqa: E402
+
+
+async def build_dashboard(pages: int) -> str:
+    analysis_id = f"bench_report_{pages}"
+    manager = DashboardManager()
+    await manager.create_dashboard(analysis_id, 'https://example.com')
+    await manager.update_dashboard(analysis_id, {
+        'site_analysis': build_site_analysis(),
+        'seo_analysis': build_seo_analysis(pages),
+        'status': 'completed'
+    })
+    return analysis_id
+
+
+async def time_async(func, *args, rounds: int) -> float:
+    """میانگین زمان (میلی‌ثانیه)"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await func(*args)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+async def measure_stream(report) -> dict:
+    """زمان اولین تکه، زمان کل و حجم در حالت Streaming"""
+    start = time.perf_counter()
+    first_chunk = None
+    size = 0
+    async for chunk in report_export.stream_report_html(report):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    return {'first_ms': first_chunk * 1000, 'total_ms': total * 1000, 'bytes': size}
+
+
+async def measure_buffered(report) -> dict:
+    """ساخت کل سند در حافظه (مانند یک Template یکجا)"""
+    start = time.perf_counter()
+    body = ''.join(report_export.iter_report_html(report)).encode('utf-8')
+    total = time.perf_counter() - start
+    return {'first_ms': total * 1000, 'total_ms': total * 1000, 'bytes': len(body)}
+
+
+async def peak_memory(measure, report) -> int:
+    """بیشینه حافظه اختصاص یافته هنگام Render (اجرای جداگانه، چون tracemalloc کند است)"""
+    tracemalloc.start()
+    await measure(report)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+async def run(args):
+    generator = ReportGenerator()
+    if report_export.weasyprint is None:
+        print("weasyprint is not installed; PDF rows are skipped")
+        
+    for pages in args.pages:
+        analysis_id = await build_dashboard(pages)
+        report = await generator.generate_seo_report(analysis_id)
+        issues = len(report.get('issues_and_solutions', []))
+        print(f"\n{pages} pages ({issues} issues)")
+        
+        rebuild_ms = await time_async(generator.generate_seo_report, analysis_id, rounds=args.rounds)
+        await generator.get_seo_report(analysis_id)
+        cached_ms = await time_async(generator.get_seo_report, analysis_id, rounds=args.rounds)
+        print(f"{'report':<22}{'time (ms)':>12}")
+        print(f"{'rebuild per request':<22}{rebuild_ms:>12.2f}")
+        print(f"{'cached':<22}{cached_ms:>12.3f}")
+        
+        print(f"{'html':<22}{'first (ms)':>12}{'total (ms)':>12}{'bytes':>12}{'peak MB':>10}")
+        for label, measure in (('buffered', measure_buffered), ('streamed', measure_stream)):
+            result = await measure(report)
+            peak = await peak_memory(measure, report)
+            print(
+                f"{label:<22}{result['first_ms']:>12.2f}{result['total_ms']:>12.2f}"
+                f"{result['bytes']:>12}{peak / 1024 / 1024:>10.2f}"
+            )
+            
+        if report_export.weasyprint is not None:
+            start = time.perf_counter()
+            pdf = await report_export.render_report_pdf(report)
+            render_ms = (time.perf_counter() - start) * 1000
+            size = report_export.file_size(pdf)
+            pdf.close()
+            print(f"{'pdf':<22}{render_ms:>12.2f}{'':>12}{size:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SEO report render benchmark")
+    parser.add_argument('--pages', type=int, nargs='+', default=[200, 1000, 5000])
+    parser.add_argument('--rounds', type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
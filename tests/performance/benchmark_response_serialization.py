@@ -0,0 +1,138 @@
+"""
+Benchmark Serialize و فشرده‌سازی پاسخ‌های API
+
+مقایسه مسیر قبلی FastAPI (jsonable_encoder + JSONResponse) با FastJSONResponse
+و حجم ارسالی با gzip/brotli برای پاسخ‌های /dashboard/{id} و /seo-report.
+
+اجرا:
+    python tests/performance/benchmark_response_serialization.py [--pages 200 1000] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+# داشبوردها فقط در حافظه ساخته می‌شوند
+os.environ.setdefault('DASHBOARD_PERSISTENCE', 'false')
+os.environ.setdefault('RESULT_STORE_DIR', tempfile.mkdtemp(prefix='bench_results_'))
+
+from tests.performance.benchmark_cache_codec import build_seo_analysis  # noqa: E402
+from tests.fixtures.mock_data import get_mock_site_analysis  # noqa: E402
+from core import responses  # noqa: E402
+from core.dashboard_manager import DashboardManager  # noqa: E402
+from core.report_generator import ReportGenerator  # noqa: E402
+from middleware import compression  # noqa: E402
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except ImportError:
+    jsonable_encoder = None
+
+
+def legacy_render(content: Any) -> bytes:
+    """مسیر قبلی: jsonable_encoder و سپس JSONResponse.render"""
+    if jsonable_encoder is not None:
+        content = jsonable_encoder(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def measure(render: Callable[[Any], bytes], content: Any, rounds: int) -> Dict[str, float]:
+    """میانگین زمان (میلی‌ثانیه) و حجم خروجی"""
+    body = render(content)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        render(content)
+    return {'ms': (time.perf_counter() - start) / rounds * 1000, 'bytes': len(body), 'body': body}
+
+
+def measure_compression(body: bytes, encoding: str, rounds: int) -> Dict[str, float]:
+    """میانگین زمان فشرده‌سازی (میلی‌ثانیه) و حجم روی شبکه"""
+    compressed = compression._Compressor(encoding).compress(body, final=True)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        compression._Compressor(encoding).compress(body, final=True)
+    return {'ms': (time.perf_counter() - start) / rounds * 1000, 'bytes': len(compressed)}
+
+
+def build_site_analysis() -> Dict[str, Any]:
+    """site_analysis با ساختار خروجی SiteAnalyzer (security_headers به صورت دیکشنری)"""
+    site_analysis = get_mock_site_analysis()
+    site_analysis['security']['security_headers'] = {
+        'x_frame_options': 'DENY',
+        'x_content_type_options': 'nosniff',
+        'strict_transport_security': None,
+        'content_security_policy': None
+    }
+    return site_analysis
+
+
+async def build_payloads(pages: int) -> Dict[str, Any]:
+    """ساخت داشبورد و گزارش سئو با همان مسیر Endpoint ها"""
+    analysis_id = f"bench_{pages}"
+    manager = DashboardManager()
+    await manager.create_dashboard(analysis_id, 'https://example.com')
+    await manager.update_dashboard(analysis_id, {
+        'site_analysis': build_site_analysis(),
+        'seo_analysis': build_seo_analysis(pages),
+        'generated_content': {
+            'content_items': [
+                {'id': f"content_{i}", 'type': 'text', 'title': f"مقاله {i}", 'content': 'متن مقاله سئو شده. ' * 400}
+                for i in range(pages // 20 + 1)
+            ]
+        },
+        'status': 'completed'
+    })
+    return {
+        '/dashboard/{id}': await manager.get_dashboard_data(analysis_id),
+        '/seo-report': await ReportGenerator().generate_seo_report(analysis_id)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API response serialisation benchmark")
+    parser.add_argument('--pages', type=int, nargs='+', default=[200, 1000])
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    
+    if jsonable_encoder is None:
+        print("fastapi is not installed; legacy row skips jsonable_encoder")
+    if responses.orjson is None:
+        print("orjson is not installed; FastJSONResponse falls back to json")
+    encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+    if compression.brotli is None:
+        print("brotli is not installed; br rows are skipped")
+        
+    for pages in args.pages:
+        payloads = asyncio.run(build_payloads(pages))
+        for endpoint, content in payloads.items():
+            print(f"\n{endpoint} with {pages} pages")
+            print(f"{'variant':<22}{'time (ms)':>12}{'bytes on wire':>16}")
+            
+            legacy = measure(legacy_render, content, args.rounds)
+            fast = measure(responses.dumps, content, args.rounds)
+            print(f"{'legacy json':<22}{legacy['ms']:>12.2f}{legacy['bytes']:>16}")
+            print(f"{'FastJSONResponse':<22}{fast['ms']:>12.2f}{fast['bytes']:>16}")
+            
+            for encoding in encodings:
+                result = measure_compression(fast['body'], encoding, args.rounds)
+                total_ms = fast['ms'] + result['ms']
+                print(f"{'FastJSON + ' + encoding:<22}{total_ms:>12.2f}{result['bytes']:>16}")
+
+
+if __name__ == '__main__':
+    main()
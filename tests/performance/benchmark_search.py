@@ -0,0 +1,150 @@
+"""
+Benchmark جستجوی تحلیل‌ها
+
+مقایسه پیمایش تمام داشبوردها در حافظه (تطبیق رشته‌ای آدرس، CMS، پلاگین‌ها، مشکلات و
+کلمات کلیدی برای هر درخواست) با SearchIndex (SQLite FTS5 و Index های ثانویه) برای
+Query های رایج صفحه جستجو، به همراه زمان ساخت افزایشی Index.
+
+اجرا:
+    python tests/performance/benchmark_search.py [--analyses 1000 10000 50000] [--queries 50]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from core.search_index import SearchIndex, search_document  # noqa: E402
+
+CMS_TYPES = ['wordpress', 'joomla', 'drupal', 'shopify', 'custom']
+PLUGINS = ['yoast', 'woocommerce', 'elementor', 'rank-math', 'wp-rocket', 'wordfence', 'contact-form-7', 'jetpack']
+PLUGINS += [f"plugin-{i}" for i in range(200)]
+ISSUE_TYPES = [f"issue_type_{i}" for i in range(40)]
+WORDS = ['سئو', 'فروشگاه', 'آموزش', 'کفش', 'لپ‌تاپ', 'موبایل', 'خرید', 'قیمت', 'ارزان', 'بهترین']
+WORDS += [f"word{i}" for i in range(2000)]
+STATUSES = ['completed'] * 8 + ['failed', 'processing']
+
+
+def build_dashboards(count: int) -> List[Dict[str, Any]]:
+    """داشبوردهای تصادفی با مقادیر قابل جستجو در derived['search']"""
+    rng = random.Random(11)
+    dashboards = []
+    for i in range(count):
+        site_analysis = {
+            'cms_type': rng.choice(CMS_TYPES),
+            'cms_details': {'plugins': [{'slug': slug, 'name': slug.title()} for slug in rng.sample(PLUGINS, rng.randint(0, 12))]},
+            'technology_stack': {'javascript_libraries': ['jQuery'], 'analytics': ['Google Analytics']}
+        }
+        seo_analysis = {
+            'issues': [{'type': issue_type, 'title': 'مشکل'} for issue_type in rng.sample(ISSUE_TYPES, rng.randint(0, 15))],
+            'content': {'keywords': [{'word': word} for word in rng.sample(WORDS, 50)]}
+        }
+        updated_at = f"2026-01-{1 + i % 28:02d}T{i % 24:02d}:00:{i % 60:02d}.{i:06d}"
+        dashboards.append({
+            'analysis_id': f"analysis_{i}",
+            'site_url': f"https://www.site-{i}.example.com",
+            'status': rng.choice(STATUSES),
+            'created_at': updated_at,
+            'updated_at': updated_at,
+            'version': 2,
+            'derived': {'version': 2, 'search': search_document(site_analysis, seo_analysis, [])}
+        })
+    return dashboards
+
+
+def scan(dashboards: List[Dict[str, Any]], limit: int = 50, **filters) -> Dict[str, Any]:
+    """مسیر بدون Index: بررسی تمام داشبوردها و مرتب‌سازی نتایج در هر درخواست"""
+    matches = []
+    for dashboard in dashboards:
+        document = dashboard['derived']['search']
+        if 'status' in filters and dashboard['status'] != filters['status']:
+            continue
+        if 'cms_type' in filters and document['cms_type'] != filters['cms_type']:
+            continue
+        if 'plugin' in filters and filters['plugin'] not in document['plugins']:
+            continue
+        if 'issue_type' in filters and filters['issue_type'] not in document['issue_types']:
+            continue
+        if 'keyword' in filters and filters['keyword'] not in document['keywords']:
+            continue
+        if 'query' in filters:
+            text = ' '.join([dashboard['site_url'], *document['plugins'], *document['issue_types'], *document['keywords']])
+            if filters['query'] not in text:
+                continue
+        matches.append(dashboard)
+    matches.sort(key=lambda dashboard: dashboard['updated_at'], reverse=True)
+    return {'items': matches[:limit], 'total': len(matches)}
+
+
+async def timed(func, queries: int) -> List[float]:
+    timings = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)
+
+
+async def run(args):
+    print(f"{'analyses':>9}  {'query':<34}{'scan p50':>10}{'index p50':>11}{'index p99':>11}{'total':>8}")
+    for count in args.analyses:
+        dashboards = build_dashboards(count)
+        with tempfile.TemporaryDirectory(prefix='bench_search_') as directory:
+            index = SearchIndex(path=os.path.join(directory, 'search.sqlite3'), enabled=True, flush_interval=3600)
+            await asyncio.to_thread(index._open)
+            
+            start = time.perf_counter()
+            for offset in range(0, count, 500):
+                for dashboard in dashboards[offset:offset + 500]:
+                    index.index_dashboard(dashboard['analysis_id'], dashboard)
+                await index.flush()
+            build_ms = (time.perf_counter() - start) * 1000
+            print(f"{count:>9}  {'build index (incremental)':<34}{'':>10}{build_ms:>11.1f}")
+            
+            page = await index.search(status='completed', limit=50)
+            cases = (
+                ('list newest (completed)', {'status': 'completed'}, {'status': 'completed'}),
+                ('list page 2 (cursor)', {'status': 'completed', 'cursor': page['next_cursor']}, None),
+                ('text: plugin "woocommerce"', {'query': 'woocommerce'}, {'query': 'woocommerce'}),
+                ('text: keyword prefix "word12"', {'query': 'word12'}, {'query': 'word12'}),
+                ('keyword filter "word7"', {'facets': {'keyword': 'word7'}}, {'keyword': 'word7'}),
+                ('site prefix', {'site': 'site-123'}, {'query': 'site-123'}),
+                ('cms + plugin + issue facets', {
+                    'cms_type': 'wordpress', 'facets': {'plugin': 'yoast', 'issue_type': 'issue_type_3'}
+                }, {'cms_type': 'wordpress', 'plugin': 'yoast', 'issue_type': 'issue_type_3'}),
+                ('text + facet counts', {'query': 'yoast', 'facet_counts': True}, {'query': 'yoast'}),
+                ('relevance: "yoast elementor"', {'query': 'yoast elementor', 'sort': 'relevance'}, None)
+            )
+            scan_queries = max(1, min(args.queries, 200000 // count))
+            for label, params, scan_filters in cases:
+                scan_p50 = ''
+                if scan_filters is not None:
+                    scan_timings = await timed(lambda: asyncio.sleep(0, scan(dashboards, **scan_filters)), scan_queries)
+                    scan_p50 = f"{statistics.median(scan_timings):.2f}"
+                result = await index.search(**params)
+                timings = await timed(lambda: index.search(**params), args.queries)
+                p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+                print(
+                    f"{count:>9}  {label:<34}{scan_p50:>10}{statistics.median(timings):>11.2f}"
+                    f"{p99:>11.2f}{result['total']:>8}"
+                )
+            await index.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analysis search benchmark")
+    parser.add_argument('--analyses', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--queries', type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark Time-Series Store
+
+ثبت چند ماه داده مانیتورینگ برای هزاران سایت و اندازه‌گیری زمان Query بازه‌ها
+(24 ساعت، 7 روز، 90 روز) با انتخاب خودکار سطح Rollup.
+
+اجرا:
+    python tests/performance/benchmark_timeseries.py [--sites 1000] [--days 90] [--interval 3600] [--persist]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from core.timeseries import TimeSeriesStore  # noqa: E402
+
+METRICS = ('response_time', 'issues_count')
+
+
+def series_bytes(store: TimeSeriesStore) -> int:
+    """حجم تقریبی ستون‌های نگهداری شده در حافظه"""
+    total = 0
+    for series in store._series.values():
+        for ring in [series.raw, *series.rollups.values()]:
+            total += sum(column.buffer_info()[1] * column.itemsize for column in ring.columns)
+    return total
+
+
+async def run(args):
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_ts_'), 'timeseries.sqlite3')
+    store = TimeSeriesStore(path=path, enabled=args.persist, max_series=args.sites * len(METRICS))
+    await store.connect()
+    
+    end = time.time()
+    start = end - args.days * 86400
+    sites = [f"site-{i}.example.com" for i in range(args.sites)]
+    rng = random.Random(1)
+    
+    began = time.perf_counter()
+    points = 0
+    timestamp = start
+    while timestamp < end:
+        for site in sites:
+            await store.record(site, {
+                'response_time': rng.uniform(0.2, 2.5),
+                'issues_count': float(rng.randint(0, 40))
+            }, timestamp=timestamp)
+            points += len(METRICS)
+        timestamp += args.interval
+    await store.flush()
+    ingest = time.perf_counter() - began
+    
+    print(f"{args.sites} sites x {len(METRICS)} metrics, {args.days} days every {args.interval}s")
+    print(f"ingest: {points} points in {ingest:.1f}s ({points / ingest:,.0f} points/s)")
+    print(f"memory: {series_bytes(store) / 1024 / 1024:.1f} MB in {len(store._series)} series")
+    
+    print(f"\n{'range':<10}{'resolution':>12}{'points':>9}{'p50 (ms)':>11}{'p99 (ms)':>11}")
+    for label, seconds in (('24h', 86400), ('7d', 7 * 86400), ('90d', 90 * 86400)):
+        timings = []
+        for _ in range(args.queries):
+            site = rng.choice(sites)
+            t = time.perf_counter()
+            result = await store.query(site, 'response_time', start=end - seconds, end=end, max_points=500)
+            timings.append((time.perf_counter() - t) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(
+            f"{label:<10}{result['resolution']:>12}{len(result['points']):>9}"
+            f"{statistics.median(timings):>11.3f}{p99:>11.3f}"
+        )
+        
+    if args.persist:
+        # Query های سرد: سری‌ها از SQLite بارگذاری می‌شوند
+        store._series.clear()
+        timings = []
+        for site in rng.sample(sites, min(100, len(sites))):
+            t = time.perf_counter()
+            await store.query(site, 'response_time', start=end - 90 * 86400, end=end)
+            timings.append((time.perf_counter() - t) * 1000)
+        print(f"\ncold 90d query (load from SQLite): p50 {statistics.median(timings):.2f} ms")
+        
+    await store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-series store benchmark")
+    parser.add_argument('--sites', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--interval', type=int, default=3600, help="seconds between checks of each site")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--persist', action='store_true', help="also write to SQLite and measure cold loads")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+تست Admission Controller (اولویت، Weighted Fair Queueing بین Tenant ها و لغو)
+"""
+
+import asyncio
+
+import pytest
+
+from core.admission import AdmissionController, PriorityClass, QueueFullError, get_tenant_id
+
+
+def make_controller(**kwargs):
+    options = {'max_concurrent': 1, 'max_queue': 20, 'reserved_interactive': 0, 'tenant_weights': {}}
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def drain(controller, running, tickets):
+    """آزادسازی پشت سر هم Slot ها و برگرداندن ترتیب اجرای Ticket ها"""
+    order = []
+    while running is not None:
+        controller.release(running)
+        running = next((ticket for ticket in tickets if ticket.admitted), None)
+        if running is not None:
+            order.append(running.analysis_id)
+    return order
+
+
+class TestAdmissionController:
+    """تست صف و Slot های Pipeline"""
+    
+    @pytest.mark.asyncio
+    async def test_weighted_fair_order_across_tenants(self):
+        controller = make_controller(tenant_weights={'key:a': 2.0})
+        running = controller.reserve('busy', PriorityClass.INTERACTIVE, 'ip:other')
+        tickets = [controller.reserve(f"a{i}", PriorityClass.INTERACTIVE, 'key:a') for i in range(4)]
+        tickets += [controller.reserve(f"b{i}", PriorityClass.INTERACTIVE, 'key:b') for i in range(2)]
+        
+        # وزن 2 برای a: به ازای هر کار b دو کار a اجرا می‌شود (بدون گرسنگی b)
+        assert drain(controller, running, tickets) == ['a0', 'b0', 'a1', 'a2', 'b1', 'a3']
+        
+    @pytest.mark.asyncio
+    async def test_higher_priority_class_runs_first(self):
+        controller = make_controller()
+        running = controller.reserve('busy', PriorityClass.BATCH, 'ip:1')
+        batch = controller.reserve('batch', PriorityClass.BATCH, 'ip:1')
+        interactive = controller.reserve('interactive', PriorityClass.INTERACTIVE, 'ip:2')
+        
+        assert controller.get_position(interactive) == 1 and controller.get_position(batch) == 2
+        controller.release(running)
+        assert interactive.admitted and not batch.admitted
+        
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_is_full(self):
+        controller = make_controller(max_queue=2)
+        tickets = [controller.reserve(f"t{i}", PriorityClass.INTERACTIVE, 'ip:1') for i in range(3)]
+        
+        assert tickets[0].admitted and all(t.was_queued for t in tickets[1:])
+        with pytest.raises(QueueFullError) as error:
+            controller.reserve('overflow', PriorityClass.INTERACTIVE, 'ip:1')
+        assert error.value.retry_after >= 1
+        
+        # لغو یک Ticket منتظر جای خالی در صف ایجاد می‌کند
+        controller.cancel(tickets[2])
+        assert controller.reserve('t3', PriorityClass.INTERACTIVE, 'ip:1').was_queued
+        
+    @pytest.mark.asyncio
+    async def test_cancelled_tickets_release_slots(self):
+        controller = make_controller()
+        running = controller.reserve('running', PriorityClass.INTERACTIVE, 'ip:1')
+        waiting = controller.reserve('waiting', PriorityClass.INTERACTIVE, 'ip:1')
+        last = controller.reserve('last', PriorityClass.INTERACTIVE, 'ip:2')
+        
+        # لغو Task منتظر (مثلاً قطع درخواست) Ticket را از صف خارج می‌کند
+        task = asyncio.create_task(controller.wait_for_slot(waiting))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert waiting.cancelled and controller.get_position(last) == 1
+        
+        # لغو Ticket در حال اجرا Slot را آزاد و به Ticket بعدی واگذار می‌کند
+        controller.cancel(running)
+        assert last.admitted and not waiting.admitted
+        await controller.wait_for_slot(last)
+        controller.release(last)
+        assert controller.reserve('next', PriorityClass.INTERACTIVE, 'ip:3').admitted
+        
+    def test_unknown_api_keys_fall_back_to_client_ip(self):
+        known = {get_tenant_id('tenant-a')}
+        
+        assert get_tenant_id('tenant-a', '10.0.0.1', known=known) == get_tenant_id('tenant-a')
+        assert get_tenant_id('random-key', '10.0.0.1', known=known) == 'ip:10.0.0.1'
+        assert get_tenant_id('random-key', None, known=known) == 'anonymous'
+        assert get_tenant_id('random-key', '10.0.0.1').startswith('key:')
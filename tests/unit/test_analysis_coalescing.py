@@ -0,0 +1,92 @@
+"""
+تست ادغام تحلیل‌های همزمان (لغو leader پیش از شروع اجرا)
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('fastapi')
+from fastapi import BackgroundTasks, HTTPException  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+import main  # noqa: E402
+from core.admission import AdmissionController, PriorityClass  # noqa: E402
+from core.analysis_coalescer import make_analysis_key  # noqa: E402
+from core.dashboard_manager import DashboardManager  # noqa: E402
+
+
+class TestAnalysisCoalescing:
+    """تست Leader و Follower های یک تحلیل"""
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_queued_leader_fails_followers(self, monkeypatch):
+        controller = AdmissionController(max_concurrent=1, max_queue=5, reserved_interactive=0, tenant_weights={})
+        monkeypatch.setattr(main, 'admission_controller', controller)
+        running = controller.reserve('busy', PriorityClass.INTERACTIVE, 'ip:1')
+        
+        manager = DashboardManager()
+        key = make_analysis_key('https://coalesce.example.com', True, ['text'])
+        for analysis_id in ('leader_1', 'follower_1', 'follower_2'):
+            await manager.create_dashboard(analysis_id, 'https://coalesce.example.com')
+            main.analysis_coalescer.join(key, analysis_id)
+        ticket = controller.reserve('leader_1', PriorityClass.INTERACTIVE, 'ip:2')
+        assert not ticket.admitted
+        
+        task = asyncio.create_task(main.run_admitted_pipeline(
+            ticket, 'leader_1', 'https://coalesce.example.com', True, ['text'], key
+        ))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+            
+        for analysis_id in ('leader_1', 'follower_1', 'follower_2'):
+            meta = await manager.get_dashboard_meta(analysis_id)
+            assert meta['status'] == 'failed'
+        assert main.analysis_coalescer.get_leader(key) is None
+        assert ticket.cancelled and controller.get_position(ticket) == 0
+        controller.release(running)
+        
+    @pytest.mark.asyncio
+    async def test_failed_start_releases_key_and_fails_followers(self, monkeypatch):
+        controller = AdmissionController(max_concurrent=2, max_queue=5, reserved_interactive=0, tenant_weights={})
+        monkeypatch.setattr(main, 'admission_controller', controller)
+        manager = DashboardManager()
+        url = 'https://start-failure.example.com'
+        key = make_analysis_key(url, True, ['text'])
+        gate = asyncio.Event()
+        original_create = DashboardManager.create_dashboard
+        created = []
+        
+        async def create_dashboard(self, analysis_id, site_url):
+            created.append(analysis_id)
+            dashboard_url = await original_create(self, analysis_id, site_url)
+            if len(created) == 1:
+                await gate.wait()
+                raise OSError("database is unavailable")
+            return dashboard_url
+            
+        monkeypatch.setattr(DashboardManager, 'create_dashboard', create_dashboard)
+        
+        def call():
+            http_request = Request({'type': 'http', 'method': 'POST', 'headers': [], 'client': ('10.0.0.1', 1)})
+            return main.analyze_and_optimize_site(
+                main.SiteRequest(url=url, content_types=['text']), BackgroundTasks(), http_request
+            )
+            
+        leader = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        # follower در حین await داشبورد leader به آن ملحق می‌شود
+        follower = await call()
+        assert follower.initial_findings['coalesced_with'] == created[0]
+        
+        gate.set()
+        with pytest.raises(HTTPException) as error:
+            await leader
+        assert error.value.status_code == 500
+        
+        assert main.analysis_coalescer.get_leader(key) is None
+        assert (await manager.get_dashboard_meta(follower.analysis_id))['status'] == 'failed'
+        # Slot رزرو شده leader آزاد شده است
+        assert controller.get_stats()['running'] == 0
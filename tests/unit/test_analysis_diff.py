@@ -0,0 +1,83 @@
+"""
+تست مقایسه ساختاری دو تحلیل یک سایت
+"""
+
+from core.analysis_diff import change_alerts, diff_analyses, issue_records
+
+
+def make_snapshot(analysis_id, pages, issues, overall_score, weaknesses=None, ssl_enabled=True):
+    return {
+        'analysis_id': analysis_id,
+        'site_url': 'https://example.com',
+        'created_at': f"2026-01-0{analysis_id[-1]}T00:00:00",
+        'site_analysis': {'security': {'ssl_enabled': ssl_enabled}},
+        'seo_analysis': {
+            'technical': {'pages': pages, 'analyzed_at': analysis_id},
+            'headings': {'pages_without_h1': [page['url'] for page in pages if page.get('h1') is None]},
+            'issues': issues
+        },
+        'derived': {
+            'weaknesses': weaknesses or [],
+            'portfolio': {'metrics': {'overall_score': overall_score}},
+            'search': {'plugins': ['yoast'], 'technologies': [], 'keywords': []}
+        }
+    }
+
+
+def page(path, title, status_code=200, h1='سلام'):
+    return {'url': f"https://example.com{path}", 'title': title, 'status_code': status_code, 'h1': h1}
+
+
+class TestAnalysisDiff:
+    """تست diff_analyses و هشدارهای تغییرات"""
+    
+    def test_pages_issues_and_scores(self):
+        before = make_snapshot('a1', [page('/', 'خانه'), page('/blog', 'بلاگ'), page('/old', 'قدیمی')], [
+            {'type': 'missing_alt', 'url': 'https://example.com/blog', 'severity': 'medium'},
+            {'type': 'broken_link', 'url': 'https://example.com/old', 'severity': 'high'}
+        ], 70)
+        after = make_snapshot('a2', [page('/', 'خانه'), page('/blog', 'بلاگ جدید', h1=None), page('/new', 'جدید')], [
+            {'type': 'missing_alt', 'url': 'https://example.com/blog', 'severity': 'medium'},
+            {'type': 'missing_h1', 'url': 'https://example.com/blog', 'severity': 'high'}
+        ], 62.5)
+        
+        diff = diff_analyses(before, after)
+        summary = diff['summary']
+        
+        assert (summary['pages_added'], summary['pages_removed'], summary['pages_changed']) == (1, 1, 1)
+        assert summary['pages_unchanged'] == 1 and summary['titles_changed'] == 1
+        assert diff['pages']['added'] == ['https://example.com/new'] and len(diff['pages']['removed']) == 1
+        fields = {change['field'] for change in diff['pages']['changed'][0]['changes']}
+        assert {'technical.pages.title', 'headings.pages_without_h1'} <= fields
+        assert (summary['issues_new'], summary['issues_fixed'], summary['high_priority_new']) == (1, 1, 1)
+        assert summary['score_delta'] == -7.5
+        assert diff['site']['changes'] == []
+        
+    def test_duplicate_weakness_titles_are_not_positional(self):
+        weaknesses = [
+            {'title': 'تصویر بدون Alt', 'description': f"صفحه {i}", 'priority': 'medium'} for i in range(3)
+        ]
+        before = issue_records({}, weaknesses)
+        after = issue_records({}, list(reversed(weaknesses)))
+        
+        assert set(before) == set(after) and len(before) == 3
+        diff = diff_analyses(
+            make_snapshot('a1', [], [], 50, weaknesses=weaknesses),
+            make_snapshot('a2', [], [], 50, weaknesses=weaknesses[1:][::-1])
+        )
+        assert (diff['summary']['issues_fixed'], diff['summary']['issues_changed']) == (1, 0)
+        assert diff['issues']['fixed'][0]['description'] == 'صفحه 0'
+        
+    def test_change_alerts(self):
+        before = make_snapshot('a1', [page('/', 'خانه')], [], 80)
+        after = make_snapshot('a2', [page('/', 'خانه')], [
+            {'type': 'broken_link', 'url': 'https://example.com/', 'severity': 'high'}
+        ], 60, ssl_enabled=False)
+        
+        alerts = change_alerts(diff_analyses(before, after))
+        messages = ' | '.join(alert['message'] for alert in alerts)
+        
+        assert all(alert['category'] == 'change' for alert in alerts)
+        assert 'کاهش' in messages and 'HTTPS' in messages and '1 مشکل جدید' in messages
+        assert sum(alert['priority'] == 'high' for alert in alerts) == 3
+        assert change_alerts(diff_analyses(before, before)) == []
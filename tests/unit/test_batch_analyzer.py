@@ -0,0 +1,140 @@
+"""
+تست Batch Analyzer (محدودیت همزمانی Host/سراسری، لغو با قطع Client و خطای یک سایت)
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from core import batch_analyzer  # noqa: E402
+from core.admission import AdmissionController  # noqa: E402
+from core.batch_analyzer import BatchAnalysisScheduler  # noqa: E402
+from core.dashboard_manager import DashboardManager  # noqa: E402
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    controller = AdmissionController(max_concurrent=10, max_queue=20, reserved_interactive=0, tenant_weights={})
+    monkeypatch.setattr(batch_analyzer, 'admission_controller', controller)
+    return controller
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """analysis_id داشبوردهای ساخته شده بر اساس URL"""
+    created = {}
+    original_create = DashboardManager.create_dashboard
+    
+    async def create_dashboard(self, analysis_id, site_url):
+        created[site_url] = analysis_id
+        return await original_create(self, analysis_id, site_url)
+        
+    monkeypatch.setattr(DashboardManager, 'create_dashboard', create_dashboard)
+    return created
+
+
+class FakePipeline:
+    """جایگزین _run_pipeline که تا آزاد شدن gate منتظر می‌ماند و همزمانی را ثبت می‌کند"""
+    
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.running = []
+        self.max_running = 0
+        
+    async def __call__(self, analysis_id, url, auto_implement, content_types, http_client):
+        self.running.append(url)
+        self.max_running = max(self.max_running, len(self.running))
+        try:
+            await self.gate.wait()
+        finally:
+            self.running.remove(url)
+        return {'type': 'result', 'analysis_id': analysis_id, 'url': url, 'status': 'completed', 'duration': 0.0}
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+class TestBatchAnalysisScheduler:
+    """تست اجرای دسته‌ای"""
+    
+    @pytest.mark.asyncio
+    async def test_busy_host_does_not_hold_global_slots(self, controller, created):
+        scheduler = BatchAnalysisScheduler(max_concurrency=2, per_host_concurrency=1)
+        pipeline = FakePipeline()
+        scheduler._run_pipeline = pipeline
+        urls = ['https://a.example.com/1', 'https://a.example.com/2', 'https://a.example.com/3', 'https://b.example.com']
+        
+        task = asyncio.create_task(collect(scheduler.stream(urls)))
+        await asyncio.sleep(0.1)
+        # کارهای منتظر Host a نباید Slot سراسری سایت b را بگیرند
+        assert sorted(pipeline.running) == ['https://a.example.com/1', 'https://b.example.com']
+        
+        pipeline.gate.set()
+        items = await task
+        assert pipeline.max_running == 2
+        assert items[-1]['type'] == 'summary' and items[-1]['completed'] == 4
+        
+    @pytest.mark.asyncio
+    async def test_client_disconnect_marks_dashboards_failed(self, controller, created):
+        scheduler = BatchAnalysisScheduler(max_concurrency=1, per_host_concurrency=1)
+        pipeline = FakePipeline()
+        scheduler._run_pipeline = pipeline
+        urls = ['https://a.example.com', 'https://b.example.com', 'https://c.example.com']
+        
+        task = asyncio.create_task(collect(scheduler.stream(urls)))
+        await asyncio.sleep(0.1)
+        assert len(pipeline.running) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+            
+        manager = DashboardManager()
+        assert len(created) == 3
+        for analysis_id in created.values():
+            meta = await manager.get_dashboard_meta(analysis_id)
+            assert meta['status'] == 'failed'
+        assert controller.get_stats()['running'] == 0 and controller.get_stats()['queued'] == 0
+        assert scheduler._host_semaphores == {}
+        
+    @pytest.mark.asyncio
+    async def test_site_failure_becomes_failed_result_line(self, controller, monkeypatch):
+        scheduler = BatchAnalysisScheduler(max_concurrency=2, per_host_concurrency=1)
+        pipeline = FakePipeline()
+        pipeline.gate.set()
+        scheduler._run_pipeline = pipeline
+        original_create = DashboardManager.create_dashboard
+        
+        async def create_dashboard(self, analysis_id, site_url):
+            if site_url == 'https://broken.example.com':
+                raise OSError("database is unavailable")
+            return await original_create(self, analysis_id, site_url)
+            
+        monkeypatch.setattr(DashboardManager, 'create_dashboard', create_dashboard)
+        
+        items = await collect(scheduler.stream(['https://ok.example.com', 'https://broken.example.com']))
+        results = {item['url']: item for item in items if item['type'] == 'result'}
+        
+        assert results['https://broken.example.com']['status'] == 'failed'
+        assert results['https://broken.example.com']['error'] == 'database is unavailable'
+        assert results['https://ok.example.com']['status'] == 'completed'
+        assert items[-1]['type'] == 'summary' and items[-1]['completed'] == 1 and items[-1]['failed'] == 1
+        
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded_by_batch_pipeline_slots(self, monkeypatch):
+        controller = AdmissionController(max_concurrent=4, max_queue=20, reserved_interactive=1, tenant_weights={})
+        monkeypatch.setattr(batch_analyzer, 'admission_controller', controller)
+        monkeypatch.delenv('BATCH_MAX_CONCURRENCY', raising=False)
+        
+        # یک Slot برای interactive رزرو شده است
+        assert BatchAnalysisScheduler().max_concurrency == 3
+        assert BatchAnalysisScheduler(max_concurrency=16).max_concurrency == 3
+        assert BatchAnalysisScheduler(max_concurrency=2).max_concurrency == 2
+        
+        scheduler = BatchAnalysisScheduler(max_concurrency=16)
+        stream = scheduler.stream([])
+        started = await stream.__anext__()
+        assert started['max_concurrency'] == 3 and started['pipeline_slots'] == 3
+        await stream.aclose()
@@ -0,0 +1,281 @@
+"""
+تست Backend های Cache
+همان مجموعه تست برای Redis و SQLite اجرا می‌شود (Redis فقط در صورت تنظیم TEST_REDIS_URL)
+"""
+
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from core.cache import GLOBAL_TAG, CacheManager, domain_tag
+from core.cache_backends import CacheBackend, RedisCacheBackend, SQLiteCacheBackend
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+async def backend(request, tmp_path):
+    """Backend متصل (هر تست روی هر دو Backend اجرا می‌شود)"""
+    if request.param == 'sqlite':
+        cache_backend = SQLiteCacheBackend(path=str(tmp_path / 'cache.sqlite3'), poll_interval=0.05)
+    else:
+        redis_url = os.getenv('TEST_REDIS_URL')
+        if not redis_url:
+            pytest.skip("TEST_REDIS_URL is not set")
+        cache_backend = RedisCacheBackend(redis_url)
+        
+    try:
+        await cache_backend.connect()
+    except Exception as e:
+        pytest.skip(f"{request.param} backend unavailable: {e}")
+        
+    yield cache_backend
+    await cache_backend.close()
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+async def workers(request, tmp_path):
+    """دو CacheManager متصل به یک Backend مشترک (مانند دو Worker)"""
+    if request.param == 'sqlite':
+        path = str(tmp_path / 'cache.sqlite3')
+        make_backend = lambda: SQLiteCacheBackend(path=path, poll_interval=0.05)  # noqa: E731
+    else:
+        redis_url = os.getenv('TEST_REDIS_URL')
+        if not redis_url:
+            pytest.skip("TEST_REDIS_URL is not set")
+        make_backend = lambda: RedisCacheBackend(redis_url)  # noqa: E731
+        
+    managers = [CacheManager(backend=make_backend(), local_ttl=60) for _ in range(2)]
+    for manager in managers:
+        await manager.connect()
+        if not manager._connected:
+            pytest.skip(f"{request.param} backend unavailable")
+            
+    yield managers
+    for manager in managers:
+        await manager.close()
+
+
+@pytest.fixture
+def prefix():
+    """پیشوند یکتا برای جدا کردن کلیدهای هر تست"""
+    return f"test:{uuid.uuid4().hex}:"
+
+
+class TestCacheBackendContract:
+    """تست رابط CacheBackend"""
+    
+    def test_incomplete_backend_fails_on_construction(self):
+        class PartialBackend(CacheBackend):
+            async def get_many(self, keys):
+                return [(None, -2) for _ in keys]
+                
+        with pytest.raises(TypeError):
+            PartialBackend()
+            
+    @pytest.mark.asyncio
+    async def test_set_and_get_many(self, backend, prefix):
+        await backend.set_many({f"{prefix}a": b"1", f"{prefix}b": b"2"}, ttl=60)
+        
+        values = await backend.get_many([f"{prefix}a", f"{prefix}missing", f"{prefix}b"])
+        
+        assert [value for value, _ in values] == [b"1", None, b"2"]
+        assert 0 < values[0][1] <= 60
+        assert values[1][1] == -2
+        
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self, backend, prefix):
+        await backend.set_many({f"{prefix}short": b"x"}, ttl=1)
+        await asyncio.sleep(1.2)
+        
+        [(value, ttl)] = await backend.get_many([f"{prefix}short"])
+        
+        assert value is None
+        assert ttl == -2
+        
+    @pytest.mark.asyncio
+    async def test_overwrite_and_delete(self, backend, prefix):
+        await backend.set_many({f"{prefix}k": b"old"}, ttl=60)
+        await backend.set_many({f"{prefix}k": b"new"}, ttl=60)
+        assert (await backend.get_many([f"{prefix}k"]))[0][0] == b"new"
+        
+        await backend.delete_many([f"{prefix}k"])
+        assert (await backend.get_many([f"{prefix}k"]))[0][0] is None
+        
+    @pytest.mark.asyncio
+    async def test_counters(self, backend, prefix):
+        assert await backend.get_counters([f"{prefix}c1"]) == [0]
+        
+        assert await backend.incr_many([f"{prefix}c1", f"{prefix}c2"]) == [1, 1]
+        assert await backend.incr_many([f"{prefix}c1"]) == [2]
+        assert await backend.get_counters([f"{prefix}c1", f"{prefix}c2"]) == [2, 1]
+        
+    @pytest.mark.asyncio
+    async def test_lock_ownership(self, backend, prefix):
+        name = f"{prefix}lock"
+        
+        assert await backend.acquire_lock(name, 'owner', timeout=5)
+        assert not await backend.acquire_lock(name, 'other', timeout=5)
+        assert await backend.lock_exists(name)
+        
+        # فقط دارنده Lock می‌تواند آن را آزاد کند
+        await backend.release_lock(name, 'other')
+        assert await backend.lock_exists(name)
+        await backend.release_lock(name, 'owner')
+        assert not await backend.lock_exists(name)
+        
+    @pytest.mark.asyncio
+    async def test_lock_expiry(self, backend, prefix):
+        name = f"{prefix}lock"
+        
+        assert await backend.acquire_lock(name, 'owner', timeout=0.2)
+        await asyncio.sleep(0.4)
+        
+        assert not await backend.lock_exists(name)
+        assert await backend.acquire_lock(name, 'other', timeout=5)
+        
+    @pytest.mark.asyncio
+    async def test_publish_and_listen(self, backend, prefix):
+        received = []
+        
+        async def listen():
+            async for message in backend.listen():
+                message = message.decode() if isinstance(message, bytes) else message
+                if message.startswith(prefix):
+                    received.append(message)
+                    return
+                    
+        listener = asyncio.create_task(listen())
+        await asyncio.sleep(0.2)
+        await backend.publish(f"{prefix}hello")
+        await asyncio.wait_for(listener, timeout=5)
+        
+        assert received == [f"{prefix}hello"]
+
+
+class TestCacheManagerOnBackend:
+    """تست CacheManager روی هر Backend"""
+    
+    @pytest.fixture
+    async def manager(self, backend):
+        cache = CacheManager(backend=backend, local_ttl=60)
+        cache._connected = True
+        yield cache
+        cache.local.clear()
+        
+    @pytest.mark.asyncio
+    async def test_round_trip_through_remote_tier(self, manager, prefix):
+        await manager.set(f"{prefix}key", {'score': 85, 'issues': ['a', 'b']}, ttl=60)
+        manager.local.clear()
+        
+        assert await manager.get(f"{prefix}key") == {'score': 85, 'issues': ['a', 'b']}
+        assert manager.stats['remote_hits'] == 1
+        
+    @pytest.mark.asyncio
+    async def test_get_or_set_computes_once(self, manager, prefix):
+        calls = 0
+        
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return 'value'
+            
+        results = await asyncio.gather(*[manager.get_or_set(f"{prefix}key", compute, 60) for _ in range(20)])
+        
+        assert results == ['value'] * 20
+        assert calls == 1
+        
+    @pytest.mark.asyncio
+    async def test_tag_invalidation(self, manager, prefix):
+        tags = [domain_tag(f"{prefix.strip(':')}.example.com")]
+        await manager.set(f"{prefix}key", 'value', ttl=60, tags=tags)
+        
+        await manager.invalidate_tags(tags)
+        
+        assert await manager.get(f"{prefix}key", tags=tags) is None
+
+
+class TestTagInvalidationAcrossWorkers:
+    """تست Invalidation با Tag در هر دو لایه و از طریق کانال Invalidation هر Backend"""
+    
+    @pytest.mark.asyncio
+    async def test_invalidated_tag_misses_in_both_tiers_on_every_worker(self, workers, prefix):
+        worker_a, worker_b = workers
+        tags = [domain_tag(f"{prefix.strip(':')}.example.com")]
+        other_tags = [domain_tag(f"other-{prefix.strip(':')}.example.com")]
+        await worker_a.set(f"{prefix}key", 'value', ttl=60, tags=tags)
+        await worker_a.set(f"{prefix}other", 'other', ttl=60, tags=other_tags)
+        
+        # Worker B نسخه Tag و مقدار را در لایه محلی خود نگه می‌دارد
+        assert await worker_b.get(f"{prefix}key", tags=tags) == 'value'
+        assert worker_b.stats['remote_hits'] == 1
+        received = worker_b.stats['invalidations_received']
+        
+        await worker_a.invalidate_tags(tags)
+        for _ in range(50):
+            if worker_b.stats['invalidations_received'] > received:
+                break
+            await asyncio.sleep(0.1)
+        assert worker_b.stats['invalidations_received'] > received
+        
+        for worker in workers:
+            assert await worker.get(f"{prefix}key", tags=tags) is None
+            worker.local.clear()
+            assert await worker.get(f"{prefix}key", tags=tags) is None
+            # کلیدهای Tag های دیگر نامعتبر نشده‌اند
+            assert await worker.get(f"{prefix}other", tags=other_tags) == 'other'
+            
+    @pytest.mark.asyncio
+    async def test_global_tag_clears_untagged_keys(self, workers, prefix):
+        worker_a, worker_b = workers
+        await worker_a.set(f"{prefix}plain", 'value', ttl=60)
+        assert await worker_b.get(f"{prefix}plain") == 'value'
+        
+        await worker_b.invalidate_tags([GLOBAL_TAG])
+        
+        assert await worker_b.get(f"{prefix}plain") is None
+        worker_a.local.clear()
+        worker_a._tag_versions.clear()
+        assert await worker_a.get(f"{prefix}plain") is None
+
+
+class TestSQLiteBackend:
+    """رفتارهای مخصوص Backend محلی"""
+    
+    @pytest.mark.asyncio
+    async def test_size_based_eviction(self, tmp_path):
+        backend = SQLiteCacheBackend(path=str(tmp_path / 'cache.sqlite3'), max_bytes=10_000)
+        await backend.connect()
+        
+        for i in range(50):
+            await backend.set_many({f"key:{i}": b"x" * 1000}, ttl=60 + i)
+            
+        stats = backend.get_stats()
+        assert stats['bytes'] <= 10_000
+        assert stats['evictions'] > 0
+        
+        # نزدیک‌ترین کلیدها به انقضا حذف می‌شوند
+        values = await backend.get_many(["key:0", "key:49"])
+        assert values[0][0] is None
+        assert values[1][0] is not None
+        await backend.close()
+        
+    @pytest.mark.asyncio
+    async def test_shared_between_workers(self, tmp_path):
+        path = str(tmp_path / 'cache.sqlite3')
+        worker_a = CacheManager(backend=SQLiteCacheBackend(path=path, poll_interval=0.05))
+        worker_b = CacheManager(backend=SQLiteCacheBackend(path=path, poll_interval=0.05))
+        await worker_a.connect()
+        await worker_b.connect()
+        
+        await worker_a.set('shared', 'v1', ttl=60)
+        assert await worker_b.get('shared') == 'v1'
+        
+        # تغییر در یک Worker نسخه محلی Worker دیگر را حذف می‌کند
+        await worker_a.set('shared', 'v2', ttl=60)
+        await asyncio.sleep(0.3)
+        assert await worker_b.get('shared') == 'v2'
+        
+        await worker_a.close()
+        await worker_b.close()
@@ -0,0 +1,75 @@
+"""
+تست Cache Codec (Round-trip با msgpack/zstd و JSON/zlib و Header های نامعتبر)
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from core import cache_codec
+from core.cache_codec import CacheCodec, CodecError
+
+
+VALUE = {
+    'analysis_id': 'a1',
+    'created_at': datetime(2026, 1, 2, 3, 4, 5),
+    'day': date(2026, 1, 2),
+    'pages': [{'url': f"https://example.com/{i}", 'title': 'صفحه'} for i in range(100)],
+    'tags': {'seo'}
+}
+
+
+class TestCacheCodec:
+    """تست encode/decode"""
+    
+    def test_msgpack_zstd_round_trip(self):
+        pytest.importorskip('msgpack')
+        pytest.importorskip('zstandard')
+        codec = CacheCodec(serializer='msgpack', compression='zstd', compress_threshold=0)
+        
+        encoded = codec.encode({**VALUE, 'by_status': {200: 5, 404: 1}})
+        decoded = codec.decode(encoded)
+        
+        assert encoded[2] == cache_codec.SERIALIZER_MSGPACK | (cache_codec.COMPRESSION_ZSTD << 4)
+        assert decoded['created_at'] == VALUE['created_at'] and decoded['day'] == VALUE['day']
+        assert decoded['pages'] == VALUE['pages'] and decoded['tags'] == ['seo']
+        # msgpack کلیدهای غیر رشته‌ای را حفظ می‌کند
+        assert decoded['by_status'] == {200: 5, 404: 1}
+        
+    def test_json_zlib_fallback_when_optional_packages_are_missing(self, monkeypatch):
+        monkeypatch.setattr(cache_codec, 'msgpack', None)
+        monkeypatch.setattr(cache_codec, 'zstandard', None)
+        codec = CacheCodec(serializer='msgpack', compression='zstd', compress_threshold=0)
+        
+        assert codec.describe()['serializer'] == 'json' and codec.describe()['compression'] == 'zlib'
+        decoded = codec.decode(codec.encode({**VALUE, 'by_status': {200: 5}}))
+        
+        assert decoded['created_at'] == VALUE['created_at'] and decoded['day'] == VALUE['day']
+        assert decoded['pages'] == VALUE['pages']
+        # JSON کلیدهای غیر رشته‌ای را به رشته تبدیل می‌کند
+        assert decoded['by_status'] == {'200': 5}
+        
+    def test_values_written_with_other_settings_are_readable(self):
+        pytest.importorskip('msgpack')
+        pytest.importorskip('zstandard')
+        writer = CacheCodec(serializer='msgpack', compression='zstd', compress_threshold=0)
+        reader = CacheCodec(serializer='json', compression='none')
+        
+        assert reader.decode(writer.encode(VALUE))['created_at'] == VALUE['created_at']
+        assert reader.decode(b'{"legacy": true}') == {'legacy': True}
+        
+    def test_corrupted_and_unknown_headers_raise_codec_error(self):
+        codec = CacheCodec(serializer='json', compression='zlib', compress_threshold=0)
+        encoded = codec.encode(VALUE)
+        
+        invalid = [
+            encoded[:1] + bytes((9,)) + encoded[2:],                   # نسخه ناشناخته
+            encoded[:2] + bytes((0x0F,)) + encoded[3:],                # Serializer ناشناخته
+            encoded[:2] + bytes((0xF0,)) + encoded[3:],                # فشرده‌سازی ناشناخته
+            encoded[:cache_codec.HEADER_SIZE] + b'not zlib data',      # Payload خراب
+            encoded[:-10],                                             # Payload ناقص
+            b'\xff\xfe garbage'                                        # بدون Header و JSON نامعتبر
+        ]
+        for data in invalid:
+            with pytest.raises(CodecError):
+                codec.decode(data)
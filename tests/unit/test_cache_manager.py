@@ -0,0 +1,189 @@
+"""
+تست CacheManager (محافظت در برابر Cache Stampede و memoize)
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+from core.cache import CachedFailureError, CacheManager
+from core.cache_backends import SQLiteCacheBackend
+
+
+@pytest.fixture
+def key():
+    return f"test:{uuid.uuid4().hex}"
+
+
+class CountingLoader:
+    """Loader کند با شمارش فراخوانی‌ها (تا آزاد شدن gate منتظر می‌ماند)"""
+    
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.gate = asyncio.Event()
+        
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.gate.wait()
+        return self.values[min(self.calls, len(self.values)) - 1]
+
+
+class TestCacheStampede:
+    """تست Singleflight، Lock بین Worker ها و stale-while-revalidate"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_across_workers_load_once(self, tmp_path, key):
+        path = str(tmp_path / 'cache.sqlite3')
+        workers = [CacheManager(backend=SQLiteCacheBackend(path=path, poll_interval=0.05)) for _ in range(2)]
+        for worker in workers:
+            await worker.connect()
+        loader = CountingLoader('value')
+        
+        calls = [
+            asyncio.create_task(worker.get_or_set(key, loader, 60))
+            for worker in workers for _ in range(10)
+        ]
+        await loader.started.wait()
+        await asyncio.sleep(0.1)
+        loader.gate.set()
+        
+        # یک Worker محاسبه می‌کند؛ Worker دیگر تا آزاد شدن Lock منتظر نتیجه می‌ماند
+        assert await asyncio.gather(*calls) == ['value'] * 20
+        assert loader.calls == 1
+        for worker in workers:
+            await worker.close()
+            
+    @pytest.mark.asyncio
+    async def test_stale_value_served_while_refreshing(self, tmp_path, key):
+        manager = CacheManager(backend=SQLiteCacheBackend(path=str(tmp_path / 'cache.sqlite3')))
+        # مقدار منقضی شده که هنوز در بازه stale_ttl است
+        await manager.set(key, 'old', ttl=0, stale_ttl=60)
+        loader = CountingLoader('new')
+        
+        assert await asyncio.gather(*[manager.get_or_set(key, loader, 60, stale_ttl=60) for _ in range(5)]) == ['old'] * 5
+        await loader.started.wait()
+        assert await manager.get_or_set(key, loader, 60, stale_ttl=60) == 'old'
+        
+        loader.gate.set()
+        await asyncio.gather(*manager._background_tasks)
+        assert await manager.get_or_set(key, loader, 60, stale_ttl=60) == 'new'
+        assert loader.calls == 1
+
+
+class Analyzer:
+    """کلاس نمونه با متدهای memoize شده"""
+    
+    cache = CacheManager(backend=SQLiteCacheBackend(path=':memory:'))
+    
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+        
+    @cache.memoize(ttl=1)
+    async def difficulty(self, keyword, language='fa', depth=1):
+        self.calls.append((keyword, language, depth))
+        return {'keyword': keyword, 'analyzer': self.name}
+        
+    @cache.memoize(ttl=60, key_args=['keyword'])
+    async def volume(self, keyword, request_id=None):
+        self.calls.append((keyword, request_id))
+        return len(keyword)
+        
+    @cache.memoize(ttl=60, negative_ttl=0)
+    async def unstable(self, keyword):
+        self.calls.append(keyword)
+        raise ConnectionError(f"failed {keyword}")
+        
+    @cache.memoize(ttl=60, negative_ttl=1)
+    async def flaky(self, keyword):
+        self.calls.append(keyword)
+        raise ConnectionError(f"failed {keyword}")
+
+
+class TestMemoize:
+    """تست کلید، TTL و خطاهای memoize"""
+    
+    @pytest.mark.asyncio
+    async def test_key_from_arguments(self, key):
+        first, second = Analyzer('first'), Analyzer('second')
+        
+        result = await first.difficulty(key, depth=2, language='en')
+        # ترتیب و شکل ارسال Argument ها و نمونه self در کلید اثری ندارند
+        assert await first.difficulty(key, 'en', 2) == result
+        assert await second.difficulty(key, language='en', depth=2) == result
+        assert first.calls == [(key, 'en', 2)] and second.calls == []
+        
+        # مقدار پیش‌فرض در کلید قرار می‌گیرد
+        await first.difficulty(key)
+        assert await first.difficulty(key, 'fa', 1) == {'keyword': key, 'analyzer': 'first'}
+        assert len(first.calls) == 2
+        
+        # فقط key_args در کلید استفاده می‌شوند
+        assert await first.volume(key, request_id=1) == await first.volume(key, request_id=2)
+        assert first.calls[2:] == [(key, 1)]
+        
+    @pytest.mark.asyncio
+    async def test_ttl_and_bypass(self, key):
+        analyzer = Analyzer('a')
+        await analyzer.difficulty(key)
+        await analyzer.difficulty(key)
+        await analyzer.difficulty(key, bypass_cache=True)
+        assert len(analyzer.calls) == 2
+        
+        await asyncio.sleep(1.1)
+        await analyzer.difficulty(key)
+        assert len(analyzer.calls) == 3
+        stats = Analyzer.cache.memoize_stats[Analyzer.difficulty.__qualname__]
+        assert stats['hit'] >= 1 and stats['bypass'] >= 1
+        
+    @pytest.mark.asyncio
+    async def test_exceptions_are_not_cached(self, key):
+        analyzer = Analyzer('a')
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await analyzer.unstable(key)
+        assert analyzer.calls == [key, key]
+        
+    @pytest.mark.asyncio
+    async def test_negative_caching_expires_after_negative_ttl(self, key):
+        analyzer = Analyzer('a')
+        with pytest.raises(ConnectionError):
+            await analyzer.flaky(key)
+        # تا پایان negative_ttl خطای ذخیره شده بدون فراخوانی دوباره برگردانده می‌شود
+        with pytest.raises(CachedFailureError):
+            await analyzer.flaky(key)
+        assert analyzer.calls == [key]
+        
+        await asyncio.sleep(1.1)
+        with pytest.raises(ConnectionError):
+            await analyzer.flaky(key)
+        assert analyzer.calls == [key, key]
+
+
+class TestLocalTier:
+    """تست جدا بودن مقادیر برگشتی از لایه محلی"""
+    
+    @pytest.mark.asyncio
+    async def test_mutating_returned_values_does_not_change_cache(self, key):
+        # بدون connect فقط لایه محلی استفاده می‌شود
+        manager = CacheManager(backend=SQLiteCacheBackend(path=':memory:'))
+        value = {'keywords': ['seo'], 'report': {'score': 80}}
+        await manager.set(key, value, ttl=60)
+        value['keywords'].append('set_by_caller')
+        
+        first = await manager.get(key)
+        first['keywords'].append('added_by_caller')
+        first['report']['score'] = 0
+        assert await manager.get(key) == {'keywords': ['seo'], 'report': {'score': 80}}
+        
+        (await manager.get_many([key]))[key]['keywords'].clear()
+        assert (await manager.get_many([key]))[key]['keywords'] == ['seo']
+        
+        analyzer = Analyzer(key)
+        (await analyzer.difficulty(key))['analyzer'] = 'changed'
+        assert await analyzer.difficulty(key) == {'keyword': key, 'analyzer': key}
+        assert len(analyzer.calls) == 1
@@ -0,0 +1,46 @@
+"""
+تست Cache حافظه داشبوردها (سقف حجم و حذف LRU)
+"""
+
+from core.dashboard_cache import DashboardCache, estimate_size
+
+
+def make_dashboard(analysis_id: str, size: int = 1000):
+    return {'analysis_id': analysis_id, 'data': {'payload': 'x' * size}}
+
+
+class TestDashboardCache:
+    """تست حذف داشبوردهای کم‌استفاده"""
+    
+    def test_evicts_least_recently_used(self):
+        evicted = []
+        budget = estimate_size(make_dashboard('a')) * 2
+        cache = DashboardCache(max_bytes=budget, on_evict=evicted.append)
+        
+        cache.put('a', make_dashboard('a'))
+        cache.put('b', make_dashboard('b'))
+        cache.get('a')
+        cache.put('c', make_dashboard('c'))
+        
+        assert evicted == ['b']
+        assert 'a' in cache and 'c' in cache
+        assert cache.get_stats()['bytes'] <= budget
+        
+    def test_remeasures_and_keeps_current_entry(self):
+        cache = DashboardCache(max_bytes=5000)
+        cache.put('a', make_dashboard('a'))
+        
+        big = make_dashboard('b', size=10000)
+        cache.put('b', big)
+        
+        # داشبورد فعلی حتی بزرگ‌تر از سقف هم حذف نمی‌شود
+        assert 'b' in cache and 'a' not in cache
+        assert cache.get_stats()['bytes'] == estimate_size(big)
+        
+    def test_no_eviction_without_persistence(self):
+        cache = DashboardCache(max_bytes=100, can_evict=lambda: False)
+        for analysis_id in ('a', 'b', 'c'):
+            cache.put(analysis_id, make_dashboard(analysis_id))
+            
+        assert len(cache) == 3
+        assert cache.get_stats()['over_budget'] > 0
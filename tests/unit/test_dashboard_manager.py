@@ -0,0 +1,54 @@
+"""
+تست DashboardManager (نماهای مشتق شده)
+"""
+
+import uuid
+
+import pytest
+
+from core.dashboard_manager import DashboardManager
+from core.dashboard_store import persisted_state
+
+
+class TestDerivedViews:
+    """تست نقاط قوت/ضعف و پیشنهادات ذخیره شده"""
+    
+    @pytest.mark.asyncio
+    async def test_returned_lists_do_not_alias_cached_views(self):
+        manager = DashboardManager()
+        analysis_id = f"test_{uuid.uuid4().hex}"
+        await manager.create_dashboard(analysis_id, 'https://example.com')
+        await manager.update_dashboard(analysis_id, {'site_analysis': {}, 'seo_analysis': {}, 'status': 'completed'})
+        
+        first = await manager.get_dashboard_data(analysis_id)
+        counts = {name: len(first[name]) for name in ('strengths', 'weaknesses', 'recommendations')}
+        assert counts['weaknesses'] > 0
+        
+        # مانند apply-fixes که پیشنهادات مشکلات سئو را به لیست اضافه می‌کند
+        for name in counts:
+            first[name].append({'id': 'added_by_caller', 'title': 'x'})
+        view = await manager.get_dashboard_view(analysis_id, ['recommendations'])
+        view['recommendations'].append({'id': 'added_by_view'})
+        
+        second = await manager.get_dashboard_data(analysis_id)
+        assert {name: len(second[name]) for name in counts} == counts
+        assert all(item.get('id') != 'added_by_caller' for item in second['recommendations'])
+
+        
+    @pytest.mark.asyncio
+    async def test_apply_fixes_requires_reentering_unpersisted_secrets(self):
+        pytest.importorskip('fastapi')
+        from fastapi import HTTPException
+        import main
+        
+        manager = DashboardManager()
+        analysis_id = f"test_{uuid.uuid4().hex}"
+        await manager.create_dashboard(analysis_id, 'https://example.com')
+        credentials = {'cms_type': 'wordpress', 'username': 'admin', 'password': 'secret', 'saved_at': '2026-01-01T00:00:00'}
+        # مانند داشبوردی که پس از Restart از Database (بدون رمز) بارگذاری شده است
+        reloaded = persisted_state({'cms_credentials': credentials})['cms_credentials']
+        await manager.update_dashboard(analysis_id, {'site_analysis': {}, 'seo_analysis': {}, 'cms_credentials': reloaded})
+        
+        with pytest.raises(HTTPException) as error:
+            await main.apply_specific_fixes(analysis_id, main.ApplyFixesRequest(recommendation_ids=['rec_0']))
+        assert error.value.status_code == 409
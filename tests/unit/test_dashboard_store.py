@@ -0,0 +1,176 @@
+"""
+تست Dashboard Store (نوشتن write-behind در SQLite، حذف رمزها از وضعیت ذخیره شده و پاک کردن داشبوردها)
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+pytest.importorskip('greenlet')
+from sqlalchemy import event, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from core import dashboard_manager, dashboard_store as dashboard_store_module  # noqa: E402
+from core.dashboard_store import DashboardStore, missing_secrets, restore_secrets  # noqa: E402
+from core.result_store import ResultHandle, ResultStore  # noqa: E402
+from database.models import Base, Dashboard, SEOAnalysis, SiteAnalysis  # noqa: E402
+
+
+@pytest.fixture
+async def store(tmp_path):
+    """DashboardStore متصل به یک SQLite موقت"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'dashboards.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        
+    dashboard_store = DashboardStore(enabled=True, flush_interval=60)
+    dashboard_store._session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    dashboard_store._flush_event = asyncio.Event()
+    dashboard_store._flush_lock = asyncio.Lock()
+    dashboard_store._connected = True
+    yield dashboard_store
+    await engine.dispose()
+
+
+def make_dashboard(analysis_id):
+    return {
+        'analysis_id': analysis_id,
+        'site_url': 'https://example.com',
+        'status': 'completed',
+        'created_at': '2026-01-01T00:00:00',
+        'updated_at': '2026-01-01T00:00:01',
+        'cms_credentials': {
+            'cms_type': 'wordpress',
+            'username': 'admin',
+            'password': 'secret-password',
+            'api_key': 'secret-key',
+            'saved_at': '2026-01-01T00:00:01'
+        },
+        'data': {'generated_content': {'items': []}}
+    }
+
+
+class TestDashboardStore:
+    """تست نوشتن و بارگذاری داشبوردها"""
+    
+    @pytest.mark.asyncio
+    async def test_credentials_secrets_are_not_persisted(self, store):
+        dashboard = make_dashboard('a1')
+        store.mark_dirty('a1', dashboard)
+        await store.flush()
+        
+        async with store._session_factory() as session:
+            row = (await session.execute(select(Dashboard).where(Dashboard.analysis_id == 'a1'))).scalar_one()
+        assert row.state['cms_credentials']['username'] == 'admin'
+        assert 'password' not in row.state['cms_credentials'] and 'api_key' not in row.state['cms_credentials']
+        assert 'secret-password' not in str(row.state) + str(row.data)
+        assert 'secret-key' not in str(row.state) + str(row.data)
+        # نسخه حافظه دست نخورده است
+        assert dashboard['cms_credentials']['password'] == 'secret-password'
+        
+        loaded = await store.load('a1')
+        assert 'password' not in loaded['cms_credentials']
+        # بدون نسخه حافظه رمزها باید دوباره وارد شوند
+        assert missing_secrets(loaded, 'cms_credentials') == ['password', 'api_key']
+        restore_secrets(loaded, dashboard)
+        assert loaded['cms_credentials']['password'] == 'secret-password'
+        assert missing_secrets(loaded, 'cms_credentials') == []
+        assert missing_secrets(dashboard, 'cms_credentials') == []
+        
+        # اطلاعات لاگین جدیدتر (از Worker دیگر) با رمز قدیمی ترکیب نمی‌شود
+        loaded['cms_credentials'] = {'username': 'other', 'saved_at': '2026-02-01T00:00:00'}
+        restore_secrets(loaded, dashboard)
+        assert 'password' not in loaded['cms_credentials']
+
+        
+    @pytest.mark.asyncio
+    async def test_flush_rewrites_only_dirty_sections(self, store, tmp_path, monkeypatch):
+        results = ResultStore(base_dir=str(tmp_path / 'results'), spill_threshold=10)
+        monkeypatch.setattr(dashboard_store_module, 'result_store', results)
+        site_analysis = {'cms_type': 'wordpress', 'pages': list(range(50))}
+        seo_analysis = {'score': 70, 'issues': list(range(50))}
+        dashboard = make_dashboard('a1')
+        dashboard['data']['site_analysis'] = results.put('a1', 'site_analysis', site_analysis)
+        dashboard['data']['seo_analysis'] = results.put('a1', 'seo_analysis', seo_analysis)
+        store.mark_dirty('a1', dashboard)
+        await store.flush()
+        
+        loads, statements = [], []
+        original_aload = results.aload
+        
+        async def aload(value):
+            loads.append(value)
+            return await original_aload(value)
+            
+        monkeypatch.setattr(results, 'aload', aload)
+        engine = store._session_factory.kw['bind'].sync_engine
+        record = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+        event.listen(engine, 'before_cursor_execute', record)
+        
+        # فقط وضعیت تغییر کرده است (دو update_dashboard پشت سر هم)
+        dashboard['status'] = 'failed'
+        store.mark_dirty('a1', dashboard, sections=[])
+        dashboard['changes'] = {'pages': 1}
+        store.mark_dirty('a1', dashboard, sections=[])
+        await store.flush()
+        event.remove(engine, 'before_cursor_execute', record)
+        
+        assert loads == []
+        writes = [statement for statement in statements if statement.startswith(('UPDATE', 'INSERT'))]
+        assert writes and not any('payload' in statement or 'data=' in statement for statement in writes)
+        assert not any('seo_analyses' in statement for statement in writes)
+        
+        async with store._session_factory() as session:
+            site_row = (await session.execute(select(SiteAnalysis).where(SiteAnalysis.analysis_id == 'a1'))).scalar_one()
+            seo_row = (await session.execute(select(SEOAnalysis).where(SEOAnalysis.analysis_id == 'a1'))).scalar_one()
+            dashboard_row = (await session.execute(select(Dashboard).where(Dashboard.analysis_id == 'a1'))).scalar_one()
+        assert site_row.status == 'failed' and site_row.payload == site_analysis
+        assert seo_row.payload == seo_analysis
+        assert dashboard_row.state['changes'] == {'pages': 1} and dashboard_row.summary['seo_score'] == 70
+        assert dashboard_row.data == {'generated_content': {'items': []}}
+        
+        # بدون ردیف موجود، تغییر جزئی در دور بعد کامل نوشته می‌شود
+        missing = make_dashboard('a2')
+        missing['data']['site_analysis'] = site_analysis
+        store.mark_dirty('a2', missing, sections=['generated_content'])
+        await store.flush()
+        assert store.is_dirty('a2')
+        await store.flush()
+        assert not store.is_dirty('a2')
+        assert results.load((await store.load('a2'))['data']['site_analysis']) == site_analysis
+        
+    @pytest.mark.asyncio
+    async def test_clear_all_flushes_before_removing_results(self, store, tmp_path, monkeypatch):
+        results = ResultStore(base_dir=str(tmp_path / 'results'), spill_threshold=10)
+        monkeypatch.setattr(dashboard_manager, 'dashboard_store', store)
+        monkeypatch.setattr(dashboard_manager, 'result_store', results)
+        monkeypatch.setattr(dashboard_store_module, 'result_store', results)
+        site_analysis = {'cms_type': 'wordpress', 'pages': list(range(50))}
+        
+        flushed = make_dashboard('a1')
+        flushed['data']['site_analysis'] = results.put('a1', 'site_analysis', site_analysis)
+        assert isinstance(flushed['data']['site_analysis'], ResultHandle)
+        store.mark_dirty('a1', flushed)
+        await dashboard_manager.DashboardManager.clear_all_dashboards()
+        
+        # داشبورد قبل از حذف فایل‌های Result Store کامل در Database نوشته شده است
+        async with store._session_factory() as session:
+            row = (await session.execute(select(SiteAnalysis).where(SiteAnalysis.analysis_id == 'a1'))).scalar_one()
+        assert row.payload == site_analysis
+        assert not (results.base_dir / 'a1').exists()
+        
+        # اگر نوشتن ناموفق باشد نتایج داشبورد نوشته نشده حذف نمی‌شوند
+        unflushed = make_dashboard('a2')
+        handle = results.put('a2', 'site_analysis', site_analysis)
+        unflushed['data']['site_analysis'] = handle
+        store.mark_dirty('a2', unflushed)
+        
+        async def fail(batch):
+            raise OSError("database is unavailable")
+            
+        monkeypatch.setattr(store, '_write_batch', fail)
+        await dashboard_manager.DashboardManager.clear_all_dashboards()
+        assert store.is_dirty('a2')
+        assert results.load(handle) == site_analysis
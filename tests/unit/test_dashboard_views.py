@@ -0,0 +1,55 @@
+"""
+تست انتخاب فیلدها و صفحه‌بندی Cursor داشبورد
+"""
+
+import pytest
+
+from core.dashboard_views import paginate, parse_fields
+
+
+class TestParseFields:
+    """تست پارامتر fields"""
+    
+    def test_no_fields_means_full_dashboard(self):
+        assert parse_fields(None) is None
+        assert parse_fields('  ') is None
+        
+    def test_known_and_data_fields(self):
+        assert parse_fields('summary, status,data.seo_analysis,summary') == ['summary', 'status', 'data.seo_analysis']
+        
+    def test_unknown_field_rejected(self):
+        with pytest.raises(ValueError):
+            parse_fields('summary,cms_credentials')
+        assert parse_fields('alerts', extra=('alerts',)) == ['alerts']
+
+
+class TestPaginate:
+    """تست صفحه‌بندی Cursor"""
+    
+    def test_walks_all_pages(self):
+        items = [{'id': i, 'content': 'x' * 100} for i in range(25)]
+        
+        seen, cursor = [], None
+        while True:
+            page = paginate('content-items', items, cursor=cursor, limit=10, fields=['id'])
+            seen.extend(page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+                
+        assert seen == [{'id': i} for i in range(25)]
+        assert page['total'] == 25
+        
+    def test_limit_is_capped(self):
+        page = paginate('issues', list(range(10_000)), limit=10_000)
+        
+        assert page['limit'] == 500
+        assert len(page['items']) == 500
+        
+    def test_cursor_bound_to_list(self):
+        cursor = paginate('issues', list(range(100)), limit=10)['next_cursor']
+        
+        with pytest.raises(ValueError):
+            paginate('keywords', list(range(100)), cursor=cursor)
+        with pytest.raises(ValueError):
+            paginate('issues', list(range(100)), cursor='not-a-cursor')
@@ -0,0 +1,74 @@
+"""
+تست گزارش تجمیعی (PortfolioIndex)
+"""
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from core.portfolio import PortfolioIndex, portfolio_row  # noqa: E402
+
+
+def make_dashboard(analysis_id, site_url, response_time, issue_types, updated_at, status='completed'):
+    site_analysis = {
+        'cms_type': 'wordpress',
+        'security': {'ssl_enabled': True},
+        'performance': {'response_time': response_time, 'status_code': 200}
+    }
+    seo_analysis = {'issues': [{'type': issue_type} for issue_type in issue_types]}
+    return {
+        'analysis_id': analysis_id,
+        'site_url': site_url,
+        'status': status,
+        'updated_at': updated_at,
+        'derived': {'portfolio': portfolio_row(site_analysis, seo_analysis, [], [])}
+    }
+
+
+@pytest.fixture
+def index():
+    index = PortfolioIndex(sync_interval=0, initial_capacity=2)
+    index.upsert('a1', make_dashboard('a1', 'https://one.com', 0.5, ['h1'], '2026-01-01T00:00:00'))
+    index.upsert('a2', make_dashboard('a2', 'https://one.com', 4.0, ['h1', 'alt'], '2026-01-02T00:00:00'))
+    index.upsert('b1', make_dashboard('b1', 'https://two.com', 2.5, ['alt', 'alt'], '2026-01-01T00:00:00'))
+    index.upsert('c1', make_dashboard('c1', 'https://three.com', 1.5, [], '2026-01-01T00:00:00', status='failed'))
+    return index
+
+
+class TestPortfolioIndex:
+    """تست Query های تجمیعی"""
+    
+    def test_latest_only_keeps_newest_analysis_per_site(self, index):
+        summary = index.summary()
+        
+        assert summary['analyses'] == 2 and summary['sites'] == 2
+        assert summary['distributions']['response_time']['max'] == 4.0
+        assert summary['statuses'] == {'completed': 3, 'failed': 1}
+        
+        everything = index.summary(status=None, latest_only=False)
+        assert everything['analyses'] == 4
+        
+    def test_top_issues_count_affected_sites(self, index):
+        issues = index.summary()['top_issues']
+        
+        assert [(item['type'], item['sites_affected'], item['occurrences']) for item in issues] == [
+            ('alt', 2, 3), ('h1', 1, 1)
+        ]
+        
+    def test_rankings_are_paged(self, index):
+        ranking = index.rankings('response_time', ascending=False, limit=1, status=None, latest_only=False)
+        assert ranking['total'] == 4
+        assert [item['analysis_id'] for item in ranking['items']] == ['a2']
+        
+        second = index.rankings('response_time', ascending=False, limit=2, offset=1, status=None, latest_only=False)
+        assert [item['analysis_id'] for item in second['items']] == ['b1', 'c1']
+        
+        with pytest.raises(ValueError):
+            index.rankings('unknown')
+            
+    def test_upsert_replaces_row(self, index):
+        index.upsert('b1', make_dashboard('b1', 'https://two.com', 0.2, [], '2026-01-03T00:00:00'))
+        
+        issues = index.summary()['top_issues']
+        assert sorted((item['type'], item['sites_affected']) for item in issues) == [('alt', 1), ('h1', 1)]
+        assert len(index) == 4
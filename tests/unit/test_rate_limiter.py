@@ -0,0 +1,140 @@
+"""
+تست Rate Limiter (Token Bucket، Store ها و Middleware)
+Store Redis فقط در صورت تنظیم TEST_REDIS_URL اجرا می‌شود
+"""
+
+import os
+import uuid
+
+import pytest
+
+from core.rate_limiter import MemoryRateLimitStore, RateLimiter, RateLimitStore, RedisRateLimitStore, parse_rate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'redis'])
+async def store(request):
+    if request.param == 'memory':
+        yield MemoryRateLimitStore(shards=4)
+        return
+    redis_url = os.getenv('TEST_REDIS_URL')
+    if not redis_url:
+        pytest.skip("TEST_REDIS_URL is not set")
+    redis_store = RedisRateLimitStore(redis_url)
+    try:
+        await redis_store.connect()
+    except Exception as e:
+        pytest.skip(f"redis store unavailable: {e}")
+    yield redis_store
+    await redis_store.close()
+
+
+class TestRateLimiter:
+    """تست Token Bucket و انتخاب Bucket ها"""
+    
+    def test_parse_rate(self):
+        assert (parse_rate('60/minute').limit, parse_rate('60/minute').period) == (60, 60)
+        assert parse_rate('10/5m').period == 300 and parse_rate('2/seconds').rate == 2
+        with pytest.raises(ValueError):
+            parse_rate('60/fortnight')
+            
+    def test_store_without_acquire_fails_on_construction(self):
+        class PartialStore(RateLimitStore):
+            name = "partial"
+            
+        with pytest.raises(TypeError):
+            PartialStore()
+            
+    @pytest.mark.asyncio
+    async def test_burst_then_reject_is_all_or_nothing(self, store):
+        prefix = f"test:{uuid.uuid4().hex}:"
+        tenant = [(prefix + 'tenant', parse_rate('5/hour'))]
+        both = tenant + [(prefix + 'route', parse_rate('2/hour'))]
+        
+        assert [(await store.acquire(both))[0] for _ in range(3)] == [True, True, False]
+        allowed, tokens = await store.acquire(tenant)
+        # درخواست رد شده Token ای از Bucket tenant برنداشته است
+        assert allowed and int(tokens[0]) == 2
+        
+    @pytest.mark.asyncio
+    async def test_refill_and_idle_bucket_expiry(self):
+        clock = FakeClock()
+        store = MemoryRateLimitStore(shards=1, clock=clock)
+        limit = parse_rate('2/second')
+        
+        assert [store.acquire_sync([('a', limit)])[0] for _ in range(3)] == [True, True, False]
+        clock.now += 0.5
+        assert store.acquire_sync([('a', limit)]) == (True, [0.0])
+        
+        clock.now += 2
+        store.acquire_sync([('b', limit)])
+        # Bucket a پر شده و با برداشت بعدی همان Shard حذف شده است
+        assert store.get_stats()['buckets'] == 1
+        
+    @pytest.mark.asyncio
+    async def test_route_api_key_limits_and_headers(self):
+        limiter = RateLimiter(
+            default='3/minute',
+            routes='POST /analyze=1/minute,/dashboard/*/export*=100/minute',
+            api_keys='vip=10/minute,internal=unlimited',
+            exempt_paths='/health',
+            backend='memory'
+        )
+        
+        assert len(limiter.buckets('POST', '/analyze', 'ip:1')) == 2
+        assert len(limiter.buckets('GET', '/analyze', 'ip:1')) == 1
+        assert len(limiter.buckets('GET', '/dashboard/a1/export/pdf', 'ip:1')) == 2
+        assert await limiter.check('GET', '/health', client_host='1.2.3.4') is None
+        assert await limiter.check('GET', '/dashboard', api_key='internal') is None
+        
+        first = await limiter.check('POST', '/analyze', client_host='1.2.3.4')
+        second = await limiter.check('POST', '/analyze', client_host='1.2.3.4')
+        assert first.allowed and not second.allowed
+        assert dict(second.headers())[b'x-ratelimit-limit'] == b'1'
+        assert dict(second.headers())[b'retry-after'] == b'60'
+        assert (await limiter.check('GET', '/dashboard', client_host='1.2.3.4')).remaining == 1
+        assert (await limiter.check('GET', '/dashboard', api_key='vip')).remaining == 9
+        
+    @pytest.mark.asyncio
+    async def test_unknown_api_keys_share_the_client_ip_bucket(self):
+        limiter = RateLimiter(default='3/minute', routes='', api_keys='vip=10/minute', backend='memory')
+        
+        # کلیدهای تصادفی Tenant جدیدی نمی‌سازند و Bucket همان IP را مصرف می‌کنند
+        results = [
+            await limiter.check('GET', '/dashboard', api_key=uuid.uuid4().hex, client_host='10.0.0.9')
+            for _ in range(4)
+        ]
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert not (await limiter.check('GET', '/dashboard', client_host='10.0.0.9')).allowed
+        assert (await limiter.check('GET', '/dashboard', api_key='vip', client_host='10.0.0.9')).allowed
+        
+    @pytest.mark.asyncio
+    async def test_middleware_adds_headers_and_rejects(self):
+        from middleware.security import RateLimitMiddleware
+        
+        async def app(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b'ok'})
+            
+        middleware = RateLimitMiddleware(app, limiter=RateLimiter(default='1/minute', routes='', api_keys='', backend='memory'))
+        scope = {'type': 'http', 'method': 'GET', 'path': '/dashboard/a1', 'headers': [], 'client': ('10.0.0.1', 1234)}
+        responses = []
+        for _ in range(2):
+            messages = []
+            
+            async def send(message):
+                messages.append(message)
+                
+            await middleware(scope, None, send)
+            responses.append(messages)
+            
+        ok_headers = dict(responses[0][0]['headers'])
+        assert responses[0][0]['status'] == 200 and ok_headers[b'x-ratelimit-remaining'] == b'0'
+        assert responses[1][0]['status'] == 429 and dict(responses[1][0]['headers'])[b'retry-after'] == b'60'
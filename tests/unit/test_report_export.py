@@ -0,0 +1,38 @@
+"""
+تست خروجی HTML گزارش سئو
+"""
+
+from core import report_export
+
+
+def make_report(issues: int):
+    return {
+        'analysis_id': 'a1',
+        'site_url': 'https://example.com/?q=<script>',
+        'overall_score': {'overall': 72.5, 'grade': 'B', 'breakdown': {'technical': 75}},
+        'issues_and_solutions': [
+            {'issue': f"مشکل {i}", 'priority': 'high', 'solution': {'steps': ['اصلاح <b>']}}
+            for i in range(issues)
+        ]
+    }
+
+
+class TestReportHtml:
+    """تست ساخت HTML"""
+    
+    def test_issue_rows_are_chunked(self, monkeypatch):
+        monkeypatch.setattr(report_export, 'REPORT_EXPORT_CHUNK_ROWS', 10)
+        chunks = list(report_export.iter_report_html(make_report(25)))
+        html = ''.join(chunks)
+        
+        row_chunks = [chunk for chunk in chunks if chunk.startswith('<tr><td>')]
+        assert [chunk.count('<tr>') for chunk in row_chunks] == [10, 10, 5]
+        assert html.startswith('<!DOCTYPE html>') and html.endswith('</html>')
+        assert html.count('<table>') == html.count('</table>')
+        
+    def test_values_are_escaped(self):
+        html = ''.join(report_export.iter_report_html(make_report(1)))
+        
+        assert '<script>' not in html
+        assert '&lt;script&gt;' in html
+        assert '&lt;b&gt;' in html
@@ -0,0 +1,76 @@
+"""
+تست Result Store (حذف نتایج منقضی شده و بارگذاری Handle ها خارج از Event Loop)
+"""
+
+import os
+import time
+
+import pytest
+
+from core.pipeline import PipelineManager, PipelineStep
+from core.result_store import ResultHandle, ResultStore
+
+
+def make_store(tmp_path, **kwargs):
+    return ResultStore(base_dir=str(tmp_path / 'results'), spill_threshold=10, cache_items=4, **kwargs)
+
+
+class TestResultStore:
+    """تست delete و sweep و PipelineContext"""
+    
+    @pytest.mark.asyncio
+    async def test_sweep_removes_only_expired_inactive_analyses(self, tmp_path):
+        store = make_store(tmp_path, ttl_seconds=60)
+        handles = {
+            analysis_id: store.put(analysis_id, 'site_analysis', {'pages': list(range(20))})
+            for analysis_id in ('old', 'active', 'fresh')
+        }
+        assert all(isinstance(handle, ResultHandle) for handle in handles.values())
+        store.load(handles['old'])
+        
+        old_time = time.time() - 120
+        for analysis_id in ('old', 'active'):
+            directory = store.base_dir / analysis_id
+            for path in [directory, *directory.iterdir()]:
+                os.utime(path, (old_time, old_time))
+                
+        assert store.sweep(active_ids=['active']) == 1
+        assert not (store.base_dir / 'old').exists()
+        assert store.load(handles['old']) is None
+        assert store.load(handles['active']) == {'pages': list(range(20))}
+        assert store.load(handles['fresh']) == {'pages': list(range(20))}
+        
+        store.delete('fresh')
+        assert not (store.base_dir / 'fresh').exists()
+        
+    @pytest.mark.asyncio
+    async def test_pipeline_steps_do_not_load_synchronously(self, tmp_path):
+        store = make_store(tmp_path)
+        sync_loads = []
+        original_load = store.load
+        
+        def load(value):
+            sync_loads.append(value)
+            return original_load(value)
+            
+        pipeline = PipelineManager('a1', store)
+        
+        async def first_step(context):
+            return {'pages': list(range(20))}
+            
+        async def second_step(context):
+            # مقدار پیش از اجرای Step در Thread جداگانه بارگذاری شده است
+            store.load = load
+            try:
+                return len(context['first_result']['pages'])
+            finally:
+                store.load = original_load
+                
+        pipeline.add_step(PipelineStep('first', first_step))
+        pipeline.add_step(PipelineStep('second', second_step, ['first']))
+        result = await pipeline.execute()
+        
+        assert result['status'] == 'completed' and result['results']['second']['result'] == 20
+        assert sync_loads == []
+        assert isinstance(result['context'].get_raw('first_result'), ResultHandle)
+        assert (await result['context'].aget('first_result'))['pages'][-1] == 19
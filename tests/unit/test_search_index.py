@@ -0,0 +1,85 @@
+"""
+تست Index جستجوی تحلیل‌ها (FTS5، فیلترها و صفحه‌بندی)
+"""
+
+import pytest
+
+from core.search_index import SearchIndex, match_expression, search_document
+
+
+def make_dashboard(site_url, plugins, issue_types, keywords, updated_at, status='completed', version=2):
+    site_analysis = {
+        'cms_type': 'WordPress',
+        'cms_details': {'plugins': [{'slug': slug, 'name': slug.title()} for slug in plugins]},
+        'technology_stack': {'javascript_libraries': ['jQuery']}
+    }
+    seo_analysis = {
+        'issues': [{'type': issue_type, 'title': f"مشکل {issue_type}"} for issue_type in issue_types],
+        'content': {'keywords': [{'word': word, 'count': 3} for word in keywords]}
+    }
+    return {
+        'site_url': site_url,
+        'status': status,
+        'created_at': updated_at,
+        'updated_at': updated_at,
+        'version': version,
+        'derived': {'version': version, 'search': search_document(site_analysis, seo_analysis, [])}
+    }
+
+
+@pytest.fixture
+async def index():
+    index = SearchIndex(enabled=False)
+    await index.connect()
+    index.index_dashboard('a1', make_dashboard(
+        'https://www.shop.example.com', ['woocommerce', 'yoast'], ['missing_alt'], ['کفش', 'کتانی'], '2026-01-01T00:00:01'
+    ))
+    index.index_dashboard('a2', make_dashboard(
+        'https://blog.test.org', ['yoast'], ['headings_h1'], ['آموزش'], '2026-01-01T00:00:02', status='failed'
+    ))
+    index.index_dashboard('a3', make_dashboard(
+        'https://shop.example.com/fa', [], ['missing_alt', 'headings_h1'], ['کفش'], '2026-01-01T00:00:03'
+    ))
+    yield index
+    await index.close()
+
+
+class TestSearchIndex:
+    """تست جستجو و فیلترها"""
+    
+    @pytest.mark.asyncio
+    async def test_full_text_and_facet_filters(self, index):
+        assert {item['analysis_id'] for item in (await index.search(query='yoast'))['items']} == {'a1', 'a2'}
+        assert [item['analysis_id'] for item in (await index.search(query='کف'))['items']] == ['a3', 'a1']
+        assert (await index.search(facets={'plugin': 'WooCommerce'}))['total'] == 1
+        assert (await index.search(facets={'keyword': 'کتانی'}))['total'] == 1
+        assert (await index.search(facets={'issue_type': 'headings_h1'}, status='completed'))['total'] == 1
+        assert (await index.search(site='www.shop.example.com'))['total'] == 2
+        assert (await index.search(cms_type='wordpress', query='missing'))['total'] == 2
+        
+    @pytest.mark.asyncio
+    async def test_keyset_pagination_and_facet_counts(self, index):
+        first = await index.search(limit=2, facet_counts=True)
+        second = await index.search(limit=2, cursor=first['next_cursor'])
+        
+        assert [item['analysis_id'] for item in first['items']] == ['a3', 'a2']
+        assert [item['analysis_id'] for item in second['items']] == ['a1']
+        assert second['next_cursor'] is None and first['total'] == 3
+        assert {'value': 'completed', 'count': 2} in first['facets']['status']
+        assert first['facets']['plugin'][0] == {'value': 'yoast', 'count': 2}
+        with pytest.raises(ValueError):
+            await index.search(cursor='not-a-cursor')
+            
+    @pytest.mark.asyncio
+    async def test_update_replaces_document_and_status(self, index):
+        index.index_dashboard('a1', make_dashboard(
+            'https://www.shop.example.com', ['elementor'], [], [], '2026-01-02T00:00:00', status='failed', version=3
+        ))
+        
+        assert (await index.search(query='woocommerce'))['total'] == 0
+        assert [item['analysis_id'] for item in (await index.search(query='elementor'))['items']] == ['a1']
+        assert (await index.search(status='failed'))['total'] == 2
+        
+    def test_match_expression_strips_operators(self):
+        assert match_expression('yoast" OR (seo*') == '"yoast"* "OR"* "seo"*'
+        assert match_expression('  ") ') is None
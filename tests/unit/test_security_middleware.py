@@ -0,0 +1,64 @@
+"""
+تست Middleware های امنیتی ASGI (Header ها، Logging و عبور پاسخ‌های Streaming)
+"""
+
+import logging
+
+import pytest
+
+from core.rate_limiter import RateLimiter
+from middleware.security import (
+    RateLimitMiddleware,
+    RequestLoggingMiddleware,
+    SecurityHeadersMiddleware
+)
+
+
+def build_stack(app):
+    """همان ترتیب main.py (آخرین Middleware بیرونی‌ترین است)"""
+    app = SecurityHeadersMiddleware(app)
+    app = RequestLoggingMiddleware(app)
+    return RateLimitMiddleware(app, limiter=RateLimiter(default='100/minute', routes='', api_keys='', backend='memory'))
+
+
+class TestSecurityMiddleware:
+    """تست Stack Middleware های امنیتی"""
+    
+    @pytest.mark.asyncio
+    async def test_streaming_chunks_are_forwarded_unbuffered(self, caplog):
+        events = []
+        
+        async def app(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'), (b'x-frame-options', b'SAMEORIGIN')
+            ]})
+            for index in range(3):
+                events.append(f"produced {index}")
+                await send({'type': 'http.response.body', 'body': f"data: {index}\n\n".encode(), 'more_body': index < 2})
+                
+        async def send(message):
+            events.append(message['type'] if message['type'] == 'http.response.start' else f"sent {message['body'][6:7].decode()}")
+            if message['type'] == 'http.response.start':
+                events.append(message['headers'])
+                
+        scope = {'type': 'http', 'method': 'GET', 'path': '/events', 'headers': [], 'client': ('10.0.0.1', 1234)}
+        with caplog.at_level(logging.INFO, logger='middleware.security'):
+            await build_stack(app)(scope, None, send)
+            
+        headers = events[1]
+        assert events[0] == 'http.response.start'
+        assert events[2:] == ['produced 0', 'sent 0', 'produced 1', 'sent 1', 'produced 2', 'sent 2']
+        assert [value for name, value in headers if name == b'x-frame-options'] == [b'DENY']
+        assert (b'x-content-type-options', b'nosniff') in headers
+        assert (b'x-ratelimit-remaining', b'99') in headers
+        assert any('Response: GET /events Status: 200' in record.message for record in caplog.records)
+        
+    @pytest.mark.asyncio
+    async def test_non_http_scopes_pass_through(self):
+        calls = []
+        
+        async def app(scope, receive, send):
+            calls.append(scope['type'])
+            
+        await build_stack(app)({'type': 'lifespan'}, None, None)
+        assert calls == ['lifespan']
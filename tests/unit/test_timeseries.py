@@ -0,0 +1,147 @@
+"""
+تست Time-Series Store (بافر حلقوی، Rollup ها، Query بازه و ذخیره پایدار)
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from core.timeseries import RingBuffer, TimeSeriesStore, monitoring_metrics
+
+
+DAY = 86400
+T0 = 1_700_000_000 - 1_700_000_000 % DAY  # ابتدای یک روز
+HOUR = int(time.time()) // 3600 * 3600  # ابتدای ساعت جاری (نقاط قدیمی هنگام نوشتن Prune می‌شوند)
+
+
+class TestRingBuffer:
+    """تست بافر حلقوی"""
+    
+    def test_wraps_and_keeps_order(self):
+        ring = RingBuffer(capacity=5, width=2)
+        for i in range(12):
+            ring.append((float(i), float(i * 10)))
+            
+        assert len(ring) == 5
+        assert ring.first_time() == 7
+        assert ring.range(0, 100) == [(float(i), float(i * 10)) for i in range(7, 12)]
+        assert ring.range(8, 10) == [(8.0, 80.0), (9.0, 90.0), (10.0, 100.0)]
+        assert ring.range(0, 100, limit=2) == [(10.0, 100.0), (11.0, 110.0)]
+
+
+class TestTimeSeriesStore:
+    """تست ثبت و Query"""
+    
+    @pytest.fixture
+    def store(self):
+        return TimeSeriesStore(enabled=False, raw_capacity=100)
+        
+    @pytest.mark.asyncio
+    async def test_rollups(self, store):
+        # هر 10 ثانیه یک نقطه به مدت 2 ساعت
+        for i in range(720):
+            await store.record('https://www.example.com/page', {'response_time': float(i % 6)}, timestamp=T0 + i * 10)
+            
+        hourly = await store.query('example.com', 'response_time', start=T0, end=T0 + 7200, resolution='1h')
+        
+        assert [point['count'] for point in hourly['points']] == [360, 360]
+        assert hourly['points'][0]['avg'] == pytest.approx(2.5)
+        assert hourly['points'][0]['min'] == 0 and hourly['points'][0]['max'] == 5
+        
+    @pytest.mark.asyncio
+    async def test_auto_resolution(self, store):
+        for i in range(720):
+            await store.record('example.com', {'response_time': 1.0}, timestamp=T0 + i * 10)
+            
+        # 10 دقیقه آخر در نقاط خام موجود است
+        recent = await store.query('example.com', 'response_time', start=T0 + 6600, end=T0 + 7190)
+        # نقاط خام (100 نقطه) کل 2 ساعت را پوشش نمی‌دهند و 1m بیش از 60 نقطه است
+        full = await store.query('example.com', 'response_time', start=T0, end=T0 + 7200, max_points=60)
+        
+        assert recent['resolution'] == 'raw'
+        assert len(recent['points']) == 60
+        assert full['resolution'] == '1h'
+        
+    @pytest.mark.asyncio
+    async def test_out_of_order_points_are_dropped(self, store):
+        await store.record('example.com', {'issues_count': 5}, timestamp=T0 + 100)
+        await store.record('example.com', {'issues_count': 7}, timestamp=T0 + 50)
+        
+        result = await store.query('example.com', 'issues_count', start=T0, end=T0 + 200, resolution='raw')
+        
+        assert [point['value'] for point in result['points']] == [5.0]
+        assert store.stats['out_of_order'] == 1
+        
+    @pytest.mark.asyncio
+    async def test_persisted_and_reloaded(self, tmp_path):
+        path = str(tmp_path / 'timeseries.sqlite3')
+        store = TimeSeriesStore(path=path, enabled=True, raw_capacity=100, flush_interval=60)
+        await store.connect()
+        for day in range(10):
+            await store.record('example.com', {'issues_count': float(day)}, timestamp=T0 + day * DAY)
+        await store.close()
+        
+        reopened = TimeSeriesStore(path=path, enabled=True, raw_capacity=100, flush_interval=60)
+        await reopened.connect()
+        daily = await reopened.query('example.com', 'issues_count', start=T0, end=T0 + 10 * DAY, resolution='1d')
+        await reopened.close()
+        
+        assert [point['last'] for point in daily['points']] == [float(day) for day in range(10)]
+        
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_requeued(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'timeseries.sqlite3')
+        store = TimeSeriesStore(path=path, enabled=True, raw_capacity=100, flush_interval=60)
+        await store.connect()
+        for i in range(3):
+            await store.record('example.com', {'response_time': float(i)}, timestamp=HOUR + i)
+            
+        def fail(*args):
+            raise sqlite3.OperationalError("database is locked")
+            
+        monkeypatch.setattr(store, '_write', fail)
+        with pytest.raises(sqlite3.OperationalError):
+            await store.flush()
+        monkeypatch.undo()
+        await store.record('example.com', {'response_time': 9.0}, timestamp=HOUR + 3)
+        assert store.get_stats()['pending_points'] == 4
+        await store.close()
+        
+        reopened = TimeSeriesStore(path=path, enabled=True, raw_capacity=100, flush_interval=60)
+        await reopened.connect()
+        hourly = await reopened.query('example.com', 'response_time', start=HOUR, end=HOUR + 3600, resolution='1h')
+        raw = await reopened.query('example.com', 'response_time', start=HOUR, end=HOUR + 3600, resolution='raw')
+        await reopened.close()
+        
+        assert len(raw['points']) == 4
+        assert [(point['count'], point['min'], point['max'], point['last']) for point in hourly['points']] == [(4, 0, 9, 9)]
+        
+    @pytest.mark.asyncio
+    async def test_workers_sharing_a_file_add_up_rollups(self, tmp_path):
+        path = str(tmp_path / 'timeseries.sqlite3')
+        workers = [TimeSeriesStore(path=path, enabled=True, raw_capacity=100, flush_interval=60) for _ in range(2)]
+        for worker in workers:
+            await worker.connect()
+        for i in range(4):
+            await workers[i % 2].record('example.com', {'response_time': float(i)}, timestamp=HOUR + i)
+            await workers[i % 2].flush()
+        for worker in workers:
+            await worker.close()
+            
+        reopened = TimeSeriesStore(path=path, enabled=True, raw_capacity=100, flush_interval=60)
+        await reopened.connect()
+        hourly = await reopened.query('example.com', 'response_time', start=HOUR, end=HOUR + 3600, resolution='1h')
+        await reopened.close()
+        
+        point = hourly['points'][0]
+        assert (point['count'], point['min'], point['max'], point['avg']) == (4, 0, 3, pytest.approx(1.5))
+
+
+def test_monitoring_metrics_only_for_given_sections():
+    metrics = monitoring_metrics(
+        site_analysis={'performance': {'response_time': 0.8, 'status_code': 200}},
+        status='completed'
+    )
+    
+    assert metrics == {'response_time': 0.8, 'status_code': 200.0, 'analysis_status': 2.0}